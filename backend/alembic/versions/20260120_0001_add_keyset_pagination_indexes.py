@@ -0,0 +1,41 @@
+"""Add (tenant_id, created_at, id) indexes for keyset pagination
+
+Revision ID: 20260120_0001
+Revises: 20260119_0001
+Create Date: 2026-01-20
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260120_0001'
+down_revision = '20260119_0001'
+branch_labels = None
+depends_on = None
+
+
+KEYSET_INDEXES = [
+    ("ix_orders_tenant_created_id", "orders"),
+    ("ix_activity_logs_tenant_created_id", "activity_logs"),
+    ("ix_crm_accounts_tenant_created_id", "crm_accounts"),
+    ("ix_wms_stock_levels_tenant_created_id", "wms_stock_levels"),
+    ("ix_fms_customs_declarations_tenant_created_id", "fms_customs_declarations"),
+]
+
+
+def upgrade():
+    # List endpoints page with WHERE tenant_id = ? AND (created_at, id) < cursor
+    # ORDER BY created_at DESC, id DESC - these indexes serve that as a range scan
+    conn = op.get_bind()
+    for index_name, table_name in KEYSET_INDEXES:
+        conn.execute(sa.text(
+            f"CREATE INDEX IF NOT EXISTS {index_name} "
+            f"ON {table_name}(tenant_id, created_at DESC, id DESC)"
+        ))
+
+
+def downgrade():
+    conn = op.get_bind()
+    for index_name, _ in KEYSET_INDEXES:
+        conn.execute(sa.text(f"DROP INDEX IF EXISTS {index_name}"))
@@ -0,0 +1,69 @@
+"""Add background_jobs table (durable queue for long-running operations)
+
+Revision ID: 20260121_0001
+Revises: 20260120_0001
+Create Date: 2026-01-21
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision = '20260121_0001'
+down_revision = '20260120_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('background_jobs',
+        sa.Column('id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('tenant_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False, server_default='queued'),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+
+        # Progress
+        sa.Column('progress', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('progress_message', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+
+        # Retries
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+
+        sa.Column('idempotency_key', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.text('false')),
+
+        # Worker lease
+        sa.Column('locked_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+
+        sa.Column('created_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_background_jobs_id', 'background_jobs', ['id'])
+    op.create_index('ix_background_jobs_tenant_id', 'background_jobs', ['tenant_id'])
+    op.create_index('ix_background_jobs_kind', 'background_jobs', ['kind'])
+    # Workers claim with WHERE status = 'queued' AND run_after <= now() ORDER BY run_after
+    op.create_index('ix_background_jobs_claim', 'background_jobs', ['status', 'run_after'])
+    op.create_index(
+        'uq_background_jobs_idempotency', 'background_jobs', ['tenant_id', 'kind', 'idempotency_key'],
+        unique=True, postgresql_where=sa.text('idempotency_key IS NOT NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('uq_background_jobs_idempotency', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_claim', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_kind', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_tenant_id', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_id', table_name='background_jobs')
+    op.drop_table('background_jobs')
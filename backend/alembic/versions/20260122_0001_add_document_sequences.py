@@ -0,0 +1,47 @@
+"""Add document_sequences (shared number allocation for orders, invoices, ...)
+
+Revision ID: 20260122_0001
+Revises: 20260121_0001
+Create Date: 2026-01-22
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision = '20260122_0001'
+down_revision = '20260121_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_sequences',
+        sa.Column('id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('tenant_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('last_value', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', 'key', name='uq_document_sequences_key'),
+    )
+    op.create_index('ix_document_sequences_id', 'document_sequences', ['id'])
+    op.create_index('ix_document_sequences_tenant_id', 'document_sequences', ['tenant_id'])
+
+    # Carry over the per-customer order code counters
+    conn = op.get_bind()
+    conn.execute(sa.text("""
+        INSERT INTO document_sequences (id, tenant_id, key, last_value, created_at, updated_at)
+        SELECT id, tenant_id, 'order:' || customer_code, last_seq, created_at, now()
+        FROM order_sequences
+        WHERE yymm = 'ALL'
+        ON CONFLICT (tenant_id, key) DO NOTHING
+    """))
+
+
+def downgrade():
+    op.drop_index('ix_document_sequences_tenant_id', table_name='document_sequences')
+    op.drop_index('ix_document_sequences_id', table_name='document_sequences')
+    op.drop_table('document_sequences')
@@ -0,0 +1,62 @@
+"""Add order_import_staging (COPY target of the order import job)
+
+Revision ID: 20260123_0001
+Revises: 20260122_0001
+Create Date: 2026-01-23
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260123_0001'
+down_revision = '20260122_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    # Rows only live inside the import transaction that copied them: no WAL needed
+    conn.execute(sa.text("""
+        CREATE UNLOGGED TABLE IF NOT EXISTS order_import_staging (
+            job_id VARCHAR NOT NULL,
+            row_no INTEGER NOT NULL,
+            id VARCHAR NOT NULL,
+            log_id VARCHAR NOT NULL,
+            order_code VARCHAR NOT NULL,
+            customer_id VARCHAR NOT NULL,
+            status VARCHAR NOT NULL,
+            order_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            customer_requested_date TIMESTAMP WITHOUT TIME ZONE,
+            pickup_text VARCHAR,
+            delivery_text VARCHAR,
+            pickup_site_id VARCHAR,
+            delivery_site_id VARCHAR,
+            port_site_id VARCHAR,
+            pickup_location_id VARCHAR,
+            delivery_location_id VARCHAR,
+            equipment VARCHAR,
+            qty INTEGER NOT NULL,
+            container_code VARCHAR,
+            cargo_note VARCHAR,
+            empty_return_note VARCHAR,
+            seal_no VARCHAR,
+            delivery_order_no VARCHAR,
+            weight_kg DOUBLE PRECISION,
+            distance_km INTEGER,
+            freight_charge INTEGER
+        )
+    """))
+    conn.execute(sa.text(
+        "CREATE INDEX IF NOT EXISTS ix_order_import_staging_job_id ON order_import_staging (job_id)"
+    ))
+
+    # Container dedupe for imports (and container lookups in general)
+    op.create_index('ix_orders_tenant_container_code', 'orders', ['tenant_id', 'container_code'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_orders_tenant_container_code', table_name='orders')
+    conn = op.get_bind()
+    conn.execute(sa.text("DROP TABLE IF EXISTS order_import_staging"))
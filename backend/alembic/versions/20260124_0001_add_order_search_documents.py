@@ -0,0 +1,70 @@
+"""Add order_search_documents (indexed order search, see app/services/order_search.py)
+
+Revision ID: 20260124_0001
+Revises: 20260123_0001
+Create Date: 2026-01-24
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260124_0001'
+down_revision = '20260123_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    conn.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(sa.text("""
+        CREATE TABLE IF NOT EXISTS order_search_documents (
+            order_id VARCHAR PRIMARY KEY REFERENCES orders(id) ON DELETE CASCADE,
+            tenant_id VARCHAR NOT NULL,
+            order_code VARCHAR NOT NULL,
+            container_code VARCHAR,
+            status VARCHAR NOT NULL,
+            order_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            document TEXT NOT NULL DEFAULT '',
+            tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', document)) STORED,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+        )
+    """))
+    # Exact / prefix code lookups (LIKE 'TCNU12%')
+    conn.execute(sa.text(
+        "CREATE INDEX IF NOT EXISTS ix_order_search_container_code "
+        "ON order_search_documents (tenant_id, container_code text_pattern_ops)"
+    ))
+    conn.execute(sa.text(
+        "CREATE INDEX IF NOT EXISTS ix_order_search_order_code "
+        "ON order_search_documents (tenant_id, order_code text_pattern_ops)"
+    ))
+    # Word prefixes and substrings
+    conn.execute(sa.text(
+        "CREATE INDEX IF NOT EXISTS ix_order_search_tsv ON order_search_documents USING gin (tsv)"
+    ))
+    conn.execute(sa.text(
+        "CREATE INDEX IF NOT EXISTS ix_order_search_document_trgm "
+        "ON order_search_documents USING gin (document gin_trgm_ops)"
+    ))
+
+    # Documents for existing orders (same shape as order_search._UPSERT)
+    conn.execute(sa.text("""
+        INSERT INTO order_search_documents (order_id, tenant_id, order_code, container_code, status, order_date, document, updated_at)
+        SELECT o.id, o.tenant_id, upper(o.order_code), upper(replace(o.container_code, ' ', '')), o.status, o.order_date,
+               lower(concat_ws(' ', o.order_code, o.container_code, c.code, c.name, c.short_name,
+                               o.pickup_text, o.delivery_text, ps.code, ps.company_name, ds.code, ds.company_name,
+                               o.seal_no, o.delivery_order_no, o.cargo_note, o.equipment)),
+               now()
+        FROM orders o
+        LEFT JOIN customers c ON c.id = o.customer_id
+        LEFT JOIN sites ps ON ps.id = o.pickup_site_id
+        LEFT JOIN sites ds ON ds.id = o.delivery_site_id
+        ON CONFLICT (order_id) DO NOTHING
+    """))
+
+
+def downgrade():
+    conn = op.get_bind()
+    conn.execute(sa.text("DROP TABLE IF EXISTS order_search_documents"))
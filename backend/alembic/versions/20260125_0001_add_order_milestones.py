@@ -0,0 +1,63 @@
+"""Add order milestone columns (accepted_at, picked_up_at, delivered_at, completed_at)
+
+Revision ID: 20260125_0001
+Revises: 20260124_0001
+Create Date: 2026-01-25
+
+Columns are filled from order_status_logs during the upgrade (salary and
+revenue reports read only the new columns). ``python -m
+app.scripts.backfill_order_milestones`` recomputes them later, e.g. after
+editing status logs with raw SQL.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260125_0001'
+down_revision = '20260124_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('orders', sa.Column('accepted_at', sa.DateTime(), nullable=True))
+    op.add_column('orders', sa.Column('picked_up_at', sa.DateTime(), nullable=True))
+    op.add_column('orders', sa.Column('delivered_at', sa.DateTime(), nullable=True))
+    op.add_column('orders', sa.Column('completed_at', sa.DateTime(), nullable=True))
+
+    op.create_index('ix_orders_tenant_delivered_at', 'orders', ['tenant_id', 'delivered_at'])
+    op.create_index('ix_orders_tenant_driver_delivered_at', 'orders', ['tenant_id', 'driver_id', 'delivered_at'])
+    op.create_index('ix_orders_tenant_completed_at', 'orders', ['tenant_id', 'completed_at'])
+
+    # Milestone recompute reads the logs of one order / one tenant
+    op.create_index('ix_order_status_logs_order_status', 'order_status_logs', ['order_id', 'to_status', 'changed_at'])
+
+    # Milestones of existing orders (same as order_status_logger._SYNC_MILESTONES)
+    op.get_bind().execute(sa.text("""
+        UPDATE orders o SET
+            accepted_at = m.accepted_at,
+            picked_up_at = m.picked_up_at,
+            delivered_at = m.delivered_at,
+            completed_at = m.completed_at
+        FROM (
+            SELECT order_id,
+                   MIN(changed_at) FILTER (WHERE to_status IN ('ACCEPTED', 'ASSIGNED')) AS accepted_at,
+                   MIN(changed_at) FILTER (WHERE to_status = 'IN_TRANSIT') AS picked_up_at,
+                   MIN(changed_at) FILTER (WHERE to_status = 'DELIVERED') AS delivered_at,
+                   MIN(changed_at) FILTER (WHERE to_status = 'COMPLETED') AS completed_at
+            FROM order_status_logs
+            GROUP BY order_id
+        ) m
+        WHERE o.id = m.order_id
+    """))
+
+
+def downgrade():
+    op.drop_index('ix_order_status_logs_order_status', table_name='order_status_logs')
+    op.drop_index('ix_orders_tenant_completed_at', table_name='orders')
+    op.drop_index('ix_orders_tenant_driver_delivered_at', table_name='orders')
+    op.drop_index('ix_orders_tenant_delivered_at', table_name='orders')
+    op.drop_column('orders', 'completed_at')
+    op.drop_column('orders', 'delivered_at')
+    op.drop_column('orders', 'picked_up_at')
+    op.drop_column('orders', 'accepted_at')
@@ -0,0 +1,55 @@
+"""Add gps_breadcrumbs (vehicle position history, see app/services/gps_track.py)
+
+Revision ID: 20260126_0001
+Revises: 20260125_0001
+Create Date: 2026-01-26
+
+Partitioned by month on recorded_at. The partitions for this month and the
+next are created here; later ones by the gps_track_maintenance job (and on
+demand by the first write of a month).
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260126_0001'
+down_revision = '20260125_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    conn.execute(sa.text("""
+        CREATE TABLE IF NOT EXISTS gps_breadcrumbs (
+            vehicle_id VARCHAR NOT NULL,
+            recorded_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            tenant_id VARCHAR NOT NULL,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            speed SMALLINT,
+            heading SMALLINT,
+            PRIMARY KEY (vehicle_id, recorded_at)
+        ) PARTITION BY RANGE (recorded_at)
+    """))
+    # Time-window scans (downsampling) on an append-only table
+    conn.execute(sa.text(
+        "CREATE INDEX IF NOT EXISTS ix_gps_breadcrumbs_recorded_at_brin ON gps_breadcrumbs USING brin (recorded_at)"
+    ))
+
+    now = datetime.utcnow()
+    start = datetime(now.year, now.month, 1)
+    for _ in range(2):
+        end = datetime(start.year + 1, 1, 1) if start.month == 12 else datetime(start.year, start.month + 1, 1)
+        conn.execute(sa.text(
+            f"CREATE TABLE IF NOT EXISTS gps_breadcrumbs_{start:%Y%m} PARTITION OF gps_breadcrumbs "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        ))
+        start = end
+
+
+def downgrade():
+    conn = op.get_bind()
+    conn.execute(sa.text("DROP TABLE IF EXISTS gps_breadcrumbs"))
@@ -0,0 +1,27 @@
+"""Add GPS provider rate limit and sync lag columns (GPS ingest daemon)
+
+Revision ID: 20260127_0001
+Revises: 20260126_0001
+Create Date: 2026-01-27
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260127_0001'
+down_revision = '20260126_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('gps_providers', sa.Column('max_requests_per_minute', sa.Integer(), nullable=True))
+    op.add_column('gps_sync_logs', sa.Column('schedule_lag_ms', sa.Integer(), nullable=True))
+    op.add_column('gps_sync_logs', sa.Column('data_lag_seconds', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('gps_sync_logs', 'data_lag_seconds')
+    op.drop_column('gps_sync_logs', 'schedule_lag_ms')
+    op.drop_column('gps_providers', 'max_requests_per_minute')
@@ -0,0 +1,25 @@
+"""Add orders.departed_pickup_at / departed_delivery_at (geofence state, see app/services/geofence_batch.py)
+
+Revision ID: 20260128_0001
+Revises: 20260127_0001
+Create Date: 2026-01-28
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20260128_0001'
+down_revision = '20260127_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('orders', sa.Column('departed_pickup_at', sa.DateTime(), nullable=True))
+    op.add_column('orders', sa.Column('departed_delivery_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('orders', 'departed_delivery_at')
+    op.drop_column('orders', 'departed_pickup_at')
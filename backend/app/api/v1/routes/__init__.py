@@ -1,4 +1,6 @@
 from fastapi import APIRouter
+# MES, project, FMS AI and CRM chat routers are optional and loaded on demand
+# (see app/core/lazy_modules.py)
 from app.api.v1.routes.auth import router as auth_router
 from app.api.v1.routes.customers import router as customers_router
 from app.api.v1.routes.customer_addresses import router as customer_addresses_router
@@ -42,13 +44,11 @@ from app.api.v1.routes.crm import crm_router
 from app.api.v1.routes.accounting import router as accounting_router
 from app.api.v1.routes.controlling import router as controlling_router
 from app.api.v1.routes.wms import router as wms_router
-from app.api.v1.routes.project import router as project_router
 from app.api.v1.routes.workflow import router as workflow_router
 from app.api.v1.routes.document import router as document_router
 from app.api.v1.routes.fms import router as fms_router
 from app.api.v1.routes.admin_billing import router as admin_billing_router
 from app.api.v1.routes.tenant_billing import router as tenant_billing_router
-from app.api.v1.routes.mes import router as mes_router
 from app.api.v1.routes.uploads import router as uploads_router
 from app.api.v1.routes.payment_qr import router as payment_qr_router
 from app.api.v1.routes.invoice_automation import router as invoice_automation_router
@@ -58,6 +58,8 @@ from app.api.v1.routes.vehicle_costs import router as vehicle_costs_router
 from app.api.v1.routes.tractor_trailer_pairings import router as tractor_trailer_pairings_router
 from app.api.v1.routes.public_namecard import router as public_namecard_router
 from app.api.v1.routes.activity_logs import router as activity_logs_router
+from app.api.v1.routes.exports import router as exports_router
+from app.api.v1.routes.jobs import router as jobs_router
 from app.api.v1.routes.worker_auth import router as worker_auth_router
 from app.api.v1.routes.workspace import router as workspace_router
 from app.api.v1.routes.worker_tenant_api import router as worker_tenant_api_router
@@ -118,11 +120,9 @@ api_router.include_router(crm_router)
 api_router.include_router(accounting_router)
 api_router.include_router(controlling_router, prefix="/controlling", tags=["Controlling"])
 api_router.include_router(wms_router, prefix="/wms", tags=["WMS"])
-api_router.include_router(project_router, prefix="/project", tags=["Project Management"])
 api_router.include_router(workflow_router, prefix="/workflow", tags=["Workflow Engine"])
 api_router.include_router(document_router, prefix="/dms", tags=["Document Management"])
 api_router.include_router(fms_router, tags=["Forwarding Management System"])
-api_router.include_router(mes_router, prefix="/mes", tags=["Manufacturing Execution System"])
 api_router.include_router(admin_billing_router)
 api_router.include_router(tenant_billing_router)
 api_router.include_router(uploads_router)
@@ -134,6 +134,8 @@ api_router.include_router(vehicle_costs_router)
 api_router.include_router(tractor_trailer_pairings_router)
 api_router.include_router(public_namecard_router)
 api_router.include_router(activity_logs_router)
+api_router.include_router(exports_router)
+api_router.include_router(jobs_router)
 api_router.include_router(worker_auth_router, tags=["Personal Workspace - Auth"])
 api_router.include_router(workspace_router, tags=["Personal Workspace"])
 api_router.include_router(worker_tenant_api_router, tags=["Worker Tenant API"])
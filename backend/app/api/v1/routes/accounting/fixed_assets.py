@@ -2,7 +2,7 @@
 Accounting - Fixed Assets API Routes
 Quản lý tài sản cố định
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlmodel import Session, select, func
 from pydantic import BaseModel
 from typing import Optional, List
@@ -17,6 +17,7 @@ from app.models.accounting import (
     AssetDepreciation, AssetRevaluation, AssetDisposal, DisposalType, AssetTransfer, AssetMaintenance
 )
 from app.core.security import get_current_user
+from app.core.jobs import JobContext, enqueue, job_accepted
 
 router = APIRouter()
 
@@ -450,14 +451,31 @@ def run_depreciation(
     }
 
 
-@router.post("/run-bulk-depreciation")
+@router.post("/run-bulk-depreciation", status_code=202)
 def run_bulk_depreciation(
     depreciation_date: datetime = Query(...),
+    idempotency_key: Optional[str] = Header(None),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    """Run depreciation for all active assets"""
-    tenant_id = str(current_user.tenant_id)
+    """
+    Run depreciation for all active assets
+
+    Runs as a background job: returns 202 with a status_url (/jobs/{id}).
+    """
+    job = enqueue(
+        session, "assets.bulk_depreciation", str(current_user.tenant_id),
+        payload={"depreciation_date": depreciation_date.isoformat()},
+        user_id=current_user.id, idempotency_key=idempotency_key,
+    )
+    return job_accepted(job)
+
+
+def run_bulk_depreciation_job(ctx: JobContext, depreciation_date: str) -> dict:
+    """Job handler for assets.bulk_depreciation - all assets in one transaction"""
+    session = ctx.session
+    tenant_id = ctx.tenant_id
+    depreciation_date = datetime.fromisoformat(depreciation_date)
 
     # Get all active assets
     assets = session.exec(
@@ -475,16 +493,20 @@ def run_bulk_depreciation(
     skipped = 0
     total_amount = Decimal("0")
 
-    for asset in assets:
+    # Assets already depreciated for this period (one query instead of one per asset)
+    depreciated_ids = set(session.exec(
+        select(AssetDepreciation.asset_id).where(
+            AssetDepreciation.tenant_id == tenant_id,
+            AssetDepreciation.depreciation_date >= period_start,
+            AssetDepreciation.depreciation_date <= period_end,
+        )
+    ).all())
+
+    for i, asset in enumerate(assets):
+        ctx.progress(i, len(assets))
+
         # Check if already depreciated
-        existing = session.exec(
-            select(AssetDepreciation).where(
-                AssetDepreciation.asset_id == asset.id,
-                AssetDepreciation.depreciation_date >= period_start,
-                AssetDepreciation.depreciation_date <= period_end,
-            )
-        ).first()
-        if existing:
+        if asset.id in depreciated_ids:
             skipped += 1
             continue
 
@@ -509,7 +531,7 @@ def run_bulk_depreciation(
             accumulated_after=asset.accumulated_depreciation + amount,
             book_value_after=asset.book_value - amount,
             depreciation_method=asset.depreciation_method,
-            created_by=str(current_user.id),
+            created_by=ctx.user_id,
         )
         session.add(depreciation)
 
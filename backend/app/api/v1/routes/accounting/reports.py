@@ -9,12 +9,15 @@ from typing import Optional, List
 from datetime import datetime, date
 from decimal import Decimal
 
-from app.db.session import get_session
+from app.db.replica import get_read_session
 from app.models import User
 from app.models.accounting import (
     ChartOfAccounts, GeneralLedger, FiscalPeriod, FiscalYear, JournalEntryLine, JournalEntry
 )
 from app.core.security import get_current_user
+from app.core.export import (
+    FORMAT_PATTERN, MODE_PATTERN, columns_from_schema, export_response, select_export_columns,
+)
 
 router = APIRouter()
 
@@ -68,7 +71,7 @@ class TaxSummaryResponse(BaseModel):
 
 @router.get("/reports/trial-balance", response_model=TrialBalanceResponse)
 def get_trial_balance(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     month: int = Query(default=None),
     year: int = Query(default=None),
@@ -179,13 +182,41 @@ def get_trial_balance(
     )
 
 
+TRIAL_BALANCE_COLUMNS = columns_from_schema(TrialBalanceAccount, exclude=("has_children", "children"))
+
+
+@router.get("/reports/trial-balance/export")
+def export_trial_balance(
+    current_user: User = Depends(get_current_user),
+    month: int = Query(default=None),
+    year: int = Query(default=None),
+    show_zero: bool = Query(default=False),
+    format: str = Query("xlsx", pattern=FORMAT_PATTERN),
+    columns: Optional[str] = Query(None, description="Comma-separated columns (default: all)"),
+    mode: str = Query("auto", pattern=MODE_PATTERN, description="auto, stream or background"),
+):
+    """Export Trial Balance report (CSV/XLSX)"""
+    return export_response(
+        lambda s: get_trial_balance(
+            session=s, current_user=current_user, month=month, year=year, show_zero=show_zero
+        ).accounts,
+        select_export_columns(TRIAL_BALANCE_COLUMNS, columns),
+        format,
+        filename="trial-balance",
+        tenant_id=str(current_user.tenant_id),
+        user_id=str(current_user.id),
+        mode=mode,
+        sheet_title="Trial Balance",
+    )
+
+
 # =====================
 # TAX SUMMARY
 # =====================
 
 @router.get("/tax-summary", response_model=TaxSummaryResponse)
 def get_tax_summary(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     year: int = Query(default=None),
 ):
@@ -256,7 +287,7 @@ def get_tax_summary(
 
 @router.get("/reports/pnl")
 def get_pnl_report(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     month: int = Query(default=None),
     year: int = Query(default=None),
@@ -416,7 +447,7 @@ def get_pnl_report(
 
 @router.get("/reports/balance-sheet")
 def get_balance_sheet(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     as_of_date: str = Query(default=None),
 ):
@@ -554,7 +585,7 @@ def get_balance_sheet(
 
 @router.get("/reports/cash-flow")
 def get_cash_flow(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     month: int = Query(default=None),
     year: int = Query(default=None),
@@ -3,6 +3,7 @@ Activity Logs API - View and query activity logs for audit and billing
 
 Endpoints:
 - GET /activity-logs - List with filters (date range, user, module, action)
+- GET /activity-logs/export - CSV/XLSX export (same filters as the list)
 - GET /activity-logs/summary - Aggregated statistics
 - GET /activity-logs/user-costs - Cost breakdown per user for billing
 - GET /activity-logs/{log_id} - Single log detail
@@ -20,6 +21,10 @@ from app.db.session import get_session
 from app.models import User
 from app.models.activity_log import ActivityLog
 from app.core.security import get_current_user
+from app.core.pagination import TOTAL_MODE_PATTERN, count_total, fetch_keyset_page
+from app.core.export import (
+    FORMAT_PATTERN, MODE_PATTERN, columns_from_schema, export_response, query_source, select_export_columns,
+)
 
 
 router = APIRouter(prefix="/activity-logs", tags=["activity-logs"])
@@ -71,10 +76,11 @@ class ActivityLogRead(BaseModel):
 
 class ActivityLogListResponse(BaseModel):
     items: List[ActivityLogRead]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class ActivitySummary(BaseModel):
@@ -97,6 +103,42 @@ class UserCostSummary(BaseModel):
 
 # ==================== ENDPOINTS ====================
 
+def _apply_filters(
+    query,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    module: Optional[str] = None,
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    success: Optional[bool] = None,
+    search: Optional[str] = None,
+):
+    """List/export filters"""
+    if start_date:
+        query = query.where(ActivityLog.created_at >= start_date)
+    if end_date:
+        query = query.where(ActivityLog.created_at <= end_date)
+    if user_id:
+        query = query.where(ActivityLog.user_id == user_id)
+    if module:
+        query = query.where(ActivityLog.module == module)
+    if action:
+        query = query.where(ActivityLog.action == action)
+    if resource_type:
+        query = query.where(ActivityLog.resource_type == resource_type)
+    if success is not None:
+        query = query.where(ActivityLog.success == success)
+    if search:
+        search_pattern = f"%{search}%"
+        query = query.where(
+            (ActivityLog.user_name.ilike(search_pattern)) |
+            (ActivityLog.resource_code.ilike(search_pattern)) |
+            (ActivityLog.endpoint.ilike(search_pattern))
+        )
+    return query
+
+
 @router.post("/test-create")
 def test_create_activity_log(
     session: Session = Depends(get_session),
@@ -165,6 +207,8 @@ def list_activity_logs(
     # Pagination
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=200, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor of the previous page"),
+    total_mode: str = Query("exact", pattern=TOTAL_MODE_PATTERN, description="exact, cached, estimate or none"),
     # Dependencies
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
@@ -177,41 +221,24 @@ def list_activity_logs(
     check_activity_log_permission(current_user)
     tenant_id = str(current_user.tenant_id)
 
-    # Base query
-    query = select(ActivityLog).where(ActivityLog.tenant_id == tenant_id)
-
-    # Apply filters
-    if start_date:
-        query = query.where(ActivityLog.created_at >= start_date)
-    if end_date:
-        query = query.where(ActivityLog.created_at <= end_date)
-    if user_id:
-        query = query.where(ActivityLog.user_id == user_id)
-    if module:
-        query = query.where(ActivityLog.module == module)
-    if action:
-        query = query.where(ActivityLog.action == action)
-    if resource_type:
-        query = query.where(ActivityLog.resource_type == resource_type)
-    if success is not None:
-        query = query.where(ActivityLog.success == success)
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.where(
-            (ActivityLog.user_name.ilike(search_pattern)) |
-            (ActivityLog.resource_code.ilike(search_pattern)) |
-            (ActivityLog.endpoint.ilike(search_pattern))
-        )
+    query = _apply_filters(
+        select(ActivityLog).where(ActivityLog.tenant_id == tenant_id),
+        start_date, end_date, user_id, module, action, resource_type, success, search,
+    )
 
     # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = count_total(session, query, total_mode)
 
     # Apply pagination and ordering
-    offset = (page - 1) * page_size
-    query = query.order_by(ActivityLog.created_at.desc()).offset(offset).limit(page_size)
-
-    items = session.exec(query).all()
+    next_cursor = None
+    if cursor or page == 1:
+        items, next_cursor = fetch_keyset_page(
+            session, query, ActivityLog.created_at, ActivityLog.id, cursor, page_size
+        )
+    else:
+        offset = (page - 1) * page_size
+        query = query.order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc()).offset(offset).limit(page_size)
+        items = session.exec(query).all()
 
     # Parse request_summary JSON for response
     result_items = []
@@ -249,7 +276,67 @@ def list_activity_logs(
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size if total > 0 else 1
+        total_pages=((total + page_size - 1) // page_size if total > 0 else 1) if total is not None else None,
+        next_cursor=next_cursor,
+    )
+
+
+ACTIVITY_LOG_COLUMNS = columns_from_schema(ActivityLogRead)
+
+
+@router.get("/export")
+def export_activity_logs(
+    start_date: Optional[datetime] = Query(None, description="Start date filter (ISO format)"),
+    end_date: Optional[datetime] = Query(None, description="End date filter (ISO format)"),
+    user_id: Optional[str] = Query(None, description="Filter by user ID"),
+    module: Optional[str] = Query(None, description="Filter by module (tms, hrm, crm, wms, fms)"),
+    action: Optional[str] = Query(None, description="Filter by action (CREATE, UPDATE, DELETE)"),
+    resource_type: Optional[str] = Query(None, description="Filter by resource type (orders, employees, etc.)"),
+    success: Optional[bool] = Query(None, description="Filter by success status"),
+    search: Optional[str] = Query(None, description="Search in user_name, resource_code, endpoint"),
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    columns: Optional[str] = Query(None, description="Comma-separated columns (default: all)"),
+    mode: str = Query("auto", pattern=MODE_PATTERN, description="auto, stream or background"),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Export activity logs (same filters as the list) as CSV/XLSX.
+
+    Only the selected columns are read, through a server-side cursor. With
+    mode=auto, exports estimated above EXPORT_BACKGROUND_ROWS rows run in the
+    background (202 + status URL under /exports).
+    """
+    check_activity_log_permission(current_user)
+    tenant_id = str(current_user.tenant_id)
+    export_columns = select_export_columns(ACTIVITY_LOG_COLUMNS, columns)
+
+    query = _apply_filters(
+        select(*[getattr(ActivityLog, c.key) for c in export_columns]).where(ActivityLog.tenant_id == tenant_id),
+        start_date, end_date, user_id, module, action, resource_type, success, search,
+    ).order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc())
+
+    estimated_rows = None
+    if mode == "auto":
+        estimated_rows = count_total(
+            session,
+            _apply_filters(
+                select(ActivityLog).where(ActivityLog.tenant_id == tenant_id),
+                start_date, end_date, user_id, module, action, resource_type, success, search,
+            ),
+            "estimate",
+        )
+
+    return export_response(
+        query_source(query),
+        export_columns,
+        format,
+        filename="activity-logs",
+        tenant_id=tenant_id,
+        user_id=str(current_user.id),
+        mode=mode,
+        estimated_rows=estimated_rows,
+        sheet_title="Activity Logs",
     )
 
 
@@ -11,7 +11,7 @@ from decimal import Decimal
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select, func, and_
 
@@ -37,7 +37,9 @@ from app.services.billing import (
     get_usage_breakdown,
     estimate_monthly_cost,
     get_current_billing_period,
+    process_end_of_month,
 )
+from app.core.jobs import JobContext, enqueue, job_accepted
 
 router = APIRouter(prefix="/admin/billing", tags=["Super Admin - Billing"])
 
@@ -812,6 +814,31 @@ def seed_billing_data_endpoint(
     }
 
 
+@router.post("/process-end-of-month", status_code=202)
+def process_end_of_month_endpoint(
+    idempotency_key: Optional[str] = Header(None),
+    session: Session = Depends(get_session),
+    user: User = Depends(require_super_admin),
+):
+    """
+    Generate last month's invoices and reset usage counters (all tenants)
+
+    Runs as a background job: returns 202 with a status_url (/jobs/{id}).
+    """
+    job = enqueue(
+        session, "billing.end_of_month", str(user.tenant_id),
+        user_id=user.id, idempotency_key=idempotency_key,
+    )
+    return job_accepted(job)
+
+
+def run_process_end_of_month(ctx: JobContext) -> dict:
+    """Job handler for billing.end_of_month"""
+    result = process_end_of_month(ctx.session)
+    ctx.session.commit()
+    return result
+
+
 @router.post("/estimate", response_model=dict)
 def estimate_cost(
     session: Session = Depends(get_session),
@@ -1,23 +1,35 @@
 """
 TMS Automation API
 Endpoints to trigger and monitor automation jobs
+
+Jobs also run on their own schedule (app/core/scheduler.py). Manual triggers
+take the same per-tenant lease before answering, so they never overlap a
+scheduled run: a job whose lease another worker holds answers 409.
 """
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlmodel import Session
-from typing import Dict
-from app.db.session import get_session
 from app.models import User
 from app.core.security import get_current_user
-from app.services.automation_jobs import get_automation_jobs
+from app.core.scheduler import scheduler
+from app.services import automation_jobs  # noqa: F401  (registers the scheduled jobs)
 
 router = APIRouter(prefix="/automation", tags=["TMS Automation"])
 
+LEASE_HELD = "Job is already running for this tenant, try again later"
+
+
+def _start(background_tasks: BackgroundTasks, name: str, tenant_id: str, **kwargs) -> bool:
+    """Take the job's lease and run it after the response; False when the lease is held elsewhere"""
+    lease = scheduler.try_lease(name, tenant_id)
+    if lease is None:
+        return False
+    background_tasks.add_task(scheduler.run_leased, lease, name, tenant_id, **kwargs)
+    return True
+
 
 @router.post("/auto-accept-orders")
 def trigger_auto_accept_orders(
     background_tasks: BackgroundTasks,
     limit: int = 50,
-    session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -30,17 +42,13 @@ def trigger_auto_accept_orders(
         raise HTTPException(403, "Only ADMIN or DISPATCHER can trigger automation")
 
     tenant_id = str(current_user.tenant_id)
-    automation = get_automation_jobs()
 
     # Run in background
-    background_tasks.add_task(
-        automation.auto_accept_orders,
-        session=session,
-        tenant_id=tenant_id,
-        limit=limit
-    )
+    if not _start(background_tasks, "auto_accept_orders", tenant_id, limit=limit):
+        raise HTTPException(409, LEASE_HELD)
 
     return {
+        "status": "started",
         "message": "Auto-acceptance job started",
         "limit": limit
     }
@@ -50,7 +58,6 @@ def trigger_auto_accept_orders(
 def trigger_auto_assign_drivers(
     background_tasks: BackgroundTasks,
     limit: int = 50,
-    session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -63,17 +70,13 @@ def trigger_auto_assign_drivers(
         raise HTTPException(403, "Only ADMIN or DISPATCHER can trigger automation")
 
     tenant_id = str(current_user.tenant_id)
-    automation = get_automation_jobs()
 
     # Run in background
-    background_tasks.add_task(
-        automation.auto_assign_drivers,
-        session=session,
-        tenant_id=tenant_id,
-        limit=limit
-    )
+    if not _start(background_tasks, "auto_assign_drivers", tenant_id, limit=limit):
+        raise HTTPException(409, LEASE_HELD)
 
     return {
+        "status": "started",
         "message": "Auto-assignment job started",
         "limit": limit
     }
@@ -83,7 +86,6 @@ def trigger_auto_assign_drivers(
 def trigger_gps_status_detection(
     background_tasks: BackgroundTasks,
     limit: int = 100,
-    session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -96,17 +98,13 @@ def trigger_gps_status_detection(
         raise HTTPException(403, "Only ADMIN or DISPATCHER can trigger automation")
 
     tenant_id = str(current_user.tenant_id)
-    automation = get_automation_jobs()
 
     # Run in background
-    background_tasks.add_task(
-        automation.detect_gps_status,
-        session=session,
-        tenant_id=tenant_id,
-        limit=limit
-    )
+    if not _start(background_tasks, "detect_gps_status", tenant_id, limit=limit):
+        raise HTTPException(409, LEASE_HELD)
 
     return {
+        "status": "started",
         "message": "GPS status detection job started",
         "limit": limit
     }
@@ -116,7 +114,6 @@ def trigger_gps_status_detection(
 def trigger_eta_recalculation(
     background_tasks: BackgroundTasks,
     limit: int = 100,
-    session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -129,17 +126,13 @@ def trigger_eta_recalculation(
         raise HTTPException(403, "Only ADMIN or DISPATCHER can trigger automation")
 
     tenant_id = str(current_user.tenant_id)
-    automation = get_automation_jobs()
 
     # Run in background
-    background_tasks.add_task(
-        automation.recalculate_etas,
-        session=session,
-        tenant_id=tenant_id,
-        limit=limit
-    )
+    if not _start(background_tasks, "recalculate_etas", tenant_id, limit=limit):
+        raise HTTPException(409, LEASE_HELD)
 
     return {
+        "status": "started",
         "message": "ETA recalculation job started",
         "limit": limit
     }
@@ -148,7 +141,6 @@ def trigger_eta_recalculation(
 @router.post("/run-all")
 def run_all_automation_jobs(
     background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -164,40 +156,33 @@ def run_all_automation_jobs(
         raise HTTPException(403, "Only ADMIN or DISPATCHER can trigger automation")
 
     tenant_id = str(current_user.tenant_id)
-    automation = get_automation_jobs()
-
-    # Run all jobs in background
-    background_tasks.add_task(
-        automation.auto_accept_orders,
-        session=session,
-        tenant_id=tenant_id,
-        limit=50
-    )
-    background_tasks.add_task(
-        automation.auto_assign_drivers,
-        session=session,
-        tenant_id=tenant_id,
-        limit=50
-    )
-    background_tasks.add_task(
-        automation.detect_gps_status,
-        session=session,
-        tenant_id=tenant_id,
-        limit=100
-    )
-    background_tasks.add_task(
-        automation.recalculate_etas,
-        session=session,
-        tenant_id=tenant_id,
-        limit=100
-    )
+
+    # Run all jobs in background (jobs whose lease is held elsewhere are skipped)
+    started, skipped = [], []
+    for name, limit in (
+        ("auto_accept_orders", 50),
+        ("auto_assign_drivers", 50),
+        ("detect_gps_status", 100),
+        ("recalculate_etas", 100),
+    ):
+        job = name.replace("_", "-")
+        (started if _start(background_tasks, name, tenant_id, limit=limit) else skipped).append(job)
+    if not started:
+        raise HTTPException(409, LEASE_HELD)
 
     return {
-        "message": "All automation jobs started",
-        "jobs": [
-            "auto-accept-orders",
-            "auto-assign-drivers",
-            "detect-gps-status",
-            "recalculate-etas"
-        ]
+        "status": "started",
+        "message": "All automation jobs started" if not skipped else "Some automation jobs were already running",
+        "jobs": started,
+        "skipped": skipped,
     }
+
+
+@router.get("/scheduler")
+def get_scheduler_status(
+    current_user: User = Depends(get_current_user),
+):
+    """Scheduled automation jobs: intervals, run counts, durations (this worker)"""
+    if current_user.role != "ADMIN":
+        raise HTTPException(403, "Only ADMIN can view scheduler status")
+    return scheduler.snapshot()
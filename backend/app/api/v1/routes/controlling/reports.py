@@ -8,7 +8,7 @@ from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
 
-from app.db.session import get_session
+from app.db.replica import get_read_session
 from app.models import User
 from app.models.accounting import CostCenter, FiscalYear, FiscalPeriod
 from app.models.accounting.journal import JournalEntryLine, JournalEntry, JournalEntryStatus
@@ -30,7 +30,7 @@ router = APIRouter()
 
 @router.get("/reports/budget-vs-actual")
 def get_budget_vs_actual(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     budget_id: str = Query(...),
     fiscal_period_id: Optional[str] = Query(None),
@@ -127,7 +127,7 @@ def get_budget_vs_actual(
 
 @router.get("/reports/cost-center-analysis")
 def get_cost_center_analysis(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     fiscal_year_id: str = Query(...),
     fiscal_period_id: Optional[str] = Query(None),
@@ -214,7 +214,7 @@ def get_cost_center_analysis(
 
 @router.get("/reports/profitability")
 def get_profitability_report(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     fiscal_year_id: str = Query(...),
 ):
@@ -313,7 +313,7 @@ def get_profitability_report(
 
 @router.get("/reports/internal-orders")
 def get_internal_orders_report(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     status: Optional[str] = Query(None),
     cost_center_id: Optional[str] = Query(None),
@@ -385,7 +385,7 @@ def get_internal_orders_report(
 
 @router.get("/reports/activity-analysis")
 def get_activity_analysis(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     fiscal_year_id: Optional[str] = Query(None),
     cost_center_id: Optional[str] = Query(None),
@@ -462,7 +462,7 @@ def get_activity_analysis(
 
 @router.get("/reports/dashboard")
 def get_controlling_dashboard(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
     fiscal_year_id: Optional[str] = Query(None),
 ):
@@ -17,7 +17,6 @@ from app.api.v1.routes.crm.dashboard import router as dashboard_router
 from app.api.v1.routes.crm.seed import router as seed_router
 from app.api.v1.routes.crm.contracts import router as contracts_router
 from app.api.v1.routes.crm.sales_orders import router as sales_orders_router
-from app.api.v1.routes.crm.chat import router as chat_router
 
 crm_router = APIRouter(prefix="/crm", tags=["CRM"])
 
@@ -35,5 +34,4 @@ crm_router.include_router(activity_logs_router)
 crm_router.include_router(customer_groups_router)
 crm_router.include_router(contracts_router)
 crm_router.include_router(sales_orders_router)
-crm_router.include_router(chat_router)
 crm_router.include_router(seed_router)
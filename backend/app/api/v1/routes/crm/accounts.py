@@ -2,7 +2,7 @@
 CRM - Accounts API Routes
 Manage customer/vendor accounts
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlmodel import Session, select, func, or_
 from pydantic import BaseModel
 from typing import Optional
@@ -19,6 +19,8 @@ from app.models.customer_address import CustomerAddress, AddressType
 from app.models.customer_bank_account import CustomerBankAccount
 from app.models.customer_contact import CustomerContact, ContactType
 from app.core.security import get_current_user
+from app.core.jobs import JobContext, enqueue, job_accepted
+from app.core.pagination import TOTAL_MODE_PATTERN, count_total, fetch_keyset_page
 from app.api.v1.routes.crm.activity_logs import log_activity
 import json
 
@@ -85,6 +87,8 @@ def list_accounts(
     search: Optional[str] = Query(None),
     sort_by: Optional[str] = Query(None, description="Field to sort by"),
     sort_order: Optional[str] = Query("desc", description="Sort order: asc or desc"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor (only with the default created_at sort)"),
+    total_mode: str = Query("exact", pattern=TOTAL_MODE_PATTERN),
 ):
     """List all accounts"""
     tenant_id = str(current_user.tenant_id)
@@ -111,8 +115,7 @@ def list_accounts(
         query = query.where(search_filter)
 
     # Count
-    count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = count_total(session, query, total_mode)
 
     # Sorting
     sort_fields = {
@@ -124,25 +127,46 @@ def list_accounts(
         "city": Account.city,
         "created_at": Account.created_at,
     }
-    sort_column = sort_fields.get(sort_by, Account.created_at)
-    if sort_order == "asc":
-        query = query.order_by(sort_column.asc())
+    keyset = sort_by in (None, "created_at")
+    if cursor and not keyset:
+        raise HTTPException(400, "cursor is only supported when sorting by created_at")
+
+    next_cursor = None
+    if keyset and (cursor or page == 1):
+        # Keyset pagination on (created_at, id)
+        accounts, next_cursor = fetch_keyset_page(
+            session, query, Account.created_at, Account.id, cursor, page_size,
+            descending=sort_order != "asc",
+        )
     else:
-        query = query.order_by(sort_column.desc())
-
-    # Pagination
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
+        sort_column = sort_fields.get(sort_by, Account.created_at)
+        if sort_order == "asc":
+            query = query.order_by(sort_column.asc(), Account.id.asc())
+        else:
+            query = query.order_by(sort_column.desc(), Account.id.desc())
+
+        # Pagination
+        offset = (page - 1) * page_size
+        query = query.offset(offset).limit(page_size)
+
+        accounts = session.exec(query).all()
+
+    # Enrich with customer group and contact count (batched for the page)
+    group_ids = {acc.customer_group_id for acc in accounts if acc.customer_group_id}
+    groups = {
+        g.id: g for g in session.exec(select(CustomerGroup).where(CustomerGroup.id.in_(group_ids))).all()
+    } if group_ids else {}
+    account_ids = [acc.id for acc in accounts]
+    contact_counts = dict(session.exec(
+        select(Contact.account_id, func.count())
+        .where(Contact.account_id.in_(account_ids))
+        .group_by(Contact.account_id)
+    ).all()) if account_ids else {}
 
-    accounts = session.exec(query).all()
-
-    # Enrich with customer group and contact count
     items = []
     for acc in accounts:
-        group = session.get(CustomerGroup, acc.customer_group_id) if acc.customer_group_id else None
-        contact_count = session.exec(
-            select(func.count()).where(Contact.account_id == acc.id)
-        ).one()
+        group = groups.get(acc.customer_group_id) if acc.customer_group_id else None
+        contact_count = contact_counts.get(acc.id, 0)
 
         items.append({
             "id": acc.id,
@@ -172,7 +196,8 @@ def list_accounts(
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size,
+        "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+        "next_cursor": next_cursor,
     }
 
 
@@ -268,8 +293,9 @@ def create_account(
     return account
 
 
-@router.post("/sync-all-to-tms")
+@router.post("/sync-all-to-tms", status_code=202)
 def sync_all_accounts_to_tms(
+    idempotency_key: Optional[str] = Header(None),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
@@ -278,8 +304,22 @@ def sync_all_accounts_to_tms(
     This will:
     1. Auto-link accounts to existing TMS customers by code
     2. Sync all data (bank accounts, contacts) to TMS
+
+    Runs as a background job: returns 202 with a status_url (/jobs/{id}).
     """
-    tenant_id = str(current_user.tenant_id)
+    job = enqueue(
+        session, "crm.sync_all_to_tms", str(current_user.tenant_id),
+        user_id=current_user.id, idempotency_key=idempotency_key,
+    )
+    return job_accepted(job)
+
+
+def run_sync_all_to_tms(ctx: JobContext) -> dict:
+    """Job handler for crm.sync_all_to_tms"""
+    from app.services.crm_sync_service import sync_crm_to_tms
+
+    session = ctx.session
+    tenant_id = ctx.tenant_id
 
     # Get all CUSTOMER accounts
     accounts = session.exec(
@@ -289,20 +329,28 @@ def sync_all_accounts_to_tms(
         )
     ).all()
 
+    # TMS customers of unlinked accounts, by code (one query instead of one per account)
+    unlinked_codes = {a.code for a in accounts if not a.tms_customer_id}
+    customers_by_code = {}
+    if unlinked_codes:
+        for customer in session.exec(
+            select(Customer).where(
+                Customer.tenant_id == tenant_id,
+                Customer.code.in_(unlinked_codes)
+            )
+        ).all():
+            customers_by_code.setdefault(customer.code, customer)
+
     synced = 0
     linked = 0
     errors = []
 
-    for account in accounts:
+    for i, account in enumerate(accounts):
+        ctx.progress(i, len(accounts))
         try:
             # Auto-link if not linked
             if not account.tms_customer_id:
-                existing_customer = session.exec(
-                    select(Customer).where(
-                        Customer.tenant_id == tenant_id,
-                        Customer.code == account.code
-                    )
-                ).first()
+                existing_customer = customers_by_code.get(account.code)
 
                 if existing_customer:
                     account.tms_customer_id = existing_customer.id
@@ -316,7 +364,6 @@ def sync_all_accounts_to_tms(
 
             # Sync data if linked
             if account.tms_customer_id:
-                from app.services.crm_sync_service import sync_crm_to_tms
                 if sync_crm_to_tms(account.id, session):
                     synced += 1
         except Exception as e:
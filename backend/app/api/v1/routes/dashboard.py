@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, Query
 from sqlmodel import Session, select, func
-from app.db.session import get_session
+from app.db.replica import get_read_session
 from app.models import (
     Vehicle, Driver, Order, MaintenanceRecord, MaintenanceSchedule,
     Trip, User, FuelLog, Customer
 )
 from app.core.security import get_current_user
+from app.core.response_cache import cached_response
 from datetime import date, timedelta, datetime
 from typing import Optional
 from decimal import Decimal
@@ -14,8 +15,9 @@ router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
 @router.get("/stats")
+@cached_response("dashboard", ttl=60)
 def get_dashboard_stats(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get overall dashboard statistics"""
@@ -115,7 +117,7 @@ def get_dashboard_stats(
 
 @router.get("/alerts")
 def get_dashboard_alerts(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get critical alerts for dashboard"""
@@ -187,9 +189,10 @@ def get_dashboard_alerts(
 
 
 @router.get("/charts/orders-trend")
+@cached_response("dashboard", ttl=300)
 def get_orders_trend(
     days: int = 30,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get order trend data for chart"""
@@ -230,8 +233,9 @@ def get_orders_trend(
 
 
 @router.get("/charts/vehicle-distribution")
+@cached_response("dashboard", ttl=300)
 def get_vehicle_distribution(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get vehicle distribution by type"""
@@ -264,9 +268,10 @@ def get_vehicle_distribution(
 
 
 @router.get("/charts/maintenance-cost")
+@cached_response("dashboard", ttl=300)
 def get_maintenance_cost_breakdown(
     months: int = 3,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get maintenance cost breakdown by type"""
@@ -299,7 +304,7 @@ def get_maintenance_cost_breakdown(
 @router.get("/recent-activities")
 def get_recent_activities(
     limit: int = 10,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get recent activities (orders, trips, maintenance)"""
@@ -353,7 +358,7 @@ def get_recent_activities(
 
 @router.get("/top-vehicles")
 def get_top_vehicles(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get top performing vehicles"""
@@ -396,8 +401,9 @@ def get_top_vehicles(
 
 
 @router.get("/fuel-consumption")
+@cached_response("dashboard", ttl=300)
 def get_fuel_consumption_stats(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get fuel consumption statistics - 30 days, liters per 100km, and vehicle rankings with last 7 refuels consumption"""
@@ -519,7 +525,7 @@ def get_fuel_consumption_stats(
 
 @router.get("/maintenance-avg-cost")
 def get_maintenance_avg_cost(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get average maintenance cost per vehicle for last 6 months"""
@@ -569,7 +575,7 @@ def get_maintenance_avg_cost(
 
 @router.get("/trip-stats")
 def get_trip_stats(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get trip statistics - total trips and average per driver for last 30 days"""
@@ -632,7 +638,7 @@ def get_trip_stats(
 def get_revenue_stats(
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get revenue statistics with date range - default from month start"""
@@ -703,7 +709,7 @@ def get_revenue_stats(
 def get_profit_stats(
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get gross and net profit statistics"""
@@ -787,7 +793,7 @@ def get_profit_stats(
 def get_customer_revenue_distribution(
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Get revenue distribution by customer"""
@@ -7,12 +7,12 @@ Dispatch Center API
 """
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List
 import json
 import random
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select, func, and_, or_
 from pydantic import BaseModel
 
@@ -28,7 +28,11 @@ from app.models.dispatch import (
     AIDecision,
 )
 from app.core.security import get_current_user
+from app.core.response_cache import cached_response
+from app.core.serialization import dumps, parse_field_list
+from app.core.config import settings
 from app.services.gps_sync import GPSSyncService, sync_all_active_providers
+from app.services.gps_track import breadcrumb, record_breadcrumbs, vehicle_track
 
 
 router = APIRouter(prefix="/dispatch", tags=["Dispatch Center"])
@@ -177,6 +181,7 @@ def get_dispatch_dashboard(
 
 
 @router.get("/stats", response_model=DispatchStats)
+@cached_response("dispatch", ttl=15)
 def get_stats(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
@@ -190,12 +195,22 @@ def get_stats(
 def get_vehicles(
     status: Optional[str] = None,
     work_status: Optional[str] = None,
+    fields: Optional[str] = None,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    """Get vehicles with GPS and dispatch info"""
+    """
+    Get vehicles with GPS and dispatch info
+
+    - fields: comma-separated VehicleDispatchInfo fields to return (e.g. "plate_number,latitude,longitude");
+      only those columns are selected. Default: all fields
+    """
     tenant_id = str(current_user.tenant_id)
-    return _get_vehicles_with_gps(session, tenant_id, status, work_status)
+    names = parse_field_list(fields, VehicleDispatchInfo.model_fields)
+    if names and "id" not in names:
+        names = ("id",) + names
+    rows = _vehicle_rows(session, tenant_id, status, work_status, names)
+    return Response(content=dumps(rows), media_type="application/json")
 
 
 @router.get("/alerts", response_model=List[AlertInfo])
@@ -460,11 +475,50 @@ def update_vehicle_gps(
         )
 
     session.add(gps)
+    record_breadcrumbs(session, [breadcrumb(
+        tenant_id, vehicle_id, gps.gps_timestamp, latitude, longitude, speed, heading,
+    )])
     session.commit()
 
     return {"message": "GPS updated", "vehicle_id": vehicle_id}
 
 
+@router.get("/vehicles/{vehicle_id}/track")
+def get_vehicle_track(
+    vehicle_id: str,
+    start: datetime = Query(..., alias="from", description="Start (UTC)"),
+    end: Optional[datetime] = Query(None, alias="to", description="End (UTC, default: now)"),
+    tolerance_m: float = Query(10.0, ge=0, le=500, description="Decimation tolerance in meters (0 = every fix)"),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Replay a vehicle's path from its GPS history.
+
+    Returns segments (split where the vehicle stopped reporting for
+    GPS_TRACK_GAP_SECONDS), each with decimated points [lat, lng, unix_time,
+    speed], the same points as an encoded polyline, and the distance driven.
+    """
+    tenant_id = str(current_user.tenant_id)
+
+    vehicle = session.get(Vehicle, vehicle_id)
+    if not vehicle or str(vehicle.tenant_id) != tenant_id:
+        raise HTTPException(404, "Vehicle not found")
+
+    # Stored times are naive UTC
+    start, end = (
+        value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+        for value in (start, end or datetime.utcnow())
+    )
+    if end <= start:
+        raise HTTPException(400, "'to' must be after 'from'")
+    if end - start > timedelta(days=settings.GPS_TRACK_MAX_RANGE_DAYS):
+        raise HTTPException(400, f"Range is limited to {settings.GPS_TRACK_MAX_RANGE_DAYS} days")
+
+    track = vehicle_track(session, tenant_id, vehicle_id, start, end, tolerance_m)
+    return Response(content=dumps(track), media_type="application/json")
+
+
 @router.post("/sync-gps")
 async def sync_gps_from_providers(
     provider_id: Optional[str] = None,
@@ -485,11 +539,9 @@ async def sync_gps_from_providers(
             raise HTTPException(404, "Provider not found")
 
         service = GPSSyncService(session)
+        # Also updates VehicleGPS for the synced vehicles
         result = await service.sync_provider(provider)
 
-        # After sync, update VehicleGPS table from mappings
-        _update_vehicle_gps_from_mappings(session, tenant_id, provider_id)
-
         return {
             "message": "GPS sync completed",
             "provider_id": provider_id,
@@ -497,14 +549,9 @@ async def sync_gps_from_providers(
             **result
         }
     else:
-        # Sync all active providers
+        # Sync all active providers (concurrently; VehicleGPS updated in the same commit)
         results = await sync_all_active_providers(session, tenant_id)
 
-        # Update VehicleGPS for all providers
-        for r in results:
-            if r.get("success"):
-                _update_vehicle_gps_from_mappings(session, tenant_id, r.get("provider_id"))
-
         return {
             "message": f"Synced {len(results)} providers",
             "results": results
@@ -836,18 +883,55 @@ def _get_dispatch_stats(session: Session, tenant_id: str) -> DispatchStats:
     )
 
 
-def _get_vehicles_with_gps(
+# VehicleDispatchInfo field -> column, for sparse ``fields=`` selects
+_VEHICLE_COLUMNS = {
+    "id": Vehicle.id,
+    "plate_number": Vehicle.plate_no,
+    "vehicle_type": Vehicle.type,
+    "status": Vehicle.status,
+    "work_status": func.coalesce(VehicleGPS.work_status, VehicleWorkStatus.OFF_DUTY.value),
+    "driver_id": Driver.id,
+    "driver_name": Driver.name,
+    "driver_phone": Driver.phone,
+    "latitude": VehicleGPS.latitude,
+    "longitude": VehicleGPS.longitude,
+    "speed": VehicleGPS.speed,
+    "address": VehicleGPS.address,
+    "gps_timestamp": VehicleGPS.gps_timestamp,
+    "current_trip_id": VehicleGPS.current_trip_id,
+    "current_order_id": VehicleGPS.current_order_id,
+    "destination": VehicleGPS.destination_address,
+    "eta": VehicleGPS.eta_destination,
+    "remaining_km": VehicleGPS.remaining_km,
+}
+_DRIVER_FIELDS = ("driver_id", "driver_name", "driver_phone")
+
+
+def _vehicle_rows(
     session: Session,
     tenant_id: str,
     status: Optional[str] = None,
     work_status: Optional[str] = None,
-) -> List[VehicleDispatchInfo]:
-    """Get vehicles with their GPS data and assigned drivers"""
+    fields: Optional[tuple] = None,
+) -> List[dict]:
+    """
+    Vehicles with GPS data and assigned drivers as plain dicts.
 
-    # Build query - Join Driver directly with Vehicle via tractor_id
+    Only the columns for ``fields`` (default: all of VehicleDispatchInfo) are
+    selected; the values come straight from the database so callers can
+    serialize them without re-validating.
+    """
+    names = fields or tuple(_VEHICLE_COLUMNS)
+    wants_driver = any(name in _DRIVER_FIELDS for name in names)
+    columns = [_VEHICLE_COLUMNS[name].label(name) for name in names]
+    if wants_driver:
+        columns.append(VehicleGPS.driver_id.label("_gps_driver_id"))
+
+    # Join Driver directly with Vehicle via tractor_id
     # This shows real vehicle-driver assignments from the database
     query = (
-        select(Vehicle, VehicleGPS, Driver)
+        select(*columns)
+        .select_from(Vehicle)
         .outerjoin(VehicleGPS, and_(
             VehicleGPS.vehicle_id == Vehicle.id,
             VehicleGPS.tenant_id == tenant_id
@@ -867,42 +951,46 @@ def _get_vehicles_with_gps(
 
     query = query.order_by(Vehicle.plate_no)
 
-    results = session.exec(query).all()
+    rows = [dict(row._mapping) for row in session.execute(query).all()]
+    if not wants_driver:
+        return rows
 
-    vehicles = []
-    for vehicle, gps, driver in results:
-        # Use driver from GPS record if available, otherwise use assigned driver
-        gps_driver_id = gps.driver_id if gps and gps.driver_id else None
-        actual_driver = driver
-
-        # If GPS has a different driver_id, try to fetch that driver
-        if gps_driver_id and (not driver or driver.id != gps_driver_id):
-            gps_driver = session.get(Driver, gps_driver_id)
-            if gps_driver and str(gps_driver.tenant_id) == tenant_id:
-                actual_driver = gps_driver
-
-        vehicles.append(VehicleDispatchInfo(
-            id=vehicle.id,
-            plate_number=vehicle.plate_no,
-            vehicle_type=vehicle.type,
-            status=vehicle.status,
-            work_status=gps.work_status if gps else VehicleWorkStatus.OFF_DUTY.value,
-            driver_id=actual_driver.id if actual_driver else None,
-            driver_name=actual_driver.name if actual_driver else None,
-            driver_phone=actual_driver.phone if actual_driver else None,
-            latitude=gps.latitude if gps else None,
-            longitude=gps.longitude if gps else None,
-            speed=gps.speed if gps else None,
-            address=gps.address if gps else None,
-            gps_timestamp=gps.gps_timestamp if gps else None,
-            current_trip_id=gps.current_trip_id if gps else None,
-            current_order_id=gps.current_order_id if gps else None,
-            destination=gps.destination_address if gps else None,
-            eta=gps.eta_destination if gps else None,
-            remaining_km=gps.remaining_km if gps else None,
-        ))
+    # Driver from the GPS record wins over the assigned driver - fetch them in one query
+    gps_driver_ids = {
+        row["_gps_driver_id"] for row in rows
+        if row["_gps_driver_id"] and row["_gps_driver_id"] != row.get("driver_id")
+    }
+    gps_drivers = {}
+    if gps_driver_ids:
+        gps_drivers = {
+            d.id: d for d in session.execute(
+                select(Driver.id, Driver.name, Driver.phone).where(
+                    Driver.id.in_(gps_driver_ids),
+                    Driver.tenant_id == tenant_id,
+                )
+            ).all()
+        }
+    for row in rows:
+        gps_driver = gps_drivers.get(row.pop("_gps_driver_id"))
+        if gps_driver:
+            driver_values = {"driver_id": gps_driver.id, "driver_name": gps_driver.name, "driver_phone": gps_driver.phone}
+            for name in _DRIVER_FIELDS:
+                if name in row:
+                    row[name] = driver_values[name]
+    return rows
 
-    return vehicles
+
+def _get_vehicles_with_gps(
+    session: Session,
+    tenant_id: str,
+    status: Optional[str] = None,
+    work_status: Optional[str] = None,
+) -> List[VehicleDispatchInfo]:
+    """Get vehicles with their GPS data and assigned drivers"""
+    return [
+        VehicleDispatchInfo(**row)
+        for row in _vehicle_rows(session, tenant_id, status, work_status)
+    ]
 
 
 def _get_active_alerts(
@@ -1088,75 +1176,3 @@ def _log_dispatch_action(
     session.add(log)
     session.commit()
     return log
-
-
-def _update_vehicle_gps_from_mappings(
-    session: Session,
-    tenant_id: str,
-    provider_id: Optional[str] = None,
-):
-    """
-    Cập nhật VehicleGPS table từ GPSVehicleMapping.
-    Điều này giúp merge dữ liệu GPS từ providers vào hệ thống dispatch.
-    """
-    # Get mappings with latest location data
-    query = (
-        select(GPSVehicleMapping)
-        .where(GPSVehicleMapping.tenant_id == tenant_id)
-        .where(GPSVehicleMapping.is_active == True)
-        .where(GPSVehicleMapping.last_latitude != None)
-    )
-
-    if provider_id:
-        query = query.where(GPSVehicleMapping.provider_id == provider_id)
-
-    mappings = session.exec(query).all()
-
-    updated_count = 0
-    for mapping in mappings:
-        # Find or create VehicleGPS record
-        gps = session.exec(
-            select(VehicleGPS)
-            .where(VehicleGPS.tenant_id == tenant_id)
-            .where(VehicleGPS.vehicle_id == mapping.vehicle_id)
-        ).first()
-
-        if gps:
-            # Update existing record
-            gps.latitude = mapping.last_latitude
-            gps.longitude = mapping.last_longitude
-            gps.speed = mapping.last_speed
-            gps.heading = mapping.last_heading
-            gps.address = mapping.last_address
-            gps.gps_timestamp = mapping.last_location_at
-            gps.updated_at = datetime.utcnow()
-        else:
-            # Create new GPS record
-            # Try to get driver assigned to this vehicle
-            vehicle = session.get(Vehicle, mapping.vehicle_id)
-            driver_id = None
-            if vehicle:
-                # Find active driver for this vehicle (if any)
-                # This is simplified - in reality might need more complex logic
-                pass
-
-            gps = VehicleGPS(
-                tenant_id=tenant_id,
-                vehicle_id=mapping.vehicle_id,
-                driver_id=driver_id,
-                latitude=mapping.last_latitude,
-                longitude=mapping.last_longitude,
-                speed=mapping.last_speed,
-                heading=mapping.last_heading,
-                address=mapping.last_address,
-                gps_timestamp=mapping.last_location_at,
-                work_status=VehicleWorkStatus.AVAILABLE.value,
-            )
-
-        session.add(gps)
-        updated_count += 1
-
-    if updated_count > 0:
-        session.commit()
-
-    return updated_count
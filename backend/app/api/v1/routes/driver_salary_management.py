@@ -1,16 +1,18 @@
-from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, Query
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlmodel import Session, select, func
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_long_session, get_session
 from app.models import Order, User, Site, DriverSalarySetting, Driver
 from app.models.order import OrderStatus
 from app.models.hrm import DriverPayroll, DriverPayrollStatus
 from app.schemas.driver_salary_trip import DriverSalaryTripUpdate, DriverSalaryTripRead, SalaryBreakdown
 from app.core.security import get_current_user
-from app.services.order_status_logger import get_delivered_date
+from app.core.jobs import JobContext, JobFailed, enqueue, job_accepted
+from app.services.order_status_logger import get_delivered_date, month_range
 from app.services.salary_calculator import calculate_trip_salary
 from app.services.distance_calculator import get_distance_from_rates
 
@@ -77,66 +79,40 @@ def get_is_from_port(session: Session, order: Order) -> Optional[bool]:
     return pickup_site.site_type == "PORT"
 
 
-def count_trips_on_date(session: Session, tenant_id: str, driver_id: str, delivered_date: date) -> int:
-    """Count trips delivered by driver on a specific date"""
-    # Query orders with DELIVERED status on the same date
-    from app.models import OrderStatusLog
-    from sqlalchemy import cast, Date
-
-    # Get all order IDs delivered on this date
-    delivered_orders = session.exec(
-        select(OrderStatusLog.order_id)
-        .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            cast(OrderStatusLog.changed_at, Date) == delivered_date
-        )
-        .distinct()
-    ).all()
+def _day_range(day: date):
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
 
-    if not delivered_orders:
-        return 0
 
-    # Count how many of those orders belong to this driver
-    count = session.exec(
+def count_trips_on_date(session: Session, tenant_id: str, driver_id: str, delivered_date: date) -> int:
+    """Count trips delivered by driver on a specific date"""
+    day_start, day_end = _day_range(delivered_date)
+    return session.exec(
         select(func.count(Order.id))
         .where(
-            Order.id.in_(delivered_orders),
-            Order.driver_id == driver_id
+            Order.tenant_id == tenant_id,
+            Order.driver_id == driver_id,
+            Order.delivered_at >= day_start,
+            Order.delivered_at < day_end
         )
     ).one()
 
-    return count
-
 
 def is_first_trip_on_date(session: Session, tenant_id: str, driver_id: str, delivered_date: date, order_id: str) -> bool:
     """
     Check if this order is the first trip (by created_at) for this driver on this date.
     Used to determine which trip receives the daily bonus.
     """
-    from app.models import OrderStatusLog
-    from sqlalchemy import cast, Date
-
-    # Get all order IDs delivered on this date for this driver
-    delivered_orders = session.exec(
-        select(OrderStatusLog.order_id)
-        .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            cast(OrderStatusLog.changed_at, Date) == delivered_date
-        )
-        .distinct()
-    ).all()
-
-    if not delivered_orders:
-        return False
+    day_start, day_end = _day_range(delivered_date)
 
     # Get the first order (by created_at) for this driver on this date
     first_order = session.exec(
         select(Order.id)
         .where(
-            Order.id.in_(delivered_orders),
-            Order.driver_id == driver_id
+            Order.tenant_id == tenant_id,
+            Order.driver_id == driver_id,
+            Order.delivered_at >= day_start,
+            Order.delivered_at < day_end
         )
         .order_by(Order.created_at.asc())
         .limit(1)
@@ -147,33 +123,43 @@ def is_first_trip_on_date(session: Session, tenant_id: str, driver_id: str, deli
 
 def count_trips_in_month(session: Session, tenant_id: str, driver_id: str, year: int, month: int) -> int:
     """Count total trips delivered by driver in a month"""
-    from app.models import OrderStatusLog
-
-    # Get all order IDs delivered in this month
-    delivered_orders = session.exec(
-        select(OrderStatusLog.order_id)
+    month_start, month_end = month_range(year, month)
+    return session.exec(
+        select(func.count(Order.id))
         .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            func.extract('year', OrderStatusLog.changed_at) == year,
-            func.extract('month', OrderStatusLog.changed_at) == month
+            Order.tenant_id == tenant_id,
+            Order.driver_id == driver_id,
+            Order.delivered_at >= month_start,
+            Order.delivered_at < month_end
         )
-        .distinct()
-    ).all()
+    ).one()
 
-    if not delivered_orders:
-        return 0
 
-    # Count how many of those orders belong to this driver
-    count = session.exec(
-        select(func.count(Order.id))
+def delivered_trip_counts(session: Session, tenant_id: str, year: int, month: int, driver_id: Optional[str] = None):
+    """
+    Trips per (driver, day) and per driver for a month in one range scan -
+    same numbers as count_trips_on_date / count_trips_in_month
+    """
+    month_start, month_end = month_range(year, month)
+    query = (
+        select(Order.driver_id, func.date(Order.delivered_at), func.count(Order.id))
         .where(
-            Order.id.in_(delivered_orders),
-            Order.driver_id == driver_id
+            Order.tenant_id == tenant_id,
+            Order.driver_id.isnot(None),
+            Order.delivered_at >= month_start,
+            Order.delivered_at < month_end
         )
-    ).one()
+        .group_by(Order.driver_id, func.date(Order.delivered_at))
+    )
+    if driver_id:
+        query = query.where(Order.driver_id == driver_id)
 
-    return count
+    per_day: Dict[Tuple[str, date], int] = {}
+    per_month: Dict[str, int] = defaultdict(int)
+    for row_driver_id, day, count in session.exec(query).all():
+        per_day[(row_driver_id, day)] = count
+        per_month[row_driver_id] += count
+    return per_day, per_month
 
 
 @router.get("/trips", response_model=List[DriverSalaryTripRead])
@@ -193,30 +179,12 @@ def list_driver_salary_trips(
 
     tenant_id = str(current_user.tenant_id)
 
-    # Get all orders for this driver that were DELIVERED in the specified month
-    from app.models import OrderStatusLog
-
-    # First, get all order IDs that were marked DELIVERED in this month
-    delivered_orders_subquery = (
-        select(OrderStatusLog.order_id)
-        .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            func.extract('year', OrderStatusLog.changed_at) == year,
-            func.extract('month', OrderStatusLog.changed_at) == month
-        )
-        .distinct()
-    )
-
-    delivered_order_ids = session.exec(delivered_orders_subquery).all()
-
-    if not delivered_order_ids:
-        return []
-
-    # Now get the full Order objects (all drivers or specific driver)
+    # Orders DELIVERED in the specified month (all drivers or specific driver)
+    month_start, month_end = month_range(year, month)
     query = select(Order).where(
         Order.tenant_id == tenant_id,
-        Order.id.in_(delivered_order_ids),
+        Order.delivered_at >= month_start,
+        Order.delivered_at < month_end,
         Order.status.in_([OrderStatus.DELIVERED, OrderStatus.COMPLETED])
     )
 
@@ -260,6 +228,9 @@ def list_driver_salary_trips(
     # Only ONE trip per driver per day should receive the bonus
     bonus_applied_keys = set()  # Set of (driver_id, delivered_date) tuples
 
+    # Trips per day / month for every driver in one query instead of two per order
+    day_counts, month_counts = delivered_trip_counts(session, tenant_id, year, month, driver_id)
+
     for order in orders:
         # Get delivered date from status logs
         delivered_date = get_delivered_date(session, order.id)
@@ -311,8 +282,8 @@ def list_driver_salary_trips(
         trips_per_day = 0
         trips_per_month = 0
         if delivered_date_only and order.driver_id:
-            trips_per_day = count_trips_on_date(session, tenant_id, order.driver_id, delivered_date_only)
-            trips_per_month = count_trips_in_month(session, tenant_id, order.driver_id, year, month)
+            trips_per_day = day_counts.get((order.driver_id, delivered_date_only), 0)
+            trips_per_month = month_counts.get(order.driver_id, 0)
 
         # Check if from port
         is_from_port = get_is_from_port(session, order)
@@ -523,35 +494,23 @@ def update_trip_salary_flags(
 
 def build_trip_snapshot(session: Session, tenant_id: str, driver_id: str, year: int, month: int, settings: DriverSalarySetting) -> dict:
     """Build trip snapshot with locked distance_km values for payroll"""
-    from app.models import OrderStatusLog
-
-    # Get all order IDs that were marked DELIVERED in this month
-    delivered_orders_subquery = (
-        select(OrderStatusLog.order_id)
-        .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            func.extract('year', OrderStatusLog.changed_at) == year,
-            func.extract('month', OrderStatusLog.changed_at) == month
-        )
-        .distinct()
-    )
-
-    delivered_order_ids = session.exec(delivered_orders_subquery).all()
-
-    if not delivered_order_ids:
-        return {"trips": [], "generated_at": datetime.utcnow().isoformat()}
-
-    # Get orders for this driver
+    # Orders of this driver DELIVERED in this month
+    month_start, month_end = month_range(year, month)
     orders = session.exec(
         select(Order).where(
             Order.tenant_id == tenant_id,
-            Order.id.in_(delivered_order_ids),
             Order.driver_id == driver_id,
+            Order.delivered_at >= month_start,
+            Order.delivered_at < month_end,
             Order.status.in_([OrderStatus.DELIVERED, OrderStatus.COMPLETED])
         ).order_by(Order.created_at.asc())
     ).all()
 
+    if not orders:
+        return {"trips": [], "generated_at": datetime.utcnow().isoformat()}
+
+    day_counts, _ = delivered_trip_counts(session, tenant_id, year, month, driver_id)
+
     trips = []
     total_salary = 0
     total_distance = 0
@@ -575,7 +534,7 @@ def build_trip_snapshot(session: Session, tenant_id: str, driver_id: str, year:
             ) or 0
 
         # Count trips per day
-        trips_per_day = count_trips_on_date(session, tenant_id, driver_id, delivered_date_only) if delivered_date_only else 0
+        trips_per_day = day_counts.get((driver_id, delivered_date_only), 0) if delivered_date_only else 0
 
         # Check if from port
         is_from_port = get_is_from_port(session, order)
@@ -761,7 +720,7 @@ def get_payroll(
 @router.post("/payrolls", response_model=PayrollRead)
 def create_payroll(
     payload: PayrollCreate,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """Create driver payroll for a month (DRAFT status)"""
@@ -1154,7 +1113,7 @@ def delete_payroll(
 def validate_trips_for_payroll(
     year: int = Query(...),
     month: int = Query(..., ge=1, le=12),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -1167,34 +1126,20 @@ def validate_trips_for_payroll(
     tenant_id = str(current_user.tenant_id)
 
     # Find all delivered orders in this month
-    from app.models import OrderStatusLog
-
-    delivered_orders_subquery = (
-        select(OrderStatusLog.order_id)
-        .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            func.extract('year', OrderStatusLog.changed_at) == year,
-            func.extract('month', OrderStatusLog.changed_at) == month
-        )
-        .distinct()
-    )
-
-    delivered_order_ids = session.exec(delivered_orders_subquery).all()
-
-    if not delivered_order_ids:
-        return {"valid": True, "missing_km_trips": [], "total_missing": 0}
-
-    # Get orders
+    month_start, month_end = month_range(year, month)
     orders = session.exec(
         select(Order).where(
             Order.tenant_id == tenant_id,
-            Order.id.in_(delivered_order_ids),
+            Order.delivered_at >= month_start,
+            Order.delivered_at < month_end,
             Order.driver_id.isnot(None),
             Order.status.in_([OrderStatus.DELIVERED, OrderStatus.COMPLETED])
         )
     ).all()
 
+    if not orders:
+        return {"valid": True, "missing_km_trips": [], "total_missing": 0}
+
     # Check each order for missing km
     missing_km_trips = []
 
@@ -1266,59 +1211,70 @@ def validate_trips_for_payroll(
     }
 
 
-@router.post("/payrolls/generate-all")
+def _active_salary_settings(session: Session, tenant_id: str) -> Optional[DriverSalarySetting]:
+    return session.exec(
+        select(DriverSalarySetting).where(
+            DriverSalarySetting.tenant_id == tenant_id,
+            DriverSalarySetting.status == "ACTIVE"
+        ).limit(1)
+    ).first()
+
+
+@router.post("/payrolls/generate-all", status_code=202)
 def generate_all_payrolls(
     year: int = Query(...),
     month: int = Query(..., ge=1, le=12),
     force: bool = Query(False, description="Force generate even with missing km"),
+    idempotency_key: Optional[str] = Header(None),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    """Generate payrolls for all drivers who have trips in the month"""
+    """
+    Generate payrolls for all drivers who have trips in the month
+
+    Runs as a background job: returns 202 with a status_url (/jobs/{id}).
+    Missing-km validation errors are reported in the job result.
+    """
     if current_user.role not in ("DISPATCHER", "ADMIN"):
         raise HTTPException(403, "Only DISPATCHER or ADMIN can generate payrolls")
 
     tenant_id = str(current_user.tenant_id)
 
-    # Get salary settings
-    settings = session.exec(
-        select(DriverSalarySetting).where(
-            DriverSalarySetting.tenant_id == tenant_id,
-            DriverSalarySetting.status == "ACTIVE"
-        ).limit(1)
-    ).first()
+    if not _active_salary_settings(session, tenant_id):
+        raise HTTPException(400, "No active salary settings found")
+
+    job = enqueue(
+        session, "payroll.generate_all", tenant_id,
+        payload={"year": year, "month": month, "force": force},
+        user_id=current_user.id, idempotency_key=idempotency_key,
+    )
+    return job_accepted(job)
+
+
+def run_generate_all_payrolls(ctx: JobContext, year: int, month: int, force: bool = False) -> dict:
+    """Job handler for payroll.generate_all"""
+    session = ctx.session
+    tenant_id = ctx.tenant_id
 
+    settings = _active_salary_settings(session, tenant_id)
     if not settings:
-        raise HTTPException(400, "No active salary settings found")
+        raise JobFailed("No active salary settings found")
 
     # First, validate trips for missing km (unless force=True)
     if not force:
         # Find all delivered orders in this month
-        from app.models import OrderStatusLog
-
-        delivered_orders_subquery = (
-            select(OrderStatusLog.order_id)
-            .where(
-                OrderStatusLog.tenant_id == tenant_id,
-                OrderStatusLog.to_status == OrderStatus.DELIVERED,
-                func.extract('year', OrderStatusLog.changed_at) == year,
-                func.extract('month', OrderStatusLog.changed_at) == month
+        month_start, month_end = month_range(year, month)
+        orders = session.exec(
+            select(Order).where(
+                Order.tenant_id == tenant_id,
+                Order.delivered_at >= month_start,
+                Order.delivered_at < month_end,
+                Order.driver_id.isnot(None),
+                Order.status.in_([OrderStatus.DELIVERED, OrderStatus.COMPLETED])
             )
-            .distinct()
-        )
-
-        delivered_order_ids = session.exec(delivered_orders_subquery).all()
-
-        if delivered_order_ids:
-            orders = session.exec(
-                select(Order).where(
-                    Order.tenant_id == tenant_id,
-                    Order.id.in_(delivered_order_ids),
-                    Order.driver_id.isnot(None),
-                    Order.status.in_([OrderStatus.DELIVERED, OrderStatus.COMPLETED])
-                )
-            ).all()
+        ).all()
 
+        if orders:
             missing_km_trips = []
 
             for order in orders:
@@ -1378,28 +1334,26 @@ def generate_all_payrolls(
                         }
                     by_driver[driver_id]["trips"].append(trip)
 
-                raise HTTPException(
-                    status_code=400,
+                message = f"Có {len(missing_km_trips)} chuyến thiếu thông tin km. Vui lòng cập nhật trước khi tạo bảng lương."
+                raise JobFailed(
+                    message,
                     detail={
                         "code": "MISSING_KM",
-                        "message": f"Có {len(missing_km_trips)} chuyến thiếu thông tin km. Vui lòng cập nhật trước khi tạo bảng lương.",
+                        "message": message,
                         "missing_km_trips": list(by_driver.values()),
                         "total_missing": len(missing_km_trips)
                     }
                 )
 
     # Find all drivers with delivered orders in this month
-    from app.models import OrderStatusLog
-
+    month_start, month_end = month_range(year, month)
     driver_ids = session.exec(
         select(Order.driver_id)
-        .join(OrderStatusLog, Order.id == OrderStatusLog.order_id)
         .where(
             Order.tenant_id == tenant_id,
             Order.driver_id.isnot(None),
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            func.extract('year', OrderStatusLog.changed_at) == year,
-            func.extract('month', OrderStatusLog.changed_at) == month
+            Order.delivered_at >= month_start,
+            Order.delivered_at < month_end
         )
         .distinct()
     ).all()
@@ -1408,7 +1362,8 @@ def generate_all_payrolls(
     skipped = 0
     errors = []
 
-    for driver_id in driver_ids:
+    for i, driver_id in enumerate(driver_ids):
+        ctx.progress(i, len(driver_ids))
         try:
             # Check if payroll already exists
             existing = session.exec(
@@ -1462,7 +1417,7 @@ def generate_all_payrolls(
                 total_bonuses=total_bonuses,
                 total_deductions=0,
                 net_salary=net_salary,
-                created_by_id=str(current_user.id)
+                created_by_id=ctx.user_id
             )
 
             session.add(payroll)
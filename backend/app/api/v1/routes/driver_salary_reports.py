@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
-from app.db.session import get_session
-from app.models import Order, Driver, DriverSalarySetting, Site, User, OrderStatusLog, IncomeTaxSetting
+from sqlmodel import Session, select
+from app.db.session import get_long_session
+from app.models import Order, Driver, DriverSalarySetting, Site, User, IncomeTaxSetting
 from app.models.order import OrderStatus
 from app.core.security import get_current_user
-from app.services.order_status_logger import get_delivered_date
+from app.core.export import (
+    FORMAT_PATTERN, MODE_PATTERN, ExportColumn, export_response, select_export_columns,
+)
+from app.services.order_status_logger import get_delivered_date, month_range
 from app.services.salary_calculator import calculate_trip_salary
 from app.services.income_tax_calculator import (
     calculate_seniority_bonus,
@@ -22,7 +25,7 @@ def get_monthly_salary_report(
     year: int = Query(..., description="Year (e.g., 2025)"),
     month: int = Query(..., ge=1, le=12, description="Month (1-12)"),
     driver_id: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -43,15 +46,14 @@ def get_monthly_salary_report(
         raise HTTPException(400, "Không tìm thấy cài đặt lương. Vui lòng tạo cài đặt lương trước.")
 
     # Get all order IDs that were DELIVERED in this month (using delivered_date from status logs)
+    month_start, month_end = month_range(year, month)
     delivered_orders_subquery = (
-        select(OrderStatusLog.order_id)
+        select(Order.id)
         .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            func.extract('year', OrderStatusLog.changed_at) == year,
-            func.extract('month', OrderStatusLog.changed_at) == month
+            Order.tenant_id == tenant_id,
+            Order.delivered_at >= month_start,
+            Order.delivered_at < month_end
         )
-        .distinct()
     )
 
     delivered_order_ids = session.exec(delivered_orders_subquery).all()
@@ -253,3 +255,55 @@ def get_monthly_salary_report(
         "settings_used": settings.model_dump(),
         "drivers": list(driver_reports.values())
     }
+
+
+SALARY_DRIVER_COLUMNS = [
+    ExportColumn("driver_id"), ExportColumn("driver_name"), ExportColumn("trip_count"),
+    ExportColumn("base_salary"), ExportColumn("total_trip_salary"), ExportColumn("monthly_bonus"),
+    ExportColumn("seniority_bonus"), ExportColumn("gross_salary"),
+    ExportColumn("social_insurance"), ExportColumn("health_insurance"), ExportColumn("unemployment_insurance"),
+    ExportColumn("taxable_income"), ExportColumn("income_tax"), ExportColumn("advance_payment"),
+    ExportColumn("total_deductions"), ExportColumn("total_salary"),
+]
+SALARY_TRIP_COLUMNS = [
+    ExportColumn("driver_id"), ExportColumn("driver_name"), ExportColumn("order_code"),
+    ExportColumn("delivered_date"), ExportColumn("pickup_site_code"), ExportColumn("delivery_site_code"),
+    ExportColumn("distance_km"), ExportColumn("trips_per_day"), ExportColumn("is_holiday"),
+    ExportColumn("total", "Trip salary"),
+]
+
+
+def _salary_export_rows(report: dict, level: str):
+    for driver in report["drivers"]:
+        if level == "trips":
+            for trip in driver["trips"]:
+                yield {"driver_id": driver["driver_id"], "driver_name": driver["driver_name"], **trip}
+        else:
+            yield {**driver.get("deductions", {}), **driver}
+
+
+@router.get("/monthly/export")
+def export_monthly_salary_report(
+    year: int = Query(..., description="Year (e.g., 2025)"),
+    month: int = Query(..., ge=1, le=12, description="Month (1-12)"),
+    driver_id: Optional[str] = None,
+    level: str = Query("drivers", pattern="^(drivers|trips)$", description="One row per driver or per trip"),
+    format: str = Query("xlsx", pattern=FORMAT_PATTERN),
+    columns: Optional[str] = Query(None, description="Comma-separated columns (default: all)"),
+    mode: str = Query("auto", pattern=MODE_PATTERN, description="auto, stream or background"),
+    current_user: User = Depends(get_current_user),
+):
+    """Export the monthly salary report as CSV/XLSX"""
+    available = SALARY_TRIP_COLUMNS if level == "trips" else SALARY_DRIVER_COLUMNS
+    return export_response(
+        lambda s: _salary_export_rows(
+            get_monthly_salary_report(year, month, driver_id, session=s, current_user=current_user), level
+        ),
+        select_export_columns(available, columns),
+        format,
+        filename=f"driver-salary-{year}-{month:02d}",
+        tenant_id=str(current_user.tenant_id),
+        user_id=str(current_user.id),
+        mode=mode,
+        sheet_title=f"Lương {month:02d}-{year}",
+    )
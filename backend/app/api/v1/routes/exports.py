@@ -0,0 +1,47 @@
+"""
+Background report exports
+
+Large exports (see app/core/export.py) return 202 with a status URL; the client
+polls it and downloads the file once the export is completed.
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from app.models import User
+from app.core.security import get_current_user
+from app.core.export import MEDIA_TYPES, export_jobs
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+
+def _get_export(export_id: str, current_user: User) -> dict:
+    meta = export_jobs.get(str(current_user.tenant_id), export_id)
+    if not meta:
+        raise HTTPException(404, "Export not found")
+    if meta["user_id"] != str(current_user.id) and current_user.role != "ADMIN":
+        raise HTTPException(403, "Not allowed to access this export")
+    return meta
+
+
+@router.get("/{export_id}")
+def get_export_status(
+    export_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Status of a background export (queued, running, completed, failed)"""
+    return export_jobs.public(_get_export(export_id, current_user))
+
+
+@router.get("/{export_id}/download")
+def download_export(
+    export_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Download a completed background export"""
+    meta = _get_export(export_id, current_user)
+    if meta["status"] != "completed":
+        raise HTTPException(409, f"Export is {meta['status']}")
+    path = export_jobs.file_path(meta)
+    if not path.exists():
+        raise HTTPException(410, "Export file has expired")
+    return FileResponse(path, media_type=MEDIA_TYPES[meta["format"]], filename=meta["filename"])
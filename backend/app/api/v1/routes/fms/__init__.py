@@ -16,10 +16,7 @@ from .consolidations import router as consolidations_router
 from .documents import router as documents_router
 from .seed import router as seed_router
 from .master_data import router as master_data_router
-from .customs_documents import router as customs_documents_router
 from .customs_partners import router as customs_partners_router
-from .ai_training import router as ai_training_router
-from .parsing_instructions import router as parsing_instructions_router
 
 router = APIRouter(prefix="/fms", tags=["FMS"])
 
@@ -36,10 +33,7 @@ router.include_router(consolidations_router)
 router.include_router(documents_router)
 router.include_router(seed_router)
 router.include_router(master_data_router)
-router.include_router(customs_documents_router)
 router.include_router(customs_partners_router)
-router.include_router(ai_training_router)
-router.include_router(parsing_instructions_router)
 
 # ECUS integration (optional - requires pyodbc)
 try:
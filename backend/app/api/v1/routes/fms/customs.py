@@ -2,17 +2,18 @@
 FMS Customs API Routes
 Quản lý tờ khai hải quan
 """
-from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File, Form
 from sqlmodel import Session, select
 from typing import Optional, List
 from datetime import datetime, date
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_long_session, get_session
 from app.models.fms import CustomsDeclaration, DeclarationType, DeclarationStatus, HSCode
 from app.models.fms.master_data import HSCodeCatalog
 from app.models import User
 from app.core.security import get_current_user
+from app.core.pagination import TOTAL_MODE_PATTERN, count_total, fetch_keyset_page
 from app.services.vnaccs_xml_export import export_to_vnaccs_xml
 
 router = APIRouter(prefix="/customs", tags=["FMS Customs"])
@@ -107,7 +108,8 @@ class CustomsResponse(BaseModel):
 
 class CustomsListResponse(BaseModel):
     items: List[CustomsResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class HSCodeCreate(BaseModel):
@@ -251,6 +253,9 @@ def list_customs_declarations(
     declaration_type: Optional[str] = None,
     status: Optional[str] = None,
     declaration_no: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; omit to return all rows"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor of the previous page"),
+    total_mode: str = Query("exact", pattern=TOTAL_MODE_PATTERN),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
@@ -268,7 +273,15 @@ def list_customs_declarations(
     if declaration_no:
         query = query.where(CustomsDeclaration.declaration_no.ilike(f"%{declaration_no}%"))
 
-    declarations = session.exec(query.order_by(CustomsDeclaration.created_at.desc())).all()
+    next_cursor = None
+    if limit or cursor:
+        total = count_total(session, query, total_mode)
+        declarations, next_cursor = fetch_keyset_page(
+            session, query, CustomsDeclaration.created_at, CustomsDeclaration.id, cursor, limit or 50
+        )
+    else:
+        declarations = session.exec(query.order_by(CustomsDeclaration.created_at.desc())).all()
+        total = len(declarations)
 
     return CustomsListResponse(
         items=[CustomsResponse(
@@ -298,7 +311,8 @@ def list_customs_declarations(
             release_date=d.release_date,
             created_at=d.created_at,
         ) for d in declarations],
-        total=len(declarations),
+        total=total,
+        next_cursor=next_cursor,
     )
 
 
@@ -1333,7 +1347,7 @@ class HSCodeImportResponse(BaseModel):
 @router.post("/hs-codes/import", response_model=HSCodeImportResponse)
 def import_hs_codes(
     items: List[HSCodeImportRequest],
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -1417,7 +1431,7 @@ async def import_hs_codes_from_excel(
     description_column: str = Form(default="W"),  # Column containing Vietnamese description
     product_code_column: str = Form(default="V"),  # Column containing product code (optional)
     header_row: int = Form(default=1),  # Row number of header (1-based)
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """
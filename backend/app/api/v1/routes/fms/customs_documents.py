@@ -5,7 +5,7 @@ Upload và phân tích chứng từ để tạo tờ khai hải quan
 import os
 import uuid
 import io
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, UploadFile, File, Form, Query
 from sqlmodel import Session, select
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -15,6 +15,7 @@ from enum import Enum
 from app.db.session import get_session
 from app.models import User
 from app.core.security import get_current_user
+from app.core.jobs import JobCancelled, JobContext, enqueue, job_accepted
 from app.services.document_parser import (
     DocumentParser,
     ParsedDocument,
@@ -1042,9 +1043,10 @@ async def check_ai_status(
     }
 
 
-@router.post("/parse-ai-batch", response_model=AIBatchParseResponse)
-async def parse_documents_batch_with_ai(
+@router.post("/parse-ai-batch", status_code=202)
+def parse_documents_batch_with_ai(
     file_ids: List[str] = Form(...),
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
@@ -1055,12 +1057,26 @@ async def parse_documents_batch_with_ai(
     và gộp thành một tờ khai duy nhất.
 
     Priority order được cấu hình trong AI Settings (Super Admin).
+
+    Runs as a background job: returns 202 with a status_url (/jobs/{id});
+    the job result is an AIBatchParseResponse.
     """
+    job = enqueue(
+        db, "fms.parse_ai_batch", str(current_user.tenant_id),
+        payload={"file_ids": file_ids},
+        user_id=current_user.id, idempotency_key=idempotency_key,
+    )
+    return job_accepted(job)
+
+
+async def run_parse_ai_batch(ctx: JobContext, file_ids: List[str]) -> dict:
+    """Job handler for fms.parse_ai_batch - returns an AIBatchParseResponse as a dict"""
     import logging
     logger = logging.getLogger(__name__)
 
+    db = ctx.session
     try:
-        tenant_id = str(current_user.tenant_id)
+        tenant_id = ctx.tenant_id
         upload_path = os.path.join(UPLOAD_DIR, tenant_id)
 
         logger.info(f"parse-ai-batch: UPLOAD_DIR={UPLOAD_DIR}")
@@ -1079,7 +1095,9 @@ async def parse_documents_batch_with_ai(
         source_docs: List[str] = []
         errors: List[str] = []
 
-        for file_id in file_ids:
+        for i, file_id in enumerate(file_ids):
+            ctx.progress(i, len(file_ids), f"Parsing {i + 1}/{len(file_ids)}")
+
             # Find the file
             file_path = None
             for ext in ALLOWED_EXTENSIONS:
@@ -1109,7 +1127,7 @@ async def parse_documents_batch_with_ai(
                 os.path.basename(file_path),
                 db_session=db,
                 tenant_id=tenant_id,
-                user_id=str(current_user.id) if current_user else None,
+                user_id=ctx.user_id,
             )
             if result.success:
                 results.append(result)
@@ -1127,7 +1145,7 @@ async def parse_documents_batch_with_ai(
                 success=False,
                 error=error_msg,
                 source_documents=[]
-            )
+            ).model_dump(mode="json")
 
         # Merge results
         logger.info(f"parse-ai-batch: merging {len(results)} results")
@@ -1187,14 +1205,16 @@ async def parse_documents_batch_with_ai(
             source_documents=source_docs,
         )
         logger.info(f"parse-ai-batch: returning response with success={response.success}")
-        return response
+        return response.model_dump(mode="json")
+    except JobCancelled:
+        raise
     except Exception as e:
         logger.exception(f"parse-ai-batch: Unexpected error: {e}")
         return AIBatchParseResponse(
             success=False,
             error=f"Server error: {str(e)}",
             source_documents=[]
-        )
+        ).model_dump(mode="json")
 
 
 def _merge_ai_results(results: List[AIParseResult]) -> AIParseResult:
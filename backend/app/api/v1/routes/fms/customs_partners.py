@@ -13,7 +13,7 @@ from pydantic import BaseModel
 import pandas as pd
 import io
 
-from app.db.session import get_session
+from app.db.session import get_long_session, get_session
 from app.models.fms import CustomsExporter, CustomsImporter, CustomsLocation
 from app.models import User
 from app.core.security import get_current_user
@@ -754,7 +754,7 @@ def delete_location(
 @router.post("/import-from-path")
 def import_from_path(
     file_path: str = Query(..., description="Path to Excel file on server"),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -864,7 +864,7 @@ def import_from_path(
 @router.post("/import-excel")
 async def import_from_excel(
     file: UploadFile = File(...),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """
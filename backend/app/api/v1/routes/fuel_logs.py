@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from fastapi.responses import FileResponse
 from sqlmodel import Session, select
-from app.db.session import get_session
+from app.db.session import get_long_session, get_session
 from app.models import FuelLog, Vehicle, Driver, User
 from app.core.security import get_current_user
 from app.core.config import settings
@@ -202,7 +202,7 @@ def delete_fuel_log(
 @router.post("/import-excel")
 async def import_excel(
     file: UploadFile = File(...),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """
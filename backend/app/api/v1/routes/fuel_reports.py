@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select, func
-from app.db.session import get_session
+from app.db.replica import get_read_session
 from app.models import FuelLog, Vehicle, User
 from app.core.security import get_current_user
 from datetime import date as date_type
@@ -14,7 +14,7 @@ def get_fuel_consumption_report(
     vehicle_id: Optional[str] = None,
     start_date: Optional[date_type] = None,
     end_date: Optional[date_type] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -167,7 +167,7 @@ def get_fuel_consumption_trend(
     vehicle_id: Optional[str] = None,
     start_date: Optional[date_type] = None,
     end_date: Optional[date_type] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -46,6 +46,7 @@ class GPSProviderCreate(BaseModel):
     endpoint_history: Optional[str] = None
     endpoint_alerts: Optional[str] = None
     sync_interval_seconds: int = 30
+    max_requests_per_minute: Optional[int] = None
     is_realtime: bool = False
     websocket_url: Optional[str] = None
 
@@ -67,6 +68,7 @@ class GPSProviderUpdate(BaseModel):
     endpoint_history: Optional[str] = None
     endpoint_alerts: Optional[str] = None
     sync_interval_seconds: Optional[int] = None
+    max_requests_per_minute: Optional[int] = None
     is_realtime: Optional[bool] = None
     websocket_url: Optional[str] = None
     status: Optional[str] = None
@@ -94,6 +96,7 @@ class GPSProviderResponse(BaseModel):
     auth_type: str
     status: str
     sync_interval_seconds: int
+    max_requests_per_minute: Optional[int] = None
     is_realtime: bool
     last_sync_at: Optional[datetime]
     last_error: Optional[str]
@@ -173,6 +176,7 @@ def list_providers(
             auth_type=p.auth_type,
             status=p.status,
             sync_interval_seconds=p.sync_interval_seconds,
+            max_requests_per_minute=p.max_requests_per_minute,
             is_realtime=p.is_realtime,
             last_sync_at=p.last_sync_at,
             last_error=p.last_error,
@@ -216,6 +220,7 @@ def create_provider(
         endpoint_history=payload.endpoint_history,
         endpoint_alerts=payload.endpoint_alerts,
         sync_interval_seconds=payload.sync_interval_seconds,
+        max_requests_per_minute=payload.max_requests_per_minute,
         is_realtime=payload.is_realtime,
         websocket_url=payload.websocket_url,
         status=GPSProviderStatus.INACTIVE.value,
@@ -235,6 +240,7 @@ def create_provider(
         auth_type=provider.auth_type,
         status=provider.status,
         sync_interval_seconds=provider.sync_interval_seconds,
+        max_requests_per_minute=provider.max_requests_per_minute,
         is_realtime=provider.is_realtime,
         last_sync_at=provider.last_sync_at,
         last_error=provider.last_error,
@@ -271,6 +277,7 @@ def get_provider(
         "endpoint_history": provider.endpoint_history,
         "endpoint_alerts": provider.endpoint_alerts,
         "sync_interval_seconds": provider.sync_interval_seconds,
+        "max_requests_per_minute": provider.max_requests_per_minute,
         "is_realtime": provider.is_realtime,
         "websocket_url": provider.websocket_url,
         "status": provider.status,
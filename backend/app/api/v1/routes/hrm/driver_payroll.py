@@ -4,24 +4,24 @@ API endpoints for creating, managing, and approving driver payrolls with workflo
 """
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
+from sqlmodel import Session, select
 from typing import List, Optional
 
 from app.db.session import get_session
 from app.models import User, Driver
 from app.models.hrm import DriverPayroll, DriverPayrollStatus
 from app.models import Order, Site
-from app.models.order import OrderStatus
 from app.schemas.driver_payroll import (
     DriverPayrollCreate, DriverPayrollUpdate, DriverPayrollAction,
     DriverPayrollRead, DriverPayrollListItem
 )
 from app.core.security import get_current_user
-from app.services.order_status_logger import get_delivered_date
+from app.services.order_status_logger import get_delivered_date, month_range
 from app.services.salary_calculator import calculate_trip_salary
 from app.services.distance_calculator import get_distance_from_rates
 from app.services.workflow_integration import WorkflowIntegrationService
 from app.models import DriverSalarySetting
+from app.api.v1.routes.driver_salary_management import delivered_trip_counts
 
 router = APIRouter(prefix="/hrm/driver-payroll", tags=["driver-payroll"])
 
@@ -88,25 +88,14 @@ def create_driver_payroll(
     if not settings:
         raise HTTPException(400, "No active salary settings found. Please configure salary settings first.")
 
-    # Query all delivered orders in this month
-    from app.models import OrderStatusLog
-    from sqlalchemy import cast, Date
-
-    delivered_orders_subquery = (
-        select(OrderStatusLog.order_id)
-        .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            func.extract('year', OrderStatusLog.changed_at) == payload.year,
-            func.extract('month', OrderStatusLog.changed_at) == payload.month,
-        )
-        .distinct()
-    )
-
+    # Query all orders first delivered in this month (Order.delivered_at range scan)
+    month_start, month_end = month_range(payload.year, payload.month)
     orders = session.exec(
         select(Order).where(
-            Order.id.in_(delivered_orders_subquery),
+            Order.tenant_id == tenant_id,
             Order.driver_id == payload.driver_id,
+            Order.delivered_at >= month_start,
+            Order.delivered_at < month_end,
         ).order_by(Order.created_at)
     ).all()
 
@@ -118,6 +107,7 @@ def create_driver_payroll(
     total_salary = 0
     total_distance_km = 0
     bonus_applied_keys = set()
+    trips_by_day, _ = delivered_trip_counts(session, tenant_id, payload.year, payload.month, payload.driver_id)
 
     for order in orders:
         delivered_date = get_delivered_date(session, order.id)
@@ -149,21 +139,7 @@ def create_driver_payroll(
                 delivery_site_name = delivery_site.company_name
 
         # Count trips per day
-        trips_per_day = 0
-        if delivered_date_only:
-            delivered_on_date = session.exec(
-                select(OrderStatusLog.order_id).where(
-                    OrderStatusLog.tenant_id == tenant_id,
-                    OrderStatusLog.to_status == OrderStatus.DELIVERED,
-                    cast(OrderStatusLog.changed_at, Date) == delivered_date_only
-                ).distinct()
-            ).all()
-            trips_per_day = session.exec(
-                select(func.count(Order.id)).where(
-                    Order.id.in_(delivered_on_date),
-                    Order.driver_id == payload.driver_id
-                )
-            ).one()
+        trips_per_day = trips_by_day.get((payload.driver_id, delivered_date_only), 0)
 
         # Check if from port
         is_from_port = False
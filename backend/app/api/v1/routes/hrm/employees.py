@@ -15,7 +15,7 @@ from app.models.hrm.employee import Employee, EmployeeStatus, EmployeeType, Empl
 from app.models.hrm.department import Branch, Department, Team, Position
 from app.models.hrm.namecard import EmployeeNameCard
 from app.models.user import UserStatus
-from app.core.security import get_current_user, hash_password
+from app.core.security import get_current_user, hash_password, invalidate_user_cache
 from app.services.driver_hrm_sync import sync_employee_to_driver
 
 router = APIRouter(prefix="/employees", tags=["HRM - Employees"])
@@ -783,6 +783,7 @@ def disable_user_account(
         user.status = UserStatus.INACTIVE.value
         session.add(user)
         session.commit()
+        invalidate_user_cache(user.id)
 
     return {"message": "User account disabled"}
 
@@ -0,0 +1,70 @@
+"""
+Background jobs
+
+Long-running operations (see app/core/jobs.py) return 202 with a status URL;
+the client polls it until the job has succeeded, failed or been cancelled.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, select
+
+from app.db.session import get_session
+from app.models import User
+from app.models.background_job import BackgroundJob, FINISHED_JOB_STATUSES
+from app.core.security import get_current_user
+from app.core.jobs import public, request_cancel
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _get_job(session: Session, job_id: str, current_user: User) -> BackgroundJob:
+    job = session.get(BackgroundJob, job_id)
+    if not job or job.tenant_id != str(current_user.tenant_id):
+        raise HTTPException(404, "Job not found")
+    if job.created_by != str(current_user.id) and current_user.role != "ADMIN":
+        raise HTTPException(403, "Not allowed to access this job")
+    return job
+
+
+@router.get("")
+def list_jobs(
+    kind: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Recent jobs of the tenant (own jobs only, unless ADMIN)"""
+    query = select(BackgroundJob).where(BackgroundJob.tenant_id == str(current_user.tenant_id))
+    if current_user.role != "ADMIN":
+        query = query.where(BackgroundJob.created_by == str(current_user.id))
+    if kind:
+        query = query.where(BackgroundJob.kind == kind)
+    if status:
+        query = query.where(BackgroundJob.status == status)
+    jobs = session.exec(query.order_by(BackgroundJob.created_at.desc()).limit(limit)).all()
+    return [public(job) for job in jobs]
+
+
+@router.get("/{job_id}")
+def get_job(
+    job_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Status, progress and result of a background job"""
+    return public(_get_job(session, job_id, current_user))
+
+
+@router.post("/{job_id}/cancel")
+def cancel_job(
+    job_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Cancel a queued job, or ask a running one to stop at its next progress report"""
+    job = _get_job(session, job_id, current_user)
+    if job.status in FINISHED_JOB_STATUSES:
+        raise HTTPException(409, f"Job is {job.status}")
+    return public(request_cancel(session, job))
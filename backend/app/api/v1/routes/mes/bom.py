@@ -4,13 +4,14 @@ BOM (Bill of Materials) API Routes
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional, List
 from datetime import date
 from decimal import Decimal
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.core.security import get_current_user
 from app.models import User
 from app.models.mes import BillOfMaterials, BOMLine, BOMStatus, BOMType
@@ -78,7 +79,7 @@ async def list_boms(
     bom_type: Optional[BOMType] = None,
     product_id: Optional[str] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Danh sách BOM"""
@@ -101,12 +102,12 @@ async def list_boms(
 
     # Count
     count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Paginate
     query = query.order_by(BillOfMaterials.created_at.desc())
     query = query.offset((page - 1) * size).limit(size)
-    items = session.exec(query).all()
+    items = (await session.exec(query)).all()
 
     return {
         "items": items,
@@ -120,17 +121,17 @@ async def list_boms(
 @router.post("")
 async def create_bom(
     data: BOMCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tạo BOM mới"""
     # Check duplicate code
-    existing = session.exec(
+    existing = (await session.exec(
         select(BillOfMaterials).where(
             BillOfMaterials.tenant_id == current_user.tenant_id,
             BillOfMaterials.bom_code == data.bom_code,
         )
-    ).first()
+    )).first()
     if existing:
         raise HTTPException(400, f"Mã BOM {data.bom_code} đã tồn tại")
 
@@ -140,7 +141,7 @@ async def create_bom(
         **data.model_dump(exclude={"lines"})
     )
     session.add(bom)
-    session.flush()
+    await session.flush()
 
     # Add lines
     total_cost = Decimal("0")
@@ -157,8 +158,8 @@ async def create_bom(
             session.add(line)
 
     bom.standard_cost = total_cost
-    session.commit()
-    session.refresh(bom)
+    await session.commit()
+    await session.refresh(bom)
 
     return bom
 
@@ -166,23 +167,23 @@ async def create_bom(
 @router.get("/{bom_id}")
 async def get_bom(
     bom_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Chi tiết BOM"""
-    bom = session.exec(
+    bom = (await session.exec(
         select(BillOfMaterials).where(
             BillOfMaterials.id == bom_id,
             BillOfMaterials.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not bom:
         raise HTTPException(404, "Không tìm thấy BOM")
 
     # Get lines
-    lines = session.exec(
+    lines = (await session.exec(
         select(BOMLine).where(BOMLine.bom_id == bom_id).order_by(BOMLine.line_number)
-    ).all()
+    )).all()
 
     return {
         **bom.model_dump(),
@@ -194,16 +195,16 @@ async def get_bom(
 async def update_bom(
     bom_id: str,
     data: BOMUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Cập nhật BOM"""
-    bom = session.exec(
+    bom = (await session.exec(
         select(BillOfMaterials).where(
             BillOfMaterials.id == bom_id,
             BillOfMaterials.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not bom:
         raise HTTPException(404, "Không tìm thấy BOM")
 
@@ -211,8 +212,8 @@ async def update_bom(
         setattr(bom, key, value)
 
     session.add(bom)
-    session.commit()
-    session.refresh(bom)
+    await session.commit()
+    await session.refresh(bom)
 
     return bom
 
@@ -220,26 +221,26 @@ async def update_bom(
 @router.delete("/{bom_id}")
 async def delete_bom(
     bom_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa BOM"""
-    bom = session.exec(
+    bom = (await session.exec(
         select(BillOfMaterials).where(
             BillOfMaterials.id == bom_id,
             BillOfMaterials.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not bom:
         raise HTTPException(404, "Không tìm thấy BOM")
 
     # Delete lines first
-    lines = session.exec(select(BOMLine).where(BOMLine.bom_id == bom_id)).all()
+    lines = (await session.exec(select(BOMLine).where(BOMLine.bom_id == bom_id))).all()
     for line in lines:
-        session.delete(line)
+        await session.delete(line)
 
-    session.delete(bom)
-    session.commit()
+    await session.delete(bom)
+    await session.commit()
 
     return {"message": "Đã xóa BOM"}
 
@@ -247,16 +248,16 @@ async def delete_bom(
 @router.post("/{bom_id}/activate")
 async def activate_bom(
     bom_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Kích hoạt BOM"""
-    bom = session.exec(
+    bom = (await session.exec(
         select(BillOfMaterials).where(
             BillOfMaterials.id == bom_id,
             BillOfMaterials.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not bom:
         raise HTTPException(404, "Không tìm thấy BOM")
 
@@ -266,8 +267,8 @@ async def activate_bom(
     bom.approved_at = datetime.utcnow()
 
     session.add(bom)
-    session.commit()
-    session.refresh(bom)
+    await session.commit()
+    await session.refresh(bom)
 
     return bom
 
@@ -277,23 +278,23 @@ async def activate_bom(
 async def add_bom_line(
     bom_id: str,
     data: BOMLineCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Thêm dòng vào BOM"""
-    bom = session.exec(
+    bom = (await session.exec(
         select(BillOfMaterials).where(
             BillOfMaterials.id == bom_id,
             BillOfMaterials.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not bom:
         raise HTTPException(404, "Không tìm thấy BOM")
 
     # Get max line number
-    max_line = session.exec(
+    max_line = (await session.exec(
         select(func.max(BOMLine.line_number)).where(BOMLine.bom_id == bom_id)
-    ).one() or 0
+    )).one() or 0
 
     line = BOMLine(
         tenant_id=current_user.tenant_id,
@@ -308,8 +309,8 @@ async def add_bom_line(
     bom.standard_cost += line.total_cost
     session.add(bom)
 
-    session.commit()
-    session.refresh(line)
+    await session.commit()
+    await session.refresh(line)
 
     return line
 
@@ -318,27 +319,27 @@ async def add_bom_line(
 async def delete_bom_line(
     bom_id: str,
     line_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa dòng khỏi BOM"""
-    line = session.exec(
+    line = (await session.exec(
         select(BOMLine).where(
             BOMLine.id == line_id,
             BOMLine.bom_id == bom_id,
             BOMLine.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not line:
         raise HTTPException(404, "Không tìm thấy dòng BOM")
 
     # Update BOM total cost
-    bom = session.exec(select(BillOfMaterials).where(BillOfMaterials.id == bom_id)).first()
+    bom = (await session.exec(select(BillOfMaterials).where(BillOfMaterials.id == bom_id))).first()
     if bom:
         bom.standard_cost -= line.total_cost
         session.add(bom)
 
-    session.delete(line)
-    session.commit()
+    await session.delete(line)
+    await session.commit()
 
     return {"message": "Đã xóa dòng BOM"}
@@ -4,13 +4,14 @@ Bảo trì thiết bị sản xuất
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 from datetime import datetime
 from decimal import Decimal
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.core.security import get_current_user
 from app.models import User
 from app.models.mes import EquipmentMaintenance, MaintenanceType, MaintenanceStatus, Workstation, WorkstationStatus
@@ -65,18 +66,18 @@ class MaintenanceComplete(BaseModel):
 
 
 # ============== Helper Functions ==============
-async def generate_maintenance_number(session: Session, tenant_id: str) -> str:
+async def generate_maintenance_number(session: AsyncSession, tenant_id: str) -> str:
     """Tạo số phiếu bảo trì"""
     from datetime import date
     today = date.today()
     prefix = f"MT{today.strftime('%y%m')}"
 
-    count = session.exec(
+    count = (await session.exec(
         select(func.count()).where(
             EquipmentMaintenance.tenant_id == tenant_id,
             EquipmentMaintenance.maintenance_number.like(f"{prefix}%")
         )
-    ).one()
+    )).one()
 
     return f"{prefix}{str(count + 1).zfill(4)}"
 
@@ -90,7 +91,7 @@ async def list_maintenance(
     maintenance_type: Optional[MaintenanceType] = None,
     workstation_id: Optional[str] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Danh sách phiếu bảo trì"""
@@ -113,12 +114,12 @@ async def list_maintenance(
 
     # Count
     count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Paginate
     query = query.order_by(EquipmentMaintenance.scheduled_date.desc())
     query = query.offset((page - 1) * size).limit(size)
-    items = session.exec(query).all()
+    items = (await session.exec(query)).all()
 
     return {
         "items": items,
@@ -132,7 +133,7 @@ async def list_maintenance(
 @router.post("")
 async def create_maintenance(
     data: MaintenanceCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tạo phiếu bảo trì"""
@@ -147,8 +148,8 @@ async def create_maintenance(
         **data.model_dump(exclude={"maintenance_number"})
     )
     session.add(maintenance)
-    session.commit()
-    session.refresh(maintenance)
+    await session.commit()
+    await session.refresh(maintenance)
 
     return maintenance
 
@@ -156,16 +157,16 @@ async def create_maintenance(
 @router.get("/{maintenance_id}")
 async def get_maintenance(
     maintenance_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Chi tiết phiếu bảo trì"""
-    maintenance = session.exec(
+    maintenance = (await session.exec(
         select(EquipmentMaintenance).where(
             EquipmentMaintenance.id == maintenance_id,
             EquipmentMaintenance.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not maintenance:
         raise HTTPException(404, "Không tìm thấy phiếu bảo trì")
 
@@ -176,16 +177,16 @@ async def get_maintenance(
 async def update_maintenance(
     maintenance_id: str,
     data: MaintenanceUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Cập nhật phiếu bảo trì"""
-    maintenance = session.exec(
+    maintenance = (await session.exec(
         select(EquipmentMaintenance).where(
             EquipmentMaintenance.id == maintenance_id,
             EquipmentMaintenance.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not maintenance:
         raise HTTPException(404, "Không tìm thấy phiếu bảo trì")
 
@@ -196,8 +197,8 @@ async def update_maintenance(
         setattr(maintenance, key, value)
 
     session.add(maintenance)
-    session.commit()
-    session.refresh(maintenance)
+    await session.commit()
+    await session.refresh(maintenance)
 
     return maintenance
 
@@ -205,16 +206,16 @@ async def update_maintenance(
 @router.post("/{maintenance_id}/start")
 async def start_maintenance(
     maintenance_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Bắt đầu bảo trì"""
-    maintenance = session.exec(
+    maintenance = (await session.exec(
         select(EquipmentMaintenance).where(
             EquipmentMaintenance.id == maintenance_id,
             EquipmentMaintenance.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not maintenance:
         raise HTTPException(404, "Không tìm thấy phiếu bảo trì")
 
@@ -226,16 +227,16 @@ async def start_maintenance(
     maintenance.downtime_start = datetime.utcnow()
 
     # Update workstation status
-    workstation = session.exec(
+    workstation = (await session.exec(
         select(Workstation).where(Workstation.id == maintenance.workstation_id)
-    ).first()
+    )).first()
     if workstation:
         workstation.status = WorkstationStatus.MAINTENANCE
         session.add(workstation)
 
     session.add(maintenance)
-    session.commit()
-    session.refresh(maintenance)
+    await session.commit()
+    await session.refresh(maintenance)
 
     return maintenance
 
@@ -244,16 +245,16 @@ async def start_maintenance(
 async def complete_maintenance(
     maintenance_id: str,
     data: MaintenanceComplete,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Hoàn thành bảo trì"""
-    maintenance = session.exec(
+    maintenance = (await session.exec(
         select(EquipmentMaintenance).where(
             EquipmentMaintenance.id == maintenance_id,
             EquipmentMaintenance.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not maintenance:
         raise HTTPException(404, "Không tìm thấy phiếu bảo trì")
 
@@ -289,9 +290,9 @@ async def complete_maintenance(
     )
 
     # Update workstation
-    workstation = session.exec(
+    workstation = (await session.exec(
         select(Workstation).where(Workstation.id == maintenance.workstation_id)
-    ).first()
+    )).first()
     if workstation:
         workstation.status = WorkstationStatus.ACTIVE
         workstation.last_maintenance_date = now
@@ -300,8 +301,8 @@ async def complete_maintenance(
         session.add(workstation)
 
     session.add(maintenance)
-    session.commit()
-    session.refresh(maintenance)
+    await session.commit()
+    await session.refresh(maintenance)
 
     return maintenance
 
@@ -309,16 +310,16 @@ async def complete_maintenance(
 @router.post("/{maintenance_id}/cancel")
 async def cancel_maintenance(
     maintenance_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Hủy phiếu bảo trì"""
-    maintenance = session.exec(
+    maintenance = (await session.exec(
         select(EquipmentMaintenance).where(
             EquipmentMaintenance.id == maintenance_id,
             EquipmentMaintenance.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not maintenance:
         raise HTTPException(404, "Không tìm thấy phiếu bảo trì")
 
@@ -328,16 +329,16 @@ async def cancel_maintenance(
     maintenance.status = MaintenanceStatus.CANCELLED
 
     # Restore workstation status if was in maintenance
-    workstation = session.exec(
+    workstation = (await session.exec(
         select(Workstation).where(Workstation.id == maintenance.workstation_id)
-    ).first()
+    )).first()
     if workstation and workstation.status == WorkstationStatus.MAINTENANCE:
         workstation.status = WorkstationStatus.ACTIVE
         session.add(workstation)
 
     session.add(maintenance)
-    session.commit()
-    session.refresh(maintenance)
+    await session.commit()
+    await session.refresh(maintenance)
 
     return maintenance
 
@@ -345,23 +346,23 @@ async def cancel_maintenance(
 @router.delete("/{maintenance_id}")
 async def delete_maintenance(
     maintenance_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa phiếu bảo trì"""
-    maintenance = session.exec(
+    maintenance = (await session.exec(
         select(EquipmentMaintenance).where(
             EquipmentMaintenance.id == maintenance_id,
             EquipmentMaintenance.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not maintenance:
         raise HTTPException(404, "Không tìm thấy phiếu bảo trì")
 
     if maintenance.status not in [MaintenanceStatus.SCHEDULED, MaintenanceStatus.CANCELLED]:
         raise HTTPException(400, "Chỉ có thể xóa phiếu đã lên lịch hoặc đã hủy")
 
-    session.delete(maintenance)
-    session.commit()
+    await session.delete(maintenance)
+    await session.commit()
 
     return {"message": "Đã xóa phiếu bảo trì"}
@@ -4,14 +4,16 @@ Lệnh sản xuất
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional, List
 from datetime import date, datetime
 from decimal import Decimal
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.core.security import get_current_user
+from app.services import sequences
 from app.models import User
 from app.models.mes import (
     ProductionOrder, ProductionOrderLine, ProductionOrderStatus, ProductionOrderType,
@@ -82,19 +84,17 @@ class ProductionOrderUpdate(BaseModel):
 
 
 # ============== Helper Functions ==============
-async def generate_order_number(session: Session, tenant_id: str) -> str:
+async def generate_order_number(session: AsyncSession, tenant_id: str) -> str:
     """Tạo số lệnh sản xuất tự động"""
     today = date.today()
     prefix = f"MO{today.strftime('%y%m')}"
 
-    count = session.exec(
-        select(func.count()).where(
-            ProductionOrder.tenant_id == tenant_id,
-            ProductionOrder.order_number.like(f"{prefix}%")
-        )
-    ).one()
+    number = (await sequences.allocate_async(
+        session, str(tenant_id), f"mes_order:{prefix}",
+        seed=sequences.max_suffix("mes_production_orders", "order_number", prefix, tenant_id),
+    ))[0]
 
-    return f"{prefix}{str(count + 1).zfill(4)}"
+    return f"{prefix}{str(number).zfill(4)}"
 
 
 # ============== Endpoints ==============
@@ -106,7 +106,7 @@ async def list_production_orders(
     order_type: Optional[ProductionOrderType] = None,
     product_id: Optional[str] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Danh sách lệnh sản xuất"""
@@ -129,12 +129,12 @@ async def list_production_orders(
 
     # Count
     count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Paginate
     query = query.order_by(ProductionOrder.created_at.desc())
     query = query.offset((page - 1) * size).limit(size)
-    items = session.exec(query).all()
+    items = (await session.exec(query)).all()
 
     return {
         "items": items,
@@ -148,7 +148,7 @@ async def list_production_orders(
 @router.post("")
 async def create_production_order(
     data: ProductionOrderCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tạo lệnh sản xuất mới"""
@@ -164,7 +164,7 @@ async def create_production_order(
         **data.model_dump(exclude={"order_number", "order_date", "lines"})
     )
     session.add(order)
-    session.flush()
+    await session.flush()
 
     # Add lines
     total_cost = Decimal("0")
@@ -181,8 +181,8 @@ async def create_production_order(
             session.add(line)
 
     order.planned_cost = total_cost
-    session.commit()
-    session.refresh(order)
+    await session.commit()
+    await session.refresh(order)
 
     return order
 
@@ -190,30 +190,30 @@ async def create_production_order(
 @router.get("/{order_id}")
 async def get_production_order(
     order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Chi tiết lệnh sản xuất"""
-    order = session.exec(
+    order = (await session.exec(
         select(ProductionOrder).where(
             ProductionOrder.id == order_id,
             ProductionOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not order:
         raise HTTPException(404, "Không tìm thấy lệnh sản xuất")
 
     # Get lines
-    lines = session.exec(
+    lines = (await session.exec(
         select(ProductionOrderLine).where(ProductionOrderLine.production_order_id == order_id)
         .order_by(ProductionOrderLine.line_number)
-    ).all()
+    )).all()
 
     # Get work orders
-    work_orders = session.exec(
+    work_orders = (await session.exec(
         select(WorkOrder).where(WorkOrder.production_order_id == order_id)
         .order_by(WorkOrder.step_number)
-    ).all()
+    )).all()
 
     return {
         **order.model_dump(),
@@ -226,16 +226,16 @@ async def get_production_order(
 async def update_production_order(
     order_id: str,
     data: ProductionOrderUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Cập nhật lệnh sản xuất"""
-    order = session.exec(
+    order = (await session.exec(
         select(ProductionOrder).where(
             ProductionOrder.id == order_id,
             ProductionOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not order:
         raise HTTPException(404, "Không tìm thấy lệnh sản xuất")
 
@@ -246,8 +246,8 @@ async def update_production_order(
         setattr(order, key, value)
 
     session.add(order)
-    session.commit()
-    session.refresh(order)
+    await session.commit()
+    await session.refresh(order)
 
     return order
 
@@ -255,16 +255,16 @@ async def update_production_order(
 @router.post("/{order_id}/confirm")
 async def confirm_production_order(
     order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xác nhận lệnh sản xuất"""
-    order = session.exec(
+    order = (await session.exec(
         select(ProductionOrder).where(
             ProductionOrder.id == order_id,
             ProductionOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not order:
         raise HTTPException(404, "Không tìm thấy lệnh sản xuất")
 
@@ -273,8 +273,8 @@ async def confirm_production_order(
 
     order.status = ProductionOrderStatus.CONFIRMED
     session.add(order)
-    session.commit()
-    session.refresh(order)
+    await session.commit()
+    await session.refresh(order)
 
     return order
 
@@ -282,16 +282,16 @@ async def confirm_production_order(
 @router.post("/{order_id}/release")
 async def release_production_order(
     order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Phát hành lệnh sản xuất (bắt đầu sản xuất)"""
-    order = session.exec(
+    order = (await session.exec(
         select(ProductionOrder).where(
             ProductionOrder.id == order_id,
             ProductionOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not order:
         raise HTTPException(404, "Không tìm thấy lệnh sản xuất")
 
@@ -302,8 +302,8 @@ async def release_production_order(
     order.released_by = str(current_user.id)
     order.released_at = datetime.utcnow()
     session.add(order)
-    session.commit()
-    session.refresh(order)
+    await session.commit()
+    await session.refresh(order)
 
     return order
 
@@ -311,16 +311,16 @@ async def release_production_order(
 @router.post("/{order_id}/start")
 async def start_production_order(
     order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Bắt đầu sản xuất"""
-    order = session.exec(
+    order = (await session.exec(
         select(ProductionOrder).where(
             ProductionOrder.id == order_id,
             ProductionOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not order:
         raise HTTPException(404, "Không tìm thấy lệnh sản xuất")
 
@@ -330,8 +330,8 @@ async def start_production_order(
     order.status = ProductionOrderStatus.IN_PROGRESS
     order.actual_start_date = datetime.utcnow()
     session.add(order)
-    session.commit()
-    session.refresh(order)
+    await session.commit()
+    await session.refresh(order)
 
     return order
 
@@ -341,16 +341,16 @@ async def complete_production_order(
     order_id: str,
     completed_quantity: Decimal,
     scrapped_quantity: Decimal = Decimal("0"),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Hoàn thành lệnh sản xuất"""
-    order = session.exec(
+    order = (await session.exec(
         select(ProductionOrder).where(
             ProductionOrder.id == order_id,
             ProductionOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not order:
         raise HTTPException(404, "Không tìm thấy lệnh sản xuất")
 
@@ -364,8 +364,8 @@ async def complete_production_order(
     order.completed_by = str(current_user.id)
     order.completed_at = datetime.utcnow()
     session.add(order)
-    session.commit()
-    session.refresh(order)
+    await session.commit()
+    await session.refresh(order)
 
     return order
 
@@ -373,16 +373,16 @@ async def complete_production_order(
 @router.post("/{order_id}/cancel")
 async def cancel_production_order(
     order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Hủy lệnh sản xuất"""
-    order = session.exec(
+    order = (await session.exec(
         select(ProductionOrder).where(
             ProductionOrder.id == order_id,
             ProductionOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not order:
         raise HTTPException(404, "Không tìm thấy lệnh sản xuất")
 
@@ -391,8 +391,8 @@ async def cancel_production_order(
 
     order.status = ProductionOrderStatus.CANCELLED
     session.add(order)
-    session.commit()
-    session.refresh(order)
+    await session.commit()
+    await session.refresh(order)
 
     return order
 
@@ -400,16 +400,16 @@ async def cancel_production_order(
 @router.delete("/{order_id}")
 async def delete_production_order(
     order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa lệnh sản xuất (chỉ bản nháp)"""
-    order = session.exec(
+    order = (await session.exec(
         select(ProductionOrder).where(
             ProductionOrder.id == order_id,
             ProductionOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not order:
         raise HTTPException(404, "Không tìm thấy lệnh sản xuất")
 
@@ -417,20 +417,20 @@ async def delete_production_order(
         raise HTTPException(400, "Chỉ có thể xóa lệnh ở trạng thái bản nháp")
 
     # Delete lines
-    lines = session.exec(
+    lines = (await session.exec(
         select(ProductionOrderLine).where(ProductionOrderLine.production_order_id == order_id)
-    ).all()
+    )).all()
     for line in lines:
-        session.delete(line)
+        await session.delete(line)
 
     # Delete work orders
-    work_orders = session.exec(
+    work_orders = (await session.exec(
         select(WorkOrder).where(WorkOrder.production_order_id == order_id)
-    ).all()
+    )).all()
     for wo in work_orders:
-        session.delete(wo)
+        await session.delete(wo)
 
-    session.delete(order)
-    session.commit()
+    await session.delete(order)
+    await session.commit()
 
     return {"message": "Đã xóa lệnh sản xuất"}
@@ -4,13 +4,14 @@ Kiểm tra chất lượng trong sản xuất
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.core.security import get_current_user
 from app.models import User
 from app.models.mes import QualityControl, QualityControlLine, QCStatus, QCType, DefectType
@@ -80,18 +81,18 @@ class QCComplete(BaseModel):
 
 
 # ============== Helper Functions ==============
-async def generate_qc_number(session: Session, tenant_id: str) -> str:
+async def generate_qc_number(session: AsyncSession, tenant_id: str) -> str:
     """Tạo số phiếu QC"""
     from datetime import date
     today = date.today()
     prefix = f"QC{today.strftime('%y%m')}"
 
-    count = session.exec(
+    count = (await session.exec(
         select(func.count()).where(
             QualityControl.tenant_id == tenant_id,
             QualityControl.qc_number.like(f"{prefix}%")
         )
-    ).one()
+    )).one()
 
     return f"{prefix}{str(count + 1).zfill(4)}"
 
@@ -107,7 +108,7 @@ async def list_quality_controls(
     production_order_id: Optional[str] = None,
     result: Optional[str] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Danh sách phiếu kiểm tra chất lượng"""
@@ -134,12 +135,12 @@ async def list_quality_controls(
 
     # Count
     count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Paginate
     query = query.order_by(QualityControl.created_at.desc())
     query = query.offset((page - 1) * size).limit(size)
-    items = session.exec(query).all()
+    items = (await session.exec(query)).all()
 
     return {
         "items": items,
@@ -153,7 +154,7 @@ async def list_quality_controls(
 @router.post("")
 async def create_quality_control(
     data: QCCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tạo phiếu kiểm tra chất lượng"""
@@ -169,7 +170,7 @@ async def create_quality_control(
         **data.model_dump(exclude={"qc_number", "qc_date", "lines"})
     )
     session.add(qc)
-    session.flush()
+    await session.flush()
 
     # Add lines
     if data.lines:
@@ -182,8 +183,8 @@ async def create_quality_control(
             )
             session.add(line)
 
-    session.commit()
-    session.refresh(qc)
+    await session.commit()
+    await session.refresh(qc)
 
     return qc
 
@@ -191,24 +192,24 @@ async def create_quality_control(
 @router.get("/{qc_id}")
 async def get_quality_control(
     qc_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Chi tiết phiếu kiểm tra"""
-    qc = session.exec(
+    qc = (await session.exec(
         select(QualityControl).where(
             QualityControl.id == qc_id,
             QualityControl.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not qc:
         raise HTTPException(404, "Không tìm thấy phiếu kiểm tra")
 
     # Get lines
-    lines = session.exec(
+    lines = (await session.exec(
         select(QualityControlLine).where(QualityControlLine.quality_control_id == qc_id)
         .order_by(QualityControlLine.line_number)
-    ).all()
+    )).all()
 
     return {
         **qc.model_dump(),
@@ -220,16 +221,16 @@ async def get_quality_control(
 async def update_quality_control(
     qc_id: str,
     data: QCUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Cập nhật phiếu kiểm tra"""
-    qc = session.exec(
+    qc = (await session.exec(
         select(QualityControl).where(
             QualityControl.id == qc_id,
             QualityControl.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not qc:
         raise HTTPException(404, "Không tìm thấy phiếu kiểm tra")
 
@@ -240,8 +241,8 @@ async def update_quality_control(
         setattr(qc, key, value)
 
     session.add(qc)
-    session.commit()
-    session.refresh(qc)
+    await session.commit()
+    await session.refresh(qc)
 
     return qc
 
@@ -249,16 +250,16 @@ async def update_quality_control(
 @router.post("/{qc_id}/start")
 async def start_quality_control(
     qc_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Bắt đầu kiểm tra"""
-    qc = session.exec(
+    qc = (await session.exec(
         select(QualityControl).where(
             QualityControl.id == qc_id,
             QualityControl.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not qc:
         raise HTTPException(404, "Không tìm thấy phiếu kiểm tra")
 
@@ -268,8 +269,8 @@ async def start_quality_control(
     qc.status = QCStatus.IN_PROGRESS
     qc.started_at = datetime.utcnow()
     session.add(qc)
-    session.commit()
-    session.refresh(qc)
+    await session.commit()
+    await session.refresh(qc)
 
     return qc
 
@@ -278,16 +279,16 @@ async def start_quality_control(
 async def complete_quality_control(
     qc_id: str,
     data: QCComplete,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Hoàn thành kiểm tra"""
-    qc = session.exec(
+    qc = (await session.exec(
         select(QualityControl).where(
             QualityControl.id == qc_id,
             QualityControl.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not qc:
         raise HTTPException(404, "Không tìm thấy phiếu kiểm tra")
 
@@ -316,8 +317,8 @@ async def complete_quality_control(
     qc.completed_at = datetime.utcnow()
 
     session.add(qc)
-    session.commit()
-    session.refresh(qc)
+    await session.commit()
+    await session.refresh(qc)
 
     return qc
 
@@ -325,16 +326,16 @@ async def complete_quality_control(
 @router.delete("/{qc_id}")
 async def delete_quality_control(
     qc_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa phiếu kiểm tra"""
-    qc = session.exec(
+    qc = (await session.exec(
         select(QualityControl).where(
             QualityControl.id == qc_id,
             QualityControl.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not qc:
         raise HTTPException(404, "Không tìm thấy phiếu kiểm tra")
 
@@ -342,14 +343,14 @@ async def delete_quality_control(
         raise HTTPException(400, "Chỉ có thể xóa phiếu chờ kiểm tra")
 
     # Delete lines
-    lines = session.exec(
+    lines = (await session.exec(
         select(QualityControlLine).where(QualityControlLine.quality_control_id == qc_id)
-    ).all()
+    )).all()
     for line in lines:
-        session.delete(line)
+        await session.delete(line)
 
-    session.delete(qc)
-    session.commit()
+    await session.delete(qc)
+    await session.commit()
 
     return {"message": "Đã xóa phiếu kiểm tra"}
 
@@ -359,25 +360,25 @@ async def delete_quality_control(
 async def add_qc_line(
     qc_id: str,
     data: QCLineCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Thêm tiêu chí kiểm tra"""
-    qc = session.exec(
+    qc = (await session.exec(
         select(QualityControl).where(
             QualityControl.id == qc_id,
             QualityControl.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not qc:
         raise HTTPException(404, "Không tìm thấy phiếu kiểm tra")
 
     # Get max line number
-    max_line = session.exec(
+    max_line = (await session.exec(
         select(func.max(QualityControlLine.line_number)).where(
             QualityControlLine.quality_control_id == qc_id
         )
-    ).one() or 0
+    )).one() or 0
 
     line = QualityControlLine(
         tenant_id=current_user.tenant_id,
@@ -386,8 +387,8 @@ async def add_qc_line(
         **data.model_dump()
     )
     session.add(line)
-    session.commit()
-    session.refresh(line)
+    await session.commit()
+    await session.refresh(line)
 
     return line
 
@@ -397,17 +398,17 @@ async def update_qc_line(
     qc_id: str,
     line_id: str,
     data: QCLineCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Cập nhật kết quả kiểm tra cho tiêu chí"""
-    line = session.exec(
+    line = (await session.exec(
         select(QualityControlLine).where(
             QualityControlLine.id == line_id,
             QualityControlLine.quality_control_id == qc_id,
             QualityControlLine.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not line:
         raise HTTPException(404, "Không tìm thấy tiêu chí kiểm tra")
 
@@ -415,7 +416,7 @@ async def update_qc_line(
         setattr(line, key, value)
 
     session.add(line)
-    session.commit()
-    session.refresh(line)
+    await session.commit()
+    await session.refresh(line)
 
     return line
@@ -4,13 +4,14 @@ Quy trình sản xuất
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional, List
 from datetime import date
 from decimal import Decimal
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.core.security import get_current_user
 from app.models import User
 from app.models.mes import Routing, RoutingStep, RoutingStatus
@@ -81,7 +82,7 @@ async def list_routings(
     status: Optional[RoutingStatus] = None,
     product_id: Optional[str] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Danh sách quy trình sản xuất"""
@@ -101,12 +102,12 @@ async def list_routings(
 
     # Count
     count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Paginate
     query = query.order_by(Routing.created_at.desc())
     query = query.offset((page - 1) * size).limit(size)
-    items = session.exec(query).all()
+    items = (await session.exec(query)).all()
 
     return {
         "items": items,
@@ -120,17 +121,17 @@ async def list_routings(
 @router.post("")
 async def create_routing(
     data: RoutingCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tạo quy trình mới"""
     # Check duplicate code
-    existing = session.exec(
+    existing = (await session.exec(
         select(Routing).where(
             Routing.tenant_id == current_user.tenant_id,
             Routing.code == data.code,
         )
-    ).first()
+    )).first()
     if existing:
         raise HTTPException(400, f"Mã quy trình {data.code} đã tồn tại")
 
@@ -140,7 +141,7 @@ async def create_routing(
         **data.model_dump(exclude={"steps"})
     )
     session.add(routing)
-    session.flush()
+    await session.flush()
 
     # Add steps
     total_time = Decimal("0")
@@ -163,8 +164,8 @@ async def create_routing(
     routing.total_setup_time = total_setup
     routing.total_cost = total_cost
 
-    session.commit()
-    session.refresh(routing)
+    await session.commit()
+    await session.refresh(routing)
 
     return routing
 
@@ -172,24 +173,24 @@ async def create_routing(
 @router.get("/{routing_id}")
 async def get_routing(
     routing_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Chi tiết quy trình"""
-    routing = session.exec(
+    routing = (await session.exec(
         select(Routing).where(
             Routing.id == routing_id,
             Routing.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not routing:
         raise HTTPException(404, "Không tìm thấy quy trình")
 
     # Get steps
-    steps = session.exec(
+    steps = (await session.exec(
         select(RoutingStep).where(RoutingStep.routing_id == routing_id)
         .order_by(RoutingStep.step_number)
-    ).all()
+    )).all()
 
     return {
         **routing.model_dump(),
@@ -201,16 +202,16 @@ async def get_routing(
 async def update_routing(
     routing_id: str,
     data: RoutingUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Cập nhật quy trình"""
-    routing = session.exec(
+    routing = (await session.exec(
         select(Routing).where(
             Routing.id == routing_id,
             Routing.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not routing:
         raise HTTPException(404, "Không tìm thấy quy trình")
 
@@ -218,8 +219,8 @@ async def update_routing(
         setattr(routing, key, value)
 
     session.add(routing)
-    session.commit()
-    session.refresh(routing)
+    await session.commit()
+    await session.refresh(routing)
 
     return routing
 
@@ -227,26 +228,26 @@ async def update_routing(
 @router.delete("/{routing_id}")
 async def delete_routing(
     routing_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa quy trình"""
-    routing = session.exec(
+    routing = (await session.exec(
         select(Routing).where(
             Routing.id == routing_id,
             Routing.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not routing:
         raise HTTPException(404, "Không tìm thấy quy trình")
 
     # Delete steps
-    steps = session.exec(select(RoutingStep).where(RoutingStep.routing_id == routing_id)).all()
+    steps = (await session.exec(select(RoutingStep).where(RoutingStep.routing_id == routing_id))).all()
     for step in steps:
-        session.delete(step)
+        await session.delete(step)
 
-    session.delete(routing)
-    session.commit()
+    await session.delete(routing)
+    await session.commit()
 
     return {"message": "Đã xóa quy trình"}
 
@@ -256,16 +257,16 @@ async def delete_routing(
 async def add_routing_step(
     routing_id: str,
     data: RoutingStepCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Thêm công đoạn vào quy trình"""
-    routing = session.exec(
+    routing = (await session.exec(
         select(Routing).where(
             Routing.id == routing_id,
             Routing.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not routing:
         raise HTTPException(404, "Không tìm thấy quy trình")
 
@@ -282,8 +283,8 @@ async def add_routing_step(
     routing.total_cost += step.labor_cost + step.machine_cost + step.overhead_cost
     session.add(routing)
 
-    session.commit()
-    session.refresh(step)
+    await session.commit()
+    await session.refresh(step)
 
     return step
 
@@ -292,29 +293,29 @@ async def add_routing_step(
 async def delete_routing_step(
     routing_id: str,
     step_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa công đoạn khỏi quy trình"""
-    step = session.exec(
+    step = (await session.exec(
         select(RoutingStep).where(
             RoutingStep.id == step_id,
             RoutingStep.routing_id == routing_id,
             RoutingStep.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not step:
         raise HTTPException(404, "Không tìm thấy công đoạn")
 
     # Update routing totals
-    routing = session.exec(select(Routing).where(Routing.id == routing_id)).first()
+    routing = (await session.exec(select(Routing).where(Routing.id == routing_id))).first()
     if routing:
         routing.total_time_minutes -= (step.setup_time + step.run_time + step.wait_time + step.move_time)
         routing.total_setup_time -= step.setup_time
         routing.total_cost -= (step.labor_cost + step.machine_cost + step.overhead_cost)
         session.add(routing)
 
-    session.delete(step)
-    session.commit()
+    await session.delete(step)
+    await session.commit()
 
     return {"message": "Đã xóa công đoạn"}
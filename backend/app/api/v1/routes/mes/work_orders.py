@@ -4,13 +4,14 @@ Lệnh công việc - Chi tiết từng công đoạn sản xuất
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 from datetime import datetime
 from decimal import Decimal
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.core.security import get_current_user
 from app.models import User
 from app.models.mes import WorkOrder, WorkOrderStatus, WorkOrderType
@@ -74,7 +75,7 @@ class WorkOrderComplete(BaseModel):
 
 
 # ============== Helper Functions ==============
-async def generate_work_order_number(session: Session, tenant_id: str, production_order_number: str, step: int) -> str:
+async def generate_work_order_number(session: AsyncSession, tenant_id: str, production_order_number: str, step: int) -> str:
     """Tạo số lệnh công việc"""
     return f"{production_order_number}-{str(step).zfill(3)}"
 
@@ -90,7 +91,7 @@ async def list_work_orders(
     workstation_id: Optional[str] = None,
     operator_id: Optional[str] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Danh sách lệnh công việc"""
@@ -116,12 +117,12 @@ async def list_work_orders(
 
     # Count
     count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Paginate
     query = query.order_by(WorkOrder.created_at.desc())
     query = query.offset((page - 1) * size).limit(size)
-    items = session.exec(query).all()
+    items = (await session.exec(query)).all()
 
     return {
         "items": items,
@@ -135,7 +136,7 @@ async def list_work_orders(
 @router.post("")
 async def create_work_order(
     data: WorkOrderCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tạo lệnh công việc mới"""
@@ -156,8 +157,8 @@ async def create_work_order(
         **data.model_dump(exclude={"work_order_number"})
     )
     session.add(work_order)
-    session.commit()
-    session.refresh(work_order)
+    await session.commit()
+    await session.refresh(work_order)
 
     return work_order
 
@@ -165,16 +166,16 @@ async def create_work_order(
 @router.get("/{work_order_id}")
 async def get_work_order(
     work_order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Chi tiết lệnh công việc"""
-    work_order = session.exec(
+    work_order = (await session.exec(
         select(WorkOrder).where(
             WorkOrder.id == work_order_id,
             WorkOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not work_order:
         raise HTTPException(404, "Không tìm thấy lệnh công việc")
 
@@ -185,16 +186,16 @@ async def get_work_order(
 async def update_work_order(
     work_order_id: str,
     data: WorkOrderUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Cập nhật lệnh công việc"""
-    work_order = session.exec(
+    work_order = (await session.exec(
         select(WorkOrder).where(
             WorkOrder.id == work_order_id,
             WorkOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not work_order:
         raise HTTPException(404, "Không tìm thấy lệnh công việc")
 
@@ -205,8 +206,8 @@ async def update_work_order(
         setattr(work_order, key, value)
 
     session.add(work_order)
-    session.commit()
-    session.refresh(work_order)
+    await session.commit()
+    await session.refresh(work_order)
 
     return work_order
 
@@ -214,16 +215,16 @@ async def update_work_order(
 @router.post("/{work_order_id}/start")
 async def start_work_order(
     work_order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Bắt đầu thực hiện công việc"""
-    work_order = session.exec(
+    work_order = (await session.exec(
         select(WorkOrder).where(
             WorkOrder.id == work_order_id,
             WorkOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not work_order:
         raise HTTPException(404, "Không tìm thấy lệnh công việc")
 
@@ -234,8 +235,8 @@ async def start_work_order(
     work_order.actual_start = datetime.utcnow()
     work_order.started_by = str(current_user.id)
     session.add(work_order)
-    session.commit()
-    session.refresh(work_order)
+    await session.commit()
+    await session.refresh(work_order)
 
     return work_order
 
@@ -243,16 +244,16 @@ async def start_work_order(
 @router.post("/{work_order_id}/pause")
 async def pause_work_order(
     work_order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tạm dừng công việc"""
-    work_order = session.exec(
+    work_order = (await session.exec(
         select(WorkOrder).where(
             WorkOrder.id == work_order_id,
             WorkOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not work_order:
         raise HTTPException(404, "Không tìm thấy lệnh công việc")
 
@@ -261,8 +262,8 @@ async def pause_work_order(
 
     work_order.status = WorkOrderStatus.PAUSED
     session.add(work_order)
-    session.commit()
-    session.refresh(work_order)
+    await session.commit()
+    await session.refresh(work_order)
 
     return work_order
 
@@ -270,16 +271,16 @@ async def pause_work_order(
 @router.post("/{work_order_id}/resume")
 async def resume_work_order(
     work_order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tiếp tục công việc"""
-    work_order = session.exec(
+    work_order = (await session.exec(
         select(WorkOrder).where(
             WorkOrder.id == work_order_id,
             WorkOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not work_order:
         raise HTTPException(404, "Không tìm thấy lệnh công việc")
 
@@ -288,8 +289,8 @@ async def resume_work_order(
 
     work_order.status = WorkOrderStatus.IN_PROGRESS
     session.add(work_order)
-    session.commit()
-    session.refresh(work_order)
+    await session.commit()
+    await session.refresh(work_order)
 
     return work_order
 
@@ -298,16 +299,16 @@ async def resume_work_order(
 async def complete_work_order(
     work_order_id: str,
     data: WorkOrderComplete,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Hoàn thành công việc"""
-    work_order = session.exec(
+    work_order = (await session.exec(
         select(WorkOrder).where(
             WorkOrder.id == work_order_id,
             WorkOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not work_order:
         raise HTTPException(404, "Không tìm thấy lệnh công việc")
 
@@ -334,8 +335,8 @@ async def complete_work_order(
         work_order.notes = data.notes
 
     session.add(work_order)
-    session.commit()
-    session.refresh(work_order)
+    await session.commit()
+    await session.refresh(work_order)
 
     return work_order
 
@@ -343,16 +344,16 @@ async def complete_work_order(
 @router.post("/{work_order_id}/cancel")
 async def cancel_work_order(
     work_order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Hủy công việc"""
-    work_order = session.exec(
+    work_order = (await session.exec(
         select(WorkOrder).where(
             WorkOrder.id == work_order_id,
             WorkOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not work_order:
         raise HTTPException(404, "Không tìm thấy lệnh công việc")
 
@@ -361,8 +362,8 @@ async def cancel_work_order(
 
     work_order.status = WorkOrderStatus.CANCELLED
     session.add(work_order)
-    session.commit()
-    session.refresh(work_order)
+    await session.commit()
+    await session.refresh(work_order)
 
     return work_order
 
@@ -370,23 +371,23 @@ async def cancel_work_order(
 @router.delete("/{work_order_id}")
 async def delete_work_order(
     work_order_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa lệnh công việc"""
-    work_order = session.exec(
+    work_order = (await session.exec(
         select(WorkOrder).where(
             WorkOrder.id == work_order_id,
             WorkOrder.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not work_order:
         raise HTTPException(404, "Không tìm thấy lệnh công việc")
 
     if work_order.status not in [WorkOrderStatus.PENDING, WorkOrderStatus.CANCELLED]:
         raise HTTPException(400, "Chỉ có thể xóa công việc chờ thực hiện hoặc đã hủy")
 
-    session.delete(work_order)
-    session.commit()
+    await session.delete(work_order)
+    await session.commit()
 
     return {"message": "Đã xóa lệnh công việc"}
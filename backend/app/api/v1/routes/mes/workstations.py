@@ -4,13 +4,14 @@ Trạm làm việc / Máy móc thiết bị
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 from datetime import datetime
 from decimal import Decimal
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.core.security import get_current_user
 from app.models import User
 from app.models.mes import Workstation, WorkstationType, WorkstationStatus
@@ -79,7 +80,7 @@ async def list_workstations(
     workstation_type: Optional[WorkstationType] = None,
     warehouse_id: Optional[str] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Danh sách trạm làm việc"""
@@ -101,12 +102,12 @@ async def list_workstations(
 
     # Count
     count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Paginate
     query = query.order_by(Workstation.code)
     query = query.offset((page - 1) * size).limit(size)
-    items = session.exec(query).all()
+    items = (await session.exec(query)).all()
 
     return {
         "items": items,
@@ -120,17 +121,17 @@ async def list_workstations(
 @router.post("")
 async def create_workstation(
     data: WorkstationCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Tạo trạm làm việc mới"""
     # Check duplicate code
-    existing = session.exec(
+    existing = (await session.exec(
         select(Workstation).where(
             Workstation.tenant_id == current_user.tenant_id,
             Workstation.code == data.code,
         )
-    ).first()
+    )).first()
     if existing:
         raise HTTPException(400, f"Mã trạm {data.code} đã tồn tại")
 
@@ -139,8 +140,8 @@ async def create_workstation(
         **data.model_dump()
     )
     session.add(workstation)
-    session.commit()
-    session.refresh(workstation)
+    await session.commit()
+    await session.refresh(workstation)
 
     return workstation
 
@@ -148,16 +149,16 @@ async def create_workstation(
 @router.get("/{workstation_id}")
 async def get_workstation(
     workstation_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Chi tiết trạm làm việc"""
-    workstation = session.exec(
+    workstation = (await session.exec(
         select(Workstation).where(
             Workstation.id == workstation_id,
             Workstation.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not workstation:
         raise HTTPException(404, "Không tìm thấy trạm làm việc")
 
@@ -168,16 +169,16 @@ async def get_workstation(
 async def update_workstation(
     workstation_id: str,
     data: WorkstationUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Cập nhật trạm làm việc"""
-    workstation = session.exec(
+    workstation = (await session.exec(
         select(Workstation).where(
             Workstation.id == workstation_id,
             Workstation.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not workstation:
         raise HTTPException(404, "Không tìm thấy trạm làm việc")
 
@@ -185,8 +186,8 @@ async def update_workstation(
         setattr(workstation, key, value)
 
     session.add(workstation)
-    session.commit()
-    session.refresh(workstation)
+    await session.commit()
+    await session.refresh(workstation)
 
     return workstation
 
@@ -194,21 +195,21 @@ async def update_workstation(
 @router.delete("/{workstation_id}")
 async def delete_workstation(
     workstation_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Xóa trạm làm việc"""
-    workstation = session.exec(
+    workstation = (await session.exec(
         select(Workstation).where(
             Workstation.id == workstation_id,
             Workstation.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not workstation:
         raise HTTPException(404, "Không tìm thấy trạm làm việc")
 
-    session.delete(workstation)
-    session.commit()
+    await session.delete(workstation)
+    await session.commit()
 
     return {"message": "Đã xóa trạm làm việc"}
 
@@ -216,23 +217,23 @@ async def delete_workstation(
 @router.post("/{workstation_id}/maintenance")
 async def start_maintenance(
     workstation_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Đưa trạm vào chế độ bảo trì"""
-    workstation = session.exec(
+    workstation = (await session.exec(
         select(Workstation).where(
             Workstation.id == workstation_id,
             Workstation.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not workstation:
         raise HTTPException(404, "Không tìm thấy trạm làm việc")
 
     workstation.status = WorkstationStatus.MAINTENANCE
     session.add(workstation)
-    session.commit()
-    session.refresh(workstation)
+    await session.commit()
+    await session.refresh(workstation)
 
     return workstation
 
@@ -240,23 +241,23 @@ async def start_maintenance(
 @router.post("/{workstation_id}/activate")
 async def activate_workstation(
     workstation_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Kích hoạt trạm làm việc"""
-    workstation = session.exec(
+    workstation = (await session.exec(
         select(Workstation).where(
             Workstation.id == workstation_id,
             Workstation.tenant_id == current_user.tenant_id,
         )
-    ).first()
+    )).first()
     if not workstation:
         raise HTTPException(404, "Không tìm thấy trạm làm việc")
 
     workstation.status = WorkstationStatus.ACTIVE
     workstation.last_maintenance_date = datetime.utcnow()
     session.add(workstation)
-    session.commit()
-    session.refresh(workstation)
+    await session.commit()
+    await session.refresh(workstation)
 
     return workstation
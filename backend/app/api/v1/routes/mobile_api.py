@@ -13,7 +13,7 @@ from pydantic import BaseModel
 
 from app.db.session import get_session
 from app.core.config import settings
-from app.models import User, Driver, Vehicle, Order, FuelLog, Customer, DriverSalarySetting, OrderStatusLog, IncomeTaxSetting, OrderDocument
+from app.models import User, Driver, Vehicle, Order, FuelLog, Customer, DriverSalarySetting, IncomeTaxSetting, OrderDocument
 from app.models.order import OrderStatus
 from app.models.trip import Trip
 from app.models.empty_return import EmptyReturn
@@ -22,7 +22,7 @@ from app.models.maintenance_schedule import MaintenanceSchedule
 from app.models.site import Site
 from app.core.security import get_current_user
 from app.services.salary_calculator import calculate_trip_salary
-from app.services.order_status_logger import get_delivered_date
+from app.services.order_status_logger import get_delivered_date, month_range
 from app.services.income_tax_calculator import calculate_seniority_bonus, calculate_salary_deductions
 from datetime import timedelta
 
@@ -895,21 +895,19 @@ def get_salary_summary(
             "note": "Chua co cai dat luong. Vui long lien he quan tri vien.",
         }
 
-    # Get all order IDs that were DELIVERED in this month (using delivered_date from status logs)
-    delivered_orders_subquery = (
-        select(OrderStatusLog.order_id)
-        .where(
-            OrderStatusLog.tenant_id == tenant_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED,
-            func.extract('year', OrderStatusLog.changed_at) == year,
-            func.extract('month', OrderStatusLog.changed_at) == month
-        )
-        .distinct()
-    )
-
-    delivered_order_ids = session.exec(delivered_orders_subquery).all()
+    # Orders of this driver first delivered in this month (Order.delivered_at range scan)
+    month_start, month_end = month_range(year, month)
+    orders = session.exec(
+        select(Order).where(
+            Order.tenant_id == tenant_id,
+            Order.driver_id == driver.id,
+            Order.delivered_at >= month_start,
+            Order.delivered_at < month_end,
+            Order.status.in_([OrderStatus.DELIVERED, OrderStatus.COMPLETED])
+        ).order_by(Order.delivered_at)
+    ).all()
 
-    if not delivered_order_ids:
+    if not orders:
         # No trips in this month
         base_salary = driver.base_salary or 0
         report_date = date(year, month, 1)
@@ -932,16 +930,6 @@ def get_salary_summary(
             "note": "Khong co chuyen xe trong thang nay",
         }
 
-    # Get orders for this driver that were delivered in this month
-    orders = session.exec(
-        select(Order).where(
-            Order.tenant_id == tenant_id,
-            Order.id.in_(delivered_order_ids),
-            Order.driver_id == driver.id,
-            Order.status.in_([OrderStatus.DELIVERED, OrderStatus.COMPLETED])
-        )
-    ).all()
-
     # Calculate trip-based salary
     trips = []
     total_trip_salary = 0
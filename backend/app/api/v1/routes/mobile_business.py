@@ -13,6 +13,8 @@ from app.db.session import get_session
 from app.models import User, Driver, Vehicle, Order, Customer
 from app.models.order import OrderStatus
 from app.core.security import get_current_user
+from app.core.response_cache import response_cache
+from app.services.order_search import matching_order_ids
 
 router = APIRouter(prefix="/mobile-business", tags=["mobile_business"])
 
@@ -61,6 +63,15 @@ def get_business_dashboard(
     """
     biz_info = validate_business_user(current_user, session)
     tenant_id = str(current_user.tenant_id)
+
+    # Same numbers for every manager of the tenant - cache per tenant
+    return response_cache.get_or_set(
+        "mobile_dashboard", tenant_id, "mobile_business.dashboard", {},
+        lambda: _build_business_dashboard(session, tenant_id), ttl=30,
+    )
+
+
+def _build_business_dashboard(session: Session, tenant_id: str) -> dict:
     today = date.today()
 
     # Get today's orders
@@ -175,12 +186,9 @@ def list_orders(
     if customer_id:
         query = query.where(Order.customer_id == customer_id)
 
-    # Search
+    # Search (indexed search documents, see app/services/order_search.py)
     if search:
-        query = query.where(
-            (Order.order_code.ilike(f"%{search}%")) |
-            (Order.container_code.ilike(f"%{search}%"))
-        )
+        query = query.where(Order.id.in_(matching_order_ids(tenant_id, search)))
 
     # Count
     count_query = select(func.count()).select_from(query.subquery())
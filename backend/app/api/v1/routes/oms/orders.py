@@ -157,7 +157,7 @@ def create_order(
     delivery_address_text = "Address placeholder"
 
     # Generate order number
-    order_number = generate_order_number(tenant_id)
+    order_number = generate_order_number(session, tenant_id)
 
     # Create order
     order = OMSOrder(
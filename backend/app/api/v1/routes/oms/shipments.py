@@ -102,7 +102,7 @@ def create_shipment(
         raise HTTPException(status_code=404, detail="Order not found")
 
     # Generate shipment number
-    shipment_number = generate_shipment_number(tenant_id)
+    shipment_number = generate_shipment_number(session, tenant_id)
 
     # Create shipment
     shipment = OMSShipment(
@@ -12,7 +12,7 @@ from app.models import User
 from app.schemas.order import OrderCreate, OrderRead
 from app.schemas.shipment import ShipmentCreate, ShipmentRead
 from app.schemas.trip import TripCreate, TripRead
-from app.services.order_code import next_order_code
+from app.services.order_code import next_order_code, note_order_code
 
 router = APIRouter(prefix="/ops", tags=["ops"])
 
@@ -24,7 +24,11 @@ def create_order(
     current_user: User = Depends(get_current_user)
 ):
     tenant_id = str(current_user.tenant_id)
-    order_code = payload.order_code or next_order_code(session, tenant_id, "TMS", datetime.utcnow())
+    if payload.order_code:
+        order_code = payload.order_code
+        note_order_code(session, tenant_id, order_code)
+    else:
+        order_code = next_order_code(session, tenant_id, "TMS", datetime.utcnow())
     o = Order(
         **payload.dict(exclude={"order_code"}),
         order_code=order_code,
@@ -1,5 +1,6 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse
 from sqlmodel import Session, select
 from sqlalchemy import and_
 from pydantic import BaseModel
@@ -11,15 +12,27 @@ from app.models.order_status_log import OrderStatusLog
 from app.schemas.order import OrderCreate, OrderRead, OrderAccept, OrderReject, OrderUpdate
 from app.core.security import get_current_user, get_current_user_optional, require_permission, check_permission
 from app.core.activity_tracker import log_update, get_client_ip
-from app.services.order_code import next_order_code
+from app.core.pagination import fetch_keyset_page
+from app.core.serialization import RowSerializer
+from app.core.config import settings
+from app.core.jobs import enqueue, job_accepted
+from app.models.background_job import BackgroundJob
+from app.services.order_code import (
+    next_order_code, next_order_codes, note_manual_order_code, note_order_code, peek_order_code,
+)
 from app.services.order_parser import parse_order_text
+from app.services.order_import import detect_format, error_report_path, save_source
+from app.services import order_search
 from app.services.distance_calculator import get_distance_from_rates
 from app.services.freight_calculator import get_freight_from_rates
-from app.services.order_status_logger import log_status_change
+from app.services.order_status_logger import log_status_change, sync_milestones
 from typing import Optional, List
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# Orders are read straight from the table, so list responses skip OrderRead validation
+order_rows = RowSerializer(OrderRead, Order)
+
 
 @router.get("/preview-code/{customer_id}")
 def preview_order_code(
@@ -35,26 +48,7 @@ def preview_order_code(
         raise HTTPException(404, "Customer not found")
 
     # Don't actually increment, just peek at what it would be
-    from sqlmodel import select
-    from app.models.order_sequence import OrderSequence
-    from app.services.order_code import _get_max_order_number
-
-    # Get max from actual orders (handles manual entries)
-    max_from_orders = _get_max_order_number(session, tenant_id, customer.code)
-
-    seq = session.exec(
-        select(OrderSequence)
-        .where(
-            OrderSequence.tenant_id == tenant_id,
-            OrderSequence.customer_code == customer.code,
-            OrderSequence.yymm == "ALL",
-        )
-    ).first()
-
-    # Use the higher of sequence tracker or actual max from orders
-    current_max = max(seq.last_seq if seq else 0, max_from_orders)
-    next_seq = current_max + 1
-    preview_code = f"{customer.code}-{next_seq}"
+    preview_code = peek_order_code(session, tenant_id, customer.code)
 
     return {"order_code": preview_code}
 
@@ -85,14 +79,12 @@ def create_orders_batch(
     if not order_data_list:
         raise HTTPException(400, "No valid orders found in text")
 
+    # Reserve all order codes in one step
+    order_codes = next_order_codes(session, tenant_id, customer.code, len(order_data_list))
+
     # Create orders
     created_orders = []
-    for order_data in order_data_list:
-        # Generate order code
-        order_code = next_order_code(
-            session, tenant_id, customer.code, datetime.utcnow()
-        )
-
+    for order_data, order_code in zip(order_data_list, order_codes):
         order = Order(
             tenant_id=tenant_id,
             customer_id=customer_id,
@@ -119,6 +111,75 @@ def create_orders_batch(
     return created_orders
 
 
+@router.post("/import", status_code=202)
+def import_orders(
+    file: Optional[UploadFile] = File(None),
+    text: Optional[str] = Form(None),
+    customer_id: Optional[str] = Form(None),
+    dry_run: bool = Form(False),
+    idempotency_key: Optional[str] = Header(None),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Import orders from a CSV/XLSX file or pasted text (historical backfills).
+
+    - file: .csv / .xlsx with a header row (customer_code, container_code,
+      equipment, pickup_site_code, order_date, ...; see COLUMN_ALIASES in
+      app/services/order_import.py), or .txt in the /orders/batch text format
+    - customer_id: customer for rows without a customer_code column
+    - dry_run: validate only, nothing is written
+
+    Runs as a background job: returns 202 with a status_url (/jobs/{id}).
+    Rejected rows: GET /orders/import/{job_id}/errors
+    """
+    if current_user.role not in ("ADMIN", "DISPATCHER"):
+        raise HTTPException(403, "Only ADMIN or DISPATCHER can import orders")
+    if (file is None) == (not text):
+        raise HTTPException(400, "Send either a file or text")
+
+    tenant_id = str(current_user.tenant_id)
+    if file is not None:
+        try:
+            fmt = detect_format(file.filename)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        file.file.seek(0, 2)
+        if file.file.tell() > settings.ORDER_IMPORT_MAX_BYTES:
+            raise HTTPException(413, "Import file is too large")
+        file.file.seek(0)
+        path = save_source(tenant_id, fmt, fileobj=file.file)
+    else:
+        fmt = "text"
+        path = save_source(tenant_id, fmt, content=text)
+
+    # One attempt: a retry would re-import the chunks already committed
+    job = enqueue(
+        session, "orders.import", tenant_id,
+        payload={"source_path": str(path), "fmt": fmt, "customer_id": customer_id, "dry_run": dry_run},
+        user_id=current_user.id, idempotency_key=idempotency_key, max_attempts=1,
+    )
+    if job.payload.get("source_path") != str(path):
+        path.unlink(missing_ok=True)  # Same Idempotency-Key: the earlier upload is used
+    return job_accepted(job)
+
+
+@router.get("/import/{job_id}/errors")
+def download_import_errors(
+    job_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Rejected rows of an order import as CSV (row, field, value, message)"""
+    job = session.get(BackgroundJob, job_id)
+    if not job or job.kind != "orders.import" or job.tenant_id != str(current_user.tenant_id):
+        raise HTTPException(404, "Import not found")
+    path = error_report_path(job.tenant_id, job.id)
+    if not path.exists():
+        raise HTTPException(404, "No rejected rows for this import")
+    return FileResponse(path, media_type="text/csv", filename=f"order-import-{job.id[:8]}-errors.csv")
+
+
 @router.post("", response_model=OrderRead)
 def create_order(
     payload: OrderCreate,
@@ -151,10 +212,12 @@ def create_order(
             if delivery_loc:
                 delivery_text = f"{delivery_loc.code} - {delivery_loc.name}"
 
-        # Generate order code
-        order_code = payload.order_code or next_order_code(
-            session, tenant_id, customer.code, datetime.utcnow()
-        )
+        # Generate order code (a manual code moves the sequence past it)
+        if payload.order_code:
+            order_code = payload.order_code
+            note_manual_order_code(session, tenant_id, customer.code, order_code)
+        else:
+            order_code = next_order_code(session, tenant_id, customer.code, datetime.utcnow())
 
         # Auto-calculate distance_km from Rates table
         distance_km = payload.distance_km  # Use provided value if exists
@@ -232,15 +295,57 @@ def create_order(
         raise HTTPException(500, f"Error creating order: {str(e)}")
 
 
+@router.get("/search", response_model=List[OrderRead])
+def search_orders(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Ranked order search by order code, container number (prefix: "TCNU12"),
+    customer, pickup/delivery place, site, seal or DO number.
+
+    Exact code matches come first, then code prefixes, then text matches;
+    newest first among equals. Same visibility rules as GET /orders.
+
+    Query params:
+    - q: search text
+    - limit: max results (default 20, max 100)
+    - status: comma-separated statuses
+    - fields: comma-separated OrderRead fields to return
+    """
+    tenant_id = str(current_user.tenant_id)
+    field_names = order_rows.parse_fields(fields)
+
+    if current_user.role not in ("ADMIN", "DISPATCHER", "DRIVER", "CUSTOMER"):
+        check_permission(session, current_user, "tms", "orders", "view")
+    if current_user.role == "DRIVER" and not current_user.driver_id:
+        # Not linked to a driver: no orders are assigned to them
+        return []
+
+    orders = order_search.search_orders(
+        session, tenant_id, q, limit=limit,
+        status=[s.strip().upper() for s in status.split(",")] if status else None,
+        customer_user_id=current_user.id if current_user.role == "CUSTOMER" else None,
+        driver_id=current_user.driver_id if current_user.role == "DRIVER" else None,
+    )
+    return order_rows.response(orders, field_names)
+
+
 @router.get("", response_model=List[OrderRead])
 def list_orders(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    fields: Optional[str] = None,
 ):
     """
     List orders based on user role with pagination and filters:
@@ -251,12 +356,16 @@ def list_orders(
 
     Query params:
     - limit: max results (default 50, max 500)
-    - offset: skip first N results
+    - offset: skip first N results (legacy; prefer cursor)
+    - cursor: opaque cursor from the X-Next-Cursor header of the previous page
     - status: filter by order status
     - date_from: filter orders from this date (YYYY-MM-DD)
     - date_to: filter orders until this date (YYYY-MM-DD)
+    - fields: comma-separated OrderRead fields to return (e.g. "order_code,status,driver_id");
+      only those columns are selected. Default: all fields
     """
     tenant_id = str(current_user.tenant_id)
+    field_names = order_rows.parse_fields(fields)
     
     # Check permission for non-legacy roles
     # Legacy roles (ADMIN, DISPATCHER, DRIVER, CUSTOMER) have their own access logic
@@ -267,6 +376,8 @@ def list_orders(
     limit = min(limit, 500)
 
     query = select(Order).where(Order.tenant_id == tenant_id)
+    if field_names:
+        query = query.with_only_columns(*order_rows.select_columns(field_names))
 
     if current_user.role == "CUSTOMER":
         # CUSTOMER: only orders they created or for their customer account
@@ -298,9 +409,16 @@ def list_orders(
 
     # DISPATCHER/ADMIN: see all orders (no additional filter)
 
-    query = query.order_by(Order.created_at.desc()).offset(offset).limit(limit)
-    result = session.exec(query).all()
-    return result
+    if offset and not cursor:
+        query = query.order_by(Order.created_at.desc(), Order.id.desc()).offset(offset).limit(limit)
+        rows = session.execute(query).all() if field_names else session.exec(query).all()
+        return order_rows.response(rows, field_names)
+
+    # Keyset pagination: constant cost regardless of how deep the client pages
+    result, next_cursor = fetch_keyset_page(session, query, Order.created_at, Order.id, cursor, limit)
+    return order_rows.response(
+        result, field_names, headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+    )
 
 
 @router.post("/{order_id}/accept", response_model=OrderRead)
@@ -585,6 +703,9 @@ def update_order(
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(order, field, value)
+    if update_data.get("order_code"):
+        # An edited code moves the sequence past it
+        note_order_code(session, tenant_id, order.order_code)
 
     # Auto-recalculate distance_km when pickup or delivery location changes
     location_fields = ["pickup_location_id", "delivery_location_id", "pickup_site_id", "delivery_site_id"]
@@ -835,6 +956,8 @@ def update_status_log(
         log.note = payload.note
 
     session.add(log)
+    # A corrected DELIVERED time moves the trip's salary day/month
+    sync_milestones(session, [order_id])
     session.commit()
     session.refresh(log)
 
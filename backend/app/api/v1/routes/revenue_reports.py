@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, Query
 from sqlmodel import Session, select, func
-from app.db.session import get_session
-from app.models import Order, Driver, Customer, Site, User, OrderStatusLog
+from app.db.replica import get_read_session
+from app.models import Order, Driver, Customer, Site, User
 from app.models.order import OrderStatus
 from app.core.security import get_current_user
-from app.services.order_status_logger import get_delivered_date
+from app.services.order_status_logger import get_delivered_date, month_range
 from datetime import datetime, date as date_type
 from typing import Optional, List, Dict
 import calendar
@@ -18,7 +18,7 @@ def get_revenue_summary(
     month: int = Query(..., ge=1, le=12, description="Month (1-12)"),
     customer_id: Optional[str] = None,
     driver_id: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -29,15 +29,14 @@ def get_revenue_summary(
 
     # Try to get delivered order IDs from status logs
     try:
+        month_start, month_end = month_range(year, month)
         delivered_orders_subquery = (
-            select(OrderStatusLog.order_id)
+            select(Order.id)
             .where(
-                OrderStatusLog.tenant_id == tenant_id,
-                OrderStatusLog.to_status == OrderStatus.DELIVERED,
-                func.extract('year', OrderStatusLog.changed_at) == year,
-                func.extract('month', OrderStatusLog.changed_at) == month
+                Order.tenant_id == tenant_id,
+                Order.delivered_at >= month_start,
+                Order.delivered_at < month_end
             )
-            .distinct()
         )
         delivered_order_ids = session.exec(delivered_orders_subquery).all()
     except Exception:
@@ -183,7 +182,7 @@ def get_revenue_summary(
 @router.get("/monthly-trend")
 def get_monthly_trend(
     year: int = Query(..., description="Year (e.g., 2025)"),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -197,15 +196,14 @@ def get_monthly_trend(
     for month in range(1, 13):
         # Try to get delivered order IDs from status logs
         try:
+            month_start, month_end = month_range(year, month)
             delivered_orders_subquery = (
-                select(OrderStatusLog.order_id)
+                select(Order.id)
                 .where(
-                    OrderStatusLog.tenant_id == tenant_id,
-                    OrderStatusLog.to_status == OrderStatus.DELIVERED,
-                    func.extract('year', OrderStatusLog.changed_at) == year,
-                    func.extract('month', OrderStatusLog.changed_at) == month
+                    Order.tenant_id == tenant_id,
+                    Order.delivered_at >= month_start,
+                    Order.delivered_at < month_end
                 )
-                .distinct()
             )
             delivered_order_ids = session.exec(delivered_orders_subquery).all()
         except Exception:
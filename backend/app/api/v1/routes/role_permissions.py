@@ -16,6 +16,7 @@ from app.models.role_permission import (
     APP_MODULE_INFO, RESOURCE_TO_MODULE
 )
 from app.core.security import get_current_user
+from app.core.permission_cache import get_permission_matrix, invalidate_permission_cache
 
 router = APIRouter(prefix="/role-permissions", tags=["role-permissions"])
 
@@ -294,6 +295,7 @@ def update_role_permissions(
 
     session.commit()
     session.refresh(db_permission)
+    invalidate_permission_cache(current_user.tenant_id, role)
 
     return {
         "message": f"Đã cập nhật quyền cho vai trò {ROLE_LABELS.get(role, role)}",
@@ -327,6 +329,7 @@ def reset_role_permissions(
     if db_permission:
         session.delete(db_permission)
         session.commit()
+        invalidate_permission_cache(current_user.tenant_id, role)
 
     # Get default permissions
     role_enum = UserRole(role)
@@ -343,25 +346,5 @@ def reset_role_permissions(
 
 
 def get_effective_permissions(role: str, tenant_id: str, session: Session) -> dict:
-    """Get effective permissions for a role (from DB or default)"""
-    # Check database first
-    db_permission = session.exec(
-        select(RolePermission).where(
-            RolePermission.tenant_id == tenant_id,
-            RolePermission.role == role
-        )
-    ).first()
-
-    if db_permission:
-        return db_permission.get_permissions()
-
-    # Fall back to default
-    try:
-        role_enum = UserRole(role)
-        default_perms = DEFAULT_PERMISSIONS.get(role_enum, {})
-        permissions = {}
-        for module, actions in default_perms.items():
-            permissions[module] = actions
-        return permissions
-    except ValueError:
-        return {}
+    """Get effective permissions for a role (from DB or default, via the compiled cache)"""
+    return get_permission_matrix(session, tenant_id, role).as_dict()
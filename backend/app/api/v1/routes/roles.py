@@ -12,7 +12,7 @@ from pydantic import BaseModel
 from app.db.session import get_session
 from app.models import User, Role, Permission
 from app.models.role import UserRole, AVAILABLE_MODULES, MODULE_RESOURCES, AVAILABLE_ACTIONS, DEFAULT_ROLE_TEMPLATES
-from app.core.security import get_current_user
+from app.core.security import get_current_user, invalidate_user_cache
 
 router = APIRouter(prefix="/roles", tags=["roles"])
 
@@ -398,6 +398,7 @@ def update_role(
             session.add(permission)
 
     session.commit()
+    invalidate_user_cache()
     session.refresh(role)
 
     return {
@@ -450,6 +451,7 @@ def delete_role(
     # Delete role
     session.delete(role)
     session.commit()
+    invalidate_user_cache()
 
     return {"message": f"Role '{role.name}' deleted successfully"}
 
@@ -555,6 +557,7 @@ def assign_roles_to_user(
         session.add(user_role)
 
     session.commit()
+    invalidate_user_cache(data.user_id)
 
     return {
         "message": f"Assigned {len(data.role_ids)} roles to user",
@@ -613,6 +616,7 @@ def add_role_to_user(
     )
     session.add(user_role)
     session.commit()
+    invalidate_user_cache(user_id)
 
     return {"message": f"Role '{role.name}' added to user"}
 
@@ -650,6 +654,7 @@ def remove_role_from_user(
 
     session.delete(user_role)
     session.commit()
+    invalidate_user_cache(user_id)
 
     return {"message": "Role removed from user"}
 
@@ -18,6 +18,7 @@ from pydantic import BaseModel, field_validator
 from app.db.session import get_session
 from app.models import User, Tenant
 from app.core.security import get_current_user, hash_password
+from app.core.tenant_middleware import invalidate_tenant_cache
 from app.models.user import UserSystemRole
 
 router = APIRouter(prefix="/tenant", tags=["tenant"])
@@ -377,6 +378,7 @@ def self_register_tenant(
     session.add(admin_user)
 
     session.commit()
+    invalidate_tenant_cache(code=subdomain)  # Drop cached 'unknown code' entry
 
     return SelfRegisterResponse(
         tenant_id=tenant_id,
@@ -583,6 +585,7 @@ def update_enabled_modules(
     tenant.enabled_modules = json.dumps(valid_modules)
     session.add(tenant)
     session.commit()
+    invalidate_tenant_cache(code=tenant.code)
 
     return valid_modules
 
@@ -624,6 +627,7 @@ def update_tenant_settings(
     session.add(tenant)
     session.commit()
     session.refresh(tenant)
+    invalidate_tenant_cache(code=tenant.code)
 
     return {"message": "Cập nhật thành công", "tenant_id": str(tenant.id)}
 
@@ -708,6 +712,7 @@ def create_tenant(
     session.add(tenant)
     session.commit()
     session.refresh(tenant)
+    invalidate_tenant_cache(code=tenant.code)  # Drop cached 'unknown code' entry
 
     return {"message": "Tạo tenant thành công", "tenant_id": str(tenant.id)}
 
@@ -738,6 +743,7 @@ def update_tenant_modules_by_id(
     tenant.enabled_modules = json.dumps(valid_modules)
     session.add(tenant)
     session.commit()
+    invalidate_tenant_cache(code=tenant.code)
 
     return valid_modules
 
@@ -765,6 +771,7 @@ def update_tenant_subscription(
     tenant.subscription_status = status
     session.add(tenant)
     session.commit()
+    invalidate_tenant_cache(code=tenant.code)
 
     return {"message": "Cập nhật subscription thành công"}
 
@@ -790,5 +797,6 @@ def toggle_tenant_status(
     tenant.is_active = is_active
     session.add(tenant)
     session.commit()
+    invalidate_tenant_cache(code=tenant.code)
 
     return {"message": f"Tenant đã được {'kích hoạt' if is_active else 'vô hiệu hóa'}"}
@@ -5,13 +5,14 @@ Quản lý doanh thu chuyến - View and manage freight charges for orders
 
 from datetime import datetime, date
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlmodel import Session, select, func
 from pydantic import BaseModel
 
-from app.db.session import get_session
+from app.db.session import get_long_session, get_session
 from app.models import Order, Customer, Site, Location, Rate, RateCustomer, User, Driver
 from app.core.security import get_current_user
+from app.core.jobs import JobContext, enqueue, job_accepted
 from app.services.freight_calculator import get_freight_from_rates, calculate_freight_for_order
 
 router = APIRouter(prefix="/trip-revenue", tags=["trip-revenue"])
@@ -399,7 +400,7 @@ def apply_suggested_freight(
 @router.post("/bulk-apply")
 def bulk_apply_suggested_freight(
     payload: BulkCalculatePayload,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_long_session),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -440,23 +441,39 @@ def bulk_apply_suggested_freight(
     }
 
 
-@router.post("/recalculate-all")
+@router.post("/recalculate-all", status_code=202)
 def recalculate_all_freights(
     overwrite: bool = Query(default=False, description="Overwrite existing freight charges"),
+    idempotency_key: Optional[str] = Header(None),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     """
     Recalculate freight for all orders (optionally overwriting existing values).
     Use with caution!
+
+    Runs as a background job: returns 202 with a status_url (/jobs/{id}).
     """
     if current_user.role != "ADMIN":
         raise HTTPException(403, "Only ADMIN can recalculate all freights")
 
-    tenant_id = str(current_user.tenant_id)
+    job = enqueue(
+        session, "freight.recalculate_all", str(current_user.tenant_id),
+        payload={"overwrite": overwrite},
+        user_id=current_user.id, idempotency_key=idempotency_key,
+    )
+    return job_accepted(job)
+
+
+RECALCULATE_BATCH_SIZE = 500
+
+
+def run_recalculate_all_freights(ctx: JobContext, overwrite: bool = False) -> dict:
+    """Job handler for freight.recalculate_all - commits every RECALCULATE_BATCH_SIZE orders"""
+    session = ctx.session
 
     # Query orders
-    query = select(Order).where(Order.tenant_id == tenant_id)
+    query = select(Order.id).where(Order.tenant_id == ctx.tenant_id)
 
     if not overwrite:
         # Only orders without freight
@@ -464,27 +481,32 @@ def recalculate_all_freights(
             (Order.freight_charge.is_(None)) | (Order.freight_charge == 0)
         )
 
-    orders = session.exec(query).all()
+    order_ids = session.exec(query.order_by(Order.id)).all()
 
     updated = 0
     skipped = 0
 
-    for order in orders:
-        suggested_freight = calculate_freight_for_order(session, order)
+    for offset in range(0, len(order_ids), RECALCULATE_BATCH_SIZE):
+        batch = order_ids[offset:offset + RECALCULATE_BATCH_SIZE]
+        orders = session.exec(select(Order).where(Order.id.in_(batch))).all()
 
-        if suggested_freight is None:
-            skipped += 1
-            continue
+        for order in orders:
+            suggested_freight = calculate_freight_for_order(session, order)
 
-        order.freight_charge = suggested_freight
-        session.add(order)
-        updated += 1
+            if suggested_freight is None:
+                skipped += 1
+                continue
 
-    session.commit()
+            order.freight_charge = suggested_freight
+            session.add(order)
+            updated += 1
+
+        session.commit()
+        ctx.progress(offset + len(batch), len(order_ids))
 
     return {
         "ok": True,
         "updated": updated,
         "skipped": skipped,
-        "total_processed": len(orders),
+        "total_processed": len(order_ids),
     }
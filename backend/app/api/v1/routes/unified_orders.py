@@ -18,6 +18,7 @@ from app.models.unified_order import (
     OrderAssignment, UnifiedOrderSequence, OrderStatusHistory
 )
 from app.models.actor import Actor, ActorRelationship
+from app.core.serialization import RowSerializer
 
 router = APIRouter(prefix="/unified-orders", tags=["Unified Orders"])
 
@@ -211,6 +212,10 @@ class OrderResponse(BaseModel):
         from_attributes = True
 
 
+# Rows come straight from the table, so list responses skip OrderResponse validation
+order_rows = RowSerializer(OrderResponse, UnifiedOrder)
+
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
@@ -281,10 +286,14 @@ async def list_orders(
     date_to: Optional[str] = Query(None, description="Filter by created date to (YYYY-MM-DD)"),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)"),
     session: Session = Depends(get_session),
 ):
     """List orders for an owner actor"""
+    field_names = order_rows.parse_fields(fields)
     query = select(UnifiedOrder).where(UnifiedOrder.owner_actor_id == owner_actor_id)
+    if field_names:
+        query = query.with_only_columns(*order_rows.select_columns(field_names))
 
     if source_type:
         query = query.where(UnifiedOrder.source_type == source_type)
@@ -312,8 +321,8 @@ async def list_orders(
         query = query.where(UnifiedOrder.created_at <= f"{date_to}T23:59:59")
 
     query = query.order_by(UnifiedOrder.created_at.desc()).offset(offset).limit(limit)
-    orders = session.exec(query).all()
-    return orders
+    orders = session.execute(query).all() if field_names else session.exec(query).all()
+    return order_rows.response(orders, field_names)
 
 
 @router.get("/assigned-to-me", response_model=List[OrderResponse])
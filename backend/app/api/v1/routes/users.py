@@ -11,7 +11,7 @@ from pydantic import BaseModel, EmailStr
 from app.db.session import get_session
 from app.models import User
 from app.models.user import UserRole, UserStatus, ROLE_PERMISSIONS
-from app.core.security import get_current_user, hash_password, verify_password
+from app.core.security import get_current_user, hash_password, verify_password, invalidate_user_cache
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -444,6 +444,7 @@ def update_user(
     user.updated_at = datetime.utcnow()
     session.add(user)
     session.commit()
+    invalidate_user_cache(user_id)
     session.refresh(user)
 
     return {
@@ -509,6 +510,7 @@ def patch_user(
     user.updated_at = datetime.utcnow()
     session.add(user)
     session.commit()
+    invalidate_user_cache(user_id)
     session.refresh(user)
 
     return {
@@ -558,6 +560,7 @@ def change_user_password(
     user.updated_at = datetime.utcnow()
     session.add(user)
     session.commit()
+    invalidate_user_cache(user_id)
 
     return {"message": "Password changed successfully"}
 
@@ -607,6 +610,7 @@ def self_change_password(
     user.updated_at = datetime.utcnow()
     session.add(user)
     session.commit()
+    invalidate_user_cache(user_id)
 
     return {"message": "Doi mat khau thanh cong"}
 
@@ -639,6 +643,7 @@ def delete_user(
 
     session.delete(user)
     session.commit()
+    invalidate_user_cache(user_id)
 
     return {"message": f"User '{user.username}' deleted successfully"}
 
@@ -688,6 +693,7 @@ def toggle_user_status(
     user.updated_at = datetime.utcnow()
     session.add(user)
     session.commit()
+    invalidate_user_cache(user_id)
 
     return {
         "message": f"User status changed to {new_status}",
@@ -13,6 +13,7 @@ from sqlmodel import Session, select, func, and_, or_
 from pydantic import BaseModel
 
 from app.db.session import get_session
+from app.db.replica import get_read_session
 from app.models import (
     Vehicle, User, Driver,
     VehicleOperatingCost, VehicleCostAllocation,
@@ -24,6 +25,9 @@ from app.models import (
 )
 from app.models.order import OrderStatus
 from app.core.security import get_current_user
+from app.core.export import (
+    FORMAT_PATTERN, MODE_PATTERN, columns_from_schema, export_response, select_export_columns,
+)
 
 
 router = APIRouter(prefix="/vehicle-costs", tags=["Vehicle Operating Costs"])
@@ -674,7 +678,7 @@ def get_monthly_cost_summary(
     year: int,
     month: int,
     vehicle_id: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Lấy tổng hợp chi phí theo tháng, group by category"""
@@ -728,7 +732,7 @@ def get_vehicle_pl_report(
     year: Optional[int] = None,
     month: Optional[int] = None,
     vehicle_id: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Báo cáo P&L theo xe (chỉ tính cho đầu kéo TRACTOR)
@@ -991,7 +995,7 @@ def get_vehicle_pl_report(
 def get_route_pl_report(
     year: Optional[int] = None,
     month: Optional[int] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     """Báo cáo P&L theo tuyến đường
@@ -1107,3 +1111,56 @@ def get_route_pl_report(
     reports.sort(key=lambda x: x.trip_count, reverse=True)
 
     return reports
+
+
+# ============================================================================
+# EXPORTS
+# ============================================================================
+
+VEHICLE_PL_COLUMNS = columns_from_schema(VehiclePLReport)
+ROUTE_PL_COLUMNS = columns_from_schema(RoutePLReport)
+
+
+@router.get("/report/vehicle-pl/export")
+def export_vehicle_pl_report(
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    vehicle_id: Optional[str] = None,
+    format: str = Query("xlsx", pattern=FORMAT_PATTERN),
+    columns: Optional[str] = Query(None, description="Comma-separated columns (default: all)"),
+    mode: str = Query("auto", pattern=MODE_PATTERN, description="auto, stream or background"),
+    current_user: User = Depends(get_current_user),
+):
+    """Xuất báo cáo P&L theo xe (CSV/XLSX)"""
+    return export_response(
+        lambda s: get_vehicle_pl_report(year, month, vehicle_id, session=s, current_user=current_user),
+        select_export_columns(VEHICLE_PL_COLUMNS, columns),
+        format,
+        filename="vehicle-pl",
+        tenant_id=str(current_user.tenant_id),
+        user_id=str(current_user.id),
+        mode=mode,
+        sheet_title="P&L theo xe",
+    )
+
+
+@router.get("/report/route-pl/export")
+def export_route_pl_report(
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    format: str = Query("xlsx", pattern=FORMAT_PATTERN),
+    columns: Optional[str] = Query(None, description="Comma-separated columns (default: all)"),
+    mode: str = Query("auto", pattern=MODE_PATTERN, description="auto, stream or background"),
+    current_user: User = Depends(get_current_user),
+):
+    """Xuất báo cáo P&L theo tuyến (CSV/XLSX)"""
+    return export_response(
+        lambda s: get_route_pl_report(year, month, session=s, current_user=current_user),
+        select_export_columns(ROUTE_PL_COLUMNS, columns),
+        format,
+        filename="route-pl",
+        tenant_id=str(current_user.tenant_id),
+        user_id=str(current_user.id),
+        mode=mode,
+        sheet_title="P&L theo tuyến",
+    )
@@ -16,6 +16,7 @@ from app.models.wms import (
     Product, Warehouse, StorageLocation, ProductLot
 )
 from app.core.security import get_current_user
+from app.core.pagination import TOTAL_MODE_PATTERN, count_total, fetch_keyset_page
 
 router = APIRouter()
 
@@ -69,6 +70,8 @@ def list_stock_levels(
     low_stock: Optional[bool] = Query(None),
     page: int = Query(1, ge=1),
     size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor of the previous page"),
+    total_mode: str = Query("exact", pattern=TOTAL_MODE_PATTERN),
 ):
     """List stock levels"""
     tenant_id = str(current_user.tenant_id)
@@ -89,18 +92,27 @@ def list_stock_levels(
         query = query.join(Product, StockLevel.product_id == Product.id)
         query = query.where(StockLevel.quantity_available <= Product.reorder_point)
 
-    count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = count_total(session, query, total_mode)
 
-    query = query.offset((page - 1) * size).limit(size)
+    next_cursor = None
+    if cursor or page == 1:
+        items, next_cursor = fetch_keyset_page(
+            session, query, StockLevel.created_at, StockLevel.id, cursor, size
+        )
+    else:
+        query = query.order_by(StockLevel.created_at.desc(), StockLevel.id.desc())
+        items = session.exec(query.offset((page - 1) * size).limit(size)).all()
 
-    items = session.exec(query).all()
+    # Enrich with product info (one lookup for the whole page)
+    product_ids = {item.product_id for item in items}
+    products = {
+        p.id: p for p in session.exec(select(Product).where(Product.id.in_(product_ids))).all()
+    } if product_ids else {}
 
-    # Enrich with product info
     result_items = []
     for item in items:
         item_dict = item.model_dump()
-        product = session.get(Product, item.product_id)
+        product = products.get(item.product_id)
         if product:
             item_dict["product_code"] = product.code
             item_dict["product_name"] = product.name
@@ -111,7 +123,8 @@ def list_stock_levels(
         "total": total,
         "page": page,
         "size": size,
-        "pages": (total + size - 1) // size,
+        "pages": (total + size - 1) // size if total is not None else None,
+        "next_cursor": next_cursor,
     }
 
 
@@ -3,6 +3,7 @@ Activity Log Middleware - Automatically capture mutation operations (POST, PUT,
 
 Logs all mutation requests to the activity_logs table for audit and billing purposes.
 Uses pure ASGI middleware to avoid BaseHTTPMiddleware body consumption issues.
+Rows are handed to ActivityLogWriter, which batch-inserts them in the background.
 """
 import json
 from datetime import datetime, timezone, timedelta
@@ -11,12 +12,12 @@ from typing import Optional
 # Vietnam timezone (UTC+7)
 VN_TIMEZONE = timezone(timedelta(hours=7))
 from starlette.types import ASGIApp, Receive, Scope, Send, Message
-from sqlmodel import Session
 
-from app.db.session import engine
-from app.models.activity_log import ActivityLog, ActionType
+from app.models.base import uuid4_str
+from app.models.activity_log import ActionType
 from app.models.action_cost import get_action_cost
-from app.core.security import decode_token
+from app.core.security import decode_token_cached
+from app.core.activity_log_writer import activity_log_writer
 
 
 # Methods to log (mutation operations only)
@@ -278,33 +279,31 @@ def save_activity_log(
     user_agent: str,
     cost_tokens: int,
 ):
-    """Save activity log to database"""
+    """Queue activity log for the write-behind batch writer"""
     try:
-        with Session(engine) as session:
-            log = ActivityLog(
-                tenant_id=tenant_id,
-                user_id=user_id,
-                user_name=user_name,
-                user_role=user_role,
-                user_email=user_email,
-                action=action,
-                module=module,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                resource_code=resource_code,
-                endpoint=endpoint,
-                method=method,
-                request_summary=json.dumps(request_summary, ensure_ascii=False) if request_summary else None,
-                response_status=response_status,
-                success=200 <= response_status < 400,
-                ip_address=ip_address,
-                user_agent=user_agent[:500] if user_agent else None,
-                cost_tokens=cost_tokens,
-                created_at=datetime.utcnow()  # Store in UTC, convert in frontend
-            )
-            session.add(log)
-            session.commit()
-            return True
+        activity_log_writer.enqueue({
+            "id": uuid4_str(),
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "user_name": user_name,
+            "user_role": user_role,
+            "user_email": user_email,
+            "action": action,
+            "module": module,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "resource_code": resource_code,
+            "endpoint": endpoint,
+            "method": method,
+            "request_summary": json.dumps(request_summary, ensure_ascii=False) if request_summary else None,
+            "response_status": response_status,
+            "success": 200 <= response_status < 400,
+            "ip_address": ip_address,
+            "user_agent": user_agent[:500] if user_agent else None,
+            "cost_tokens": cost_tokens,
+            "created_at": datetime.utcnow(),  # Store in UTC, convert in frontend
+        })
+        return True
     except Exception as e:
         # Silently fail - don't disrupt the request
         return False
@@ -371,7 +370,7 @@ class ActivityLogMiddleware:
         user_info = None
         tenant_id = None
         try:
-            payload = decode_token(token)
+            payload = decode_token_cached(token)
             user_info = {
                 "id": payload.get("sub"),
                 "name": payload.get("name", payload.get("full_name", "Unknown")),
@@ -0,0 +1,416 @@
+"""
+Activity Log Writer - write-behind batching for activity_logs
+
+The middleware enqueues one row per mutation request; a background task
+flushes rows in batches (every ACTIVITY_LOG_BATCH_SIZE rows or
+ACTIVITY_LOG_FLUSH_MS milliseconds, whichever comes first) with a single
+multi-row INSERT on the audit pool, so log writes never compete with request
+handlers for connections.
+
+Backpressure: the queue is bounded. When it is full, or when the database is
+unavailable, rows are appended to a JSONL spill file under STORAGE_DIR (by the
+flusher, off the event loop) and replayed in chunks once the database is
+keeping up again. Nothing is ever awaited on the request path.
+
+Every worker process shares the spill directory: appends and the spill ->
+replay rename take an exclusive fcntl lock on SPILL_LOCK_FILE, and only the
+worker holding REPLAY_LOCK_FILE replays (the others skip the replay that cycle).
+Without fcntl (Windows) the locks only cover the threads of one process.
+
+Rows carry their own id and are inserted with ON CONFLICT (id) DO NOTHING, so a
+replayed row that was already written is skipped. A batch rejected for its
+data is retried row by row; rows that still fail go to a dead-letter file
+instead of being spilled (and retried) forever.
+
+Lifecycle: start() on app startup, stop() on shutdown. stop() asks the
+flusher to finish: it writes the batch it is collecting and everything still
+queued before it exits, so a graceful shutdown loses nothing.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import IO, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.session import audit_engine
+from app.models.activity_log import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+SPILL_DIR = os.path.join(settings.STORAGE_DIR, "activity_log_spill")
+SPILL_FILE = os.path.join(SPILL_DIR, "pending.jsonl")
+# Spill being replayed; removed only once all of its rows were flushed (or spilled again)
+REPLAY_FILE = SPILL_FILE + ".replay"
+# Rows the database rejected one by one (kept for inspection, never replayed)
+DEAD_LETTER_FILE = os.path.join(SPILL_DIR, "dead_letter.jsonl")
+# Held by a worker while it appends to, or renames, the files above
+SPILL_LOCK_FILE = os.path.join(SPILL_DIR, "spill.lock")
+# Held by the one worker replaying REPLAY_FILE
+REPLAY_LOCK_FILE = os.path.join(SPILL_DIR, "replay.lock")
+
+# The database is unreachable (as opposed to rejecting the rows): spill and retry later
+UNAVAILABLE_ERRORS = (OperationalError, InterfaceError)
+
+# Queued by stop(): the flusher writes what it has and exits
+_STOP = object()
+
+_activity_log_table = ActivityLog.__table__
+_insert_rows = insert(_activity_log_table).on_conflict_do_nothing(index_elements=["id"])
+
+
+def _encode_row(row: dict) -> str:
+    return json.dumps(
+        {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in row.items()},
+        ensure_ascii=False,
+    )
+
+
+def _decode_row(line: str) -> dict:
+    row = json.loads(line)
+    if row.get("created_at"):
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+def _lock_file(path: str, blocking: bool = True) -> Optional[IO]:
+    """
+    Open ``path`` with an exclusive lock shared by every worker process; the
+    lock is released when the returned file is closed. None when ``blocking``
+    is False and another process holds the lock.
+    """
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    f = open(path, "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            f.close()
+            return None
+    return f
+
+
+def _remove_replay_file() -> None:
+    try:
+        os.remove(REPLAY_FILE)
+    except FileNotFoundError:
+        pass
+
+
+class ActivityLogWriter:
+    """Bounded queue + background batch flusher for ActivityLog rows"""
+
+    def __init__(
+        self,
+        batch_size: int = settings.ACTIVITY_LOG_BATCH_SIZE,
+        flush_interval_ms: int = settings.ACTIVITY_LOG_FLUSH_MS,
+        max_queue: int = settings.ACTIVITY_LOG_QUEUE_MAX,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._spill_lock = threading.Lock()
+        self._overflow: list[dict] = []  # Rows that found the queue full; spilled by the flusher
+
+        # Counters (exposed for monitoring)
+        self.enqueued = 0
+        self.written = 0
+        self.spilled = 0
+        self.dead_lettered = 0
+        self.failed_flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ---------- Producer side ----------
+
+    def enqueue(self, row: dict) -> None:
+        """Queue a row for writing. Never blocks; spills to disk (via the flusher) when full."""
+        if not self.running:
+            # Not started (scripts, tests) - keep the old inline behaviour
+            self._insert_sync([row])
+            return
+
+        try:
+            self._queue.put_nowait(row)
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self._overflow.append(row)
+
+    # ---------- Lifecycle ----------
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="activity-log-writer")
+        logger.info(
+            "ActivityLogWriter started (batch=%s, interval=%.0fms, queue=%s)",
+            self.batch_size, self.flush_interval * 1000, self.max_queue,
+        )
+
+    async def stop(self) -> None:
+        """Stop the flusher once it has written everything queued so far"""
+        if not self.running:
+            return
+        # Blocks only while the queue is full, and the flusher is draining it
+        await self._queue.put(_STOP)
+        try:
+            await self._task
+        except Exception:
+            logger.exception("ActivityLogWriter flusher failed")
+        self._task = None
+
+    # ---------- Consumer side ----------
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            stopping = item is _STOP
+            batch = [] if stopping else [item]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+
+            while not stopping and len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            try:
+                ok = await self._flush(batch)
+                await self._spill_overflow()
+                if stopping:
+                    drained = len(batch) + await self._drain()
+                    await self._spill_overflow()
+                    logger.info("ActivityLogWriter drained %s rows on shutdown", drained)
+                    return
+                if ok and self._queue.empty():
+                    await self._replay_spill()
+            except Exception:
+                # Keep flushing: a dead flusher would send every later row to _insert_sync
+                self.failed_flushes += 1
+                logger.exception("ActivityLogWriter flush cycle failed")
+                if stopping:
+                    return
+
+    async def _drain(self) -> int:
+        """Flush whatever is queued, including rows enqueued while flushing"""
+        drained = 0
+        while True:
+            rows = []
+            while len(rows) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    rows.append(item)
+            if not rows:
+                return drained
+            await self._flush(rows)
+            drained += len(rows)
+
+    async def _flush(self, rows: list[dict]) -> bool:
+        """Write rows; False when the database is unavailable (the rows were spilled)"""
+        if not rows:
+            return True
+        try:
+            await asyncio.to_thread(self._insert_batch, rows)
+            self.written += len(rows)
+            return True
+        except UNAVAILABLE_ERRORS as e:
+            self.failed_flushes += 1
+            logger.warning("ActivityLogWriter flush of %s rows failed: %s", len(rows), e)
+            await asyncio.to_thread(self._spill, rows)
+            return False
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.warning("ActivityLogWriter batch of %s rows rejected, retrying row by row: %s", len(rows), e)
+
+        rejected, unsent = await asyncio.to_thread(self._insert_each, rows)
+        self.written += len(rows) - len(rejected) - len(unsent)
+        if rejected:
+            await asyncio.to_thread(self._dead_letter, rejected)
+        if unsent:
+            await asyncio.to_thread(self._spill, unsent)
+            return False
+        return True
+
+    @staticmethod
+    def _insert_batch(rows: list[dict]) -> None:
+        # SQLAlchemy turns an executemany INSERT into multi-row VALUES batches
+        with audit_engine.begin() as conn:
+            conn.execute(_insert_rows, rows)
+
+    def _insert_each(self, rows: list[dict]) -> tuple[list[tuple[dict, str]], list[dict]]:
+        """
+        Insert rows one at a time. Returns the rows the database rejected (with
+        the error) and the rows not tried because it became unavailable.
+        """
+        rejected = []
+        for i, row in enumerate(rows):
+            try:
+                self._insert_batch([row])
+            except UNAVAILABLE_ERRORS:
+                return rejected, rows[i:]
+            except Exception as e:
+                rejected.append((row, str(e).splitlines()[0] if str(e) else type(e).__name__))
+        return rejected, []
+
+    def _insert_sync(self, rows: list[dict]) -> None:
+        try:
+            with Session(audit_engine) as session:
+                session.execute(_insert_rows, rows)
+                session.commit()
+            self.written += len(rows)
+        except Exception:
+            # Silently fail - don't disrupt the request
+            pass
+
+    # ---------- Spill file ----------
+
+    @contextmanager
+    def _spill_locked(self):
+        """Exclusive access to the spill files, across threads and worker processes"""
+        with self._spill_lock:
+            lock = _lock_file(SPILL_LOCK_FILE)
+            try:
+                yield
+            finally:
+                lock.close()
+
+    def _spill(self, rows: list[dict]) -> None:
+        """Append rows to the spill file (blocking: call from a worker thread)"""
+        try:
+            with self._spill_locked():
+                with open(SPILL_FILE, "a", encoding="utf-8") as f:
+                    for row in rows:
+                        f.write(_encode_row(row) + "\n")
+            self.spilled += len(rows)
+        except Exception as e:
+            logger.error("ActivityLogWriter could not spill %s rows: %s", len(rows), e)
+
+    async def _spill_overflow(self) -> None:
+        if self._overflow:
+            rows, self._overflow = self._overflow, []
+            await asyncio.to_thread(self._spill, rows)
+
+    def _dead_letter(self, rejected: list[tuple[dict, str]]) -> None:
+        try:
+            with self._spill_locked():
+                with open(DEAD_LETTER_FILE, "a", encoding="utf-8") as f:
+                    for row, error in rejected:
+                        f.write(json.dumps({"error": error, "row": json.loads(_encode_row(row))}, ensure_ascii=False) + "\n")
+            self.dead_lettered += len(rejected)
+            logger.error("ActivityLogWriter moved %s rejected rows to %s", len(rejected), DEAD_LETTER_FILE)
+        except Exception as e:
+            logger.error("ActivityLogWriter could not dead-letter %s rows: %s", len(rejected), e)
+
+    async def _replay_spill(self) -> None:
+        """
+        Re-insert rows from the spill file, batch_size rows at a time.
+
+        The replay file is deleted only after every chunk was handled. If the
+        process dies mid-replay the file is replayed again on the next run;
+        rows already written are skipped by their id. When the database goes
+        away mid-replay, the rest of the file goes back to the spill file.
+        Another worker replaying at the same time makes this a no-op.
+        """
+        opened = await asyncio.to_thread(self._open_replay)
+        if opened is None:
+            return
+        lock, replay = opened
+        replayed = 0
+        try:
+            try:
+                while True:
+                    lines, rows = await asyncio.to_thread(self._read_chunk, replay)
+                    if not lines:
+                        break
+                    if not await self._flush(rows):
+                        await asyncio.to_thread(self._respill_rest, replay)
+                        break
+                    replayed += len(rows)
+            finally:
+                await asyncio.to_thread(replay.close)
+            await asyncio.to_thread(_remove_replay_file)
+        finally:
+            await asyncio.to_thread(lock.close)
+        if replayed:
+            logger.info("ActivityLogWriter replayed %s spilled rows", replayed)
+
+    def _open_replay(self) -> Optional[tuple[IO, IO]]:
+        """
+        (replay lock, file to replay): a replay left over from an interrupted
+        run, else the spill file. None when there is nothing to replay or
+        another worker is replaying.
+        """
+        lock = _lock_file(REPLAY_LOCK_FILE, blocking=False)
+        if lock is None:
+            return None
+        try:
+            if not os.path.exists(REPLAY_FILE):
+                with self._spill_locked():
+                    try:
+                        os.replace(SPILL_FILE, REPLAY_FILE)
+                    except FileNotFoundError:
+                        lock.close()
+                        return None
+            return lock, open(REPLAY_FILE, encoding="utf-8")
+        except BaseException:
+            lock.close()
+            raise
+
+    def _read_chunk(self, f) -> tuple[int, list[dict]]:
+        """Next batch_size lines of the replay file: (lines read, rows decoded)"""
+        lines, rows = 0, []
+        for line in itertools.islice(f, self.batch_size):
+            lines += 1
+            if not line.strip():
+                continue
+            try:
+                rows.append(_decode_row(line))
+            except ValueError as e:
+                # Torn write (crash while spilling): nothing to replay
+                logger.error("ActivityLogWriter skipped an unreadable spilled row: %s", e)
+        return lines, rows
+
+    def _respill_rest(self, f) -> None:
+        with self._spill_locked():
+            with open(SPILL_FILE, "a", encoding="utf-8") as out:
+                for line in f:
+                    out.write(line)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "spilled": self.spilled,
+            "dead_lettered": self.dead_lettered,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+activity_log_writer = ActivityLogWriter()
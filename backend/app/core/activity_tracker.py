@@ -9,7 +9,7 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, Any, List
 from sqlmodel import Session
 
-from app.db.session import engine
+from app.db.session import audit_engine
 from app.models.activity_log import ActivityLog, ActionType
 from app.models.action_cost import get_action_cost
 
@@ -208,7 +208,7 @@ def log_update(
     cost_tokens = get_action_cost(module, resource_type, ActionType.UPDATE.value)
 
     try:
-        with Session(engine) as session:
+        with Session(audit_engine) as session:
             log = ActivityLog(
                 tenant_id=tenant_id,
                 user_id=user_id,
@@ -286,7 +286,7 @@ def log_create(
     cost_tokens = get_action_cost(module, resource_type, ActionType.CREATE.value)
 
     try:
-        with Session(engine) as session:
+        with Session(audit_engine) as session:
             log = ActivityLog(
                 tenant_id=tenant_id,
                 user_id=user_id,
@@ -356,7 +356,7 @@ def log_delete(
     cost_tokens = get_action_cost(module, resource_type, ActionType.DELETE.value)
 
     try:
-        with Session(engine) as session:
+        with Session(audit_engine) as session:
             log = ActivityLog(
                 tenant_id=tenant_id,
                 user_id=user_id,
@@ -0,0 +1,102 @@
+"""
+Cache invalidation bus - keep in-process caches consistent across workers
+
+Every uvicorn worker keeps its own in-process caches (tenants, identities,
+permissions). When one worker handles a write it invalidates its local copy
+and publishes a message with Postgres NOTIFY; every worker LISTENs on the
+same channel and drops the matching entries.
+
+If the listener is down, cache TTLs still bound staleness.
+
+Usage:
+    cache_bus.subscribe("permissions", lambda key: _matrix_cache.invalidate(...))
+    cache_bus.publish("permissions", {"tenant_id": "...", "role": "..."})
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "tms_cache_invalidation"
+
+
+class CacheBus:
+    """Postgres LISTEN/NOTIFY fan-out for cache invalidation messages"""
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self._handlers: Dict[str, List[Callable[[Any], None]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, cache: str, handler: Callable[[Any], None]) -> None:
+        """Register a local invalidation handler for a cache name"""
+        self._handlers.setdefault(cache, []).append(handler)
+
+    def publish(self, cache: str, key: Any = None) -> None:
+        """Broadcast an invalidation to all workers (best effort, sync)"""
+        payload = json.dumps({"cache": cache, "key": key}, ensure_ascii=False)
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": self.channel, "payload": payload})
+        except Exception as e:
+            logger.warning("CacheBus publish failed (%s): %s", cache, e)
+
+    def _dispatch(self, raw: str) -> None:
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return
+        for handler in self._handlers.get(message.get("cache"), []):
+            try:
+                handler(message.get("key"))
+            except Exception as e:
+                logger.warning("CacheBus handler for %s failed: %s", message.get("cache"), e)
+
+    # ---------- Listener ----------
+
+    async def start(self) -> None:
+        if not make_url(settings.DATABASE_URL).drivername.startswith("postgresql"):
+            return  # LISTEN/NOTIFY is Postgres-only; rely on TTLs elsewhere
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen(), name="cache-bus-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        import psycopg
+
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        backoff = 1
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.channel}")
+                    logger.info("CacheBus listening on %s", self.channel)
+                    backoff = 1
+                    async for notify in conn.notifies():
+                        self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("CacheBus listener error, reconnecting in %ss: %s", backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+
+cache_bus = CacheBus()
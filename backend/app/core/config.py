@@ -6,14 +6,142 @@ class Settings(BaseSettings):
     SQL_ECHO: bool = False
     JWT_SECRET: str = "change_me"
     JWT_ALG: str = "HS256"
+
+    # Identity cache for get_current_user (seconds; bounds cross-worker staleness)
+    AUTH_CACHE_TTL: float = float(os.getenv("AUTH_CACHE_TTL", "30"))
+    AUTH_CACHE_MAXSIZE: int = int(os.getenv("AUTH_CACHE_MAXSIZE", "10000"))
+    # Compiled (tenant, role) permission matrices; invalidated via cache bus
+    PERMISSION_CACHE_TTL: float = float(os.getenv("PERMISSION_CACHE_TTL", "300"))
+    PERMISSION_CACHE_MAXSIZE: int = int(os.getenv("PERMISSION_CACHE_MAXSIZE", "4096"))
+    # Tenant lookups by subdomain code (see app/core/tenant_middleware.py); invalidated via cache bus
+    TENANT_CACHE_TTL: float = float(os.getenv("TENANT_CACHE_TTL", "60"))
+    TENANT_CACHE_MAXSIZE: int = int(os.getenv("TENANT_CACHE_MAXSIZE", "2048"))
     STORAGE_DIR: str = "storage"
     API_BASE_URL: str = os.getenv("API_BASE_URL", "http://127.0.0.1:3001/api/v1")
 
     # Database pool settings for high traffic
-    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "50"))  # Base connections
-    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "100"))  # Extra connections when needed
+    # Connections per worker process on the primary, at most (pool size + overflow):
+    #   interactive 20+14, reporting 10+10, background 10+10, audit 3+5, sequence 3+5, async 20+40 = 150
+    # (the budget the single 50+100 pool used to have), plus the replica pool on
+    # the replica. Keep workers * 150 below the server's max_connections (or put
+    # PgBouncer in front), and resize the pools together.
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))  # Base connections (interactive pool)
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "14"))  # Extra connections when needed
     DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Wait time for connection
     DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Recycle connections every 30 mins
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # Interactive pool; 0 = no limit
+    DB_LONG_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_LONG_STATEMENT_TIMEOUT_MS", "300000"))  # get_long_session routes (inline imports, salary reports)
+
+    # Workload pools (see app/db/session.py): own limits and statement timeouts
+    DB_REPORTING_POOL_SIZE: int = int(os.getenv("DB_REPORTING_POOL_SIZE", "10"))
+    DB_REPORTING_MAX_OVERFLOW: int = int(os.getenv("DB_REPORTING_MAX_OVERFLOW", "10"))
+    DB_REPORTING_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_REPORTING_STATEMENT_TIMEOUT_MS", "120000"))
+    DB_BACKGROUND_POOL_SIZE: int = int(os.getenv("DB_BACKGROUND_POOL_SIZE", "10"))
+    DB_BACKGROUND_MAX_OVERFLOW: int = int(os.getenv("DB_BACKGROUND_MAX_OVERFLOW", "10"))
+    DB_BACKGROUND_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_BACKGROUND_STATEMENT_TIMEOUT_MS", "600000"))
+    DB_AUDIT_POOL_SIZE: int = int(os.getenv("DB_AUDIT_POOL_SIZE", "3"))
+    DB_AUDIT_MAX_OVERFLOW: int = int(os.getenv("DB_AUDIT_MAX_OVERFLOW", "5"))
+    DB_AUDIT_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_AUDIT_STATEMENT_TIMEOUT_MS", "10000"))
+    DB_SEQUENCE_POOL_SIZE: int = int(os.getenv("DB_SEQUENCE_POOL_SIZE", "3"))
+    DB_SEQUENCE_MAX_OVERFLOW: int = int(os.getenv("DB_SEQUENCE_MAX_OVERFLOW", "5"))
+    DB_SEQUENCE_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_SEQUENCE_STATEMENT_TIMEOUT_MS", "10000"))
+
+    # Async engine (psycopg 3) for `async def` route handlers
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")  # Empty = derived from DATABASE_URL
+    DB_ASYNC_POOL_SIZE: int = int(os.getenv("DB_ASYNC_POOL_SIZE", "20"))
+    DB_ASYNC_MAX_OVERFLOW: int = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "40"))
+    # Sync Session used on the event loop: "warn" (log once per call site), "raise" or "off"
+    DB_BLOCKING_GUARD: str = os.getenv("DB_BLOCKING_GUARD", "warn")
+
+    # Read replica for report/dashboard endpoints (empty = use primary)
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")
+    DB_REPLICA_POOL_SIZE: int = int(os.getenv("DB_REPLICA_POOL_SIZE", "20"))
+    DB_REPLICA_MAX_OVERFLOW: int = int(os.getenv("DB_REPLICA_MAX_OVERFLOW", "20"))
+    REPLICA_RETRY_SECONDS: int = int(os.getenv("REPLICA_RETRY_SECONDS", "30"))  # Cool-down after a replica failure
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))  # 0 = no stickiness
+
+    # Redis (optional) - shared response cache; in-process fallback when empty/down
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_STALE_SECONDS: int = int(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "60"))  # Serve-stale window while refreshing
+    RESPONSE_CACHE_MAXSIZE: int = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "5000"))  # In-process fallback only
+
+    # Per-request SQL instrumentation (see app/core/sql_metrics.py)
+    SQL_QUERY_WARN_THRESHOLD: int = int(os.getenv("SQL_QUERY_WARN_THRESHOLD", "50"))  # Queries per request
+    SQL_REPEAT_WARN_THRESHOLD: int = int(os.getenv("SQL_REPEAT_WARN_THRESHOLD", "10"))  # Same statement per request (N+1)
+    # Bearer token for GET /metrics (Prometheus bearer_token); empty = endpoint disabled
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+    # Activity log write-behind (see app/core/activity_log_writer.py)
+    ACTIVITY_LOG_BATCH_SIZE: int = int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "200"))  # Flush every N rows
+    ACTIVITY_LOG_FLUSH_MS: int = int(os.getenv("ACTIVITY_LOG_FLUSH_MS", "500"))  # ...or every T ms
+    ACTIVITY_LOG_QUEUE_MAX: int = int(os.getenv("ACTIVITY_LOG_QUEUE_MAX", "10000"))  # Spill to disk beyond this
+
+    # Optional modules (MES, project, FMS AI, CRM chat - see app/core/lazy_modules.py)
+    # "lazy": import on first request; "tenant": also preload those enabled for any tenant
+    # after startup; "eager": import everything at startup (previous behaviour)
+    OPTIONAL_MODULES_LOADING: str = os.getenv("OPTIONAL_MODULES_LOADING", "tenant")
+    # Budget checked by `python -m app.scripts.startup_budget`
+    STARTUP_BUDGET_MS: int = int(os.getenv("STARTUP_BUDGET_MS", "4000"))
+
+    # Report exports (see app/core/export.py)
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))  # Rows per server-side cursor fetch
+    EXPORT_BACKGROUND_ROWS: int = int(os.getenv("EXPORT_BACKGROUND_ROWS", "50000"))  # mode=auto: larger exports run in background
+    EXPORT_BACKGROUND_WORKERS: int = int(os.getenv("EXPORT_BACKGROUND_WORKERS", "2"))
+    EXPORT_RETENTION_HOURS: int = int(os.getenv("EXPORT_RETENTION_HOURS", "24"))  # Finished background files kept this long
+
+    # In-process scheduler for automation jobs (see app/core/scheduler.py)
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_JITTER: float = float(os.getenv("SCHEDULER_JITTER", "0.1"))  # +/- fraction of each interval
+    SCHEDULER_MAX_CONCURRENCY: int = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "4"))  # Slices per worker at once
+    # Seconds between runs per job; 0 = only on demand (POST /automation/...)
+    AUTOMATION_DETECT_GPS_STATUS_INTERVAL: float = float(os.getenv("AUTOMATION_DETECT_GPS_STATUS_INTERVAL", "30"))
+    AUTOMATION_RECALCULATE_ETAS_INTERVAL: float = float(os.getenv("AUTOMATION_RECALCULATE_ETAS_INTERVAL", "120"))
+    AUTOMATION_AUTO_ACCEPT_ORDERS_INTERVAL: float = float(os.getenv("AUTOMATION_AUTO_ACCEPT_ORDERS_INTERVAL", "0"))
+    AUTOMATION_AUTO_ASSIGN_DRIVERS_INTERVAL: float = float(os.getenv("AUTOMATION_AUTO_ASSIGN_DRIVERS_INTERVAL", "0"))
+
+    # Durable job queue for long-running operations (see app/core/jobs.py)
+    JOBS_WORKER_ENABLED: bool = os.getenv("JOBS_WORKER_ENABLED", "true").lower() == "true"
+    JOBS_WORKER_CONCURRENCY: int = int(os.getenv("JOBS_WORKER_CONCURRENCY", "2"))  # Jobs run at once per process
+    JOBS_POLL_SECONDS: float = float(os.getenv("JOBS_POLL_SECONDS", "1.0"))  # Idle wait between claim attempts
+    JOBS_MAX_ATTEMPTS: int = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+    JOBS_RETRY_BASE_SECONDS: float = float(os.getenv("JOBS_RETRY_BASE_SECONDS", "30"))  # Backoff: base * 2^(attempt-1)
+    JOBS_HEARTBEAT_SECONDS: float = float(os.getenv("JOBS_HEARTBEAT_SECONDS", "30"))
+    JOBS_STALE_SECONDS: float = float(os.getenv("JOBS_STALE_SECONDS", "300"))  # Running jobs without a heartbeat are requeued
+
+    # Order import (see app/services/order_import.py)
+    ORDER_IMPORT_BATCH_SIZE: int = int(os.getenv("ORDER_IMPORT_BATCH_SIZE", "2000"))  # Rows per COPY + merge transaction
+    ORDER_IMPORT_MAX_BYTES: int = int(os.getenv("ORDER_IMPORT_MAX_BYTES", str(100 * 1024 * 1024)))
+
+    # GPS provider sync (see app/services/gps_sync.py)
+    GPS_SYNC_CONCURRENCY: int = int(os.getenv("GPS_SYNC_CONCURRENCY", "8"))  # Provider fetches at once per process
+    GPS_SYNC_TIMEOUT_SECONDS: float = float(os.getenv("GPS_SYNC_TIMEOUT_SECONDS", "15"))  # Per provider fetch, incl. login
+    GPS_SYNC_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("GPS_SYNC_CONNECT_TIMEOUT_SECONDS", "5"))
+    GPS_SYNC_MAX_KEEPALIVE: int = int(os.getenv("GPS_SYNC_MAX_KEEPALIVE", "2"))  # Connections kept open per provider
+
+    # GPS ingest daemon (python -m app.scripts.gps_ingest, see app/services/gps_ingest.py)
+    GPS_INGEST_ACTIVE_SECONDS: float = float(os.getenv("GPS_INGEST_ACTIVE_SECONDS", "15"))  # Vehicles moving / on active orders
+    GPS_INGEST_IDLE_SECONDS: float = float(os.getenv("GPS_INGEST_IDLE_SECONDS", "300"))  # Everything parked / off duty
+    GPS_INGEST_MOVING_KMH: float = float(os.getenv("GPS_INGEST_MOVING_KMH", "5"))  # Slower than this counts as parked
+    GPS_INGEST_MAX_BACKOFF_SECONDS: float = float(os.getenv("GPS_INGEST_MAX_BACKOFF_SECONDS", "600"))  # Failing providers
+    GPS_INGEST_REFRESH_SECONDS: float = float(os.getenv("GPS_INGEST_REFRESH_SECONDS", "30"))  # Reload providers and vehicle activity
+
+    # Batch geofencing of active orders (see app/services/geofence_batch.py)
+    GEOFENCE_EXIT_FACTOR: float = float(os.getenv("GEOFENCE_EXIT_FACTOR", "1.5"))  # Departure only beyond radius * this
+    GEOFENCE_MAX_FIX_AGE_SECONDS: float = float(os.getenv("GEOFENCE_MAX_FIX_AGE_SECONDS", "600"))  # Older positions are ignored
+
+    # Batch ETA recalculation (see app/services/eta_batch.py)
+    ETA_AVG_SPEED_KMH: float = float(os.getenv("ETA_AVG_SPEED_KMH", "50"))
+    ETA_ROUTE_FACTOR: float = float(os.getenv("ETA_ROUTE_FACTOR", "1.0"))  # Road km per straight-line km
+
+    # GPS position history (see app/services/gps_track.py)
+    GPS_TRACK_RAW_DAYS: int = int(os.getenv("GPS_TRACK_RAW_DAYS", "14"))  # Every fix kept this long...
+    GPS_TRACK_DOWNSAMPLE_SECONDS: int = int(os.getenv("GPS_TRACK_DOWNSAMPLE_SECONDS", "60"))  # ...then one per vehicle per N seconds
+    GPS_TRACK_RETENTION_DAYS: int = int(os.getenv("GPS_TRACK_RETENTION_DAYS", "180"))  # Whole months older than this are dropped
+    GPS_TRACK_INSERT_BATCH: int = int(os.getenv("GPS_TRACK_INSERT_BATCH", "1000"))  # Rows per multi-row INSERT
+    GPS_TRACK_MAX_RANGE_DAYS: int = int(os.getenv("GPS_TRACK_MAX_RANGE_DAYS", "7"))  # Longest window per replay request
+    GPS_TRACK_GAP_SECONDS: int = int(os.getenv("GPS_TRACK_GAP_SECONDS", "900"))  # Replay starts a new segment after a gap this long
+    GPS_TRACK_MAINTENANCE_INTERVAL: float = float(os.getenv("GPS_TRACK_MAINTENANCE_INTERVAL", "3600"))  # 0 = never
 
     # Google Maps API (optional, for geocoding and distance calculation)
     GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "")
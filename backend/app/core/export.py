@@ -0,0 +1,482 @@
+"""
+Streaming CSV/XLSX export for reports and logs
+
+Rows flow from a source function through a generator-based writer straight
+into a StreamingResponse, so memory stays flat regardless of row count:
+
+- sources get their own read Session (replica when available) because the
+  request's Session is closed before a StreamingResponse body is sent;
+  ``query_source`` runs a column-only SELECT on a server-side cursor
+  (``yield_per``), report sources just call the report function
+- the source runs, and its first row is fetched, before the response starts,
+  so a report that rejects its parameters still answers with its 4xx
+- CSV is written row by row; XLSX uses openpyxl's write-only workbook, which
+  spools rows to a temp file and is streamed once the workbook is closed
+- ``columns=a,b,c`` picks and orders columns (default: all)
+- ``mode=background`` (or ``auto`` with an estimate above
+  EXPORT_BACKGROUND_ROWS) writes the file in a worker thread and returns 202
+  with a status URL (see /exports). Background exports live in this process:
+  ones left queued/running by a process that is gone are reported failed
+
+Usage in a route:
+
+    return export_response(
+        lambda s: get_vehicle_pl_report(year, month, session=s, current_user=current_user),
+        select_export_columns(VEHICLE_PL_COLUMNS, columns),
+        format, filename="vehicle-pl", tenant_id=tenant_id, user_id=user_id, mode=mode,
+    )
+"""
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Type
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from sqlmodel import Session
+from starlette.background import BackgroundTask
+
+from app.core.config import settings
+from app.db.replica import read_engine
+
+logger = logging.getLogger(__name__)
+
+FORMAT_PATTERN = "^(csv|xlsx)$"
+MODE_PATTERN = "^(auto|stream|background)$"
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+CHUNK_SIZE = 64 * 1024
+
+RowSource = Callable[[Session], Iterable[Any]]
+
+
+# =====================
+# COLUMNS
+# =====================
+
+@dataclass(frozen=True)
+class ExportColumn:
+    key: str
+    header: str = ""
+
+    @property
+    def title(self) -> str:
+        return self.header or self.key.replace("_", " ").capitalize()
+
+
+def columns_from_schema(schema: Type[BaseModel], exclude: Sequence[str] = ()) -> List[ExportColumn]:
+    """One column per schema field, in declaration order"""
+    return [ExportColumn(name) for name in schema.model_fields if name not in exclude]
+
+
+def select_export_columns(available: Sequence[ExportColumn], columns: Optional[str]) -> List[ExportColumn]:
+    """Apply ``columns=a,b,c`` (order kept); 400 on unknown keys"""
+    if not columns:
+        return list(available)
+    by_key = {c.key: c for c in available}
+    keys = list(dict.fromkeys(k.strip() for k in columns.split(",") if k.strip()))
+    unknown = [k for k in keys if k not in by_key]
+    if unknown:
+        raise HTTPException(400, f"Unknown export columns: {', '.join(unknown)}. Available: {', '.join(by_key)}")
+    return [by_key[k] for k in keys] or list(available)
+
+
+def _value(row: Any, key: str) -> Any:
+    if isinstance(row, Mapping):
+        return row.get(key)
+    mapping = getattr(row, "_mapping", None)
+    if isinstance(mapping, Mapping):
+        return mapping.get(key)
+    return getattr(row, key, None)
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+# =====================
+# WRITERS
+# =====================
+
+def iter_csv(rows: Iterable[Any], columns: Sequence[ExportColumn]) -> Iterator[bytes]:
+    """CSV (UTF-8 with BOM so Excel shows Vietnamese correctly), flushed every ~64KB"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow([c.title for c in columns])
+    for row in rows:
+        values = []
+        for column in columns:
+            value = _plain(_value(row, column.key))
+            if value is None:
+                value = ""
+            elif isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            values.append(value)
+        writer.writerow(values)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _xlsx_value(value: Any) -> Any:
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    value = _plain(value)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.replace(tzinfo=None)  # Excel has no time zones
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    if isinstance(value, (int, float, Decimal, bool, date)) or value is None:
+        return value
+    return str(value)
+
+
+def write_xlsx(rows: Iterable[Any], columns: Sequence[ExportColumn], target, sheet_title: str = "Export") -> int:
+    """Write rows to ``target`` (path or binary file) with a write-only workbook; returns row count"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append([c.title for c in columns])
+    count = 0
+    for row in rows:
+        sheet.append([_xlsx_value(_value(row, c.key)) for c in columns])
+        count += 1
+    workbook.save(target)
+    return count
+
+
+def iter_xlsx(rows: Iterable[Any], columns: Sequence[ExportColumn], sheet_title: str = "Export") -> Iterator[bytes]:
+    """XLSX bytes; rows are spooled to disk by openpyxl, so only the zip is streamed"""
+    with tempfile.TemporaryFile() as spool:
+        write_xlsx(rows, columns, spool, sheet_title)
+        spool.seek(0)
+        while chunk := spool.read(CHUNK_SIZE):
+            yield chunk
+
+
+def iter_export(rows: Iterable[Any], columns: Sequence[ExportColumn], fmt: str, sheet_title: str = "Export") -> Iterator[bytes]:
+    if fmt == "xlsx":
+        return iter_xlsx(rows, columns, sheet_title)
+    return iter_csv(rows, columns)
+
+
+# =====================
+# SOURCES
+# =====================
+
+def query_source(query, batch_size: Optional[int] = None) -> RowSource:
+    """Rows of a column select, fetched through a server-side cursor in batches"""
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+
+    def rows(session: Session) -> Iterator[Any]:
+        result = session.execute(query.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield from partition
+
+    return rows
+
+
+def _read_session() -> Session:
+    return Session(read_engine())
+
+
+def _open_stream(
+    source: RowSource, columns: Sequence[ExportColumn], fmt: str, sheet_title: str
+) -> tuple[Iterator[bytes], Session]:
+    """
+    Run the source and fetch its first row now, so its errors (HTTPException
+    from report validation, SQL errors) surface before any header is sent.
+    Returns the body iterator and the session it reads from.
+    """
+    session = _read_session()
+    try:
+        rows = iter(source(session))
+        first = list(itertools.islice(rows, 1))
+    except BaseException:
+        session.close()
+        raise
+
+    def body() -> Iterator[bytes]:
+        try:
+            yield from iter_export(itertools.chain(first, rows), columns, fmt, sheet_title)
+        finally:
+            session.close()
+
+    return body(), session
+
+
+def _filename(name: str, fmt: str) -> str:
+    return f"{name}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+
+
+def export_response(
+    source: RowSource,
+    columns: Sequence[ExportColumn],
+    fmt: str,
+    filename: str,
+    *,
+    tenant_id: str,
+    user_id: str,
+    mode: str = "auto",
+    estimated_rows: Optional[int] = None,
+    sheet_title: str = "Export",
+) -> Response:
+    """Stream the export, or queue it in the background when it is large (or asked to)"""
+    if mode == "background" or (
+        mode == "auto" and estimated_rows is not None and estimated_rows > settings.EXPORT_BACKGROUND_ROWS
+    ):
+        job = export_jobs.submit(source, columns, fmt, filename, tenant_id, user_id, sheet_title)
+        return JSONResponse(status_code=202, content=job)
+
+    body, session = _open_stream(source, columns, fmt, sheet_title)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{_filename(filename, fmt)}"'},
+        # Also closes the session when the client goes away before the body starts
+        background=BackgroundTask(session.close),
+    )
+
+
+# =====================
+# BACKGROUND EXPORTS
+# =====================
+
+class ExportJobStore:
+    """
+    Background exports as files under STORAGE_DIR/exports/<tenant>/, each with a
+    JSON status file next to it so any worker on the host can report on it.
+
+    Exports run in this process's thread pool, so a restart ends them. The
+    status file records the owning worker (host:pid); an export still queued or
+    running whose worker is gone is reported failed, and marked so on startup
+    (recover) and shutdown.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._active: set = set()  # (tenant_id, export id) queued or running here
+        self._lock = threading.Lock()
+
+    def _dir(self, tenant_id: str) -> Path:
+        return Path(settings.STORAGE_DIR) / "exports" / tenant_id
+
+    def _meta_path(self, tenant_id: str, export_id: str) -> Path:
+        return self._dir(tenant_id) / f"{export_id}.json"
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        path = self._meta_path(meta["tenant_id"], meta["id"])
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta, default=str))
+        os.replace(tmp, path)
+
+    def _read_meta(self, tenant_id: str, export_id: str) -> Optional[Dict[str, Any]]:
+        path = self._meta_path(tenant_id, export_id)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def get(self, tenant_id: str, export_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            uuid.UUID(export_id)
+        except ValueError:
+            return None
+        meta = self._read_meta(tenant_id, export_id)
+        if meta and meta["status"] in ("queued", "running") and not self._owner_alive(meta):
+            self._abandon(meta, "Export was interrupted by a server restart")
+        return meta
+
+    def file_path(self, meta: Dict[str, Any]) -> Path:
+        return self._dir(meta["tenant_id"]) / f"{meta['id']}.{meta['format']}"
+
+    def submit(
+        self,
+        source: RowSource,
+        columns: Sequence[ExportColumn],
+        fmt: str,
+        filename: str,
+        tenant_id: str,
+        user_id: str,
+        sheet_title: str = "Export",
+    ) -> Dict[str, Any]:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.EXPORT_BACKGROUND_WORKERS, thread_name_prefix="export"
+            )
+        self._dir(tenant_id).mkdir(parents=True, exist_ok=True)
+        self.purge_expired(tenant_id)
+
+        meta = {
+            "id": str(uuid.uuid4()),
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "format": fmt,
+            "filename": _filename(filename, fmt),
+            "status": "queued",
+            "rows": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "worker": self.worker_id,
+        }
+        with self._lock:
+            self._active.add((tenant_id, meta["id"]))
+        self._write_meta(meta)
+        self._executor.submit(self._run, meta, source, list(columns), sheet_title)
+        return self.public(meta)
+
+    def _run(self, meta: Dict[str, Any], source: RowSource, columns: List[ExportColumn], sheet_title: str) -> None:
+        meta["status"] = "running"
+        self._write_meta(meta)
+        target = self.file_path(meta)
+        partial = target.with_suffix(target.suffix + ".part")
+        started = time.perf_counter()
+        try:
+            with _read_session() as session:
+                rows = source(session)
+                if meta["format"] == "xlsx":
+                    meta["rows"] = write_xlsx(rows, columns, str(partial), sheet_title)
+                else:
+                    counted = _Counter(rows)
+                    with open(partial, "wb") as f:
+                        for chunk in iter_csv(counted, columns):
+                            f.write(chunk)
+                    meta["rows"] = counted.count
+            os.replace(partial, target)
+            meta["status"] = "completed"
+        except Exception as e:
+            logger.exception("Export %s failed", meta["id"])
+            partial.unlink(missing_ok=True)
+            meta["status"] = "failed"
+            meta["error"] = str(e)
+        meta["finished_at"] = datetime.utcnow().isoformat()
+        self._write_meta(meta)
+        with self._lock:
+            self._active.discard((meta["tenant_id"], meta["id"]))
+        logger.info("Export %s %s: %s rows in %.1fs", meta["id"], meta["status"], meta["rows"],
+                    time.perf_counter() - started)
+
+    def purge_expired(self, tenant_id: str) -> None:
+        """Delete exports older than EXPORT_RETENTION_HOURS (finished, or abandoned by their worker)"""
+        cutoff = time.time() - timedelta(hours=settings.EXPORT_RETENTION_HOURS).total_seconds()
+        for path in self._dir(tenant_id).glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    meta = json.loads(path.read_text())
+                    if meta.get("status") in ("completed", "failed") or not self._owner_alive(meta):
+                        target = self.file_path(meta)
+                        target.unlink(missing_ok=True)
+                        target.with_suffix(target.suffix + ".part").unlink(missing_ok=True)
+                        path.unlink(missing_ok=True)
+            except (OSError, ValueError, KeyError):
+                continue
+
+    def _owner_alive(self, meta: Dict[str, Any], restarting: bool = False) -> bool:
+        """
+        Whether the worker that queued the export may still be running it. Only
+        workers on this host can be checked; others are assumed alive. While
+        ``restarting``, exports recorded under this worker's own id are from an
+        earlier process that had the same pid (containers).
+        """
+        host, _, pid = (meta.get("worker") or "").rpartition(":")
+        if host != socket.gethostname() or not pid.isdigit():
+            return not host  # Exports from before owners were recorded count as abandoned
+        if meta["worker"] == self.worker_id:
+            return not restarting and (meta["tenant_id"], meta["id"]) in self._active
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass  # Exists, owned by another user
+        return True
+
+    def _abandon(self, meta: Dict[str, Any], reason: str) -> None:
+        meta["status"] = "failed"
+        meta["error"] = reason
+        meta["finished_at"] = datetime.utcnow().isoformat()
+        self._write_meta(meta)
+        target = self.file_path(meta)
+        target.with_suffix(target.suffix + ".part").unlink(missing_ok=True)
+
+    def recover(self) -> int:
+        """On startup: fail the exports a previous process on this host left queued or running"""
+        count = 0
+        for path in (Path(settings.STORAGE_DIR) / "exports").glob("*/*.json"):
+            try:
+                meta = json.loads(path.read_text())
+                if meta.get("status") in ("queued", "running") and not self._owner_alive(meta, restarting=True):
+                    self._abandon(meta, "Export was interrupted by a server restart")
+                    count += 1
+            except (OSError, ValueError, KeyError):
+                continue
+        if count:
+            logger.warning("Marked %d interrupted background exports as failed", count)
+        return count
+
+    @staticmethod
+    def public(meta: Dict[str, Any]) -> Dict[str, Any]:
+        data = {k: v for k, v in meta.items() if k not in ("tenant_id", "worker")}
+        data["status_url"] = f"/api/v1/exports/{meta['id']}"
+        if meta["status"] == "completed":
+            data["download_url"] = f"/api/v1/exports/{meta['id']}/download"
+        return data
+
+    def shutdown(self) -> None:
+        """Stop the pool; exports it had not finished are marked failed"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        with self._lock:
+            active, self._active = self._active, set()
+        for tenant_id, export_id in active:
+            try:
+                meta = self._read_meta(tenant_id, export_id)
+            except (OSError, ValueError):
+                continue
+            if meta and meta["status"] in ("queued", "running"):
+                self._abandon(meta, "Server shut down before the export finished")
+
+
+class _Counter:
+    """Pass-through iterable that counts rows"""
+
+    def __init__(self, rows: Iterable[Any]):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+export_jobs = ExportJobStore()
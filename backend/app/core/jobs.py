@@ -0,0 +1,515 @@
+"""
+Durable job queue for long-running operations
+
+Bulk endpoints (generate all payrolls, recalculate all freights, bulk
+depreciation, ...) used to do their work inside the request. They now insert a
+``background_jobs`` row and return 202 with ``/api/v1/jobs/{id}`` to poll:
+
+- workers (JOBS_WORKER_CONCURRENCY threads per process) claim queued rows with
+  ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of processes can share
+  the queue without double-running a job
+- handlers are registered by kind in JOB_HANDLERS as "module:function" and
+  imported on first use; they get a JobContext (own Session, tenant, user,
+  ``progress()``)
+- failures are retried with exponential backoff up to max_attempts; JobFailed
+  (and 4xx HTTPExceptions raised by reused endpoint code) fail immediately
+- ``progress()`` also checks for cancellation: a cancelled running job stops at
+  its next progress report (work already committed stays committed)
+- an Idempotency-Key makes enqueue return the existing job for the same
+  (tenant, kind, key) instead of starting another one
+- workers heartbeat their running jobs; a job whose worker died is requeued
+  after JOBS_STALE_SECONDS
+- kinds in EXCLUSIVE_KINDS run under an advisory lease per (kind, tenant), so
+  two bulk runs of the same kind never overlap for a tenant
+"""
+import asyncio
+import importlib
+import inspect
+import logging
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.scheduler import advisory_lease
+from app.core.sql_metrics import register_metrics
+from app.db.session import background_engine
+from app.models.background_job import BackgroundJob, BackgroundJobStatus, FINISHED_JOB_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# kind -> "module:function"; handler(ctx, **payload) returns a JSON-able result
+JOB_HANDLERS: Dict[str, str] = {
+    "payroll.generate_all": "app.api.v1.routes.driver_salary_management:run_generate_all_payrolls",
+    "freight.recalculate_all": "app.api.v1.routes.trip_revenue:run_recalculate_all_freights",
+    "assets.bulk_depreciation": "app.api.v1.routes.accounting.fixed_assets:run_bulk_depreciation_job",
+    "billing.end_of_month": "app.api.v1.routes.admin_billing:run_process_end_of_month",
+    "crm.sync_all_to_tms": "app.api.v1.routes.crm.accounts:run_sync_all_to_tms",
+    "fms.parse_ai_batch": "app.api.v1.routes.fms.customs_documents:run_parse_ai_batch",
+    "orders.import": "app.services.order_import:run_order_import",
+}
+
+# Bulk rewrites of the same tenant data: one at a time per tenant
+EXCLUSIVE_KINDS = {
+    "payroll.generate_all",
+    "freight.recalculate_all",
+    "assets.bulk_depreciation",
+    "billing.end_of_month",
+    "crm.sync_all_to_tms",
+    "orders.import",
+}
+
+LEASE_RETRY_SECONDS = 5
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+_handlers: Dict[str, Callable[..., Any]] = {}
+
+
+def _handler(kind: str) -> Callable[..., Any]:
+    if kind not in _handlers:
+        module_name, attr = JOB_HANDLERS[kind].split(":")
+        _handlers[kind] = getattr(importlib.import_module(module_name), attr)
+    return _handlers[kind]
+
+
+class JobFailed(Exception):
+    """Permanent failure: not retried. ``detail`` is stored as the job result."""
+
+    def __init__(self, message: str, detail: Any = None):
+        super().__init__(message)
+        self.detail = detail
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class JobContext:
+    job_id: str
+    tenant_id: str
+    user_id: Optional[str]
+    attempt: int
+    session: Session
+    _last_progress: float = 0.0
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        """
+        Report progress (throttled) and stop if the job was cancelled.
+
+        Written on its own connection, so it is visible while the handler's
+        transaction is still open.
+        """
+        now = time.monotonic()
+        finished = total is not None and done >= total
+        if not finished and now - self._last_progress < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_progress = now
+        fraction = min(1.0, done / total) if total else 0.0
+        if message is None and total is not None:
+            message = f"{done}/{total}"
+        with background_engine.begin() as conn:
+            cancel = conn.execute(
+                text("""
+                    UPDATE background_jobs
+                    SET progress = :progress, progress_message = :message,
+                        heartbeat_at = :now, updated_at = :now
+                    WHERE id = :id
+                    RETURNING cancel_requested
+                """),
+                {"progress": fraction, "message": message, "now": datetime.utcnow(), "id": self.job_id},
+            ).scalar()
+        if cancel:
+            raise JobCancelled()
+
+
+# ---------- Enqueue / status ----------
+
+def enqueue(
+    session: Session,
+    kind: str,
+    tenant_id: str,
+    payload: Optional[Dict[str, Any]] = None,
+    user_id: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+) -> BackgroundJob:
+    """Insert a queued job and commit. With an idempotency key, an existing job for it is returned instead."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = BackgroundJob(
+        tenant_id=str(tenant_id),
+        kind=kind,
+        payload=payload or {},
+        created_by=str(user_id) if user_id else None,
+        idempotency_key=idempotency_key or None,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if not job.idempotency_key:
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        jobs_worker.wake()
+        return job
+
+    table = BackgroundJob.__table__
+    values = {c.name: getattr(job, c.name) for c in table.columns}
+    stmt = insert(table).values(**values).on_conflict_do_nothing(
+        index_elements=["tenant_id", "kind", "idempotency_key"],
+        index_where=text("idempotency_key IS NOT NULL"),
+    ).returning(table.c.id)
+    inserted = session.execute(stmt).scalar()
+    session.commit()
+    if inserted:
+        jobs_worker.wake()
+    return session.exec(
+        select(BackgroundJob).where(
+            BackgroundJob.tenant_id == job.tenant_id,
+            BackgroundJob.kind == kind,
+            BackgroundJob.idempotency_key == job.idempotency_key,
+        )
+    ).one()
+
+
+def job_url(job_id: str) -> str:
+    return f"/api/v1/jobs/{job_id}"
+
+
+def public(job: BackgroundJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "progress_message": job.progress_message,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "cancel_requested": job.cancel_requested,
+        "result": job.result,
+        "error": job.error,
+        "created_by": job.created_by,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "status_url": job_url(job.id),
+    }
+
+
+def job_accepted(job: BackgroundJob) -> JSONResponse:
+    """202 response for an enqueued job; clients poll status_url"""
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job.id, "kind": job.kind, "status": job.status, "status_url": job_url(job.id)},
+        headers={"Location": job_url(job.id)},
+    )
+
+
+def request_cancel(session: Session, job: BackgroundJob) -> BackgroundJob:
+    """Queued jobs are cancelled right away; running ones stop at their next progress report"""
+    if job.status in FINISHED_JOB_STATUSES:
+        return job
+    now = datetime.utcnow()
+    table = BackgroundJob.__table__
+    session.execute(
+        update(table).where(table.c.id == job.id).values(cancel_requested=True, updated_at=now)
+    )
+    # Only if no worker has claimed it in the meantime
+    session.execute(
+        update(table)
+        .where(table.c.id == job.id, table.c.status == BackgroundJobStatus.QUEUED.value)
+        .values(status=BackgroundJobStatus.CANCELLED.value, finished_at=now)
+    )
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+# ---------- Worker ----------
+
+@dataclass
+class KindStats:
+    claimed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retried: int = 0
+    cancelled: int = 0
+    lease_skips: int = 0
+    seconds_total: float = 0.0
+
+
+@dataclass
+class _Claimed:
+    id: str
+    tenant_id: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    created_by: Optional[str]
+
+
+class JobWorker:
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats: Dict[str, KindStats] = {}
+        self._lock = threading.Lock()
+        self._running: Dict[str, str] = {}  # job id -> kind
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _stats(self, kind: str) -> KindStats:
+        return self.stats.setdefault(kind, KindStats())
+
+    def wake(self) -> None:
+        """Skip the idle wait: a job was just enqueued in this process"""
+        self._wake.set()
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> None:
+        if not settings.JOBS_WORKER_ENABLED or self._threads:
+            return
+        self._stop.clear()
+        for i in range(max(1, settings.JOBS_WORKER_CONCURRENCY)):
+            self._threads.append(threading.Thread(target=self._loop, name=f"jobs-worker-{i}", daemon=True))
+        self._threads.append(threading.Thread(target=self._heartbeat_loop, name="jobs-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info("Job worker %s started with %d threads", self.worker_id, settings.JOBS_WORKER_CONCURRENCY)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop claiming; jobs still running when the process exits are requeued by the stale-job reaper"""
+        self._stop.set()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self._claim()
+            except Exception:
+                logger.exception("Job claim failed")
+                claimed = None
+            if claimed is None:
+                self._wake.wait(settings.JOBS_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._execute(claimed)
+
+    # ---------- Claim / finish ----------
+
+    def _claim(self) -> Optional[_Claimed]:
+        table = BackgroundJob.__table__
+        c = table.c
+        now = datetime.utcnow()
+        pick = (
+            select(c.id)
+            .where(c.status == BackgroundJobStatus.QUEUED.value, c.run_after <= now)
+            .order_by(c.run_after, c.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(table)
+            .where(c.id == pick)
+            .values(
+                status=BackgroundJobStatus.RUNNING.value,
+                attempts=c.attempts + 1,
+                locked_by=self.worker_id,
+                heartbeat_at=now,
+                started_at=now,
+                updated_at=now,
+            )
+            .returning(c.id, c.tenant_id, c.kind, c.payload, c.attempts, c.max_attempts, c.created_by)
+        )
+        with background_engine.begin() as conn:
+            row = conn.execute(stmt).first()
+        if row is None:
+            return None
+        return _Claimed(
+            id=row.id, tenant_id=row.tenant_id, kind=row.kind, payload=row.payload or {},
+            attempts=row.attempts, max_attempts=row.max_attempts, created_by=row.created_by,
+        )
+
+    def _finish(self, job_id: str, **values) -> None:
+        """Update a job this worker still owns (the reaper may have taken it back)"""
+        now = datetime.utcnow()
+        values.setdefault("updated_at", now)
+        if values.get("status") in FINISHED_JOB_STATUSES:
+            values.setdefault("finished_at", now)
+        if values.get("status") == BackgroundJobStatus.QUEUED.value:
+            values.setdefault("locked_by", None)
+        table = BackgroundJob.__table__
+        with background_engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.locked_by == self.worker_id)
+                .values(**values)
+            )
+
+    def _execute(self, job: _Claimed) -> None:
+        with self._lock:
+            self._stats(job.kind).claimed += 1
+            self._running[job.id] = job.kind
+        started = time.perf_counter()
+        try:
+            if job.kind in EXCLUSIVE_KINDS:
+                with advisory_lease(f"jobkind:{job.kind}", job.tenant_id) as acquired:
+                    if not acquired:
+                        # Another run of this kind is active for the tenant: try again shortly
+                        with self._lock:
+                            self._stats(job.kind).lease_skips += 1
+                        self._finish(
+                            job.id,
+                            status=BackgroundJobStatus.QUEUED.value,
+                            attempts=job.attempts - 1,
+                            run_after=datetime.utcnow() + timedelta(seconds=LEASE_RETRY_SECONDS),
+                        )
+                        return
+                    self._run(job)
+            else:
+                self._run(job)
+        finally:
+            with self._lock:
+                self._running.pop(job.id, None)
+                self._stats(job.kind).seconds_total += time.perf_counter() - started
+
+    def _run(self, job: _Claimed) -> None:
+        try:
+            with Session(background_engine) as session:
+                ctx = JobContext(
+                    job_id=job.id, tenant_id=job.tenant_id, user_id=job.created_by,
+                    attempt=job.attempts, session=session,
+                )
+                handler = _handler(job.kind)
+                if inspect.iscoroutinefunction(handler):
+                    result = asyncio.run(handler(ctx, **job.payload))
+                else:
+                    result = handler(ctx, **job.payload)
+        except JobCancelled:
+            self._outcome(job, "cancelled")
+            self._finish(job.id, status=BackgroundJobStatus.CANCELLED.value)
+        except JobFailed as e:
+            self._fail(job, str(e), e.detail)
+        except HTTPException as e:
+            if e.status_code < 500:
+                self._fail(job, str(e.detail), e.detail)
+            else:
+                self._retry_or_fail(job, e)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed on attempt %d", job.id, job.kind, job.attempts)
+            self._retry_or_fail(job, e)
+        else:
+            self._outcome(job, "succeeded")
+            self._finish(
+                job.id, status=BackgroundJobStatus.SUCCEEDED.value, progress=1.0,
+                result=result if isinstance(result, dict) else {"value": result}, error=None,
+            )
+
+    def _fail(self, job: _Claimed, message: str, detail: Any = None) -> None:
+        self._outcome(job, "failed")
+        result = None if detail is None else (detail if isinstance(detail, dict) else {"detail": detail})
+        self._finish(job.id, status=BackgroundJobStatus.FAILED.value, error=message, result=result)
+
+    def _retry_or_fail(self, job: _Claimed, exc: Exception) -> None:
+        message = f"{type(exc).__name__}: {exc}"
+        if job.attempts >= job.max_attempts:
+            self._fail(job, message)
+            return
+        self._outcome(job, "retried")
+        delay = settings.JOBS_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+        self._finish(
+            job.id,
+            status=BackgroundJobStatus.QUEUED.value,
+            error=message,
+            run_after=datetime.utcnow() + timedelta(seconds=delay),
+        )
+
+    def _outcome(self, job: _Claimed, name: str) -> None:
+        with self._lock:
+            stats = self._stats(job.kind)
+            setattr(stats, name, getattr(stats, name) + 1)
+
+    # ---------- Heartbeat / reaper ----------
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(settings.JOBS_HEARTBEAT_SECONDS):
+            try:
+                self.heartbeat()
+                self.requeue_stale()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    def heartbeat(self) -> None:
+        with self._lock:
+            running = list(self._running)
+        if not running:
+            return
+        table = BackgroundJob.__table__
+        with background_engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.id.in_(running), table.c.locked_by == self.worker_id)
+                .values(heartbeat_at=datetime.utcnow())
+            )
+
+    def requeue_stale(self) -> int:
+        """Running jobs whose worker stopped heartbeating: retry, or fail once out of attempts"""
+        now = datetime.utcnow()
+        with background_engine.begin() as conn:
+            result = conn.execute(
+                text("""
+                    UPDATE background_jobs
+                    SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                        finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE :now END,
+                        error = 'Worker stopped responding (' || coalesce(locked_by, '?') || ')',
+                        locked_by = NULL, run_after = :now, updated_at = :now
+                    WHERE status = 'running' AND heartbeat_at < :cutoff
+                """),
+                {"now": now, "cutoff": now - timedelta(seconds=settings.JOBS_STALE_SECONDS)},
+            )
+        if result.rowcount:
+            logger.warning("Requeued %d stale jobs", result.rowcount)
+        return result.rowcount
+
+    # ---------- Reporting ----------
+
+    def metrics(self):
+        with self._lock:
+            items = [(kind, KindStats(**vars(s))) for kind, s in self.stats.items()]
+            running: Dict[str, int] = {}
+            for kind in self._running.values():
+                running[kind] = running.get(kind, 0) + 1
+
+        def samples(attr):
+            return [({"kind": kind}, getattr(s, attr)) for kind, s in items]
+
+        return [
+            ("tms_jobs_claimed_total", "counter", "Jobs claimed by this worker", samples("claimed")),
+            ("tms_jobs_succeeded_total", "counter", "Jobs that succeeded", samples("succeeded")),
+            ("tms_jobs_failed_total", "counter", "Jobs that failed permanently", samples("failed")),
+            ("tms_jobs_retried_total", "counter", "Job attempts that failed and were requeued", samples("retried")),
+            ("tms_jobs_cancelled_total", "counter", "Jobs cancelled while running", samples("cancelled")),
+            ("tms_jobs_lease_skips_total", "counter", "Claims requeued because the same kind was running for the tenant", samples("lease_skips")),
+            ("tms_jobs_run_seconds_total", "counter", "Time spent running jobs", samples("seconds_total")),
+            ("tms_jobs_running", "gauge", "Jobs running in this worker", [({"kind": k}, n) for k, n in running.items()]),
+        ]
+
+
+jobs_worker = JobWorker()
+register_metrics(jobs_worker.metrics)
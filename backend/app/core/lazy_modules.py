@@ -0,0 +1,241 @@
+"""
+Lazy loading of optional API modules
+
+MES, project management, the FMS AI document tooling and the CRM chat inbox
+are only used by a handful of tenants but account for a large share of import
+time at startup (route modules, their models/services, pandas, AI SDKs...).
+Instead of importing them in app.api.v1.routes, they are registered here and
+included into the app on demand:
+
+- on the first request whose path falls under the module's prefix
+  (LazyModuleMiddleware imports it off the event loop, then routes normally)
+- after startup, in the background, if any tenant has the module enabled
+  (OPTIONAL_MODULES_LOADING="tenant", the default)
+- at startup (OPTIONAL_MODULES_LOADING="eager", the previous behaviour)
+
+/openapi.json (and so /docs) loads everything first so the schema is complete.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, FastAPI
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v1"
+LOAD_ALL_PATHS = {"/openapi.json", "/docs", "/redoc"}
+
+
+@dataclass(frozen=True)
+class LazyRouter:
+    """One router to include when its module loads"""
+    target: str  # "package.module:attribute"
+    prefix: str = ""  # Extra prefix passed to include_router (under API_PREFIX)
+    tags: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class OptionalModule:
+    name: str
+    tenant_module: str  # Code in Tenant.enabled_modules / TenantModule.module_code
+    paths: Tuple[str, ...]  # Request path prefixes (under API_PREFIX) that need it
+    routers: Tuple[LazyRouter, ...]
+
+
+# Same tags the routers had when included through their parent package router
+FMS_TAGS = ("Forwarding Management System", "FMS")
+
+OPTIONAL_MODULES: Tuple[OptionalModule, ...] = (
+    OptionalModule(
+        name="mes",
+        tenant_module="mes",
+        paths=("/mes",),
+        routers=(LazyRouter("app.api.v1.routes.mes:router", prefix="/mes", tags=("Manufacturing Execution System",)),),
+    ),
+    OptionalModule(
+        name="project",
+        tenant_module="project",
+        paths=("/project",),
+        routers=(LazyRouter("app.api.v1.routes.project:router", prefix="/project", tags=("Project Management",)),),
+    ),
+    OptionalModule(
+        name="fms_ai",
+        tenant_module="fms",
+        paths=("/fms/customs/documents", "/fms/ai-training", "/fms/parsing-instructions"),
+        routers=(
+            LazyRouter("app.api.v1.routes.fms.customs_documents:router", prefix="/fms", tags=FMS_TAGS),
+            LazyRouter("app.api.v1.routes.fms.ai_training:router", prefix="/fms", tags=FMS_TAGS),
+            LazyRouter("app.api.v1.routes.fms.parsing_instructions:router", prefix="/fms", tags=FMS_TAGS),
+        ),
+    ),
+    OptionalModule(
+        name="crm_chat",
+        tenant_module="crm",
+        paths=("/crm/chat",),
+        routers=(LazyRouter("app.api.v1.routes.crm.chat:router", prefix="/crm", tags=("CRM",)),),
+    ),
+)
+
+
+def _import_router(target: str) -> APIRouter:
+    module_name, attr = target.split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+@dataclass
+class LoadedModule:
+    name: str
+    seconds: float
+    trigger: str
+
+
+class LazyModuleRegistry:
+    """Tracks which optional modules are included in the app"""
+
+    def __init__(self, modules: Tuple[OptionalModule, ...] = OPTIONAL_MODULES):
+        self.modules: Dict[str, OptionalModule] = {m.name: m for m in modules}
+        self.loaded: Dict[str, LoadedModule] = {}
+        self.app: Optional[FastAPI] = None
+        self._lock = threading.Lock()
+        self._async_locks: Dict[str, asyncio.Lock] = {}
+
+    def attach(self, app: FastAPI) -> None:
+        self.app = app
+        if settings.OPTIONAL_MODULES_LOADING == "eager":
+            self.load_all(trigger="startup")
+
+    # ---------- Lookup ----------
+
+    def pending(self) -> List[str]:
+        return [name for name in self.modules if name not in self.loaded]
+
+    def match(self, path: str) -> Optional[str]:
+        """Name of the unloaded module serving ``path``, if any"""
+        if not path.startswith(API_PREFIX):
+            return None
+        sub_path = path[len(API_PREFIX):]
+        for name in self.pending():
+            for prefix in self.modules[name].paths:
+                if sub_path == prefix or sub_path.startswith(prefix + "/"):
+                    return name
+        return None
+
+    # ---------- Loading ----------
+
+    def _import(self, name: str) -> Tuple[List[Tuple[LazyRouter, APIRouter]], float]:
+        started = time.perf_counter()
+        routers = [(spec, _import_router(spec.target)) for spec in self.modules[name].routers]
+        return routers, time.perf_counter() - started
+
+    def _include(self, name: str, routers, seconds: float, trigger: str) -> None:
+        with self._lock:
+            if name in self.loaded or self.app is None:
+                return
+            for spec, router in routers:
+                kwargs = {"prefix": API_PREFIX + spec.prefix}
+                if spec.tags:
+                    kwargs["tags"] = list(spec.tags)
+                self.app.include_router(router, **kwargs)
+            self.app.openapi_schema = None  # Rebuild with the new routes
+            self.loaded[name] = LoadedModule(name=name, seconds=seconds, trigger=trigger)
+        logger.info("Loaded optional module %s in %.0fms (%s)", name, seconds * 1000, trigger)
+
+    def load(self, name: str, trigger: str = "manual") -> None:
+        """Import and include a module synchronously (startup, scripts)"""
+        if name in self.loaded:
+            return
+        routers, seconds = self._import(name)
+        self._include(name, routers, seconds, trigger)
+
+    def load_all(self, trigger: str = "manual") -> None:
+        for name in self.pending():
+            self.load(name, trigger)
+
+    async def ensure_loaded(self, name: str, trigger: str) -> None:
+        """Import in a worker thread so the event loop keeps serving, include on the loop"""
+        if name in self.loaded:
+            return
+        lock = self._async_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if name in self.loaded:
+                return
+            routers, seconds = await asyncio.to_thread(self._import, name)
+            self._include(name, routers, seconds, trigger)
+
+    async def ensure_all_loaded(self, trigger: str) -> None:
+        for name in self.pending():
+            await self.ensure_loaded(name, trigger)
+
+    async def preload_enabled(self) -> None:
+        """Background startup task: load modules some tenant has enabled"""
+        try:
+            enabled = await asyncio.to_thread(_tenant_enabled_modules)
+        except Exception as e:
+            logger.warning("Could not read tenant modules, optional modules stay lazy: %s", e)
+            return
+        for name in self.pending():
+            if self.modules[name].tenant_module in enabled:
+                try:
+                    await self.ensure_loaded(name, trigger="tenant-enabled")
+                except Exception as e:
+                    logger.error("Preloading optional module %s failed: %s", name, e)
+
+    def stats(self) -> dict:
+        return {
+            "mode": settings.OPTIONAL_MODULES_LOADING,
+            "loaded": {
+                name: {"ms": round(m.seconds * 1000, 1), "trigger": m.trigger}
+                for name, m in self.loaded.items()
+            },
+            "pending": self.pending(),
+        }
+
+
+def _tenant_enabled_modules() -> Set[str]:
+    """Module codes enabled for at least one active tenant"""
+    from sqlalchemy import text
+    from app.db.session import engine
+
+    enabled: Set[str] = set()
+    with engine.connect() as conn:
+        for (raw,) in conn.execute(text("SELECT enabled_modules FROM tenants WHERE is_active")):
+            try:
+                enabled.update(json.loads(raw or "[]"))
+            except (json.JSONDecodeError, TypeError):
+                continue
+        enabled.update(
+            code for (code,) in conn.execute(
+                text("SELECT DISTINCT module_code FROM tenant_modules WHERE is_enabled")
+            )
+        )
+    return enabled
+
+
+lazy_modules = LazyModuleRegistry()
+
+
+class LazyModuleMiddleware:
+    """Pure ASGI middleware that loads an optional module before its first request is routed"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket") and lazy_modules.pending():
+            path = scope.get("path", "")
+            if path in LOAD_ALL_PATHS:
+                await lazy_modules.ensure_all_loaded(trigger=path)
+            else:
+                name = lazy_modules.match(path)
+                if name:
+                    await lazy_modules.ensure_loaded(name, trigger=path)
+        await self.app(scope, receive, send)
@@ -0,0 +1,202 @@
+"""
+Keyset (cursor) pagination helpers.
+
+OFFSET pagination makes Postgres walk and discard every skipped row, so deep
+pages on large tenants (orders, activity logs, stock levels...) get linearly
+slower. Keyset pagination instead remembers the last row of the previous page
+and asks for rows strictly "after" it on an indexed (created_at, id) key, which
+costs the same on page 1 and page 10 000.
+
+Cursors are opaque to clients: a URL-safe base64 of the last row's key. Endpoints
+keep accepting page/offset for backward compatibility; when ``cursor`` is sent
+it takes precedence.
+
+Totals are optional because ``COUNT(*)`` over a filtered subquery is often the
+most expensive part of a list endpoint:
+
+- ``exact``    - run the count (default, previous behaviour)
+- ``cached``   - exact count, memoised per tenant/filter set for a short TTL
+- ``estimate`` - planner row estimate from ``EXPLAIN``, no table scan
+- ``none``     - skip the count entirely (``total`` is returned as ``None``)
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlmodel import Session, func, select
+
+from app.core.ttl_cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+TOTAL_MODES = ("exact", "cached", "estimate", "none")
+TOTAL_MODE_PATTERN = "^(exact|cached|estimate|none)$"
+
+_total_cache = TTLCache(maxsize=2048, ttl=60)
+
+
+# =====================
+# CURSOR ENCODING
+# =====================
+
+def encode_cursor(created_at: Optional[datetime], row_id: Any) -> str:
+    """Encode the (created_at, id) key of the last row of a page."""
+    payload = [created_at.isoformat() if created_at else None, str(row_id)]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    """Decode a cursor produced by :func:`encode_cursor` (400 if malformed)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# =====================
+# KEYSET QUERY
+# =====================
+
+def apply_keyset(query, created_col, id_col, cursor: Optional[str], descending: bool = True):
+    """
+    Order ``query`` by (created_col, id_col) and, if a cursor is given, keep only
+    rows after it.
+
+    The comparison is spelled out as ``a < x OR (a = x AND b < y)`` rather than a
+    row-value comparison so NULL created_at values (nullable on a few legacy
+    tables) page correctly: Postgres sorts them first in DESC and last in ASC.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            if created_at is None:
+                after = or_(
+                    and_(created_col.is_(None), id_col < row_id),
+                    created_col.isnot(None),
+                )
+            else:
+                after = or_(
+                    created_col < created_at,
+                    and_(created_col == created_at, id_col < row_id),
+                )
+        else:
+            if created_at is None:
+                after = and_(created_col.is_(None), id_col > row_id)
+            else:
+                after = or_(
+                    created_col > created_at,
+                    and_(created_col == created_at, id_col > row_id),
+                    created_col.is_(None),
+                )
+        query = query.where(after)
+
+    if descending:
+        return query.order_by(created_col.desc(), id_col.desc())
+    return query.order_by(created_col.asc(), id_col.asc())
+
+
+def fetch_keyset_page(
+    session: Session,
+    query,
+    created_col,
+    id_col,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Run one keyset page. Fetches ``limit + 1`` rows to know whether another page
+    exists, and returns ``(rows, next_cursor)`` with ``next_cursor=None`` on the
+    last page.
+    """
+    query = apply_keyset(query, created_col, id_col, cursor, descending).limit(limit + 1)
+    if len(query.column_descriptions) > 1:
+        # Column-only select (sparse fieldsets): keep Row objects, not scalars
+        rows = list(session.execute(query).all())
+    else:
+        rows = list(session.exec(query).all())
+    return page_rows(rows, limit, created_col.key, id_col.key)
+
+
+def page_rows(
+    rows: Sequence[Any],
+    limit: int,
+    created_attr: str = "created_at",
+    id_attr: str = "id",
+) -> Tuple[List[Any], Optional[str]]:
+    """Trim a ``limit + 1`` result set and build the cursor for the next page."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_attr), getattr(last, id_attr))
+
+
+# =====================
+# TOTALS
+# =====================
+
+def count_total(
+    session: Session,
+    query,
+    mode: str = "exact",
+    cache_key: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Count the rows matched by ``query`` (before ordering/limit) according to
+    ``mode``. See the module docstring for the available modes.
+    """
+    if mode == "none":
+        return None
+
+    if mode == "estimate":
+        estimate = _estimate_rows(session, query)
+        if estimate is not None:
+            return estimate
+        mode = "exact"
+
+    count_query = select(func.count()).select_from(query.order_by(None).subquery())
+
+    if mode == "cached":
+        key = cache_key or _statement_key(session, count_query)
+        cached = _total_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        total = session.exec(count_query).one()
+        _total_cache.set(key, total)
+        return total
+
+    return session.exec(count_query).one()
+
+
+def _statement_key(session: Session, statement) -> str:
+    compiled = statement.compile(dialect=session.get_bind().dialect)
+    return f"{compiled}|{sorted((k, str(v)) for k, v in compiled.params.items())}"
+
+
+def _estimate_rows(session: Session, query) -> Optional[int]:
+    """Planner row estimate for ``query`` via ``EXPLAIN (FORMAT JSON)``."""
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    try:
+        compiled = query.order_by(None).compile(dialect=bind.dialect)
+        plan = session.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.debug("Row estimate failed, falling back to exact count: %s", e)
+        return None
@@ -0,0 +1,95 @@
+"""
+Permission Cache - compiled permission matrix per (tenant_id, role)
+
+RolePermission rows (or the legacy defaults) are parsed once into a frozen
+PermissionMatrix so `resource:action` checks are a set lookup. Entries are
+invalidated by update/reset in role_permissions.py and broadcast to the
+other workers through cache_bus; PERMISSION_CACHE_TTL is the safety net.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.ttl_cache import TTLCache, MISSING
+from app.core.cache_bus import cache_bus
+
+CACHE_NAME = "permissions"
+
+
+@dataclass(frozen=True)
+class PermissionMatrix:
+    """Immutable compiled permissions for one (tenant, role)"""
+    grants: frozenset  # {"orders:view", "orders:create", ...}
+    permissions: Dict[str, tuple]  # {"orders": ("view", "create")} - original shape/order
+    modules: frozenset  # App modules; empty = all (legacy)
+
+    def allows(self, resource: str, action: str) -> bool:
+        return f"{resource}:{action}" in self.grants
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        """Legacy {"resource": ["action", ...]} shape (fresh copy)"""
+        return {resource: list(actions) for resource, actions in self.permissions.items()}
+
+    @classmethod
+    def compile(cls, permissions: Dict[str, List[str]], modules: Optional[List[str]] = None) -> "PermissionMatrix":
+        perms = {resource: tuple(actions or ()) for resource, actions in (permissions or {}).items()}
+        return cls(
+            grants=frozenset(f"{resource}:{action}" for resource, actions in perms.items() for action in actions),
+            permissions=perms,
+            modules=frozenset(modules or ()),
+        )
+
+
+EMPTY_MATRIX = PermissionMatrix.compile({})
+
+_matrix_cache = TTLCache(maxsize=settings.PERMISSION_CACHE_MAXSIZE, ttl=settings.PERMISSION_CACHE_TTL)
+
+
+def _load_matrix(session: Session, tenant_id: str, role: str) -> PermissionMatrix:
+    from app.models import RolePermission
+    from app.models.user import LEGACY_ROLE_PERMISSIONS, LegacyUserRole
+
+    role_permission = session.exec(
+        select(RolePermission).where(
+            RolePermission.tenant_id == tenant_id,
+            RolePermission.role == role
+        )
+    ).first()
+
+    if role_permission:
+        return PermissionMatrix.compile(role_permission.get_permissions(), role_permission.get_modules())
+
+    # Fall back to legacy defaults
+    try:
+        return PermissionMatrix.compile(LEGACY_ROLE_PERMISSIONS.get(LegacyUserRole(role), {}))
+    except ValueError:
+        return EMPTY_MATRIX
+
+
+def get_permission_matrix(session: Session, tenant_id: str, role: str) -> PermissionMatrix:
+    """Compiled permissions for (tenant_id, role); DB only on cache miss"""
+    key = (str(tenant_id), role)
+    matrix = _matrix_cache.get(key)
+    if matrix is MISSING:
+        matrix = _load_matrix(session, str(tenant_id), role)
+        _matrix_cache.set(key, matrix)
+    return matrix
+
+
+def _invalidate_local(key) -> None:
+    if not key:
+        _matrix_cache.clear()
+    else:
+        _matrix_cache.invalidate((key["tenant_id"], key["role"]))
+
+
+def invalidate_permission_cache(tenant_id: Optional[str] = None, role: Optional[str] = None) -> None:
+    """Drop one (tenant, role) matrix on every worker (no args = everything)"""
+    key = {"tenant_id": str(tenant_id), "role": role} if tenant_id and role else None
+    _invalidate_local(key)
+    cache_bus.publish(CACHE_NAME, key)
+
+
+cache_bus.subscribe(CACHE_NAME, _invalidate_local)
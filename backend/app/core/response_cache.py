@@ -0,0 +1,299 @@
+"""
+Response Cache - tenant-scoped cache for dashboard/chart aggregates
+
+Keys are (namespace, tenant, route, normalized params) plus a per-(tenant,
+namespace) version number. Invalidation bumps the version, so every cached
+response of that tenant/namespace becomes unreachable at once.
+
+Backends: Redis (settings.REDIS_URL) shared by all workers, or an in-process
+TTLCache when Redis is not configured or unreachable (versions are then
+broadcast through cache_bus).
+
+Stampede protection: entries have a soft expiry (ttl) and a hard expiry
+(ttl + RESPONSE_CACHE_STALE_SECONDS). After the soft expiry one request takes
+a short lock and recomputes while the others keep serving the stale value.
+
+Invalidation is event-driven: committing ORM changes to any table in
+INVALIDATION_MAP bumps the listed namespaces for the affected tenants.
+Bulk INSERT/UPDATE/DELETE statements bypass ORM events - call
+invalidate_tables() (or invalidate_namespaces()) after committing them.
+
+Usage:
+    @router.get("/stats")
+    @cached_response("dashboard", ttl=60)
+    def get_dashboard_stats(session=..., current_user=...): ...
+"""
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+from app.core.config import settings
+from app.core.ttl_cache import TTLCache, MISSING
+from app.core.cache_bus import cache_bus
+
+logger = logging.getLogger(__name__)
+
+# table name → response cache namespaces to invalidate when rows change
+INVALIDATION_MAP: Dict[str, tuple] = {
+    "orders": ("dashboard", "dispatch", "mobile_dashboard"),
+    "fuel_logs": ("dashboard",),
+    "maintenance_records": ("dashboard",),
+    "maintenance_schedules": ("dashboard",),
+    "vehicles": ("dashboard", "dispatch"),
+    "drivers": ("dashboard", "dispatch", "mobile_dashboard"),
+    "trips": ("dashboard",),
+}
+
+# Handler kwargs that are dependencies, not query params
+_NON_PARAM_KWARGS = {"session", "db", "current_user", "request", "response", "background_tasks"}
+
+_LOCK_SECONDS = 30  # Upper bound for one recompute
+_WAIT_SECONDS = 2.0  # How long a cold-miss follower waits for the leader
+_REDIS_RETRY_SECONDS = 30
+
+
+class _LocalBackend:
+    """In-process fallback: data, versions and per-key locks"""
+
+    def __init__(self):
+        self.data = TTLCache(maxsize=settings.RESPONSE_CACHE_MAXSIZE, ttl=3600)
+        self.versions: Dict[str, int] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get_version(self, vkey: str) -> int:
+        return self.versions.get(vkey, 0)
+
+    def bump_version(self, vkey: str) -> None:
+        with self._guard:
+            self.versions[vkey] = self.versions.get(vkey, 0) + 1
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self.data.get(key)
+        return None if entry is MISSING else entry
+
+    def set(self, key: str, entry: dict, hard_ttl: float) -> None:
+        self.data.set(key, entry, ttl=hard_ttl)
+
+    def try_lock(self, key: str) -> bool:
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        return lock.acquire(blocking=False)
+
+    def unlock(self, key: str) -> None:
+        with self._guard:
+            lock = self._locks.pop(key, None)
+        if lock is not None and lock.locked():
+            lock.release()
+
+
+class _RedisBackend:
+    """Redis backend shared by all workers/nodes"""
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get_version(self, vkey: str) -> int:
+        return int(self.client.get(vkey) or 0)
+
+    def bump_version(self, vkey: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.incr(vkey)
+        pipe.expire(vkey, 7 * 24 * 3600)
+        pipe.execute()
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self.client.get(key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, entry: dict, hard_ttl: float) -> None:
+        self.client.set(key, json.dumps(entry, ensure_ascii=False), ex=max(1, int(hard_ttl)))
+
+    def try_lock(self, key: str) -> bool:
+        return bool(self.client.set(f"{key}:lock", b"1", nx=True, ex=_LOCK_SECONDS))
+
+    def unlock(self, key: str) -> None:
+        self.client.delete(f"{key}:lock")
+
+
+class ResponseCache:
+    def __init__(self):
+        self._local = _LocalBackend()
+        self._redis: Optional[_RedisBackend] = None
+        self._redis_down_until = 0.0
+        if settings.REDIS_URL:
+            try:
+                self._redis = _RedisBackend(settings.REDIS_URL)
+            except Exception as e:  # redis package missing or bad URL
+                logger.warning("Response cache: Redis unavailable, using in-process cache: %s", e)
+
+    def _backend(self):
+        if self._redis is not None and time.monotonic() >= self._redis_down_until:
+            return self._redis
+        return self._local
+
+    def _redis_failed(self, e: Exception) -> None:
+        self._redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+        logger.warning("Response cache: Redis error, in-process fallback for %ss: %s", _REDIS_RETRY_SECONDS, e)
+
+    @staticmethod
+    def _version_key(tenant_id: str, namespace: str) -> str:
+        return f"rc:ver:{tenant_id}:{namespace}"
+
+    @staticmethod
+    def _data_key(namespace: str, tenant_id: str, route: str, params: dict, version: int) -> str:
+        normalized = json.dumps(jsonable_encoder(params), sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha1(f"{route}|{normalized}".encode("utf-8")).hexdigest()
+        return f"rc:{namespace}:{tenant_id}:v{version}:{digest}"
+
+    def get_or_set(
+        self,
+        namespace: str,
+        tenant_id: str,
+        route: str,
+        params: dict,
+        compute: Callable[[], Any],
+        ttl: float,
+    ) -> Any:
+        """Return the cached value for the key, computing it at most once per expiry"""
+        backend = self._backend()
+        try:
+            return self._get_or_set(backend, namespace, str(tenant_id), route, params, compute, ttl)
+        except Exception as e:
+            if backend is self._local:
+                raise
+            self._redis_failed(e)
+            return self._get_or_set(self._local, namespace, str(tenant_id), route, params, compute, ttl)
+
+    def _get_or_set(self, backend, namespace, tenant_id, route, params, compute, ttl):
+        version = backend.get_version(self._version_key(tenant_id, namespace))
+        key = self._data_key(namespace, tenant_id, route, params, version)
+
+        entry = backend.get(key)
+        now = time.time()
+        if entry is not None and entry["fresh_until"] > now:
+            return entry["value"]
+
+        if not backend.try_lock(key):
+            if entry is not None:
+                return entry["value"]  # Someone is refreshing - serve stale
+            # Cold miss: wait briefly for the leader instead of piling onto the DB
+            deadline = time.monotonic() + _WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = backend.get(key)
+                if entry is not None:
+                    return entry["value"]
+            return jsonable_encoder(compute())
+
+        try:
+            value = jsonable_encoder(compute())
+            backend.set(
+                key,
+                {"value": value, "fresh_until": time.time() + ttl},
+                hard_ttl=ttl + settings.RESPONSE_CACHE_STALE_SECONDS,
+            )
+            return value
+        finally:
+            backend.unlock(key)
+
+    def invalidate(self, tenant_id: str, namespaces: Iterable[str]) -> None:
+        """Make every cached response of these namespaces stale for the tenant"""
+        namespaces = list(namespaces)
+        backend = self._backend()
+        if backend is not self._local:
+            try:
+                for ns in namespaces:
+                    backend.bump_version(self._version_key(str(tenant_id), ns))
+                return
+            except Exception as e:
+                self._redis_failed(e)
+        self._invalidate_local({"tenant_id": str(tenant_id), "namespaces": namespaces})
+        cache_bus.publish("response_cache", {"tenant_id": str(tenant_id), "namespaces": namespaces})
+
+    def _invalidate_local(self, key: Optional[dict]) -> None:
+        if not key:
+            return
+        for ns in key["namespaces"]:
+            self._local.bump_version(self._version_key(key["tenant_id"], ns))
+
+
+response_cache = ResponseCache()
+cache_bus.subscribe("response_cache", response_cache._invalidate_local)
+
+
+def invalidate_namespaces(tenant_id: str, *namespaces: str) -> None:
+    response_cache.invalidate(tenant_id, namespaces)
+
+
+def invalidate_tables(tenant_id: str, *tables: str) -> None:
+    """Invalidate what an ORM commit to ``tables`` would have, after a bulk SQL write"""
+    namespaces = {ns for table in tables for ns in INVALIDATION_MAP.get(table, ())}
+    if namespaces:
+        response_cache.invalidate(tenant_id, namespaces)
+
+
+def cached_response(namespace: str, ttl: float = 60):
+    """
+    Decorator for sync GET handlers that take `current_user`.
+    Query params (every kwarg that is not a dependency) become part of the key.
+    """
+    def decorator(func):
+        route = f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            current_user = kwargs.get("current_user")
+            if not settings.RESPONSE_CACHE_ENABLED or current_user is None:
+                return func(*args, **kwargs)
+            params = {k: v for k, v in kwargs.items() if k not in _NON_PARAM_KWARGS}
+            return response_cache.get_or_set(
+                namespace, current_user.tenant_id, route, params,
+                lambda: func(*args, **kwargs), ttl,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+# ============ Event-driven invalidation ============
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault("_response_cache_pending", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        namespaces = INVALIDATION_MAP.get(getattr(obj, "__tablename__", None))
+        tenant_id = getattr(obj, "tenant_id", None)
+        if namespaces and tenant_id:
+            for ns in namespaces:
+                pending.add((str(tenant_id), ns))
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_committed(session):
+    pending = session.info.pop("_response_cache_pending", None)
+    if not pending:
+        return
+    by_tenant: Dict[str, set] = {}
+    for tenant_id, ns in pending:
+        by_tenant.setdefault(tenant_id, set()).add(ns)
+    for tenant_id, namespaces in by_tenant.items():
+        try:
+            response_cache.invalidate(tenant_id, namespaces)
+        except Exception as e:
+            logger.warning("Response cache invalidation failed for %s: %s", tenant_id, e)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("_response_cache_pending", None)
@@ -0,0 +1,286 @@
+"""
+In-process scheduler for periodic per-tenant jobs
+
+Every uvicorn worker runs the same loops; Postgres advisory locks decide who
+does the work:
+
+- each job runs once per interval (+/- SCHEDULER_JITTER) with a random initial
+  delay, so workers and nodes don't tick in lockstep
+- a tick lists the tenants that have work for the job and runs one slice per
+  tenant, in random order, at most SCHEDULER_MAX_CONCURRENCY at a time
+- a slice only runs while holding the advisory lock for (job, tenant); other
+  workers skip it. The lock is a lease tied to the DB connection, so a worker
+  that dies releases it automatically
+- run counts, lease skips, failures and durations are exported on /metrics
+
+Jobs are registered at import (see app/services/automation_jobs.py) and the
+loops are started from the app lifespan.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.sql_metrics import register_metrics
+from app.db.session import background_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _int32(value: str) -> int:
+    """Stable signed 32-bit key for pg_*advisory_lock(int, int)"""
+    return zlib.crc32(value.encode("utf-8")) - 2 ** 31
+
+
+@contextmanager
+def advisory_lease(namespace: str, key: str) -> Iterator[bool]:
+    """
+    Try to take the session-level advisory lock for (namespace, key).
+
+    Yields True when this process holds it for the duration of the block,
+    False when someone else does. Never waits.
+    """
+    params = {"ns": _int32(namespace), "key": _int32(key)}
+    conn = background_engine.connect()
+    acquired = False
+    try:
+        acquired = bool(conn.execute(text("SELECT pg_try_advisory_lock(:ns, :key)"), params).scalar())
+        conn.commit()
+        yield acquired
+    finally:
+        try:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:ns, :key)"), params)
+                conn.commit()
+        except Exception:
+            # Never return a connection that may still hold the lock to the pool
+            conn.invalidate()
+        conn.close()
+
+
+@contextmanager
+def advisory_leases(namespace: str, keys: List[str]) -> Iterator[List[str]]:
+    """
+    advisory_lease() for many keys on one connection: yields the keys whose
+    lock this process took (held for the block), skipping those held elsewhere.
+    """
+    ns = _int32(namespace)
+    conn = background_engine.connect()
+    acquired: List[str] = []
+    try:
+        for key in keys:
+            if conn.execute(text("SELECT pg_try_advisory_lock(:ns, :key)"), {"ns": ns, "key": _int32(key)}).scalar():
+                acquired.append(key)
+        conn.commit()
+        yield acquired
+    finally:
+        try:
+            for key in acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:ns, :key)"), {"ns": ns, "key": _int32(key)})
+            conn.commit()
+        except Exception:
+            conn.invalidate()
+        conn.close()
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    interval: float  # Seconds between ticks; <= 0 disables the schedule
+    run: Callable[..., Any]  # run(session, tenant_id, **kwargs)
+    tenants: Callable[[Session], List[str]]  # Tenants with work for this job
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    lease_skips: int = 0
+    ticks: int = 0
+    seconds_total: float = 0.0
+    seconds_max: float = 0.0
+    last_seconds: float = 0.0
+    last_tick_tenants: int = 0
+    last_success_at: float = 0.0  # Unix time
+    last_error: Optional[str] = None
+
+
+class JobScheduler:
+    def __init__(self):
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.stats: Dict[str, JobStats] = {}
+        self._lock = threading.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def register(self, job: ScheduledJob) -> None:
+        self.jobs[job.name] = job
+        self.stats.setdefault(job.name, JobStats())
+
+    # ---------- Running one slice ----------
+
+    def run_once(self, name: str, tenant_id: str, **kwargs) -> Optional[Any]:
+        """
+        Run one (job, tenant) slice under its lease. Returns the job result, or
+        None when another worker holds the lease.
+        """
+        with advisory_lease(f"job:{name}", tenant_id) as acquired:
+            if not acquired:
+                self._lease_skipped(name)
+                return None
+            return self._run_slice(name, tenant_id, kwargs)
+
+    def try_lease(self, name: str, tenant_id: str) -> Optional[ContextManager[bool]]:
+        """
+        Take the (job, tenant) lease now, for manual triggers that answer before
+        the slice runs. Returns the held lease (pass it to run_leased), or None
+        when another worker holds it.
+        """
+        if name not in self.jobs:
+            raise KeyError(name)
+        lease = advisory_lease(f"job:{name}", tenant_id)
+        if lease.__enter__():
+            return lease
+        lease.__exit__(None, None, None)
+        self._lease_skipped(name)
+        return None
+
+    def run_leased(self, lease: ContextManager[bool], name: str, tenant_id: str, **kwargs) -> Optional[Any]:
+        """Run a slice under a lease taken with try_lease, then release it"""
+        try:
+            return self._run_slice(name, tenant_id, kwargs)
+        finally:
+            lease.__exit__(None, None, None)
+
+    def _lease_skipped(self, name: str) -> None:
+        with self._lock:
+            self.stats[name].lease_skips += 1
+
+    def _run_slice(self, name: str, tenant_id: str, kwargs: Dict[str, Any]) -> Optional[Any]:
+        """Run the job for one tenant (the caller holds the lease); None when it failed"""
+        job = self.jobs[name]
+        stats = self.stats[name]
+        started = time.perf_counter()
+        try:
+            with Session(background_engine) as session:
+                result = job.run(session, tenant_id, **{**job.kwargs, **kwargs})
+        except Exception as e:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats.failures += 1
+                stats.last_error = f"{tenant_id}: {e}"
+                self._record_duration(stats, elapsed)
+            logger.exception("Scheduled job %s failed for tenant %s", name, tenant_id)
+            return None
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            stats.runs += 1
+            stats.last_success_at = time.time()
+            self._record_duration(stats, elapsed)
+        if elapsed > job.interval > 0:
+            logger.warning("Job %s for tenant %s took %.1fs, longer than its %ss interval",
+                           name, tenant_id, elapsed, job.interval)
+        return result
+
+    @staticmethod
+    def _record_duration(stats: JobStats, elapsed: float) -> None:
+        stats.last_seconds = elapsed
+        stats.seconds_total += elapsed
+        stats.seconds_max = max(stats.seconds_max, elapsed)
+
+    # ---------- Loops ----------
+
+    async def start(self) -> None:
+        if not settings.SCHEDULER_ENABLED or self._tasks:
+            return
+        self._semaphore = asyncio.Semaphore(max(1, settings.SCHEDULER_MAX_CONCURRENCY))
+        for job in self.jobs.values():
+            if job.interval > 0:
+                self._tasks.append(asyncio.create_task(self._loop(job), name=f"scheduler:{job.name}"))
+        if self._tasks:
+            logger.info("Scheduler started: %s", ", ".join(
+                f"{j.name}/{j.interval:g}s" for j in self.jobs.values() if j.interval > 0))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _delay(self, job: ScheduledJob) -> float:
+        jitter = settings.SCHEDULER_JITTER
+        return job.interval * random.uniform(1 - jitter, 1 + jitter)
+
+    async def _loop(self, job: ScheduledJob) -> None:
+        await asyncio.sleep(random.uniform(0, job.interval))
+        while True:
+            started = time.monotonic()
+            try:
+                await self.tick(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scheduler tick for %s failed", job.name)
+            await asyncio.sleep(max(0.0, self._delay(job) - (time.monotonic() - started)))
+
+    async def tick(self, job: ScheduledJob) -> None:
+        tenants = await asyncio.to_thread(self._tenants, job)
+        random.shuffle(tenants)  # Spread slices across workers competing for leases
+        with self._lock:
+            self.stats[job.name].ticks += 1
+            self.stats[job.name].last_tick_tenants = len(tenants)
+
+        async def run_slice(tenant_id: str) -> None:
+            async with self._semaphore:
+                await asyncio.to_thread(self.run_once, job.name, tenant_id)
+
+        await asyncio.gather(*(run_slice(t) for t in tenants))
+
+    def _tenants(self, job: ScheduledJob) -> List[str]:
+        with Session(background_engine) as session:
+            return [str(t) for t in job.tenants(session)]
+
+    # ---------- Reporting ----------
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": settings.SCHEDULER_ENABLED,
+                "running": bool(self._tasks),
+                "jobs": {
+                    name: {"interval": self.jobs[name].interval, **vars(stats)}
+                    for name, stats in self.stats.items()
+                },
+            }
+
+    def metrics(self):
+        with self._lock:
+            items = [(name, JobStats(**vars(s))) for name, s in self.stats.items()]
+
+        def samples(attr):
+            return [({"job": name}, getattr(s, attr)) for name, s in items]
+
+        return [
+            ("tms_scheduler_runs_total", "counter", "Job slices completed", samples("runs")),
+            ("tms_scheduler_failures_total", "counter", "Job slices that raised", samples("failures")),
+            ("tms_scheduler_lease_skips_total", "counter", "Slices skipped because another worker held the lease", samples("lease_skips")),
+            ("tms_scheduler_run_seconds_total", "counter", "Time spent running job slices", samples("seconds_total")),
+            ("tms_scheduler_run_seconds_max", "gauge", "Slowest job slice", samples("seconds_max")),
+            ("tms_scheduler_last_run_seconds", "gauge", "Duration of the last job slice", samples("last_seconds")),
+            ("tms_scheduler_last_success_timestamp", "gauge", "Unix time of the last successful slice", samples("last_success_at")),
+        ]
+
+
+scheduler = JobScheduler()
+register_metrics(scheduler.metrics)
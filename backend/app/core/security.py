@@ -1,3 +1,5 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import Depends, HTTPException, Request
@@ -6,6 +8,10 @@ from jose import jwt, JWTError
 import bcrypt
 from sqlmodel import Session, select
 
+from app.core.config import settings
+from app.core.ttl_cache import TTLCache, MISSING
+from app.core.cache_bus import cache_bus
+from app.core.permission_cache import get_permission_matrix
 from app.db.session import get_session
 from app.models import User
 
@@ -64,6 +70,64 @@ def decode_token(token: str) -> dict:
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
 
+# ============ Identity cache ============
+# token sha256 → decoded payload; user id → column snapshot of the User row.
+# Each request gets a fresh transient User built from the snapshot, so routes
+# never share (or accidentally persist) one instance. users.py/roles.py call
+# invalidate_user_cache() on updates, role changes and deactivation; the
+# cache bus fans that out to the other workers.
+
+_token_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAXSIZE, ttl=settings.AUTH_CACHE_TTL)
+_user_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAXSIZE, ttl=settings.AUTH_CACHE_TTL)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def decode_token_cached(token: str) -> dict:
+    """decode_token() with a cache; never serves a payload past its exp"""
+    key = _token_key(token)
+    payload = _token_cache.get(key)
+    if payload is not MISSING:
+        return payload
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    ttl = settings.AUTH_CACHE_TTL
+    if payload.get("exp"):
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+
+def _load_user(session: Session, user_id: str) -> User | None:
+    snapshot = _user_cache.get(user_id)
+    if snapshot is MISSING:
+        user = session.exec(select(User).where(User.id == user_id)).first()
+        if not user:
+            return None
+        snapshot = user.model_dump()
+        _user_cache.set(user_id, snapshot)
+    return User(**snapshot)
+
+
+def _invalidate_user_local(user_id: Optional[str]) -> None:
+    if user_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.invalidate(str(user_id))
+
+
+def invalidate_user_cache(user_id: Optional[str] = None) -> None:
+    """Drop the cached snapshot for one user on every worker (no args = all users)"""
+    _invalidate_user_local(user_id)
+    cache_bus.publish("users", str(user_id) if user_id is not None else None)
+
+
+cache_bus.subscribe("users", _invalidate_user_local)
+
+
 def get_current_user(
     request: Request,
     token: str = Depends(oauth2_scheme),
@@ -75,14 +139,14 @@ def get_current_user(
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        payload = jwt.decode(actual_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token_cached(actual_token)
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = session.exec(select(User).where(User.id == user_id)).first()
+    user = _load_user(session, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -100,7 +164,7 @@ def get_current_user_optional(
     try:
         if not actual_token or actual_token == "":
             return None
-        payload = jwt.decode(actual_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token_cached(actual_token)
         user_id = payload.get("sub")
         if not user_id:
             return None
@@ -108,8 +172,7 @@ def get_current_user_optional(
         return None
 
     try:
-        user = session.exec(select(User).where(User.id == user_id)).first()
-        return user
+        return _load_user(session, user_id)
     except:
         return None
 
@@ -120,29 +183,11 @@ def get_role_permissions_from_db(session: Session, user: User) -> dict:
     """
     Get permissions for user's role from RolePermission table (tenant-specific).
     Falls back to legacy defaults if not found in DB.
+    Served from the compiled permission cache (see app.core.permission_cache).
 
     Returns: {"resource": ["action1", "action2"], ...}
     """
-    from app.models import RolePermission
-    from app.models.user import LEGACY_ROLE_PERMISSIONS, LegacyUserRole
-
-    # Get from RolePermission table (tenant-specific)
-    role_permission = session.exec(
-        select(RolePermission).where(
-            RolePermission.tenant_id == user.tenant_id,
-            RolePermission.role == user.role
-        )
-    ).first()
-
-    if role_permission:
-        return role_permission.get_permissions()
-
-    # Fall back to legacy defaults
-    try:
-        role_enum = LegacyUserRole(user.role)
-        return LEGACY_ROLE_PERMISSIONS.get(role_enum, {})
-    except ValueError:
-        return {}
+    return get_permission_matrix(session, user.tenant_id, user.role).as_dict()
 
 
 def check_resource_permission(
@@ -174,12 +219,8 @@ def check_resource_permission(
     if hasattr(user, 'system_role') and user.system_role in ("SUPER_ADMIN", "TENANT_ADMIN"):
         return True
 
-    # Get permissions from tenant-specific RolePermission table
-    permissions = get_role_permissions_from_db(session, user)
-
-    # Check if resource/action is allowed
-    resource_perms = permissions.get(resource, [])
-    allowed = action in resource_perms
+    # Compiled tenant-specific permissions (cached, O(1) lookup)
+    allowed = get_permission_matrix(session, user.tenant_id, user.role).allows(resource, action)
 
     if not allowed and raise_exception:
         raise HTTPException(
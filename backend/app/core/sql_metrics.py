@@ -0,0 +1,327 @@
+"""
+SQL Metrics - per-request query instrumentation and N+1 detection
+
+SQLAlchemy cursor events record query count, DB time and statement
+fingerprints into a per-request context (contextvars survive the hop into the
+threadpool for sync handlers). SQLMetricsMiddleware opens that context,
+aggregates it per route when the response finishes, and logs a warning when a
+route issues too many queries or repeats one statement (classic N+1).
+
+render_prometheus() exposes the aggregates plus connection pool stats in
+Prometheus text format (served at /metrics). Engines built with
+TimedQueuePool also report how long checkouts waited for a connection.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Paths that are not worth instrumenting
+SKIP_PATHS = {"/metrics", "/health"}
+
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_IN_LIST_RE = re.compile(r"\(\s*(?:%\(\w+\)s|\?|\$\d+|:\w+)(?:\s*,\s*(?:%\(\w+\)s|\?|\$\d+|:\w+))*\s*\)")
+_PARAM_RE = re.compile(r"%\(\w+\)s|\$\d+|:\w+")
+_WS_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement so repeats with different params compare equal"""
+    s = _WS_RE.sub(" ", statement).strip()
+    s = _IN_LIST_RE.sub("(?)", s)
+    s = _PARAM_RE.sub("?", s)
+    s = _NUMBER_RE.sub("N", s)
+    return s[:300]
+
+
+@dataclass
+class RequestQueryStats:
+    """Queries issued while serving a single request"""
+    count: int = 0
+    db_time: float = 0.0
+    errors: int = 0  # Statements that raised (timeouts, constraint violations); included in count
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float, failed: bool = False) -> None:
+        self.count += 1
+        self.db_time += elapsed
+        self.errors += int(failed)
+        self.statements[fingerprint(statement)] += 1
+
+    def worst_repeat(self) -> Tuple[Optional[str], int]:
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("sql_request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries():
+    """Collect query stats for a block outside of a request (scripts, benchmarks)"""
+    stats = RequestQueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@dataclass
+class RouteStats:
+    """Aggregate over all requests of one route"""
+    requests: int = 0
+    queries: int = 0
+    db_seconds: float = 0.0
+    errors: int = 0  # Statements that raised
+    max_queries: int = 0
+    n_plus_one: int = 0  # Requests that repeated one statement past the threshold
+    slow: int = 0  # Requests past the query-count threshold
+
+
+_route_stats: Dict[Tuple[str, str], RouteStats] = {}
+_route_lock = threading.Lock()
+_engines: Dict[str, Engine] = {}
+
+
+# ============ Pool checkout timing ============
+
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    wait_seconds_total: float = 0.0  # Includes opening new (overflow) connections
+    wait_seconds_max: float = 0.0
+    timeouts: int = 0  # Checkouts that gave up after pool_timeout
+
+
+_pool_lock = threading.Lock()
+
+
+class _TimedPoolMixin:
+    """Measure how long each checkout waits for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            with _pool_lock:
+                self.wait_stats.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with _pool_lock:
+                stats = self.wait_stats
+                stats.checkouts += 1
+                stats.wait_seconds_total += elapsed
+                stats.wait_seconds_max = max(stats.wait_seconds_max, elapsed)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats() -> Dict[str, Dict[str, float]]:
+    """Current usage of every instrumented pool (also used by /metrics)"""
+    out = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        info: Dict[str, float] = {}
+        for key, getter in (("size", "size"), ("checked_out", "checkedout"),
+                            ("checked_in", "checkedin"), ("overflow", "overflow")):
+            if hasattr(pool, getter):
+                info[key] = getattr(pool, getter)()
+        if hasattr(pool, "_max_overflow") and "size" in info:
+            info["limit"] = info["size"] + max(0, pool._max_overflow)
+        wait = getattr(pool, "wait_stats", None)
+        if wait is not None:
+            with _pool_lock:
+                info.update(vars(wait))
+        out[name] = info
+    return out
+
+
+# ============ Engine hooks ============
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_sql_metrics_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_sql_metrics_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def _handle_error(context) -> None:
+    # after_cursor_execute never runs for a failed statement: pop its start
+    # here, or it stays on the pooled connection's info for good
+    conn = context.connection
+    if conn is None or context.statement is None:
+        return
+    starts = conn.info.get("_sql_metrics_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(context.statement, elapsed, failed=True)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Attach query hooks to a (sync) engine and register it for pool stats"""
+    if name in _engines:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    _engines[name] = engine
+
+
+# ============ Middleware ============
+
+class SQLMetricsMiddleware:
+    """Pure ASGI middleware collecting per-request SQL stats"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("path") in SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_stats.reset(token)
+            self._finish(scope, stats)
+
+    def _finish(self, scope: Scope, stats: RequestQueryStats) -> None:
+        method = scope.get("method", "GET")
+        # Route template (e.g. /api/v1/orders/{order_id}) keeps cardinality bounded
+        route = scope.get("route")
+        path = getattr(route, "path", None) or "<unmatched>"
+
+        statement, repeats = stats.worst_repeat()
+        too_many = stats.count > settings.SQL_QUERY_WARN_THRESHOLD
+        repeated = repeats >= settings.SQL_REPEAT_WARN_THRESHOLD
+
+        with _route_lock:
+            agg = _route_stats.setdefault((method, path), RouteStats())
+            agg.requests += 1
+            agg.queries += stats.count
+            agg.db_seconds += stats.db_time
+            agg.errors += stats.errors
+            agg.max_queries = max(agg.max_queries, stats.count)
+            agg.slow += int(too_many)
+            agg.n_plus_one += int(repeated)
+
+        if too_many:
+            logger.warning(
+                "SQL: %s %s issued %s queries (%.1f ms DB)",
+                method, path, stats.count, stats.db_time * 1000,
+            )
+        if repeated:
+            logger.warning(
+                "SQL: possible N+1 in %s %s - statement repeated %s times: %s",
+                method, path, repeats, statement[:200],
+            )
+
+
+# ============ Prometheus exposition ============
+
+# Other subsystems' metrics: callables returning [(name, kind, help, samples), ...]
+_metric_sources: List[Callable[[], Iterable[tuple]]] = []
+
+
+def register_metrics(source: Callable[[], Iterable[tuple]]) -> None:
+    """Add a metrics source to the /metrics exposition"""
+    _metric_sources.append(source)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def render_prometheus() -> str:
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_str = ",".join(f'{k}="{_label(str(v))}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_str}}} {value}")
+
+    with _route_lock:
+        routes = [(k, RouteStats(**vars(v))) for k, v in _route_stats.items()]
+
+    def route_samples(attr):
+        return [({"method": m, "route": p}, getattr(s, attr)) for (m, p), s in routes]
+
+    metric("tms_http_requests_total", "counter", "Requests served per route", route_samples("requests"))
+    metric("tms_sql_queries_total", "counter", "SQL statements executed per route", route_samples("queries"))
+    metric("tms_sql_seconds_total", "counter", "Time spent in SQL per route", route_samples("db_seconds"))
+    metric("tms_sql_errors_total", "counter", "SQL statements that raised per route", route_samples("errors"))
+    metric("tms_sql_queries_max", "gauge", "Most SQL statements seen in a single request", route_samples("max_queries"))
+    metric("tms_sql_n_plus_one_total", "counter", "Requests repeating one statement past the threshold", route_samples("n_plus_one"))
+    metric("tms_sql_heavy_requests_total", "counter", "Requests past the query-count threshold", route_samples("slow"))
+
+    pools = pool_stats()
+
+    def pool_samples(key):
+        return [({"pool": name}, info[key]) for name, info in pools.items() if key in info]
+
+    metric("tms_db_pool_size", "gauge", "Configured pool size", pool_samples("size"))
+    metric("tms_db_pool_limit", "gauge", "Pool size plus max overflow", pool_samples("limit"))
+    metric("tms_db_pool_checked_out", "gauge", "Connections currently in use", pool_samples("checked_out"))
+    metric("tms_db_pool_checked_in", "gauge", "Idle connections in the pool", pool_samples("checked_in"))
+    metric("tms_db_pool_overflow", "gauge", "Connections opened beyond pool_size", pool_samples("overflow"))
+    metric("tms_db_pool_checkouts_total", "counter", "Connection checkouts", pool_samples("checkouts"))
+    metric("tms_db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection", pool_samples("wait_seconds_total"))
+    metric("tms_db_pool_checkout_wait_seconds_max", "gauge", "Longest wait for a connection", pool_samples("wait_seconds_max"))
+    metric("tms_db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection", pool_samples("timeouts"))
+
+    for source in _metric_sources:
+        try:
+            for name, kind, help_text, samples in source():
+                metric(name, kind, help_text, samples)
+        except Exception as e:
+            logger.warning("Metrics source %r failed: %s", source, e)
+
+    return "\n".join(lines) + "\n"
@@ -4,19 +4,30 @@ Tenant Middleware - Detect tenant from subdomain
 Flow:
 1. Request comes to tinhung.9log.tech
 2. Middleware extracts subdomain "tinhung"
-3. Looks up tenant by code
+3. Looks up tenant by code (in-process TTL cache, DB on miss)
 4. Stores tenant_id in request.state for use in routes
 
 Usage:
 - tinhung.9log.tech → Tenant "Tín Hưng Logistics"
 - adg.9log.tech → Tenant "ADG Logistics"
 - demo.9log.tech or app.9log.tech → Demo Tenant (default)
+
+Tenant routes that change status, modules or settings must call
+invalidate_tenant_cache(); the cache bus fans the invalidation out to the
+other workers (TENANT_CACHE_TTL bounds staleness if the bus is down).
 """
+from dataclasses import dataclass
+from typing import Optional
+
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlmodel import Session, select
-from app.db.session import engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+from sqlmodel import select
+
+from app.core.config import settings
+from app.db.session import async_session_maker
 from app.models import Tenant
+from app.core.ttl_cache import TTLCache, MISSING
+from app.core.cache_bus import cache_bus
 
 
 # Default/fallback tenant codes
@@ -25,6 +36,50 @@ DEFAULT_SUBDOMAINS = ["app", "www", "demo", "localhost"]
 # Main domain (without subdomain)
 MAIN_DOMAINS = ["9log.tech", "localhost", "127.0.0.1"]
 
+# Paths that never need tenant context
+SKIP_PATHS = {"/health", "/metrics", "/docs", "/redoc", "/openapi.json", "/favicon.ico"}
+
+TENANT_CACHE_NEGATIVE_TTL = 10.0  # unknown codes: retry sooner
+TENANT_CACHE_NEGATIVE_MAXSIZE = 256  # unknown codes are cheap to forget
+
+
+@dataclass(frozen=True)
+class TenantSnapshot:
+    """Detached, immutable view of a Tenant row (safe to share across requests)"""
+    id: str
+    code: str
+    name: str
+    type: str
+    is_active: bool
+    subscription_plan: str
+    subscription_status: str
+    enabled_modules: str
+    timezone: str
+    currency: str
+    locale: str
+
+    @classmethod
+    def from_tenant(cls, tenant: Tenant) -> "TenantSnapshot":
+        return cls(
+            id=str(tenant.id),
+            code=tenant.code,
+            name=tenant.name,
+            type=tenant.type,
+            is_active=tenant.is_active,
+            subscription_plan=tenant.subscription_plan,
+            subscription_status=tenant.subscription_status,
+            enabled_modules=tenant.enabled_modules,
+            timezone=tenant.timezone,
+            currency=tenant.currency,
+            locale=tenant.locale,
+        )
+
+
+# tenant code → TenantSnapshot
+_tenant_cache = TTLCache(maxsize=settings.TENANT_CACHE_MAXSIZE, ttl=settings.TENANT_CACHE_TTL)
+# Unknown tenant codes, kept apart so random subdomains can't evict real tenants
+_unknown_codes = TTLCache(maxsize=TENANT_CACHE_NEGATIVE_MAXSIZE, ttl=TENANT_CACHE_NEGATIVE_TTL)
+
 
 def extract_subdomain(host: str) -> str | None:
     """Extract subdomain from host header
@@ -55,46 +110,102 @@ def extract_subdomain(host: str) -> str | None:
     return None
 
 
-def get_tenant_by_code(code: str) -> Tenant | None:
-    """Look up tenant by subdomain code"""
-    with Session(engine) as session:
-        tenant = session.exec(
+async def get_tenant_by_code(code: str) -> TenantSnapshot | None:
+    """Look up tenant by subdomain code (cached)"""
+    cached = _tenant_cache.get(code)
+    if cached is not MISSING:
+        return cached
+    if _unknown_codes.get(code) is not MISSING:
+        return None
+
+    async with async_session_maker() as session:
+        tenant = (await session.exec(
             select(Tenant).where(Tenant.code == code)
-        ).first()
-        return tenant
+        )).first()
+
+    if tenant:
+        snapshot = TenantSnapshot.from_tenant(tenant)
+        _tenant_cache.set(code, snapshot)
+        return snapshot
+
+    _unknown_codes.set(code, True)
+    return None
+
+
+def _invalidate_tenant_local(key: Optional[dict]) -> None:
+    code = (key or {}).get("code")
+    tenant_id = (key or {}).get("tenant_id")
+    if code is None and tenant_id is None:
+        _tenant_cache.clear()
+        _unknown_codes.clear()
+        return
+    if code is not None:
+        _tenant_cache.invalidate(code)
+        _unknown_codes.invalidate(code)
+    if tenant_id is not None:
+        _tenant_cache.invalidate_where(lambda _, snap: snap.id == tenant_id)
+
+
+def invalidate_tenant_cache(code: Optional[str] = None, tenant_id: Optional[str] = None) -> None:
+    """Drop cached tenant entries by code and/or id on every worker (no args = clear all)"""
+    key = {"code": code, "tenant_id": str(tenant_id) if tenant_id is not None else None}
+    _invalidate_tenant_local(key)
+    cache_bus.publish("tenants", key)
+
+
+cache_bus.subscribe("tenants", _invalidate_tenant_local)
+
+
+class TenantMiddleware:
+    """Pure ASGI middleware to detect tenant from subdomain and store in request.state"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
+        # request.state is backed by scope["state"]
+        state = scope.setdefault("state", {})
+        state["subdomain"] = None
+        state["tenant_code"] = None
+        state["tenant"] = None
+        state["tenant_id"] = None
 
-class TenantMiddleware(BaseHTTPMiddleware):
-    """Middleware to detect tenant from subdomain and store in request.state"""
+        if scope.get("path", "") in SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
-        # Extract host from request
-        host = request.headers.get("host", "")
+        host = ""
+        header_code = None
+        for name, value in scope.get("headers", []):
+            if name == b"host":
+                host = value.decode("latin1")
+            elif name == b"x-tenant-code":
+                header_code = value.decode("latin1")
 
         # Try to get subdomain
         subdomain = extract_subdomain(host)
 
         # Also check X-Tenant-Code header (for API calls from frontend)
-        tenant_code = request.headers.get("x-tenant-code") or subdomain
+        tenant_code = header_code or subdomain
 
-        # Store in request state
-        request.state.subdomain = subdomain
-        request.state.tenant_code = tenant_code
-        request.state.tenant = None
-        request.state.tenant_id = None
+        state["subdomain"] = subdomain
+        state["tenant_code"] = tenant_code
 
         # Look up tenant if we have a code
         if tenant_code:
-            tenant = get_tenant_by_code(tenant_code)
+            tenant = await get_tenant_by_code(tenant_code)
             if tenant:
-                request.state.tenant = tenant
-                request.state.tenant_id = str(tenant.id)
+                state["tenant"] = tenant
+                state["tenant_id"] = tenant.id
 
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
 
 
-def get_tenant_from_request(request: Request) -> Tenant | None:
+def get_tenant_from_request(request: Request) -> TenantSnapshot | None:
     """Helper to get tenant from request state (use in routes)"""
     return getattr(request.state, "tenant", None)
 
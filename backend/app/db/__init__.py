@@ -1,3 +1,10 @@
-from app.db.session import engine, get_session
+from app.db.session import (
+    engine, reporting_engine, background_engine, audit_engine,
+    get_session, async_engine, get_async_session,
+)
+from app.db.replica import get_read_session
 
-__all__ = ["engine", "get_session"]
+__all__ = [
+    "engine", "reporting_engine", "background_engine", "audit_engine",
+    "get_session", "async_engine", "get_async_session", "get_read_session",
+]
@@ -0,0 +1,172 @@
+"""
+Read-replica routing for report and dashboard endpoints
+
+get_read_session() yields a Session bound to DATABASE_REPLICA_URL so heavy
+read-only queries stay off the primary. It falls back to the primary's
+reporting pool (never the interactive one) when:
+- no replica is configured,
+- the replica failed recently (REPLICA_RETRY_SECONDS cool-down), or
+- the caller wrote something in the last READ_YOUR_WRITES_SECONDS
+  (read-your-writes stickiness, tracked by ReadYourWritesMiddleware).
+
+The stickiness is carried by a short-lived cookie (PIN_COOKIE) set on the
+mutation's response, so the next read is pinned whichever worker serves it.
+
+Only use it for handlers that never write.
+"""
+import logging
+import time
+
+from fastapi import Request
+from sqlalchemy.exc import OperationalError
+from sqlmodel import create_engine, Session
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from app.core.config import settings
+from app.core.sql_metrics import TimedQueuePool
+from app.core.ttl_cache import TTLCache, MISSING
+from app.db.session import reporting_engine
+
+logger = logging.getLogger(__name__)
+
+MUTATION_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Set for READ_YOUR_WRITES_SECONDS after a successful mutation
+PIN_COOKIE = "rw_primary"
+
+replica_engine = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        settings.DATABASE_REPLICA_URL,
+        echo=settings.SQL_ECHO,
+        pool_pre_ping=True,
+        pool_size=settings.DB_REPLICA_POOL_SIZE,
+        max_overflow=settings.DB_REPLICA_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        poolclass=TimedQueuePool,  # Checkout wait telemetry, like the other pools
+    )
+    from app.core.sql_metrics import instrument_engine
+    instrument_engine(replica_engine, "replica")
+
+# Monotonic time until which the replica is considered down
+_replica_down_until = 0.0
+
+# Caller key (user id or client address) → recent write marker, for clients
+# that do not send cookies back. Per process: with several workers it only
+# pins reads that land on the worker which handled the write (PIN_COOKIE
+# covers the rest).
+_recent_writers = TTLCache(maxsize=50000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+
+def _has_pin_cookie(scope: Scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            for cookie in value.decode("latin1").split(";"):
+                if cookie.strip().startswith(PIN_COOKIE + "="):
+                    return True
+    return False
+
+
+def _caller_key(scope: Scope) -> str | None:
+    """Identify the caller from the JWT (cookie or bearer), else client address"""
+    from app.core.security import decode_token_cached
+
+    token = None
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            for cookie in value.decode("latin1").split(";"):
+                cookie = cookie.strip()
+                if cookie.startswith("access_token="):
+                    token = cookie[13:]
+        elif name == b"authorization" and token is None:
+            auth = value.decode("latin1")
+            if auth.startswith("Bearer "):
+                token = auth[7:]
+
+    if token:
+        try:
+            return f"user:{decode_token_cached(token).get('sub')}"
+        except Exception:
+            pass
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else None
+
+
+def _is_sticky(scope: Scope) -> bool:
+    if settings.READ_YOUR_WRITES_SECONDS <= 0:
+        return False
+    if _has_pin_cookie(scope):
+        return True
+    key = _caller_key(scope)
+    return key is not None and _recent_writers.get(key) is not MISSING
+
+
+def get_read_session(request: Request):
+    """Session for read-only handlers: replica when healthy, primary otherwise"""
+    global _replica_down_until
+
+    use_replica = (
+        replica_engine is not None
+        and time.monotonic() >= _replica_down_until
+        and not _is_sticky(request.scope)
+    )
+
+    if use_replica:
+        session = Session(replica_engine)
+        try:
+            session.connection()  # Check out now so an outage falls back cleanly
+        except OperationalError as e:
+            session.close()
+            _replica_down_until = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+            logger.warning("Read replica unavailable, using primary for %ss: %s",
+                           settings.REPLICA_RETRY_SECONDS, e)
+        else:
+            with session:
+                yield session
+            return
+
+    with Session(reporting_engine) as session:
+        yield session
+
+
+_PIN_HEADER = (
+    b"set-cookie",
+    f"{PIN_COOKIE}=1; Max-Age={settings.READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax".encode("latin1"),
+)
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware: after a successful mutation, pin the caller to the primary"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") not in MUTATION_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message.get("status", 200)
+                if status_code < 400:
+                    message = {**message, "headers": [*message.get("headers", []), _PIN_HEADER]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        if status_code < 400:
+            key = _caller_key(scope)
+            if key:
+                _recent_writers.set(key, True)
+
+
+def read_engine():
+    """Engine for read-only work outside a request (exports, background reports)"""
+    if replica_engine is not None and time.monotonic() >= _replica_down_until:
+        return replica_engine
+    return reporting_engine
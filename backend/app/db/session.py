@@ -1,17 +1,194 @@
+import asyncio
+import logging
+import os
+import sys
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
 from app.core.config import settings
+from app.core.sql_metrics import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+# ============ Workload pools ============
+# Separate pools so one workload can't starve another: a runaway report or a
+# bulk job waits on its own pool instead of taking the connections drivers need
+# to update trip status. Each pool has its own statement_timeout.
+#
+# - interactive: request handlers (get_session) - `engine`; handlers that
+#                legitimately run long inline (imports, salary reports) use
+#                get_long_session, same pool with a longer statement_timeout
+# - reporting:   read-only reports/exports when no replica is configured
+#                (get_read_session / read_engine fall back here)
+# - background:  scheduler slices, durable jobs, advisory leases
+# - audit:       activity log side-writes
+# - sequence:    document number allocation (app/services/sequences.py), in a
+#                short transaction of its own while the caller's session keeps
+#                its interactive connection
+
+
+def _connect_args(statement_timeout_ms: int) -> dict:
+    """libpq startup options (psycopg2 and psycopg 3); 0 = server default"""
+    if statement_timeout_ms <= 0:
+        return {}
+    return {"options": f"-c statement_timeout={statement_timeout_ms}"}
+
+
+def _pool_options(pool_size: int, max_overflow: int, statement_timeout_ms: int) -> dict:
+    return dict(
+        echo=settings.SQL_ECHO,
+        pool_pre_ping=True,  # Check connection before use
+        pool_size=pool_size,  # Base connections in pool
+        max_overflow=max_overflow,  # Extra connections when pool is exhausted
+        pool_timeout=settings.DB_POOL_TIMEOUT,  # Wait time for connection
+        pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle stale connections
+        connect_args=_connect_args(statement_timeout_ms),
+        poolclass=TimedQueuePool,  # Checkout wait telemetry
+    )
+
 
-# High-performance database engine with connection pooling
 engine = create_engine(
     settings.DATABASE_URL,
-    echo=settings.SQL_ECHO,
-    pool_pre_ping=True,  # Check connection before use
-    pool_size=settings.DB_POOL_SIZE,  # Base connections in pool
-    max_overflow=settings.DB_MAX_OVERFLOW,  # Extra connections when pool is exhausted
-    pool_timeout=settings.DB_POOL_TIMEOUT,  # Wait time for connection
-    pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle stale connections
+    **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW, settings.DB_STATEMENT_TIMEOUT_MS),
+)
+reporting_engine = create_engine(
+    settings.DATABASE_URL,
+    **_pool_options(settings.DB_REPORTING_POOL_SIZE, settings.DB_REPORTING_MAX_OVERFLOW,
+                    settings.DB_REPORTING_STATEMENT_TIMEOUT_MS),
 )
+background_engine = create_engine(
+    settings.DATABASE_URL,
+    **_pool_options(settings.DB_BACKGROUND_POOL_SIZE, settings.DB_BACKGROUND_MAX_OVERFLOW,
+                    settings.DB_BACKGROUND_STATEMENT_TIMEOUT_MS),
+)
+audit_engine = create_engine(
+    settings.DATABASE_URL,
+    **_pool_options(settings.DB_AUDIT_POOL_SIZE, settings.DB_AUDIT_MAX_OVERFLOW,
+                    settings.DB_AUDIT_STATEMENT_TIMEOUT_MS),
+)
+sequence_engine = create_engine(
+    settings.DATABASE_URL,
+    **_pool_options(settings.DB_SEQUENCE_POOL_SIZE, settings.DB_SEQUENCE_MAX_OVERFLOW,
+                    settings.DB_SEQUENCE_STATEMENT_TIMEOUT_MS),
+)
+
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+def get_long_session():
+    """Interactive-pool session whose transactions run with DB_LONG_STATEMENT_TIMEOUT_MS"""
+    with Session(engine) as session:
+        session.info["statement_timeout_ms"] = settings.DB_LONG_STATEMENT_TIMEOUT_MS
+        yield session
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    # SET LOCAL ends with the transaction, so the pooled connection keeps the pool's timeout
+    timeout_ms = session.info.get("statement_timeout_ms")
+    if timeout_ms is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+# ============ Async engine (for `async def` route handlers) ============
+
+def to_async_url(url: str) -> str:
+    """Map a sync Postgres DSN onto the psycopg 3 async dialect.
+
+    Examples:
+    - postgresql+psycopg2://u:p@host/db → postgresql+psycopg://u:p@host/db
+    - postgresql://u:p@host/db → postgresql+psycopg://u:p@host/db
+    """
+    scheme, sep, rest = url.partition("://")
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        return f"postgresql+psycopg{sep}{rest}"
+    return url
+
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL),
+    echo=settings.SQL_ECHO,
+    pool_pre_ping=True,
+    pool_size=settings.DB_ASYNC_POOL_SIZE,
+    max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    connect_args=_connect_args(settings.DB_STATEMENT_TIMEOUT_MS),
+    poolclass=TimedAsyncQueuePool,
+)
+
+# expire_on_commit=False: attributes can't be lazily reloaded without an await,
+# so objects must stay readable after commit (e.g. when returned from a route)
+async_session_maker = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+async def get_async_session():
+    async with async_session_maker() as session:
+        yield session
+
+
+# Per-request query counts / N+1 detection / pool stats for /metrics
+instrument_engine(engine, "interactive")
+instrument_engine(reporting_engine, "reporting")
+instrument_engine(background_engine, "background")
+instrument_engine(audit_engine, "audit")
+instrument_engine(sequence_engine, "sequence")
+instrument_engine(async_engine.sync_engine, "async")
+
+
+# ============ Blocking call guard ============
+# A sync Session used from an `async def` handler executes on the event loop
+# thread and stalls every other request on the worker. Sync handlers run in
+# the threadpool, where there is no running loop, so they never trip this.
+
+_reported_call_sites: set[tuple[str, int]] = set()
+
+
+def _caller_site() -> tuple[str, int] | None:
+    """First stack frame in application code (outside app/db)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace(os.sep, "/")
+        if "/app/" in filename and "/app/db/" not in filename:
+            return filename, frame.f_lineno
+        frame = frame.f_back
+    return None
+
+
+def _guard_blocking_execute(conn, cursor, statement, parameters, context, executemany):
+    mode = settings.DB_BLOCKING_GUARD
+    if mode == "off":
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Not on the event loop thread - safe
+
+    site = _caller_site()
+    message = (
+        "Blocking DB call on the event loop"
+        + (f" at {site[0]}:{site[1]}" if site else "")
+        + f": {' '.join(statement.split())[:200]}"
+    )
+    if mode == "raise":
+        raise RuntimeError(message)
+
+    # Warn once per call site to keep logs readable
+    key = site or ("<unknown>", 0)
+    if key in _reported_call_sites:
+        return
+    _reported_call_sites.add(key)
+    logger.warning(message)
+
+
+for _engine in (engine, reporting_engine, background_engine, audit_engine, sequence_engine):
+    event.listen(_engine, "before_cursor_execute", _guard_blocking_execute)
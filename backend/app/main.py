@@ -1,4 +1,7 @@
 import logging
+import time
+
+_import_started = time.perf_counter()
 
 # Configure logging to show INFO level
 logging.basicConfig(
@@ -6,29 +9,59 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from app.api.v1.routes.orders import router as orders_router
-from app.api.v1.routes.shipments import router as shipments_router
-from app.api.v1.routes.containers import router as containers_router
-from app.api.v1.routes.stops import router as stops_router
-from app.api.v1.routes.locations import router as locations_router
-from app.api.v1.routes.trips import router as trips_router
-from app.api.v1.routes.trip_documents import router as trip_docs_router
-from app.api.v1.routes.driver_mobile import router as driver_mobile_router
-from app.api.v1.routes.drivers import router as drivers_router
-from app.api.v1.routes.vehicles import router as vehicles_router
-from app.api.v1.routes.trailers import router as trailers_router
-from app.api.v1.routes.trip_finance import router as trip_finance_router
-from app.api.v1.routes.reports import router as reports_router
-from app.api.v1.routes.cost_norms import router as cost_norms_router
-from app.api.v1.routes.auth import router as auth_router
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.routes import api_router
 from app.core.tenant_middleware import TenantMiddleware
 from app.core.activity_log_middleware import ActivityLogMiddleware
-
-app = FastAPI(title="TMS Container v1")
+from app.core.activity_log_writer import activity_log_writer
+from app.core.cache_bus import cache_bus
+from app.core.sql_metrics import SQLMetricsMiddleware, render_prometheus
+from app.core.config import settings
+from app.db.replica import ReadYourWritesMiddleware
+from app.core.lazy_modules import LazyModuleMiddleware, lazy_modules
+from app.core.serialization import DefaultJSONResponse
+from app.core.export import export_jobs
+from app.core.scheduler import scheduler
+from app.core.jobs import jobs_worker
+from app.services.gps_sync import provider_clients
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: background workers
+    await activity_log_writer.start()
+    await cache_bus.start()
+    # Optional modules some tenant uses: import in the background, don't delay readiness
+    preload = None
+    if settings.OPTIONAL_MODULES_LOADING == "tenant":
+        preload = asyncio.create_task(lazy_modules.preload_enabled(), name="preload-optional-modules")
+    # Periodic automation jobs (GPS status, ETAs, ...) - leased per tenant across workers
+    await scheduler.start()
+    # Durable job queue (bulk payroll, freight recalculation, ...) - claimed with SKIP LOCKED
+    jobs_worker.start()
+    # Background exports a previous process left unfinished
+    await asyncio.to_thread(export_jobs.recover)
+    yield
+    if preload and not preload.done():
+        preload.cancel()
+    await scheduler.stop()
+    await asyncio.to_thread(jobs_worker.stop)
+    await provider_clients.aclose()
+    # Shutdown: drain pending writes
+    await cache_bus.stop()
+    await activity_log_writer.stop()
+    export_jobs.shutdown()
+
+
+app = FastAPI(title="TMS Container v1", lifespan=lifespan, default_response_class=DefaultJSONResponse)
 
 # Add CORS middleware FIRST (before routers)
 # Support wildcard subdomains for multi-tenant
@@ -46,7 +79,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],  # Allow frontend to read download filename
+    expose_headers=["Content-Disposition", "X-Next-Cursor"],  # Download filename, keyset pagination cursor
 )
 
 # Note: Middleware runs in REVERSE order of add_middleware calls
@@ -59,22 +92,24 @@ app.add_middleware(ActivityLogMiddleware)
 # Add Tenant detection middleware (runs first, sets tenant_id in request.state)
 app.add_middleware(TenantMiddleware)
 
-#app.include_router(orders_router)
-#app.include_router(shipments_router)
-#app.include_router(containers_router)
-#app.include_router(stops_router)
-#app.include_router(locations_router)
-#app.include_router(trips_router)
-#app.include_router(trip_docs_router)
-#app.include_router(driver_mobile_router)
-#app.include_router(drivers_router)
-#app.include_router(vehicles_router)
-#app.include_router(trailers_router)
-#app.include_router(trip_finance_router)
-#app.include_router(reports_router)
-#app.include_router(cost_norms_router)
-#app.include_router(auth_router)
+# Pin callers to the primary right after they write (only matters with a replica)
+if settings.DATABASE_REPLICA_URL and settings.READ_YOUR_WRITES_SECONDS > 0:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Import optional modules (MES, project, FMS AI, CRM chat) on their first request
+app.add_middleware(LazyModuleMiddleware)
+
+# Outermost: count SQL per request (includes the middlewares above)
+app.add_middleware(SQLMetricsMiddleware)
+
 app.include_router(api_router, prefix="/api/v1")
+lazy_modules.attach(app)
+
+logger.info(
+    "App imported in %.0fms (optional modules: %s)",
+    (time.perf_counter() - _import_started) * 1000,
+    settings.OPTIONAL_MODULES_LOADING,
+)
 
 
 # Tractor-Trailer Pairings route added
@@ -84,6 +119,20 @@ def health():
     return {"ok": True}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics(request: Request):
+    """
+    Prometheus scrape endpoint: per-route SQL stats and DB pool usage.
+    Requires ``Authorization: Bearer <METRICS_TOKEN>``; 404 when no token is set.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/fix-hs-schema")
 def fix_hs_schema():
     """Add missing columns to fms_hs_codes table - run once"""
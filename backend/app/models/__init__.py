@@ -6,6 +6,7 @@ from .customer_bank_account import CustomerBankAccount
 from .customer_contact import CustomerContact, ContactType
 from .order import Order
 from .order_sequence import OrderSequence
+from .document_sequence import DocumentSequence
 from .shipment import Shipment
 from .container import Container
 from .stop import Stop
@@ -148,7 +149,7 @@ from .project import (
 
 __all__ = ["Tenant", "TenantModule", "TenantType", "SubscriptionPlan", "SubscriptionStatus", "DeploymentType"]
 __all__ += ["Role", "Permission", "UserRoleLink", "AVAILABLE_MODULES", "MODULE_RESOURCES", "DEFAULT_ROLE_TEMPLATES"]
-__all__ += ["Customer", "Order", "OrderSequence", "OrderStatusLog", "Shipment", "Container", "Stop", "Location"]
+__all__ += ["Customer", "Order", "OrderSequence", "DocumentSequence", "OrderStatusLog", "Shipment", "Container", "Stop", "Location"]
 
 __all__ += ["Vehicle", "Driver", "Trailer", "VehicleAssignment", "TractorTrailerPairing", "Trip"]
 
@@ -455,7 +456,7 @@ from .mes import (
 
 # Dispatch Center Models
 from .dispatch import (
-    VehicleGPS, VehicleWorkStatus,
+    VehicleGPS, VehicleWorkStatus, GPSBreadcrumb,
     DispatchLog, DispatchLogType,
     DispatchAlert, AlertSeverity, AlertType as DispatchAlertType,
     AIDecision,
@@ -481,7 +482,7 @@ __all__ += [
 
 # Dispatch Center
 __all__ += [
-    "VehicleGPS", "VehicleWorkStatus",
+    "VehicleGPS", "VehicleWorkStatus", "GPSBreadcrumb",
     "DispatchLog", "DispatchLogType",
     "DispatchAlert", "AlertSeverity", "DispatchAlertType",
     "AIDecision",
@@ -522,6 +523,11 @@ __all__ += [
     "ActionCost", "DEFAULT_ACTION_COSTS", "get_action_cost",
 ]
 
+# Background Jobs (durable queue for long-running operations)
+from .background_job import BackgroundJob, BackgroundJobStatus
+
+__all__ += ["BackgroundJob", "BackgroundJobStatus"]
+
 # User Task Models (Central Task Management)
 from .user_task import (
     UserTask, UserTaskStatus, UserTaskPriority, UserTaskType, UserTaskScope, UserTaskSource,
@@ -0,0 +1,65 @@
+"""
+Background Job Model - Durable queue for long-running operations
+
+Rows are claimed by workers with SELECT ... FOR UPDATE SKIP LOCKED
+(see app/core/jobs.py) and polled by clients through /jobs/{id}.
+"""
+from datetime import datetime
+from typing import Optional
+from enum import Enum
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import JSON, Text, Index, text
+from app.models.base import BaseUUIDModel, TimestampMixin, TenantScoped
+
+
+class BackgroundJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_JOB_STATUSES = (
+    BackgroundJobStatus.SUCCEEDED.value,
+    BackgroundJobStatus.FAILED.value,
+    BackgroundJobStatus.CANCELLED.value,
+)
+
+
+class BackgroundJob(BaseUUIDModel, TimestampMixin, TenantScoped, SQLModel, table=True):
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # Claim order for queued jobs; idempotency keys are unique per tenant and kind
+        Index("ix_background_jobs_claim", "status", "run_after"),
+        Index(
+            "uq_background_jobs_idempotency", "tenant_id", "kind", "idempotency_key",
+            unique=True, postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
+    )
+
+    kind: str = Field(index=True, nullable=False)  # e.g. "payroll.generate_all"
+    status: str = Field(default=BackgroundJobStatus.QUEUED.value, nullable=False)
+    payload: dict = Field(default={}, sa_column=Column(JSON))
+    result: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
+
+    # Progress (0..1) reported by the handler
+    progress: float = Field(default=0)
+    progress_message: Optional[str] = Field(default=None)
+
+    # Retries
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    run_after: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+    idempotency_key: Optional[str] = Field(default=None)
+    cancel_requested: bool = Field(default=False)
+
+    # Worker lease
+    locked_by: Optional[str] = Field(default=None)
+    heartbeat_at: Optional[datetime] = Field(default=None)
+
+    created_by: Optional[str] = Field(default=None)
+    started_at: Optional[datetime] = Field(default=None)
+    finished_at: Optional[datetime] = Field(default=None)
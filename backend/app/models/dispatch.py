@@ -1,6 +1,7 @@
 """
 Dispatch Center Models
 - VehicleGPS: Real-time GPS tracking for vehicles
+- GPSBreadcrumb: Position history (append-only, for trip replay)
 - DispatchLog: AI/Manual dispatch activity logs
 - DispatchAlert: System alerts (delays, exceptions, etc.)
 """
@@ -10,6 +11,7 @@ from datetime import datetime
 from typing import Optional
 from enum import Enum
 
+from sqlalchemy import Column, Float, SmallInteger
 from sqlmodel import SQLModel, Field
 
 from app.models.base import BaseUUIDModel, TimestampMixin, TenantScoped
@@ -58,6 +60,27 @@ class VehicleGPS(BaseUUIDModel, TimestampMixin, TenantScoped, SQLModel, table=Tr
     gps_timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
+class GPSBreadcrumb(SQLModel, table=True):
+    """
+    One GPS fix of a vehicle. VehicleGPS keeps only the latest position; this
+    keeps the history for trip replay.
+
+    Range-partitioned by month on recorded_at (partitions are created and
+    dropped by app/services/gps_track.py). Columns are kept small: real
+    coordinates (~1m), whole km/h and degrees.
+    """
+    __tablename__ = "gps_breadcrumbs"
+    __table_args__ = {"postgresql_partition_by": "RANGE (recorded_at)"}
+
+    vehicle_id: str = Field(primary_key=True)
+    recorded_at: datetime = Field(primary_key=True)  # GPS fix time (UTC)
+    tenant_id: str = Field(nullable=False)
+    latitude: float = Field(sa_column=Column(Float(precision=24), nullable=False))
+    longitude: float = Field(sa_column=Column(Float(precision=24), nullable=False))
+    speed: Optional[int] = Field(default=None, sa_column=Column(SmallInteger))  # km/h
+    heading: Optional[int] = Field(default=None, sa_column=Column(SmallInteger))  # 0-359 degrees
+
+
 class DispatchLogType(str, Enum):
     """Type of dispatch activity"""
     AUTO_ASSIGN = "auto_assign"          # AI tự động phân công
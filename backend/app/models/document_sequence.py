@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from sqlmodel import SQLModel, Field, UniqueConstraint
+from .base import BaseUUIDModel, TimestampMixin, TenantScoped
+
+
+class DocumentSequence(BaseUUIDModel, TimestampMixin, TenantScoped, SQLModel, table=True):
+    """Last number handed out per (tenant, key) - see app/services/sequences.py"""
+    __tablename__ = "document_sequences"
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "key", name="uq_document_sequences_key"),
+    )
+
+    key: str = Field(nullable=False)                  # order:ADG, invoice:2026, mes_order:MO2601
+    last_value: int = Field(default=0, nullable=False)
@@ -78,6 +78,7 @@ class GPSProvider(SQLModel, table=True):
 
     # Sync settings
     sync_interval_seconds: int = Field(default=30, description="Khoảng thời gian sync (giây)")
+    max_requests_per_minute: Optional[int] = Field(default=None, description="Giới hạn request/phút của provider (None = không giới hạn)")
     is_realtime: bool = Field(default=False, description="Có hỗ trợ WebSocket/realtime không")
     websocket_url: Optional[str] = Field(default=None)
 
@@ -148,6 +149,10 @@ class GPSSyncLog(SQLModel, table=True):
     error_message: Optional[str] = Field(default=None)
     response_time_ms: Optional[int] = Field(default=None)
 
+    # Lag (scheduled syncs): start vs. when the sync was due, and median age of the fixes received
+    schedule_lag_ms: Optional[int] = Field(default=None)
+    data_lag_seconds: Optional[int] = Field(default=None)
+
 
 # Default endpoint configurations for known providers
 GPS_PROVIDER_DEFAULTS = {
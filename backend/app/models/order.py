@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import Optional
 
 from sqlmodel import SQLModel, Field, UniqueConstraint
+from sqlalchemy import Index
 
 from app.models.base import BaseUUIDModel, TimestampMixin, TenantScoped
 
@@ -24,6 +25,11 @@ class Order(BaseUUIDModel, TimestampMixin, TenantScoped, SQLModel, table=True):
     __tablename__ = "orders"
     __table_args__ = (
         UniqueConstraint("tenant_id", "order_code", name="uq_orders_tenant_order_code"),
+        Index("ix_orders_tenant_container_code", "tenant_id", "container_code"),
+        # Salary / revenue periods are ranges over the milestone columns
+        Index("ix_orders_tenant_delivered_at", "tenant_id", "delivered_at"),
+        Index("ix_orders_tenant_driver_delivered_at", "tenant_id", "driver_id", "delivered_at"),
+        Index("ix_orders_tenant_completed_at", "tenant_id", "completed_at"),
     )
 
     # Core identification
@@ -37,6 +43,12 @@ class Order(BaseUUIDModel, TimestampMixin, TenantScoped, SQLModel, table=True):
     order_date: datetime = Field(default_factory=datetime.utcnow, index=True, nullable=False)
     customer_requested_date: Optional[datetime] = Field(default=None, nullable=True)  # Ngày KH yêu cầu giao hàng
 
+    # Milestones: when the order first reached each status (set by order_status_logger)
+    accepted_at: Optional[datetime] = Field(default=None, nullable=True)  # ACCEPTED / ASSIGNED
+    picked_up_at: Optional[datetime] = Field(default=None, nullable=True)  # IN_TRANSIT
+    delivered_at: Optional[datetime] = Field(default=None, nullable=True)  # DELIVERED - salary month
+    completed_at: Optional[datetime] = Field(default=None, nullable=True)  # COMPLETED
+
     # Pickup & Delivery (text-based initially)
     pickup_text: Optional[str] = Field(default=None, nullable=True)
     delivery_text: Optional[str] = Field(default=None, nullable=True)
@@ -91,6 +103,8 @@ class Order(BaseUUIDModel, TimestampMixin, TenantScoped, SQLModel, table=True):
     actual_delivery_at: Optional[datetime] = Field(default=None, nullable=True)  # Actual delivery time
     arrived_at_pickup_at: Optional[datetime] = Field(default=None, nullable=True)  # GPS detected arrival at pickup
     arrived_at_delivery_at: Optional[datetime] = Field(default=None, nullable=True)  # GPS detected arrival at delivery
+    departed_pickup_at: Optional[datetime] = Field(default=None, nullable=True)  # GPS detected departure from pickup (geofence exit)
+    departed_delivery_at: Optional[datetime] = Field(default=None, nullable=True)  # GPS detected departure from delivery
 
     # Cargo weight (for capacity check)
     weight_kg: Optional[float] = Field(default=None, nullable=True)  # Weight in kg
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from datetime import datetime
 from typing import Optional
 from .base import BaseUUIDModel, TenantScoped
@@ -9,6 +10,9 @@ class OrderStatusLog(BaseUUIDModel, TenantScoped, SQLModel, table=True):
     Used for salary calculation (delivered_date = when status changed to DELIVERED)
     """
     __tablename__ = "order_status_logs"
+    __table_args__ = (
+        Index("ix_order_status_logs_order_status", "order_id", "to_status", "changed_at"),
+    )
 
     order_id: str = Field(foreign_key="orders.id", index=True)
 
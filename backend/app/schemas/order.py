@@ -133,6 +133,12 @@ class OrderRead(BaseModel):
     # Rejection
     reject_reason: Optional[str] = None
 
+    # Milestones
+    accepted_at: Optional[datetime] = None
+    picked_up_at: Optional[datetime] = None
+    delivered_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
     # Timestamps
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
\ No newline at end of file
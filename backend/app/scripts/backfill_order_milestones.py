@@ -0,0 +1,47 @@
+"""
+Backfill order milestone columns
+
+Recomputes orders.accepted_at / picked_up_at / delivered_at / completed_at
+from order_status_logs, one tenant per transaction. The migration that adds
+the columns fills them; run this after editing status logs with raw SQL. Orders already in step are not rewritten, so re-running is cheap.
+
+Usage (from backend/):
+  python -m app.scripts.backfill_order_milestones
+  python -m app.scripts.backfill_order_milestones --tenant <tenant_id>
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.response_cache import invalidate_tables
+from app.db.session import background_engine
+from app.services.order_status_logger import backfill_milestones
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant", action="append", help="Tenant id (repeatable; default: all tenants)")
+    args = parser.parse_args()
+
+    with Session(background_engine) as session:
+        tenants = args.tenant or session.execute(
+            text("SELECT DISTINCT tenant_id FROM order_status_logs")
+        ).scalars().all()
+
+        total = 0
+        for tenant_id in tenants:
+            started = time.monotonic()
+            changed = backfill_milestones(session, tenant_id)
+            session.commit()
+            if changed:
+                invalidate_tables(tenant_id, "orders")
+            total += changed
+            print(f"{tenant_id}: {changed} orders updated in {time.monotonic() - started:.1f}s")
+
+    print(f"Done: {total} orders updated across {len(tenants)} tenants")
+
+
+if __name__ == "__main__":
+    main()
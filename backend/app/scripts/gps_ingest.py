@@ -0,0 +1,69 @@
+"""
+Continuous GPS ingest
+
+Polls every active GPS provider on an adaptive schedule and writes positions
+(gps_vehicle_mappings, vehicle_gps, gps_breadcrumbs) and sync logs; see
+app/services/gps_ingest.py. Run one per deployment: extra instances wait as
+hot standbys and take over when the active one stops.
+
+An instance started with --tenant (debugging, one-off runs) does not take the
+deployment lease and runs next to the main one; the per-provider lease around
+each sync keeps the two from polling a provider at the same time.
+
+Usage (from backend/):
+  python -m app.scripts.gps_ingest
+  python -m app.scripts.gps_ingest --tenant <tenant_id>
+  python -m app.scripts.gps_ingest --once
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import time
+
+from app.core.scheduler import advisory_lease
+from app.services.gps_ingest import GPSIngestDaemon
+
+logger = logging.getLogger("app.scripts.gps_ingest")
+
+# Standby instances retry the lease this often
+STANDBY_RETRY_SECONDS = 15
+
+
+async def _run(daemon: GPSIngestDaemon, once: bool) -> None:
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, daemon.stop)
+    await daemon.run(once=once)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant", action="append", help="Tenant id (repeatable; default: all tenants)")
+    parser.add_argument("--once", action="store_true", help="Sync every provider once and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.tenant:
+        # Never holds the deployment lease: the main daemon keeps polling every tenant
+        asyncio.run(_run(GPSIngestDaemon(args.tenant), args.once))
+        return
+
+    # One unfiltered poller per deployment
+    while True:
+        with advisory_lease("gps_ingest", "all") as acquired:
+            if acquired:
+                asyncio.run(_run(GPSIngestDaemon(args.tenant), args.once))
+                return
+        if args.once:
+            logger.info("Another GPS ingest instance is running; nothing to do")
+            return
+        logger.info("Another GPS ingest instance holds the lease; standing by")
+        try:
+            time.sleep(STANDBY_RETRY_SECONDS)
+        except KeyboardInterrupt:
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Startup time budget
+
+Imports app.main in a fresh interpreter with ``-X importtime`` and reports
+where cold-start time goes: total import time against the budget, the
+heaviest packages (app sub-packages and third-party libraries) and the
+slowest individual modules.
+
+Usage (from backend/):
+  python -m app.scripts.startup_budget
+  python -m app.scripts.startup_budget --budget-ms 3000 --top 30
+  python -m app.scripts.startup_budget --eager        # include optional modules (MES, project, ...)
+
+Exits with status 1 when the total is over budget, so it can gate CI.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+# app modules are grouped this deep: app.api.v1.routes.fms, app.models.fms, app.services.x
+_APP_GROUP_DEPTH = {"app.api.v1.routes": 5, "app.models": 3, "app.services": 3}
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def run_import(eager: bool) -> Tuple[List[ImportRecord], float]:
+    """Import app.main in a child interpreter; return import records and wall time (ms)"""
+    env = dict(os.environ)
+    env["OPTIONAL_MODULES_LOADING"] = "eager" if eager else "lazy"
+    code = (
+        "import time; t = time.perf_counter(); import app.main; "
+        "print(f'WALL_MS={(time.perf_counter() - t) * 1000:.1f}')"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"Importing app.main failed (exit {proc.returncode})")
+
+    records = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+
+    wall_ms = 0.0
+    for line in proc.stdout.splitlines():
+        if line.startswith("WALL_MS="):
+            wall_ms = float(line.split("=", 1)[1])
+    return records, wall_ms
+
+
+def group_of(module: str) -> str:
+    for prefix, depth in _APP_GROUP_DEPTH.items():
+        if module == prefix or module.startswith(prefix + "."):
+            return ".".join(module.split(".")[:depth])
+    if module.startswith("app."):
+        return ".".join(module.split(".")[:2])
+    return module.split(".")[0]
+
+
+def group_totals(records: List[ImportRecord]) -> Dict[str, int]:
+    """Self time summed per group (no double counting across nested imports)"""
+    totals: Dict[str, int] = defaultdict(int)
+    for record in records:
+        totals[group_of(record.module)] += record.self_us
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report app.main import time against a budget")
+    parser.add_argument("--budget-ms", type=int, default=settings.STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=20, help="Rows per table")
+    parser.add_argument("--eager", action="store_true", help="Also import optional modules at startup")
+    args = parser.parse_args(argv)
+
+    records, wall_ms = run_import(args.eager)
+    total_us = sum(r.self_us for r in records)
+    total_ms = total_us / 1000
+
+    print(f"Startup import budget ({'eager' if args.eager else 'lazy'} optional modules)")
+    print(f"  import time : {total_ms:8.0f} ms   ({len(records)} modules)")
+    print(f"  wall time   : {wall_ms:8.0f} ms")
+    print(f"  budget      : {args.budget_ms:8d} ms   ({total_ms / args.budget_ms * 100:.0f}% used)")
+
+    print(f"\nHeaviest packages (self time, top {args.top})")
+    print(f"  {'package':<45} {'ms':>8} {'budget':>7}")
+    for name, us in sorted(group_totals(records).items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {name:<45} {us / 1000:8.1f} {us / 1000 / args.budget_ms * 100:6.1f}%")
+
+    print(f"\nSlowest modules (self time, top {args.top})")
+    print(f"  {'module':<60} {'self ms':>8} {'cum ms':>8}")
+    for record in sorted(records, key=lambda r: r.self_us, reverse=True)[:args.top]:
+        print(f"  {record.module:<60} {record.self_us / 1000:8.1f} {record.cumulative_us / 1000:8.1f}")
+
+    if total_ms > args.budget_ms:
+        print(f"\nOVER BUDGET by {total_ms - args.budget_ms:.0f} ms")
+        return 1
+    print("\nWithin budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
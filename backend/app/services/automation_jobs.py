@@ -4,16 +4,23 @@ TMS Automation Background Jobs
 - Auto-assign drivers
 - GPS-based status detection
 - ETA recalculation
+
+Registered with the in-process scheduler (app/core/scheduler.py) at the
+intervals in AUTOMATION_*_INTERVAL; the /automation endpoints run a job now.
 """
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Optional, Dict
 from sqlmodel import Session, select, and_, or_
 from app.models import (
-    Order, Driver, Vehicle, Customer,
-    VehicleGPS, AIDecision, DispatchLog, DispatchAlert
+    Order, Driver, Vehicle,
+    AIDecision, DispatchLog, DispatchAlert
 )
 from app.models.order import OrderStatus
+from app.models.tenant import Tenant
+from app.core.config import settings
+from app.core.response_cache import invalidate_tables
+from app.core.scheduler import ScheduledJob, scheduler
 from app.models.dispatch import DispatchLogType, AlertType, AlertSeverity
 from app.services.order_validator import get_order_validator
 from app.services.driver_scorer import get_driver_scorer
@@ -235,202 +242,97 @@ class AutomationJobs:
         self,
         session: Session,
         tenant_id: str,
-        limit: int = 100
+        limit: Optional[int] = None
     ) -> dict:
         """
-        Detect order status changes from GPS data
+        Detect order arrivals/departures from GPS data
+
+        Every active order's current stop is checked against its vehicle's
+        latest position in one batch (see app/services/geofence_batch.py).
 
         Args:
             session: Database session
             tenant_id: Tenant ID
-            limit: Maximum number of orders to check
+            limit: Maximum number of orders to check (default: all)
 
         Returns:
             Dict with results
         """
-        # Get active orders with GPS tracking
-        orders = session.exec(
-            select(Order).where(
-                and_(
-                    Order.tenant_id == tenant_id,
-                    Order.status.in_([OrderStatus.ASSIGNED, OrderStatus.IN_TRANSIT]),
-                    Order.driver_id != None,
-                    Order.vehicle_id != None
-                )
-            ).limit(limit)
-        ).all()
-
-        detected_pickup = 0
-        detected_delivery = 0
-        errors = 0
-
-        for order in orders:
-            try:
-                # Get vehicle GPS
-                gps = session.exec(
-                    select(VehicleGPS).where(
-                        and_(
-                            VehicleGPS.vehicle_id == order.vehicle_id,
-                            VehicleGPS.tenant_id == tenant_id
-                        )
-                    ).order_by(VehicleGPS.gps_timestamp.desc())
-                ).first()
-
-                if not gps or not gps.latitude or not gps.longitude:
-                    continue
-
-                # Check pickup arrival
-                if order.status == OrderStatus.ASSIGNED:
-                    if not order.arrived_at_pickup_at:
-                        if self.geofencing.check_order_pickup_arrival(
-                            gps.latitude, gps.longitude, order, session
-                        ):
-                            order.arrived_at_pickup_at = datetime.utcnow()
-                            session.add(order)
-                            detected_pickup += 1
-                            logger.info(f"Detected arrival at pickup for order {order.order_code}")
-
-                # Check delivery arrival
-                elif order.status == OrderStatus.IN_TRANSIT:
-                    if not order.arrived_at_delivery_at:
-                        if self.geofencing.check_order_delivery_arrival(
-                            gps.latitude, gps.longitude, order, session
-                        ):
-                            order.arrived_at_delivery_at = datetime.utcnow()
-                            # Auto-update to DELIVERED if arrived > 5 minutes ago
-                            if (datetime.utcnow() - order.arrived_at_delivery_at).total_seconds() > 300:
-                                order.status = OrderStatus.DELIVERED
-                                order.actual_delivery_at = datetime.utcnow()
-                            session.add(order)
-                            detected_delivery += 1
-                            logger.info(f"Detected arrival at delivery for order {order.order_code}")
-
-            except Exception as e:
-                errors += 1
-                logger.error(f"Error detecting GPS status for order {order.id}: {e}")
+        # NumPy is loaded on first use, not at app startup
+        from app.services.geofence_batch import apply_transitions
 
+        now = datetime.utcnow()
+        transitions = self.geofencing.evaluate_active_orders(session, tenant_id, limit=limit, now=now)
+        apply_transitions(session, transitions, at=now)
         session.commit()
+        if transitions:
+            invalidate_tables(tenant_id, "orders")
+
+        counts = {(stop, kind): 0 for stop in ("pickup", "delivery") for kind in ("arrival", "departure")}
+        for t in transitions:
+            counts[(t.stop, t.kind)] += 1
+            logger.info(f"Detected {t.kind} at {t.stop} for order {t.order_code} ({t.distance_m:.0f}m)")
 
         return {
-            "processed": len(orders),
-            "detected_pickup": detected_pickup,
-            "detected_delivery": detected_delivery,
-            "errors": errors
+            "transitions": len(transitions),
+            "detected_pickup": counts[("pickup", "arrival")],
+            "detected_delivery": counts[("delivery", "arrival")],
+            "departed_pickup": counts[("pickup", "departure")],
+            "departed_delivery": counts[("delivery", "departure")],
         }
 
     def recalculate_etas(
         self,
         session: Session,
         tenant_id: str,
-        limit: int = 100
+        limit: Optional[int] = None
     ) -> dict:
         """
         Recalculate ETAs for active orders based on current GPS location
 
+        All active orders are estimated in one batch and written with bulk
+        UPDATEs (see app/services/eta_batch.py). A late order gets a delay
+        alert unless it already has an unresolved one.
+
         Args:
             session: Database session
             tenant_id: Tenant ID
-            limit: Maximum number of orders to process
+            limit: Maximum number of orders to process (default: all)
 
         Returns:
             Dict with results
         """
-        # Get active orders with GPS
-        orders = session.exec(
-            select(Order).where(
-                and_(
-                    Order.tenant_id == tenant_id,
-                    Order.status.in_([OrderStatus.ASSIGNED, OrderStatus.IN_TRANSIT]),
-                    Order.driver_id != None,
-                    Order.vehicle_id != None
-                )
-            ).limit(limit)
-        ).all()
-
-        updated = 0
-        alerts_created = 0
-        errors = 0
-
-        for order in orders:
-            try:
-                # Get vehicle GPS
-                gps = session.exec(
-                    select(VehicleGPS).where(
-                        and_(
-                            VehicleGPS.vehicle_id == order.vehicle_id,
-                            VehicleGPS.tenant_id == tenant_id
-                        )
-                    ).order_by(VehicleGPS.gps_timestamp.desc())
-                ).first()
-
-                if not gps or not gps.latitude or not gps.longitude:
-                    continue
-
-                # Get target coordinates
-                if order.status == OrderStatus.ASSIGNED:
-                    target_coords = self.distance_calculator.get_coordinates_from_site(
-                        order.pickup_site_id, session
-                    )
-                    target_eta = order.eta_pickup_at
-                else:
-                    target_coords = self.distance_calculator.get_coordinates_from_site(
-                        order.delivery_site_id, session
-                    )
-                    target_eta = order.eta_delivery_at
-
-                if not target_coords or not target_eta:
-                    continue
-
-                # Calculate remaining distance
-                current_location = (gps.latitude, gps.longitude)
-                remaining_km = self.distance_calculator.calculate_distance(
-                    current_location, target_coords
-                )
-
-                if remaining_km is None:
-                    continue
-
-                # Estimate travel time (assume average speed 50 km/h)
-                avg_speed_kmh = 50.0
-                estimated_hours = remaining_km / avg_speed_kmh
-                new_eta = datetime.utcnow() + timedelta(hours=estimated_hours)
-
-                # Update ETA
-                if order.status == OrderStatus.ASSIGNED:
-                    order.eta_pickup_at = new_eta
-                else:
-                    order.eta_delivery_at = new_eta
-
-                session.add(order)
+        # NumPy is loaded on first use, not at app startup
+        from app.services.eta_batch import apply_estimates, estimate_tenant, orders_with_open_delay_alert
 
-                # Check for delay
-                delay_minutes = (new_eta - target_eta).total_seconds() / 60
+        estimates = estimate_tenant(session, tenant_id, limit=limit)
+        apply_estimates(session, estimates)
 
-                # Get customer delay threshold
-                customer = session.get(Customer, order.customer_id)
-                threshold_minutes = customer.delay_alert_threshold_minutes if customer else 15
-
-                if delay_minutes > threshold_minutes:
-                    # Create delay alert
-                    self._create_delay_alert(
-                        session, tenant_id, order,
-                        delay_minutes=delay_minutes
-                    )
-                    alerts_created += 1
-
-                updated += 1
-
-            except Exception as e:
-                errors += 1
-                logger.error(f"Error recalculating ETA for order {order.id}: {e}")
+        late = [e for e in estimates if e.late]
+        alerted = orders_with_open_delay_alert(session, tenant_id, [e.order_id for e in late])
+        alerts_created = 0
+        for e in late:
+            if e.order_id in alerted:
+                continue
+            self._create_delay_alert(
+                session, tenant_id,
+                order_id=e.order_id,
+                order_code=e.order_code,
+                driver_id=e.driver_id,
+                vehicle_id=e.vehicle_id,
+                delay_minutes=e.delay_minutes
+            )
+            alerted.add(e.order_id)
+            alerts_created += 1
 
         session.commit()
+        if estimates:
+            invalidate_tables(tenant_id, "orders")
 
         return {
-            "processed": len(orders),
-            "updated": updated,
+            "updated": len(estimates),
+            "late": len(late),
             "alerts_created": alerts_created,
-            "errors": errors
         }
 
     def _log_auto_action(
@@ -490,7 +392,10 @@ class AutomationJobs:
         self,
         session: Session,
         tenant_id: str,
-        order: Order,
+        order_id: str,
+        order_code: str,
+        driver_id: Optional[str],
+        vehicle_id: Optional[str],
         delay_minutes: float
     ):
         """Create delay alert"""
@@ -498,10 +403,10 @@ class AutomationJobs:
             tenant_id=tenant_id,
             alert_type=AlertType.DELAY.value,
             severity=AlertSeverity.WARNING.value if delay_minutes <= 30 else AlertSeverity.CRITICAL.value,
-            order_id=order.id,
-            vehicle_id=order.vehicle_id,
-            driver_id=order.driver_id,
-            title=f"Trễ tiến độ: Đơn {order.order_code}",
+            order_id=order_id,
+            vehicle_id=vehicle_id,
+            driver_id=driver_id,
+            title=f"Trễ tiến độ: Đơn {order_code}",
             message=f"Ước tính trễ {delay_minutes:.0f} phút so với lịch trình",
             is_auto=True
         )
@@ -518,3 +423,60 @@ def get_automation_jobs() -> AutomationJobs:
     if _automation_jobs is None:
         _automation_jobs = AutomationJobs()
     return _automation_jobs
+
+
+# ============ Schedule ============
+
+ACTIVE_ORDER_STATUSES = [OrderStatus.ASSIGNED, OrderStatus.IN_TRANSIT]
+
+
+def _tenants_with_orders(session: Session, *conditions) -> List[str]:
+    """Active tenants having at least one order matching ``conditions``"""
+    return list(session.exec(
+        select(Order.tenant_id)
+        .join(Tenant, Tenant.id == Order.tenant_id)
+        .where(Tenant.is_active == True, *conditions)
+        .distinct()
+    ).all())
+
+
+def _tenants_with_new_orders(session: Session) -> List[str]:
+    return _tenants_with_orders(session, Order.status == OrderStatus.NEW)
+
+
+def _tenants_with_unassigned_orders(session: Session) -> List[str]:
+    return _tenants_with_orders(
+        session,
+        Order.status == OrderStatus.ACCEPTED,
+        or_(Order.driver_id == None, Order.driver_id == ""),
+    )
+
+
+def _tenants_with_active_orders(session: Session) -> List[str]:
+    # Orders have no vehicle column: the vehicle is the driver's tractor
+    return _tenants_with_orders(
+        session,
+        Order.status.in_(ACTIVE_ORDER_STATUSES),
+        Order.driver_id != None,
+    )
+
+
+def _job(method: str):
+    """Scheduler entry point calling an AutomationJobs method on the singleton"""
+    def run(session: Session, tenant_id: str, **kwargs) -> dict:
+        return getattr(get_automation_jobs(), method)(session, tenant_id, **kwargs)
+    run.__name__ = method
+    return run
+
+
+for _scheduled in (
+    ScheduledJob("auto_accept_orders", settings.AUTOMATION_AUTO_ACCEPT_ORDERS_INTERVAL,
+                 _job("auto_accept_orders"), _tenants_with_new_orders, {"limit": 50}),
+    ScheduledJob("auto_assign_drivers", settings.AUTOMATION_AUTO_ASSIGN_DRIVERS_INTERVAL,
+                 _job("auto_assign_drivers"), _tenants_with_unassigned_orders, {"limit": 50}),
+    ScheduledJob("detect_gps_status", settings.AUTOMATION_DETECT_GPS_STATUS_INTERVAL,
+                 _job("detect_gps_status"), _tenants_with_active_orders),
+    ScheduledJob("recalculate_etas", settings.AUTOMATION_RECALCULATE_ETAS_INTERVAL,
+                 _job("recalculate_etas"), _tenants_with_active_orders),
+):
+    scheduler.register(_scheduled)
@@ -18,26 +18,18 @@ from app.models.billing import (
 )
 from app.models.tenant import Tenant
 from app.services.billing.credit_calculator import get_usage_breakdown
+from app.services import sequences
 
 
 def get_next_invoice_number(session: Session) -> str:
-    """Generate next invoice number: INV-YYYY-NNNNNN"""
+    """Generate next invoice number: INV-YYYY-NNNNNN (platform-wide sequence per year)"""
     year = datetime.utcnow().year
     prefix = f"INV-{year}-"
 
-    # Find max invoice number for this year
-    last_invoice = session.exec(
-        select(BillingInvoice)
-        .where(BillingInvoice.invoice_number.like(f"{prefix}%"))
-        .order_by(BillingInvoice.invoice_number.desc())
-    ).first()
-
-    if last_invoice:
-        # Extract the number part and increment
-        last_num = int(last_invoice.invoice_number.split("-")[-1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
+    next_num = sequences.allocate(
+        session, sequences.GLOBAL_TENANT, f"invoice:{year}",
+        seed=sequences.max_suffix("billing_invoices", "invoice_number", prefix),
+    )[0]
 
     return f"{prefix}{next_num:06d}"
 
@@ -0,0 +1,170 @@
+"""
+Batch ETA recalculation for active orders
+
+recalculate_etas used to walk the active orders one at a time: latest
+VehicleGPS, site coordinates and customer per order, then an alert per late
+order on every tick. A tick now:
+
+1. loads the current stop of every active order (with its planned ETA and the
+   customer's delay threshold) and the latest position of every vehicle, with
+   the geofencing loaders (app/services/geofence_batch.py)
+2. computes remaining distance and ETA for all orders as one NumPy expression:
+   straight-line km * ETA_ROUTE_FACTOR at ETA_AVG_SPEED_KMH. As in geofencing,
+   positions older than GEOFENCE_MAX_FIX_AGE_SECONDS are not used: an order
+   whose tracker went quiet keeps its ETA and raises no delay alert
+3. writes the order ETAs with one UPDATE and the vehicles' eta_destination /
+   remaining_km with another
+4. raises a DELAY alert for late orders, except those that already have an
+   unresolved one
+
+Delay is measured against the ETA first planned for the stop. It is kept in
+original_eta_*_at the first time the ETA is overwritten, so re-estimating
+doesn't move the baseline.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import DispatchAlert
+from app.models.dispatch import AlertType
+from app.services.geofence_batch import (
+    ActiveStops,
+    VehiclePositions,
+    _unix,
+    haversine_m,
+    load_active_stops,
+    load_latest_positions,
+)
+
+_UPDATE_ORDERS = text("""
+    UPDATE orders o SET
+        original_eta_pickup_at = CASE WHEN u.stop = 'pickup'
+            THEN COALESCE(o.original_eta_pickup_at, o.eta_pickup_at) ELSE o.original_eta_pickup_at END,
+        eta_pickup_at = CASE WHEN u.stop = 'pickup' THEN u.eta ELSE o.eta_pickup_at END,
+        original_eta_delivery_at = CASE WHEN u.stop = 'delivery'
+            THEN COALESCE(o.original_eta_delivery_at, o.eta_delivery_at) ELSE o.original_eta_delivery_at END,
+        eta_delivery_at = CASE WHEN u.stop = 'delivery' THEN u.eta ELSE o.eta_delivery_at END
+    FROM unnest(CAST(:ids AS varchar[]), CAST(:stops AS varchar[]), CAST(:etas AS timestamp[])) AS u(id, stop, eta)
+    WHERE o.id = u.id
+""")
+
+_UPDATE_VEHICLE_GPS = text("""
+    UPDATE vehicle_gps g SET eta_destination = u.eta, remaining_km = u.km
+    FROM unnest(CAST(:ids AS varchar[]), CAST(:etas AS timestamp[]), CAST(:kms AS double precision[])) AS u(id, eta, km)
+    WHERE g.id = u.id
+""")
+
+
+@dataclass
+class EtaEstimate:
+    order_id: str
+    order_code: str
+    driver_id: str
+    vehicle_id: str
+    gps_id: str
+    stop: str  # "pickup" / "delivery"
+    eta: datetime
+    remaining_km: float
+    delay_minutes: float
+    late: bool  # delay_minutes above the customer's threshold
+
+
+def estimate(
+    stops: ActiveStops,
+    positions: VehiclePositions,
+    now: Optional[datetime] = None,
+    avg_speed_kmh: Optional[float] = None,
+    route_factor: Optional[float] = None,
+    max_fix_age: Optional[float] = None,
+) -> List[EtaEstimate]:
+    """ETA of every active order's current stop from the latest positions (pure; writes nothing)"""
+    if not len(stops) or not len(positions.gps_ids):
+        return []
+    avg_speed_kmh = avg_speed_kmh or settings.ETA_AVG_SPEED_KMH
+    route_factor = settings.ETA_ROUTE_FACTOR if route_factor is None else route_factor
+    max_fix_age = settings.GEOFENCE_MAX_FIX_AGE_SECONDS if max_fix_age is None else max_fix_age
+    now = now or datetime.utcnow()
+    now_ts = _unix(now)
+
+    rows = positions.align(stops.vehicle_ids)
+    has_fix = rows >= 0
+    safe = np.where(has_fix, rows, 0)
+    lat = np.where(has_fix, positions.latitude[safe], np.nan)
+    lng = np.where(has_fix, positions.longitude[safe], np.nan)
+    fresh = has_fix & (now_ts - positions.timestamp[safe] <= max_fix_age)
+
+    remaining_km = haversine_m(lat, lng, stops.latitude, stops.longitude) / 1000.0 * route_factor
+    travel_s = remaining_km / avg_speed_kmh * 3600.0
+    delay_min = (now_ts + travel_s - stops.planned_eta) / 60.0
+    # Orders without a fresh position or a planned ETA are left alone
+    valid = fresh & ~np.isnan(remaining_km) & ~np.isnan(stops.planned_eta)
+    late = valid & (delay_min > stops.delay_threshold_minutes)
+
+    estimates = []
+    for i in np.flatnonzero(valid):
+        estimates.append(EtaEstimate(
+            order_id=stops.order_ids[i],
+            order_code=stops.order_codes[i],
+            driver_id=stops.driver_ids[i],
+            vehicle_id=stops.vehicle_ids[i],
+            gps_id=positions.gps_ids[rows[i]],
+            stop=stops.stops[i],
+            eta=now + timedelta(seconds=float(travel_s[i])),
+            remaining_km=round(float(remaining_km[i]), 2),
+            delay_minutes=float(delay_min[i]),
+            late=bool(late[i]),
+        ))
+    return estimates
+
+
+def estimate_tenant(
+    session: Session, tenant_id: str, limit: Optional[int] = None, now: Optional[datetime] = None
+) -> List[EtaEstimate]:
+    """Load a tenant's active stops and vehicle positions (two queries) and estimate their ETAs"""
+    stops = load_active_stops(session, tenant_id, limit)
+    if not len(stops):
+        return []
+    return estimate(stops, load_latest_positions(session, tenant_id), now)
+
+
+def apply_estimates(session: Session, estimates: List[EtaEstimate]) -> None:
+    """Write order ETAs and vehicle ETAs: one UPDATE each"""
+    if not estimates:
+        return
+    session.execute(_UPDATE_ORDERS, {
+        "ids": [e.order_id for e in estimates],
+        "stops": [e.stop for e in estimates],
+        "etas": [e.eta for e in estimates],
+    })
+
+    # A vehicle shows the ETA of the stop it is driving to: its IN_TRANSIT
+    # order (delivery) over an ASSIGNED one, then the nearest
+    per_vehicle: Dict[str, EtaEstimate] = {}
+    for e in estimates:
+        current = per_vehicle.get(e.gps_id)
+        if current is None or (e.stop != "delivery", e.remaining_km) < (current.stop != "delivery", current.remaining_km):
+            per_vehicle[e.gps_id] = e
+    session.execute(_UPDATE_VEHICLE_GPS, {
+        "ids": list(per_vehicle),
+        "etas": [e.eta for e in per_vehicle.values()],
+        "kms": [e.remaining_km for e in per_vehicle.values()],
+    })
+
+
+def orders_with_open_delay_alert(session: Session, tenant_id: str, order_ids: List[str]) -> Set[str]:
+    """Orders among ``order_ids`` that already have an unresolved DELAY alert"""
+    if not order_ids:
+        return set()
+    return set(session.exec(
+        select(DispatchAlert.order_id).where(
+            DispatchAlert.tenant_id == tenant_id,
+            DispatchAlert.alert_type == AlertType.DELAY.value,
+            DispatchAlert.is_resolved == False,
+            DispatchAlert.order_id.in_(order_ids),
+        )
+    ).all())
@@ -0,0 +1,250 @@
+"""
+Batch geofencing for active orders
+
+detect_gps_status used to query each active order's vehicle position and
+site separately and compare them one pair at a time. A tick now:
+
+1. loads the current stop of every active order in one query: pickup while
+   ASSIGNED, delivery while IN_TRANSIT. Each stop has its coordinates (site,
+   else the site's location, else the order's location), its radius and its
+   fence state
+2. loads the latest position of every vehicle of the tenant in one query
+3. computes all order-to-vehicle haversine distances as one NumPy expression
+4. compares them to the fences with hysteresis. A vehicle arrives within
+   the radius but only departs beyond radius * GEOFENCE_EXIT_FACTOR; in
+   between the previous state stands, so a truck parked at the edge of a
+   fence doesn't flap. Positions older than GEOFENCE_MAX_FIX_AGE_SECONDS
+   are not evaluated
+
+The fence state lives on the order (arrived_at_* / departed_*_at), so every
+worker sees the same state, and transitions are written with one UPDATE per
+kind. The order's vehicle is its driver's tractor. The same loaders feed
+the ETA recalculation (app/services/eta_batch.py).
+"""
+import calendar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, text
+from sqlmodel import Session
+
+from app.core.config import settings
+
+EARTH_RADIUS_M = 6371000.0
+
+# Fence radius when the site has none (matches Site.geofence_radius_meters)
+DEFAULT_RADIUS_M = 100.0
+
+# Delay alert threshold when the customer has none (matches Customer.delay_alert_threshold_minutes)
+DEFAULT_DELAY_THRESHOLD_MINUTES = 15
+
+_STOPS = """
+    SELECT o.id AS order_id, o.order_code, o.status, o.driver_id,
+           COALESCE(d.tractor_id, d.vehicle_id) AS vehicle_id,
+           CASE WHEN o.status = 'ASSIGNED' THEN 'pickup' ELSE 'delivery' END AS stop,
+           COALESCE(NULLIF(s.latitude, 0), NULLIF(sl.latitude, 0), NULLIF(ol.latitude, 0)) AS latitude,
+           COALESCE(NULLIF(s.longitude, 0), NULLIF(sl.longitude, 0), NULLIF(ol.longitude, 0)) AS longitude,
+           COALESCE(s.geofence_radius_meters, :default_radius) AS radius_m,
+           CASE WHEN o.status = 'ASSIGNED' THEN o.arrived_at_pickup_at ELSE o.arrived_at_delivery_at END AS arrived_at,
+           CASE WHEN o.status = 'ASSIGNED' THEN o.departed_pickup_at ELSE o.departed_delivery_at END AS departed_at,
+           CASE WHEN o.status = 'ASSIGNED' THEN COALESCE(o.original_eta_pickup_at, o.eta_pickup_at)
+                ELSE COALESCE(o.original_eta_delivery_at, o.eta_delivery_at) END AS planned_eta_at,
+           COALESCE(c.delay_alert_threshold_minutes, :default_delay_threshold) AS delay_threshold_minutes
+    FROM orders o
+    LEFT JOIN drivers d ON d.id = o.driver_id
+    LEFT JOIN customers c ON c.id = o.customer_id
+    LEFT JOIN sites s ON s.id = CASE WHEN o.status = 'ASSIGNED' THEN o.pickup_site_id ELSE o.delivery_site_id END
+    LEFT JOIN locations sl ON sl.id = s.location_id
+    LEFT JOIN locations ol ON ol.id = CASE WHEN o.status = 'ASSIGNED' THEN o.pickup_location_id ELSE o.delivery_location_id END
+    WHERE o.tenant_id = :tenant_id
+      AND o.status IN ('ASSIGNED', 'IN_TRANSIT')
+      AND o.driver_id IS NOT NULL
+    ORDER BY o.id
+"""
+
+_POSITIONS = text("""
+    SELECT DISTINCT ON (vehicle_id) id, vehicle_id, latitude, longitude, speed, gps_timestamp
+    FROM vehicle_gps
+    WHERE tenant_id = :tenant_id
+    ORDER BY vehicle_id, gps_timestamp DESC
+""")
+
+# (stop, kind) -> UPDATE applying that transition to a set of orders
+_TRANSITIONS = {
+    ("pickup", "arrival"): "arrived_at_pickup_at = COALESCE(arrived_at_pickup_at, :at), departed_pickup_at = NULL",
+    ("pickup", "departure"): "departed_pickup_at = :at",
+    ("delivery", "arrival"): "arrived_at_delivery_at = COALESCE(arrived_at_delivery_at, :at), departed_delivery_at = NULL",
+    ("delivery", "departure"): "departed_delivery_at = :at",
+}
+
+
+@dataclass
+class ActiveStops:
+    """Current stop of each active order, as parallel arrays"""
+    order_ids: List[str]
+    order_codes: List[str]
+    statuses: List[str]
+    driver_ids: List[str]
+    vehicle_ids: List[Optional[str]]
+    stops: List[str]  # "pickup" / "delivery"
+    latitude: np.ndarray  # NaN: no coordinates
+    longitude: np.ndarray
+    radius_m: np.ndarray
+    inside: np.ndarray  # bool: arrived and not departed since
+    planned_eta: np.ndarray  # Unix seconds of the ETA first planned for the stop, NaN: none
+    delay_threshold_minutes: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.order_ids)
+
+
+@dataclass
+class VehiclePositions:
+    """Latest vehicle_gps row of each vehicle, as parallel arrays"""
+    index: Dict[str, int]  # vehicle_id -> row
+    gps_ids: List[str]
+    latitude: np.ndarray
+    longitude: np.ndarray
+    speed: np.ndarray  # km/h, NaN when unknown
+    timestamp: np.ndarray  # Unix seconds
+
+    def align(self, vehicle_ids: Iterable[Optional[str]]) -> np.ndarray:
+        """Row of each vehicle (-1 when it has no position)"""
+        return np.fromiter((self.index.get(v, -1) for v in vehicle_ids), dtype=np.int64)
+
+
+@dataclass
+class GeofenceTransition:
+    order_id: str
+    order_code: str
+    vehicle_id: str
+    stop: str  # "pickup" / "delivery"
+    kind: str  # "arrival" / "departure"
+    distance_m: float
+
+
+def haversine_m(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in meters between arrays of points (NaN in, NaN out)"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _unix(value: datetime) -> float:
+    """Unix time of a naive UTC datetime"""
+    return calendar.timegm(value.timetuple()) + value.microsecond / 1e6
+
+
+def _floats(values) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _timestamps(values) -> np.ndarray:
+    return np.array([np.nan if v is None else _unix(v) for v in values], dtype=np.float64)
+
+
+def load_active_stops(session: Session, tenant_id: str, limit: Optional[int] = None) -> ActiveStops:
+    query = text(_STOPS + ("    LIMIT :limit" if limit else ""))
+    params = {
+        "tenant_id": str(tenant_id),
+        "default_radius": DEFAULT_RADIUS_M,
+        "default_delay_threshold": DEFAULT_DELAY_THRESHOLD_MINUTES,
+    }
+    if limit:
+        params["limit"] = limit
+    rows = session.execute(query, params).all()
+    return ActiveStops(
+        order_ids=[r.order_id for r in rows],
+        order_codes=[r.order_code for r in rows],
+        statuses=[r.status for r in rows],
+        driver_ids=[r.driver_id for r in rows],
+        vehicle_ids=[r.vehicle_id for r in rows],
+        stops=[r.stop for r in rows],
+        latitude=_floats(r.latitude for r in rows),
+        longitude=_floats(r.longitude for r in rows),
+        radius_m=_floats(r.radius_m for r in rows),
+        inside=np.array([r.arrived_at is not None and r.departed_at is None for r in rows], dtype=bool),
+        planned_eta=_timestamps(r.planned_eta_at for r in rows),
+        delay_threshold_minutes=_floats(r.delay_threshold_minutes for r in rows),
+    )
+
+
+def load_latest_positions(session: Session, tenant_id: str) -> VehiclePositions:
+    rows = session.execute(_POSITIONS, {"tenant_id": str(tenant_id)}).all()
+    return VehiclePositions(
+        index={r.vehicle_id: i for i, r in enumerate(rows)},
+        gps_ids=[r.id for r in rows],
+        latitude=_floats(r.latitude for r in rows),
+        longitude=_floats(r.longitude for r in rows),
+        speed=_floats(r.speed for r in rows),
+        timestamp=_timestamps(r.gps_timestamp for r in rows),
+    )
+
+
+def evaluate(
+    stops: ActiveStops,
+    positions: VehiclePositions,
+    now: Optional[datetime] = None,
+    exit_factor: Optional[float] = None,
+    max_fix_age: Optional[float] = None,
+) -> List[GeofenceTransition]:
+    """Arrivals and departures for every active order, from the latest positions (pure; writes nothing)"""
+    if not len(stops):
+        return []
+    exit_factor = settings.GEOFENCE_EXIT_FACTOR if exit_factor is None else exit_factor
+    max_fix_age = settings.GEOFENCE_MAX_FIX_AGE_SECONDS if max_fix_age is None else max_fix_age
+    now_ts = _unix(now or datetime.utcnow())
+
+    rows = positions.align(stops.vehicle_ids)
+    has_fix = rows >= 0
+    safe = np.where(has_fix, rows, 0)
+    if len(positions.gps_ids):
+        lat = np.where(has_fix, positions.latitude[safe], np.nan)
+        lng = np.where(has_fix, positions.longitude[safe], np.nan)
+        fresh = has_fix & (now_ts - positions.timestamp[safe] <= max_fix_age)
+    else:
+        lat = lng = np.full(len(stops), np.nan)
+        fresh = np.zeros(len(stops), dtype=bool)
+
+    distance = haversine_m(lat, lng, stops.latitude, stops.longitude)
+    valid = fresh & ~np.isnan(distance)
+    arrived = valid & ~stops.inside & (distance <= stops.radius_m)
+    departed = valid & stops.inside & (distance > stops.radius_m * exit_factor)
+
+    transitions = []
+    for kind, mask in (("arrival", arrived), ("departure", departed)):
+        for i in np.flatnonzero(mask):
+            transitions.append(GeofenceTransition(
+                order_id=stops.order_ids[i],
+                order_code=stops.order_codes[i],
+                vehicle_id=stops.vehicle_ids[i],
+                stop=stops.stops[i],
+                kind=kind,
+                distance_m=round(float(distance[i]), 1),
+            ))
+    return transitions
+
+
+def evaluate_tenant(
+    session: Session, tenant_id: str, limit: Optional[int] = None, now: Optional[datetime] = None
+) -> List[GeofenceTransition]:
+    """Load a tenant's active stops and vehicle positions (two queries) and evaluate them"""
+    stops = load_active_stops(session, tenant_id, limit)
+    if not len(stops):
+        return []
+    return evaluate(stops, load_latest_positions(session, tenant_id), now)
+
+
+def apply_transitions(session: Session, transitions: List[GeofenceTransition], at: Optional[datetime] = None) -> None:
+    """Record transitions on the orders: one UPDATE per (stop, kind)"""
+    at = at or datetime.utcnow()
+    grouped: Dict[tuple, List[str]] = {}
+    for t in transitions:
+        grouped.setdefault((t.stop, t.kind), []).append(t.order_id)
+    for key, order_ids in grouped.items():
+        session.execute(
+            text(f"UPDATE orders SET {_TRANSITIONS[key]} WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": order_ids, "at": at},
+        )
@@ -2,12 +2,19 @@
 Geofencing Service
 Check if GPS location is within geofence radius of a target location
 Used for GPS-based status detection (arrival at pickup/delivery)
+
+Single checks are below; evaluate_active_orders checks every active order of
+a tenant at once (app/services/geofence_batch.py).
 """
 import math
 import logging
-from typing import Optional, Tuple
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from app.services.distance_calculator_advanced import get_distance_calculator
 
+if TYPE_CHECKING:
+    from app.services.geofence_batch import GeofenceTransition
+
 logger = logging.getLogger(__name__)
 
 
@@ -152,6 +159,22 @@ class GeofencingService:
         gps_location = (vehicle_gps_lat, vehicle_gps_lon)
         return self.is_within_geofence(gps_location, delivery_coords, radius_meters)
 
+    def evaluate_active_orders(
+        self,
+        session,
+        tenant_id: str,
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List["GeofenceTransition"]:
+        """
+        Arrival/departure transitions of all active orders of a tenant, from
+        the latest vehicle positions (two queries, one vectorized pass).
+        Nothing is written; see geofence_batch.apply_transitions.
+        """
+        from app.services.geofence_batch import evaluate_tenant
+
+        return evaluate_tenant(session, tenant_id, limit=limit, now=now)
+
 
 # Singleton instance
 _geofencing_service: Optional[GeofencingService] = None
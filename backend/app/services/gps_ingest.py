@@ -0,0 +1,244 @@
+"""
+Continuous GPS ingest
+
+Polls every GPS provider on its own schedule so dispatch boards stay fresh
+without anyone calling /dispatch/sync-gps. Run it with
+``python -m app.scripts.gps_ingest``; one unfiltered instance per deployment
+holds the deployment lease, others wait as hot standbys. Each sync also holds a
+per-provider lease, so an instance started with --tenant never polls a
+provider at the same time as the main one.
+
+Each provider's interval adapts to its vehicles, re-checked every
+GPS_INGEST_REFRESH_SECONDS:
+
+- active (a mapped vehicle is moving, or its driver has an ASSIGNED/IN_TRANSIT order):
+  GPS_INGEST_ACTIVE_SECONDS, or the provider's sync_interval_seconds if shorter
+- idle (everything parked / off duty): GPS_INGEST_IDLE_SECONDS, or
+  sync_interval_seconds if longer
+- otherwise (no mapped vehicles yet): sync_interval_seconds
+
+and never shorter than the provider's max_requests_per_minute allows for one
+request per sync. Syncs that make more (a TOKEN provider's login or refresh)
+are held back further by ProviderClientPool.retry_at, which counts the
+requests actually sent in the last minute. A failing provider backs off
+exponentially (up to GPS_INGEST_MAX_BACKOFF_SECONDS) and a Retry-After from
+the provider is honoured. Due providers are synced together through
+GPSSyncService.sync_providers; each sync log records how late the sync
+started (schedule_lag_ms) and how old the received fixes were
+(data_lag_seconds).
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import bindparam, text
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.scheduler import advisory_leases
+from app.db.session import background_engine
+from app.models import GPSProvider, GPSProviderStatus
+from app.services.gps_sync import GPSSyncService, provider_clients
+
+logger = logging.getLogger(__name__)
+
+# Advisory lease namespace: one lease per provider while it is being synced
+PROVIDER_LEASE = "gps_ingest:provider"
+
+# Providers polled by the daemon; INACTIVE ones were never connected successfully
+POLLED_STATUSES = (GPSProviderStatus.ACTIVE.value, GPSProviderStatus.ERROR.value)
+
+_ACTIVITY = text("""
+    SELECT m.provider_id,
+           bool_or(m.last_speed >= :moving_kmh) AS moving,
+           bool_or(EXISTS (
+               SELECT 1 FROM drivers d JOIN orders o ON o.driver_id = d.id
+               WHERE COALESCE(d.tractor_id, d.vehicle_id) = m.vehicle_id
+                 AND o.tenant_id = m.tenant_id AND o.status IN ('ASSIGNED', 'IN_TRANSIT')
+           )) AS on_order
+    FROM gps_vehicle_mappings m
+    WHERE m.is_active AND m.provider_id IN :ids
+    GROUP BY m.provider_id
+""").bindparams(bindparam("ids", expanding=True))
+
+
+@dataclass
+class ProviderSchedule:
+    provider_id: str
+    name: str
+    interval: float
+    state: str  # "active", "idle" or "normal"
+    next_due: float = 0.0  # time.monotonic()
+    last_started: float = 0.0
+
+
+def provider_interval(provider: GPSProvider, state: str) -> float:
+    """Seconds between polls of ``provider`` in ``state``, after rate limit and error backoff"""
+    base = float(max(1, provider.sync_interval_seconds or 30))
+    if state == "active":
+        interval = min(base, settings.GPS_INGEST_ACTIVE_SECONDS)
+    elif state == "idle":
+        interval = max(base, settings.GPS_INGEST_IDLE_SECONDS)
+    else:
+        interval = base
+
+    if provider.max_requests_per_minute:
+        # One request per sync; provider_clients.retry_at accounts for the extra ones
+        interval = max(interval, 60.0 / provider.max_requests_per_minute)
+    if provider.error_count:
+        backoff = interval * 2 ** min(provider.error_count, 10)
+        interval = max(interval, min(backoff, settings.GPS_INGEST_MAX_BACKOFF_SECONDS))
+    return interval
+
+
+class GPSIngestDaemon:
+    def __init__(self, tenant_ids: Optional[List[str]] = None):
+        self.tenant_ids = tenant_ids
+        self.schedules: Dict[str, ProviderSchedule] = {}
+        self._in_flight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    # ---------- Schedule ----------
+
+    def _load(self) -> List[dict]:
+        """Providers to poll with their current state (runs in a worker thread)"""
+        with Session(background_engine) as session:
+            query = select(GPSProvider).where(
+                GPSProvider.is_active == True,
+                GPSProvider.status.in_(POLLED_STATUSES),
+            )
+            if self.tenant_ids:
+                query = query.where(GPSProvider.tenant_id.in_(self.tenant_ids))
+            providers = session.exec(query).all()
+            if not providers:
+                return []
+
+            activity = {
+                row.provider_id: row
+                for row in session.execute(_ACTIVITY, {
+                    "ids": [p.id for p in providers], "moving_kmh": settings.GPS_INGEST_MOVING_KMH,
+                })
+            }
+            loaded = []
+            for p in providers:
+                row = activity.get(p.id)
+                if row is None:
+                    state = "normal"
+                elif row.moving or row.on_order:
+                    state = "active"
+                else:
+                    state = "idle"
+                loaded.append({"id": p.id, "name": p.name, "state": state, "interval": provider_interval(p, state)})
+            return loaded
+
+    async def refresh(self) -> None:
+        loaded = await asyncio.to_thread(self._load)
+        now = time.monotonic()
+        current = {}
+        for item in loaded:
+            schedule = self.schedules.get(item["id"])
+            if schedule is None:
+                schedule = ProviderSchedule(item["id"], item["name"], item["interval"], item["state"], next_due=now)
+            else:
+                if item["state"] != schedule.state:
+                    logger.info("GPS provider %s is now %s (every %.0fs)", item["name"], item["state"], item["interval"])
+                schedule.name, schedule.state, schedule.interval = item["name"], item["state"], item["interval"]
+                if schedule.last_started:
+                    # A shorter interval (vehicle started moving) takes effect now, not after the old wait
+                    schedule.next_due = min(schedule.next_due, schedule.last_started + schedule.interval)
+            current[item["id"]] = schedule
+        self.schedules = current
+
+    def _due(self, now: float) -> List[ProviderSchedule]:
+        return [
+            s for s in self.schedules.values()
+            if s.next_due <= now and s.provider_id not in self._in_flight
+            and provider_clients.retry_at(s.provider_id) <= now
+        ]
+
+    # ---------- Syncing ----------
+
+    async def _sync(self, batch: List[ProviderSchedule]) -> None:
+        ids = [s.provider_id for s in batch]
+        now_wall, now = datetime.utcnow(), time.monotonic()
+        # Wall-clock time each sync was due, for the lag recorded in its log
+        due_at = {s.provider_id: now_wall - timedelta(seconds=max(0.0, now - s.next_due)) for s in batch}
+        for s in batch:
+            s.last_started = now
+            s.next_due = max(now + s.interval, provider_clients.retry_at(s.provider_id))
+        session = Session(background_engine)
+        leases = advisory_leases(PROVIDER_LEASE, ids)
+        try:
+            # DB calls run in worker threads; the loop keeps polling other providers
+            leased = await asyncio.to_thread(leases.__enter__)
+            if len(leased) < len(ids):
+                logger.info("GPS ingest: %d providers are being synced by another instance", len(ids) - len(leased))
+            try:
+                if leased:
+                    providers = await asyncio.to_thread(
+                        lambda: session.exec(select(GPSProvider).where(GPSProvider.id.in_(leased))).all()
+                    )
+                    results = await GPSSyncService(session).sync_providers(
+                        list(providers), sync_type="scheduled", due_at=due_at
+                    )
+                    failed = sum(1 for r in results if not r.get("success"))
+                    if failed:
+                        logger.warning("GPS ingest: %d of %d provider syncs failed", failed, len(results))
+            finally:
+                await asyncio.to_thread(leases.__exit__, None, None, None)
+        except Exception:
+            logger.exception("GPS ingest batch failed (%s)", ", ".join(ids))
+        finally:
+            await asyncio.to_thread(session.close)
+            self._in_flight.difference_update(ids)
+
+    def _start(self, batch: List[ProviderSchedule]) -> None:
+        self._in_flight.update(s.provider_id for s in batch)
+        task = asyncio.create_task(self._sync(batch), name="gps-ingest-sync")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # ---------- Loop ----------
+
+    async def run(self, once: bool = False) -> None:
+        """Poll until stop() (or, with ``once``, sync every provider one time and return)"""
+        await self.refresh()
+        logger.info("GPS ingest polling %d providers", len(self.schedules))
+        if once:
+            if self.schedules:
+                self._start(list(self.schedules.values()))
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await provider_clients.aclose()
+            return
+
+        next_refresh = time.monotonic() + settings.GPS_INGEST_REFRESH_SECONDS
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            if now >= next_refresh:
+                try:
+                    await self.refresh()
+                except Exception:
+                    logger.exception("GPS ingest could not reload providers")
+                next_refresh = now + settings.GPS_INGEST_REFRESH_SECONDS
+
+            due = self._due(now)
+            if due:
+                self._start(due)
+
+            upcoming = [s.next_due for s in self.schedules.values() if s.provider_id not in self._in_flight]
+            wait = min([next_refresh, *upcoming]) - time.monotonic()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=min(max(wait, 0.2), 5.0))
+            except asyncio.TimeoutError:
+                pass
+
+        # Let running syncs write their results
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await provider_clients.aclose()
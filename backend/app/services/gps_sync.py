@@ -1,93 +1,319 @@
 """
 GPS Sync Service - Service để đồng bộ dữ liệu GPS từ các nhà cung cấp
+
+Several providers (of one or many tenants) sync together:
+
+- fetches run concurrently, at most GPS_SYNC_CONCURRENCY at a time, each
+  bounded by GPS_SYNC_TIMEOUT_SECONDS, so one slow provider doesn't hold up
+  the others
+- each provider keeps a long-lived keep-alive client (ProviderClientPool)
+  instead of a new connection + TLS handshake per sync
+- access tokens are cached per process until shortly before they expire;
+  one login/refresh per provider at a time
+- every request to a provider (login and token refresh included) counts
+  against its max_requests_per_minute; retry_at() holds the next sync back
+  until the last minute's budget has room for as many requests as the
+  previous sync made
+- mappings, vehicle_gps, sync logs, provider status and position history of
+  every provider are written in one flush and commit, after all fetches, in a
+  worker thread so the event loop keeps serving other syncs
 """
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Deque, Set, Tuple
+from datetime import datetime, timedelta, timezone
 import httpx
 import json
 import asyncio
 import hashlib
+import logging
+import time
 from sqlmodel import Session, select
+from app.core.config import settings
 from app.models import (
     GPSProvider, GPSProviderType, GPSAuthType, GPSProviderStatus,
-    GPSVehicleMapping, GPSSyncLog, Vehicle
+    GPSVehicleMapping, GPSSyncLog, Vehicle, VehicleGPS, VehicleWorkStatus,
 )
+from app.services.gps_track import breadcrumb, record_breadcrumbs
 
+logger = logging.getLogger(__name__)
 
-class GPSSyncService:
-    """Service để đồng bộ dữ liệu GPS từ các nhà cung cấp"""
+# Tokens are renewed this long before they expire, so none expires mid-request
+TOKEN_EXPIRY_MARGIN = timedelta(seconds=60)
 
-    def __init__(self, db: Session):
-        self.db = db
-        self.timeout = httpx.Timeout(30.0)  # 30 seconds timeout
 
-    async def sync_provider(self, provider: GPSProvider) -> Dict[str, Any]:
-        """Đồng bộ dữ liệu từ một provider"""
-        sync_log = GPSSyncLog(
-            tenant_id=provider.tenant_id,
-            provider_id=provider.id,
-            sync_type="manual",
-            started_at=datetime.utcnow(),
-            success=False,
-            vehicles_synced=0,
+@dataclass
+class _Token:
+    access_token: Optional[str]
+    refresh_token: Optional[str]
+    expires_at: datetime
+
+
+class ProviderClientPool:
+    """
+    Long-lived httpx clients and cached access tokens, per provider (per process).
+
+    Clients are bound to the event loop that made them, so they are kept per
+    (provider, loop). A client is replaced (and closed) when the provider's base
+    URL changes; aclose() closes the clients of every loop still running.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, asyncio.AbstractEventLoop], Tuple[str, httpx.AsyncClient]] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self._tokens: Dict[str, _Token] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._retry_at: Dict[str, float] = {}  # provider_id -> time.monotonic() it asked us to wait until
+        self._limits: Dict[str, int] = {}  # provider_id -> max_requests_per_minute (0 = no limit)
+        self._sent: Dict[str, Deque[float]] = {}  # provider_id -> time.monotonic() of requests in the last minute
+        self._sent_total: Dict[str, int] = {}  # provider_id -> requests sent by this process
+        self._per_sync: Dict[str, int] = {}  # provider_id -> requests its last sync made
+
+    def client(self, provider: GPSProvider) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        self._forget_closed_loops()
+        self._limits[provider.id] = provider.max_requests_per_minute or 0
+        base_url = provider.api_base_url.rstrip('/')
+        key = (provider.id, loop)
+        entry = self._clients.get(key)
+        if entry and entry[0] == base_url and not entry[1].is_closed:
+            return entry[1]
+        if entry:
+            task = loop.create_task(entry[1].aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+        provider_id = provider.id
+
+        async def count_request(request: httpx.Request) -> None:
+            self._note_request(provider_id)
+
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.GPS_SYNC_TIMEOUT_SECONDS, connect=settings.GPS_SYNC_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=settings.GPS_SYNC_MAX_KEEPALIVE,
+                                max_keepalive_connections=settings.GPS_SYNC_MAX_KEEPALIVE),
+            # Bình Anh endpoints are served with certificates that don't verify
+            verify=provider.provider_type != GPSProviderType.BINH_ANH.value,
+            event_hooks={"request": [count_request]},
         )
-        self.db.add(sync_log)
+        self._clients[key] = (base_url, client)
+        return client
 
-        start_time = datetime.utcnow()
+    def _forget_closed_loops(self) -> None:
+        """
+        Drop clients of loops that have ended without aclose() (a script's
+        asyncio.run). They can't be closed from another loop; dropping them
+        releases their sockets.
+        """
+        for key in [k for k in self._clients if k[1].is_closed()]:
+            del self._clients[key]
+        self._closing = {t for t in self._closing if not t.get_loop().is_closed()}
 
+    def note_response(self, provider_id: str, response: httpx.Response) -> None:
+        """Remember a provider's Retry-After (429/503) so the next sync waits for it"""
+        if response.status_code not in (429, 503):
+            return
         try:
-            # Lấy client phù hợp với provider type
-            locations = await self._fetch_locations(provider)
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            delay = 60.0  # Missing or an HTTP date: wait a minute
+        self._retry_at[provider_id] = time.monotonic() + max(0.0, delay)
 
-            # Cập nhật vehicle mappings
-            vehicles_synced = await self._update_vehicle_locations(
-                provider, locations
-            )
+    def _note_request(self, provider_id: str) -> None:
+        self._sent.setdefault(provider_id, deque()).append(time.monotonic())
+        self._sent_total[provider_id] = self._sent_total.get(provider_id, 0) + 1
 
-            # Cập nhật sync log
-            sync_log.completed_at = datetime.utcnow()
-            sync_log.success = True
-            sync_log.vehicles_synced = vehicles_synced
-            sync_log.response_time_ms = int(
-                (datetime.utcnow() - start_time).total_seconds() * 1000
-            )
+    def requests_sent(self, provider_id: str) -> int:
+        """Requests sent to the provider by this process so far"""
+        return self._sent_total.get(provider_id, 0)
+
+    def note_sync(self, provider_id: str, requests: int) -> None:
+        """Requests one sync made (location calls plus any login/refresh), budgeted for the next one"""
+        self._per_sync[provider_id] = max(1, requests)
 
-            # Cập nhật provider status
-            provider.status = GPSProviderStatus.ACTIVE.value
-            provider.last_sync_at = datetime.utcnow()
-            provider.last_error = None
-            provider.error_count = 0
+    def retry_at(self, provider_id: str) -> float:
+        """
+        time.monotonic() before which the provider must not be called (0 = any
+        time): its Retry-After, or until its max_requests_per_minute budget has
+        room for another sync of the size of the last one
+        """
+        at = self._retry_at.get(provider_id, 0.0)
+        limit = self._limits.get(provider_id)
+        sent = self._sent.get(provider_id)
+        if limit and sent:
+            window_start = time.monotonic() - 60.0
+            while sent and sent[0] <= window_start:
+                sent.popleft()
+            excess = len(sent) + self._per_sync.get(provider_id, 1) - limit
+            if excess > 0:
+                # Room once the oldest `excess` requests have left the window
+                at = max(at, sent[min(excess, len(sent)) - 1] + 60.0)
+        return at
+
+    def lock(self, provider_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(provider_id, asyncio.Lock())
+
+    def cached_token(self, provider: GPSProvider) -> Optional[_Token]:
+        """Token still valid for a while: from this process, or saved on the provider by another one"""
+        deadline = datetime.utcnow() + TOKEN_EXPIRY_MARGIN
+        token = self._tokens.get(provider.id)
+        if token and token.expires_at > deadline:
+            return token
+        if provider.access_token and provider.token_expires_at and provider.token_expires_at > deadline:
+            token = _Token(provider.access_token, provider.refresh_token, provider.token_expires_at)
+            self._tokens[provider.id] = token
+            return token
+        return None
+
+    def store_token(self, provider: GPSProvider) -> None:
+        self._tokens[provider.id] = _Token(provider.access_token, provider.refresh_token, provider.token_expires_at)
+
+    def forget(self, provider_id: str) -> None:
+        self._tokens.pop(provider_id, None)
+
+    async def aclose(self) -> None:
+        """Close every client: on this loop directly, on other running loops through that loop"""
+        loop = asyncio.get_running_loop()
+        entries = list(self._clients.items())
+        self._clients.clear()
+        closing = []
+        for (_, owner), (_, client) in entries:
+            if owner is loop:
+                closing.append(client.aclose())
+            elif owner.is_running():
+                closing.append(asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), owner)))
+        closing.extend(t for t in self._closing if t.get_loop() is loop)
+        await asyncio.gather(*closing, return_exceptions=True)
+
+
+provider_clients = ProviderClientPool()
 
-            self.db.commit()
 
-            return {
-                "success": True,
-                "vehicles_synced": vehicles_synced,
-                "response_time_ms": sync_log.response_time_ms,
-            }
+class GPSSyncService:
+    """Service để đồng bộ dữ liệu GPS từ các nhà cung cấp"""
 
-        except Exception as e:
-            # Log error
-            sync_log.completed_at = datetime.utcnow()
-            sync_log.success = False
-            sync_log.error_message = str(e)[:500]
-            sync_log.response_time_ms = int(
-                (datetime.utcnow() - start_time).total_seconds() * 1000
-            )
+    def __init__(self, db: Session):
+        self.db = db
+        self.timeout = httpx.Timeout(30.0)  # 30 seconds timeout (connection tests)
 
-            # Update provider error status
-            provider.last_error = str(e)[:500]
-            provider.error_count = (provider.error_count or 0) + 1
-            if provider.error_count >= 5:
-                provider.status = GPSProviderStatus.ERROR.value
+    async def sync_provider(self, provider: GPSProvider) -> Dict[str, Any]:
+        """Đồng bộ dữ liệu từ một provider"""
+        return (await self.sync_providers([provider]))[0]
 
-            self.db.commit()
+    async def sync_providers(
+        self,
+        providers: List[GPSProvider],
+        sync_type: str = "manual",
+        due_at: Optional[Dict[str, datetime]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Đồng bộ nhiều provider cùng lúc: fetch song song, ghi DB một lần.
 
-            return {
-                "success": False,
-                "error": str(e),
-                "response_time_ms": sync_log.response_time_ms,
-            }
+        ``due_at`` (provider_id -> when the sync was scheduled) is recorded as
+        schedule lag in the sync logs.
+
+        Returns one result per provider, in order. The providers must be
+        loaded in this session and not expired (no commit since loading):
+        fetches read their attributes concurrently and must not hit the DB.
+        """
+        if not providers:
+            return []
+        semaphore = asyncio.Semaphore(max(1, settings.GPS_SYNC_CONCURRENCY))
+
+        async def fetch(provider: GPSProvider):
+            async with semaphore:
+                started_at = datetime.utcnow()
+                started = time.perf_counter()
+                sent_before = provider_clients.requests_sent(provider.id)
+                try:
+                    locations = await asyncio.wait_for(
+                        self._fetch_locations(provider), settings.GPS_SYNC_TIMEOUT_SECONDS
+                    )
+                    error = None
+                except asyncio.TimeoutError:
+                    locations, error = [], f"Timed out after {settings.GPS_SYNC_TIMEOUT_SECONDS:g}s"
+                except Exception as e:
+                    locations, error = [], str(e) or type(e).__name__
+                provider_clients.note_sync(provider.id, provider_clients.requests_sent(provider.id) - sent_before)
+                return started_at, locations, error, int((time.perf_counter() - started) * 1000)
+
+        fetched = await asyncio.gather(*(fetch(p) for p in providers))
+        # Blocking DB work (mapping query, flush, commit) stays off the event loop
+        return await asyncio.to_thread(self._write_results, providers, fetched, sync_type, due_at)
+
+    def _write_results(
+        self,
+        providers: List[GPSProvider],
+        fetched: List[Tuple[datetime, List[Dict[str, Any]], Optional[str], int]],
+        sync_type: str,
+        due_at: Optional[Dict[str, datetime]],
+    ) -> List[Dict[str, Any]]:
+        """Write the fetched locations of every provider: one flush and commit"""
+        mappings = self.db.exec(
+            select(GPSVehicleMapping).where(
+                GPSVehicleMapping.provider_id.in_([p.id for p in providers]),
+                GPSVehicleMapping.is_active == True
+            )
+        ).all()
+        mappings_by_provider: Dict[str, Dict[str, GPSVehicleMapping]] = defaultdict(dict)
+        for m in mappings:
+            mappings_by_provider[m.provider_id][m.gps_device_id] = m
+
+        results, updated, breadcrumbs = [], [], []
+        now = datetime.utcnow()
+        for provider, (started_at, locations, error, response_time_ms) in zip(providers, fetched):
+            sync_log = GPSSyncLog(
+                tenant_id=provider.tenant_id,
+                provider_id=provider.id,
+                sync_type=sync_type,
+                started_at=started_at,
+                completed_at=now,
+                success=error is None,
+                vehicles_synced=0,
+                response_time_ms=response_time_ms,
+            )
+            if due_at and provider.id in due_at:
+                sync_log.schedule_lag_ms = max(0, int((started_at - due_at[provider.id]).total_seconds() * 1000))
+
+            if error is None:
+                provider_updated = self._apply_locations(mappings_by_provider[provider.id], locations, breadcrumbs)
+                updated.extend(provider_updated)
+                sync_log.vehicles_synced = len(provider_updated)
+                sync_log.data_lag_seconds = _median_age(provider_updated, now)
+
+                # Cập nhật provider status
+                provider.status = GPSProviderStatus.ACTIVE.value
+                provider.last_sync_at = now
+                provider.last_error = None
+                provider.error_count = 0
+                result = {
+                    "success": True,
+                    "vehicles_synced": sync_log.vehicles_synced,
+                    "response_time_ms": response_time_ms,
+                }
+            else:
+                logger.warning("GPS sync of provider %s (%s) failed: %s", provider.id, provider.name, error)
+                sync_log.error_message = error[:500]
+
+                # Update provider error status
+                provider.last_error = error[:500]
+                provider.error_count = (provider.error_count or 0) + 1
+                if provider.error_count >= 5:
+                    provider.status = GPSProviderStatus.ERROR.value
+                result = {
+                    "success": False,
+                    "error": error,
+                    "response_time_ms": response_time_ms,
+                }
+
+            self.db.add(sync_log)
+            self.db.add(provider)
+            results.append(result)
+
+        self._update_vehicle_gps(updated)
+        record_breadcrumbs(self.db, breadcrumbs)
+        self.db.commit()
+        return results
 
     async def _fetch_locations(self, provider: GPSProvider) -> List[Dict[str, Any]]:
         """Fetch locations từ provider API"""
@@ -104,19 +330,25 @@ class GPSSyncService:
         endpoint = provider.endpoint_location or "/vehicles/location"
         url = f"{provider.api_base_url.rstrip('/')}{endpoint}"
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            # Nếu cần authenticate trước
-            if provider.auth_type == GPSAuthType.TOKEN.value:
-                await self._refresh_token_if_needed(client, provider)
-                headers["Authorization"] = f"Bearer {provider.access_token}"
+        client = provider_clients.client(provider)
 
-            response = await client.get(url, headers=headers, params=params)
-            response.raise_for_status()
+        # Nếu cần authenticate trước
+        if provider.auth_type == GPSAuthType.TOKEN.value:
+            await self._refresh_token_if_needed(client, provider)
+            headers["Authorization"] = f"Bearer {provider.access_token}"
 
-            data = response.json()
+        response = await client.get(url, headers=headers, params=params)
+        provider_clients.note_response(provider.id, response)
+        if response.status_code == 401 and provider.auth_type == GPSAuthType.TOKEN.value:
+            # Token revoked before its expiry: log in again next sync
+            provider_clients.forget(provider.id)
+            provider.token_expires_at = None
+        response.raise_for_status()
+
+        data = response.json()
 
-            # Parse response dựa theo provider type
-            return self._parse_locations_response(provider, data)
+        # Parse response dựa theo provider type
+        return self._parse_locations_response(provider, data)
 
     async def _fetch_binh_anh_locations(self, provider: GPSProvider) -> List[Dict[str, Any]]:
         """
@@ -151,14 +383,15 @@ class GPSSyncService:
             except:
                 pass
 
-        async with httpx.AsyncClient(timeout=self.timeout, verify=False) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
+        client = provider_clients.client(provider)
+        response = await client.get(url, params=params)
+        provider_clients.note_response(provider.id, response)
+        response.raise_for_status()
 
-            data = response.json()
+        data = response.json()
 
-            # Parse response theo format Bình Anh
-            return self._parse_binh_anh_response(data)
+        # Parse response theo format Bình Anh
+        return self._parse_binh_anh_response(data)
 
     def _parse_binh_anh_response(self, data: Any) -> List[Dict[str, Any]]:
         """
@@ -325,9 +558,21 @@ class GPSSyncService:
         self, client: httpx.AsyncClient, provider: GPSProvider
     ):
         """Refresh access token nếu hết hạn"""
-        if provider.token_expires_at and provider.token_expires_at > datetime.utcnow():
-            return  # Token still valid
-
+        token = provider_clients.cached_token(provider)
+        if token is None:
+            # One login/refresh per provider at a time; the others wait and reuse its token
+            async with provider_clients.lock(provider.id):
+                token = provider_clients.cached_token(provider)
+                if token is None:
+                    await self._renew_token(client, provider)
+                    provider_clients.store_token(provider)
+                    return
+        provider.access_token = token.access_token
+        provider.refresh_token = token.refresh_token
+        provider.token_expires_at = token.expires_at
+
+    async def _renew_token(self, client: httpx.AsyncClient, provider: GPSProvider):
+        """Refresh (or log in again) and set the new token on the provider"""
         if not provider.refresh_token:
             # Need to login again
             await self._login(client, provider)
@@ -467,21 +712,17 @@ class GPSSyncService:
 
         return locations
 
-    async def _update_vehicle_locations(
-        self, provider: GPSProvider, locations: List[Dict[str, Any]]
-    ) -> int:
-        """Cập nhật vị trí xe từ GPS data"""
-        updated_count = 0
-
-        # Lấy tất cả mappings của provider này
-        stmt = select(GPSVehicleMapping).where(
-            GPSVehicleMapping.provider_id == provider.id,
-            GPSVehicleMapping.is_active == True
-        )
-        mappings = self.db.exec(stmt).all()
-
-        # Create lookup by device_id
-        mapping_by_device = {m.gps_device_id: m for m in mappings}
+    def _apply_locations(
+        self,
+        mapping_by_device: Dict[str, GPSVehicleMapping],
+        locations: List[Dict[str, Any]],
+        breadcrumbs: List[Optional[Dict[str, Any]]],
+    ) -> List[GPSVehicleMapping]:
+        """
+        Cập nhật vị trí xe từ GPS data: sets the mappings' last_* fields and
+        appends new fixes to ``breadcrumbs``; returns the mappings updated
+        """
+        updated = []
 
         for loc in locations:
             device_id = loc.get("device_id")
@@ -489,6 +730,7 @@ class GPSSyncService:
                 continue
 
             mapping = mapping_by_device[device_id]
+            previous_fix_at = mapping.last_location_at
 
             # Update mapping with latest location
             mapping.last_latitude = loc.get("latitude")
@@ -514,9 +756,57 @@ class GPSSyncService:
                 mapping.last_location_at = datetime.utcnow()
 
             mapping.updated_at = datetime.utcnow()
-            updated_count += 1
+            updated.append(mapping)
+
+            # Position history: only new fixes (providers repeat the last one while parked/offline)
+            if mapping.last_location_at != previous_fix_at:
+                breadcrumbs.append(breadcrumb(
+                    mapping.tenant_id, mapping.vehicle_id, mapping.last_location_at,
+                    mapping.last_latitude, mapping.last_longitude, mapping.last_speed, mapping.last_heading,
+                ))
+
+        return updated
+
+    def _update_vehicle_gps(self, mappings: List[GPSVehicleMapping]) -> None:
+        """
+        Cập nhật VehicleGPS từ các mapping vừa sync (one query for all
+        vehicles). A vehicle mapped on several providers gets the newest fix.
+        """
+        latest: Dict[Tuple[str, str], GPSVehicleMapping] = {}
+        for m in mappings:
+            if m.last_latitude is None or m.last_longitude is None:
+                continue
+            key = (m.tenant_id, m.vehicle_id)
+            current = latest.get(key)
+            if current is None or _naive(m.last_location_at) > _naive(current.last_location_at):
+                latest[key] = m
+        if not latest:
+            return
 
-        return updated_count
+        existing: Dict[Tuple[str, str], VehicleGPS] = {}
+        for gps in self.db.exec(
+            select(VehicleGPS).where(VehicleGPS.vehicle_id.in_([vehicle_id for _, vehicle_id in latest]))
+        ).all():
+            existing.setdefault((gps.tenant_id, gps.vehicle_id), gps)
+
+        for (tenant_id, vehicle_id), mapping in latest.items():
+            gps = existing.get((tenant_id, vehicle_id))
+            if gps is None:
+                gps = VehicleGPS(
+                    tenant_id=tenant_id,
+                    vehicle_id=vehicle_id,
+                    latitude=mapping.last_latitude,
+                    longitude=mapping.last_longitude,
+                    work_status=VehicleWorkStatus.AVAILABLE.value,
+                )
+            gps.latitude = mapping.last_latitude
+            gps.longitude = mapping.last_longitude
+            gps.speed = mapping.last_speed
+            gps.heading = mapping.last_heading
+            gps.address = mapping.last_address
+            gps.gps_timestamp = _naive(mapping.last_location_at)
+            gps.updated_at = datetime.utcnow()
+            self.db.add(gps)
 
     async def test_connection(self, provider: GPSProvider) -> Dict[str, Any]:
         """Test kết nối với provider"""
@@ -718,8 +1008,23 @@ class GPSSyncService:
         return result
 
 
+def _naive(value: Optional[datetime]) -> datetime:
+    """UTC naive datetime (providers may send offsets); None sorts first"""
+    if value is None:
+        return datetime.min
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _median_age(mappings: List[GPSVehicleMapping], now: datetime) -> Optional[int]:
+    """Median age in seconds of the mappings' fixes (how stale the provider's data is)"""
+    ages = sorted(max(0, int((now - _naive(m.last_location_at)).total_seconds())) for m in mappings)
+    return ages[len(ages) // 2] if ages else None
+
+
 async def sync_all_active_providers(db: Session, tenant_id: str):
-    """Đồng bộ tất cả providers active của một tenant"""
+    """Đồng bộ tất cả providers active của một tenant (song song)"""
     stmt = select(GPSProvider).where(
         GPSProvider.tenant_id == tenant_id,
         GPSProvider.status == GPSProviderStatus.ACTIVE.value,
@@ -727,15 +1032,11 @@ async def sync_all_active_providers(db: Session, tenant_id: str):
     )
     providers = db.exec(stmt).all()
 
-    service = GPSSyncService(db)
-    results = []
-
-    for provider in providers:
-        result = await service.sync_provider(provider)
-        results.append({
-            "provider_id": provider.id,
-            "provider_name": provider.name,
-            **result
-        })
+    # Read before sync_providers commits (which expires the loaded providers)
+    names = [(p.id, p.name) for p in providers]
+    results = await GPSSyncService(db).sync_providers(list(providers))
 
-    return results
+    return [
+        {"provider_id": provider_id, "provider_name": name, **result}
+        for (provider_id, name), result in zip(names, results)
+    ]
@@ -0,0 +1,368 @@
+"""
+GPS position history (breadcrumbs) and trip replay
+
+VehicleGPS and GPSVehicleMapping only hold the latest fix of each vehicle;
+every fix is also appended to gps_breadcrumbs:
+
+- writes are batched multi-row INSERTs (one per GPS_TRACK_INSERT_BATCH rows)
+  from each provider sync; a fix already stored (same vehicle and time) is
+  skipped, so re-polling a provider that still reports it costs nothing
+- the table is range-partitioned by month on recorded_at. Partitions are
+  created ahead of time by the gps_track_maintenance job (and on demand by
+  the first write of a month); whole months past GPS_TRACK_RETENTION_DAYS
+  are dropped, which is a catalog operation instead of a large DELETE
+- fixes older than GPS_TRACK_RAW_DAYS are downsampled to one per vehicle
+  per GPS_TRACK_DOWNSAMPLE_SECONDS
+
+A replay (vehicle_track) reads one vehicle's range off the primary key,
+splits it into segments at gaps of GPS_TRACK_GAP_SECONDS, and decimates each
+segment with Douglas-Peucker so the map gets a few hundred points instead of
+one per poll. Distances are measured on the raw fixes.
+"""
+import calendar
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.scheduler import ScheduledJob, scheduler
+from app.db.session import background_engine
+from app.models import GPSBreadcrumb, VehicleGPS
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+
+# Fixes this far in the future are a device clock problem, not a position
+MAX_CLOCK_SKEW = timedelta(days=1)
+
+# Each maintenance run re-checks this much history before the raw cutoff,
+# so a missed run (or late-arriving fixes) is caught up
+DOWNSAMPLE_LOOKBACK = timedelta(days=2)
+
+_PARTITION_LOCK = text("SELECT pg_advisory_xact_lock(hashtext('gps_breadcrumbs_partitions'))")
+# Partition DDL waits for open writes on gps_breadcrumbs; give up rather than queue behind them
+_DDL_LOCK_TIMEOUT = text("SET LOCAL lock_timeout = '5s'")
+_LIST_PARTITIONS = text("""
+    SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'gps_breadcrumbs'::regclass
+""")
+
+_DOWNSAMPLE = text("""
+    DELETE FROM gps_breadcrumbs b
+    USING (
+        SELECT vehicle_id, recorded_at FROM (
+            SELECT vehicle_id, recorded_at,
+                   row_number() OVER (
+                       PARTITION BY vehicle_id, floor(extract(epoch FROM recorded_at) / :bucket)
+                       ORDER BY recorded_at
+                   ) AS rn
+            FROM gps_breadcrumbs
+            WHERE tenant_id = :tenant_id AND recorded_at >= :start AND recorded_at < :end
+        ) ranked
+        WHERE rn > 1
+    ) extra
+    WHERE b.vehicle_id = extra.vehicle_id AND b.recorded_at = extra.recorded_at
+      AND b.recorded_at >= :start AND b.recorded_at < :end
+""")
+
+_TRACK = text("""
+    SELECT recorded_at, latitude, longitude, speed
+    FROM gps_breadcrumbs
+    WHERE vehicle_id = :vehicle_id AND tenant_id = :tenant_id
+      AND recorded_at >= :start AND recorded_at < :end
+    ORDER BY recorded_at
+""")
+
+# Months known to have a partition (per process)
+_partitions: Set[datetime] = set()
+
+
+# ============ Partitions ============
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month(start: datetime) -> datetime:
+    return datetime(start.year + 1, 1, 1) if start.month == 12 else datetime(start.year, start.month + 1, 1)
+
+
+def _partition_name(start: datetime) -> str:
+    return f"gps_breadcrumbs_{start:%Y%m}"
+
+
+def ensure_partitions(months: Iterable[datetime]) -> int:
+    """
+    Create the monthly partitions holding ``months`` that don't exist yet;
+    returns how many were created. Runs in its own short transaction, so a
+    writer doesn't hold DDL locks on gps_breadcrumbs until it commits.
+    """
+    missing = sorted({_month_start(m) for m in months} - _partitions)
+    if not missing:
+        return 0
+    created = 0
+    with background_engine.begin() as conn:
+        # Serialize creation across workers (concurrent CREATE TABLE races on the catalog)
+        conn.execute(_PARTITION_LOCK)
+        conn.execute(_DDL_LOCK_TIMEOUT)
+        for start in missing:
+            name = _partition_name(start)
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+                conn.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF gps_breadcrumbs "
+                    f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{_next_month(start):%Y-%m-%d}')"
+                ))
+                created += 1
+    _partitions.update(missing)
+    return created
+
+
+def drop_expired_partitions(now: Optional[datetime] = None) -> List[str]:
+    """Drop the monthly partitions entirely older than GPS_TRACK_RETENTION_DAYS"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=settings.GPS_TRACK_RETENTION_DAYS)
+    dropped = []
+    with background_engine.begin() as conn:
+        conn.execute(_PARTITION_LOCK)
+        conn.execute(_DDL_LOCK_TIMEOUT)
+        for name in conn.execute(_LIST_PARTITIONS).scalars().all():
+            try:
+                start = datetime.strptime(name.rsplit("_", 1)[-1], "%Y%m")
+            except ValueError:
+                continue  # Not one of ours (attached by hand)
+            if _next_month(start) <= cutoff:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                _partitions.discard(start)
+                dropped.append(name)
+    return dropped
+
+
+# ============ Writes ============
+
+def _small_int(value: Any, modulo: Optional[int] = None) -> Optional[int]:
+    try:
+        number = int(round(float(value)))
+    except (TypeError, ValueError):
+        return None
+    if modulo:
+        return number % modulo
+    return max(0, min(number, 32767))
+
+
+def breadcrumb(
+    tenant_id: str,
+    vehicle_id: str,
+    recorded_at: datetime,
+    latitude: Any,
+    longitude: Any,
+    speed: Any = None,
+    heading: Any = None,
+) -> Optional[Dict[str, Any]]:
+    """A gps_breadcrumbs row, or None when the fix is unusable (no/invalid coordinates)"""
+    try:
+        lat, lng = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (lat == 0 and lng == 0):
+        return None
+    if recorded_at.tzinfo is not None:
+        recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "tenant_id": str(tenant_id),
+        "vehicle_id": str(vehicle_id),
+        "recorded_at": recorded_at.replace(microsecond=0),
+        "latitude": lat,
+        "longitude": lng,
+        "speed": _small_int(speed),
+        "heading": _small_int(heading, 360),
+    }
+
+
+def record_breadcrumbs(session: Session, rows: Iterable[Optional[Dict[str, Any]]]) -> int:
+    """
+    Append fixes built by breadcrumb() (None entries are ignored) in the
+    session's transaction; returns how many were sent. Fixes outside the
+    retention window are dropped.
+    """
+    now = datetime.utcnow()
+    oldest = now - timedelta(days=settings.GPS_TRACK_RETENTION_DAYS)
+    newest = now + MAX_CLOCK_SKEW
+    unique = {}
+    for row in rows:
+        if row and oldest <= row["recorded_at"] <= newest:
+            unique[(row["vehicle_id"], row["recorded_at"])] = row
+    if not unique:
+        return 0
+
+    batch = list(unique.values())
+    try:
+        ensure_partitions(row["recorded_at"] for row in batch)
+    except OperationalError as e:
+        # Keep what fits the existing partitions; the maintenance job retries the DDL
+        logger.warning("Could not create gps_breadcrumbs partitions: %s", e)
+        batch = [row for row in batch if _month_start(row["recorded_at"]) in _partitions]
+    table = GPSBreadcrumb.__table__
+    size = max(1, settings.GPS_TRACK_INSERT_BATCH)
+    for i in range(0, len(batch), size):
+        session.execute(
+            pg_insert(table).values(batch[i:i + size])
+            .on_conflict_do_nothing(index_elements=["vehicle_id", "recorded_at"])
+        )
+    return len(batch)
+
+
+# ============ Retention ============
+
+def downsample(session: Session, tenant_id: str, now: Optional[datetime] = None) -> int:
+    """Thin a tenant's fixes that just aged past GPS_TRACK_RAW_DAYS; returns rows deleted"""
+    end = (now or datetime.utcnow()) - timedelta(days=settings.GPS_TRACK_RAW_DAYS)
+    return session.execute(_DOWNSAMPLE, {
+        "tenant_id": str(tenant_id),
+        "start": end - DOWNSAMPLE_LOOKBACK,
+        "end": end,
+        "bucket": max(1, settings.GPS_TRACK_DOWNSAMPLE_SECONDS),
+    }).rowcount
+
+
+def maintain_track_history(session: Session, tenant_id: str) -> Dict[str, Any]:
+    """
+    Scheduled: downsample the tenant's history, after making sure next
+    month's partition exists and expired ones are gone (cheap no-ops once
+    another slice has done it).
+    """
+    now = datetime.utcnow()
+    created = ensure_partitions([now, _next_month(_month_start(now))])
+    dropped = drop_expired_partitions(now)
+    deleted = downsample(session, tenant_id, now)
+    session.commit()
+    if created or dropped or deleted:
+        logger.info("GPS track maintenance for %s: %d partitions created, dropped %s, %d fixes downsampled",
+                    tenant_id, created, dropped, deleted)
+    return {"partitions_created": created, "partitions_dropped": dropped, "downsampled": deleted}
+
+
+def _tenants_with_gps(session: Session) -> List[str]:
+    return list(session.exec(select(VehicleGPS.tenant_id).distinct()).all())
+
+
+scheduler.register(ScheduledJob(
+    "gps_track_maintenance", settings.GPS_TRACK_MAINTENANCE_INTERVAL, maintain_track_history, _tenants_with_gps,
+))
+
+
+# ============ Replay ============
+
+def _haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def simplify(points: List[list], tolerance_m: float) -> List[list]:
+    """
+    Douglas-Peucker on [lat, lng, ...] points: drops points closer than
+    ``tolerance_m`` to the line through their kept neighbours. Distances are
+    planar (equirectangular around the first point), fine at city/province scale.
+    """
+    n = len(points)
+    if n < 3 or tolerance_m <= 0:
+        return list(points)
+
+    ky = math.pi * EARTH_RADIUS_M / 180
+    kx = ky * math.cos(math.radians(points[0][0]))
+    xy = [(p[1] * kx, p[0] * ky) for p in points]
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    limit = tolerance_m * tolerance_m
+
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xy[first]
+        dx, dy = xy[last][0] - ax, xy[last][1] - ay
+        length = dx * dx + dy * dy
+        farthest, index = limit, 0
+        for i in range(first + 1, last):
+            px, py = xy[i][0] - ax, xy[i][1] - ay
+            t = 0.0 if length == 0 else max(0.0, min(1.0, (px * dx + py * dy) / length))
+            distance = (px - t * dx) ** 2 + (py - t * dy) ** 2
+            if distance > farthest:
+                farthest, index = distance, i
+        if index:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, kept in zip(points, keep) if kept]
+
+
+def encode_polyline(points: Iterable[list]) -> str:
+    """Encoded polyline (Google format, 5 decimals) of [lat, lng, ...] points"""
+    out = []
+    previous = (0, 0)
+    for point in points:
+        current = (int(round(point[0] * 1e5)), int(round(point[1] * 1e5)))
+        for value in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        previous = current
+    return "".join(out)
+
+
+def _segment(points: List[list], tolerance_m: float) -> Dict[str, Any]:
+    distance = sum(_haversine_m(a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:]))
+    kept = simplify(points, tolerance_m)
+    return {
+        "start": datetime.utcfromtimestamp(points[0][2]).isoformat(),
+        "end": datetime.utcfromtimestamp(points[-1][2]).isoformat(),
+        "distance_km": round(distance / 1000, 2),
+        "raw_points": len(points),
+        "polyline": encode_polyline(kept),
+        "points": kept,
+    }
+
+
+def vehicle_track(
+    session: Session,
+    tenant_id: str,
+    vehicle_id: str,
+    start: datetime,
+    end: datetime,
+    tolerance_m: float = 10.0,
+) -> Dict[str, Any]:
+    """
+    Replay of a vehicle's path in [start, end): segments split at gaps of
+    GPS_TRACK_GAP_SECONDS, each with its decimated points
+    ([lat, lng, unix_time, speed]) and the same points as an encoded polyline.
+    """
+    gap = settings.GPS_TRACK_GAP_SECONDS
+    segments, current = [], []
+    rows = session.execute(_TRACK, {
+        "tenant_id": str(tenant_id), "vehicle_id": str(vehicle_id), "start": start, "end": end,
+    })
+    for recorded_at, lat, lng, speed in rows:
+        ts = calendar.timegm(recorded_at.timetuple())
+        if current and ts - current[-1][2] > gap:
+            segments.append(_segment(current, tolerance_m))
+            current = []
+        current.append([round(lat, 6), round(lng, 6), ts, speed])
+    if current:
+        segments.append(_segment(current, tolerance_m))
+
+    return {
+        "vehicle_id": vehicle_id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "distance_km": round(sum(s["distance_km"] for s in segments), 2),
+        "raw_points": sum(s["raw_points"] for s in segments),
+        "points": sum(len(s["points"]) for s in segments),
+        "segments": segments,
+    }
@@ -3,7 +3,9 @@ OMS Order Calculator Service
 """
 from decimal import Decimal
 from typing import Dict, List
+from sqlmodel import Session
 from app.models.oms import OMSOrder, OMSOrderItem
+from app.services import sequences
 
 
 def calculate_order_totals(order: OMSOrder, items: List[OMSOrderItem]) -> Dict:
@@ -80,29 +82,29 @@ def compare_with_cs_price(
     }
 
 
-def generate_order_number(tenant_id: str) -> str:
+def _daily_number(session: Session, tenant_id: str, kind: str, prefix: str, table: str, column: str) -> str:
+    """PREFIX-YYYYMMDD-XXXX, numbered per tenant and day"""
+    from datetime import datetime
+
+    day_prefix = f"{prefix}-{datetime.now().strftime('%Y%m%d')}-"
+    number = sequences.allocate(
+        session, tenant_id, f"{kind}:{day_prefix}",
+        seed=sequences.max_suffix(table, column, day_prefix, tenant_id),
+    )[0]
+    return f"{day_prefix}{number:04d}"
+
+
+def generate_order_number(session: Session, tenant_id: str) -> str:
     """
     Generate unique order number
     Format: ORD-YYYYMMDD-XXXX
     """
-    from datetime import datetime
-    import random
+    return _daily_number(session, tenant_id, "oms_order", "ORD", "oms_orders", "order_number")
 
-    date_str = datetime.now().strftime("%Y%m%d")
-    random_suffix = f"{random.randint(0, 9999):04d}"
 
-    return f"ORD-{date_str}-{random_suffix}"
-
-
-def generate_shipment_number(tenant_id: str) -> str:
+def generate_shipment_number(session: Session, tenant_id: str) -> str:
     """
     Generate unique shipment number
     Format: SHP-YYYYMMDD-XXXX
     """
-    from datetime import datetime
-    import random
-
-    date_str = datetime.now().strftime("%Y%m%d")
-    random_suffix = f"{random.randint(0, 9999):04d}"
-
-    return f"SHP-{date_str}-{random_suffix}"
+    return _daily_number(session, tenant_id, "oms_shipment", "SHP", "oms_shipments", "shipment_number")
@@ -1,67 +1,67 @@
+import re
 from datetime import datetime
-from sqlmodel import Session, select, text
-from app.models.order_sequence import OrderSequence
+from typing import List, Optional
+from sqlmodel import Session
+
+from app.services import sequences
 
 def _yymm(dt: datetime) -> str:
     return dt.strftime("%y%m")  # 2512
 
+def order_sequence_key(customer_code: str) -> str:
+    return f"order:{customer_code}"
+
 def _get_max_order_number(session: Session, tenant_id: str, customer_code: str) -> int:
     """Get the maximum order number from existing orders for this customer"""
-    # Query to find max order number from orders table
-    # Example: "ADG-225" -> extract 225
-    query = text("""
-        SELECT MAX(CAST(SPLIT_PART(order_code, '-', 2) AS INTEGER)) as max_seq
-        FROM orders
-        WHERE tenant_id = :tenant_id
-          AND order_code LIKE :pattern
-          AND order_code ~ :regex
-    """)
+    # Example: "ADG-225" -> 225 (not ADG-2.01)
+    # Only used to seed/preview the sequence - not on the order creation path
+    return sequences.max_suffix("orders", "order_code", f"{customer_code}-", tenant_id)(session)
 
-    result = session.execute(
-        query,
-        {
-            "tenant_id": tenant_id,
-            "pattern": f"{customer_code}-%",
-            "regex": f"^{customer_code}-[0-9]+$"  # Only match ADG-123, not ADG-2.01
-        }
-    ).first()
+def _seed(tenant_id: str, customer_code: str) -> sequences.Seed:
+    return lambda conn: _get_max_order_number(conn, tenant_id, customer_code)
 
-    return result[0] if result and result[0] else 0
+def next_order_codes(session: Session, tenant_id: str, customer_code: str, count: int) -> List[str]:
+    # Simple sequence per customer (no date grouping)
+    # Format: ADG-129, ADG-130, ... - one round trip for the whole batch
+    numbers = sequences.allocate(
+        session, tenant_id, order_sequence_key(customer_code), count,
+        seed=_seed(tenant_id, customer_code),
+    )
+    return [f"{customer_code}-{n}" for n in numbers]
 
 def next_order_code(session: Session, tenant_id: str, customer_code: str, order_date: datetime) -> str:
-    # Use simple sequence per customer (no date grouping)
-    # Format: ADG-129
+    return next_order_codes(session, tenant_id, customer_code, 1)[0]
 
-    # Always get the actual max from orders table (handles manual entries)
-    max_from_orders = _get_max_order_number(session, tenant_id, customer_code)
+def peek_order_code(session: Session, tenant_id: str, customer_code: str) -> str:
+    """Code the next order would get (nothing is reserved)"""
+    last = sequences.peek(session, tenant_id, order_sequence_key(customer_code))
+    if last is None:
+        last = _get_max_order_number(session, tenant_id, customer_code)
+    return f"{customer_code}-{last + 1}"
 
-    # Lock the row with FOR UPDATE to prevent race conditions
-    seq = session.exec(
-        select(OrderSequence)
-        .where(
-            OrderSequence.tenant_id == tenant_id,
-            OrderSequence.customer_code == customer_code,
-            OrderSequence.yymm == "ALL",  # Use ALL for global sequence
+def note_manual_order_code(session: Session, tenant_id: str, customer_code: str, order_code: Optional[str]) -> None:
+    """A user-entered code like ADG-500 moves the sequence past it"""
+    if not order_code:
+        return
+    match = re.fullmatch(rf"{re.escape(customer_code)}-(\d{{1,{sequences.MAX_DIGITS}}})", order_code.strip())
+    if match:
+        sequences.bump(
+            session, tenant_id, order_sequence_key(customer_code), int(match.group(1)),
+            seed=_seed(tenant_id, customer_code),
         )
-        .with_for_update()  # Lock row until transaction commits
-    ).first()
 
-    if seq is None:
-        # First time - create sequence record
-        seq = OrderSequence(
-            tenant_id=tenant_id,
-            customer_code=customer_code,
-            yymm="ALL",
-            last_seq=max_from_orders
-        )
-        session.add(seq)
-        session.flush()
-    elif max_from_orders > seq.last_seq:
-        # Sync sequence with actual max (handles manual order code entries)
-        seq.last_seq = max_from_orders
+_ORDER_CODE = re.compile(rf"(.+)-(\d{{1,{sequences.MAX_DIGITS}}})")
 
-    seq.last_seq += 1
-    session.add(seq)
-    session.commit()  # COMMIT immediately to release lock and persist sequence
-
-    return f"{customer_code}-{seq.last_seq}"
+def note_order_code(session: Session, tenant_id: str, order_code: Optional[str]) -> None:
+    """
+    Any code written outside next_order_code(s) (edited order, ops API) moves
+    the sequence of its prefix past it: setting ADG-500 on an order means
+    ADG-500 is never handed out again
+    """
+    match = _ORDER_CODE.fullmatch(order_code.strip()) if order_code else None
+    if match:
+        prefix, number = match.groups()
+        sequences.bump(
+            session, tenant_id, order_sequence_key(prefix), int(number),
+            seed=_seed(tenant_id, prefix),
+        )
@@ -0,0 +1,651 @@
+"""
+Order import (CSV, XLSX or pasted text) for historical backfills
+
+Runs as the "orders.import" background job (see app/core/jobs.py): progress and
+the result are read from /api/v1/jobs/{id}. The file is streamed and handled in
+chunks of ORDER_IMPORT_BATCH_SIZE rows, each in one transaction:
+
+1. map columns by header (aliases, Vietnamese headers with or without accents)
+2. resolve customer / site / location codes with one IN query per kind for
+   codes not seen in an earlier chunk
+3. validate, and skip container numbers already used earlier in the file or by
+   an existing order of the tenant
+4. reserve order codes with one sequence allocation per customer
+5. COPY the valid rows into order_import_staging and merge them into orders
+   (plus the initial order_status_logs row) with one INSERT ... SELECT, then
+   build their search documents (app/services/order_search.py)
+
+Rejected rows go to an error report CSV (row, field, value, message) served by
+GET /orders/import/{job_id}/errors. Chunks already committed stay committed if
+the job is cancelled or fails later.
+"""
+import csv
+import io
+import re
+import shutil
+import unicodedata
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.jobs import JobContext, JobFailed
+from app.core.response_cache import invalidate_tables
+from app.models import Customer, Location, Order, Site
+from app.models.order import OrderStatus
+from app.services import sequences
+from app.services.order_code import next_order_codes, note_manual_order_code
+from app.services.order_parser import parse_order_text
+from app.services.order_search import refresh_documents
+from app.services.order_status_logger import sync_milestones
+
+# Errors kept in the job result; the full list is in the error report
+RESULT_ERROR_LIMIT = 100
+
+# Canonical field -> accepted headers (compared after _normalize_header)
+COLUMN_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "customer_code": ("customer_code", "customer", "ma_kh", "ma_khach_hang", "khach_hang"),
+    "order_code": ("order_code", "ma_don", "ma_don_hang", "so_don"),
+    "container_code": ("container_code", "container", "container_no", "cont", "so_cont", "so_container"),
+    "equipment": ("equipment", "size", "loai_cont", "loai_container"),
+    "qty": ("qty", "quantity", "so_luong", "sl"),
+    "cargo_note": ("cargo_note", "cargo", "hang_hoa", "ghi_chu_hang"),
+    "status": ("status", "trang_thai"),
+    "order_date": ("order_date", "ngay_dat", "ngay_don"),
+    "customer_requested_date": ("customer_requested_date", "requested_date", "ngay_giao", "ngay_yeu_cau"),
+    "pickup_site_code": ("pickup_site_code", "pickup_site", "ma_diem_lay"),
+    "delivery_site_code": ("delivery_site_code", "delivery_site", "ma_diem_giao"),
+    "port_site_code": ("port_site_code", "port_site", "empty_return_site", "ma_cang"),
+    "pickup_location_code": ("pickup_location_code", "pickup_location"),
+    "delivery_location_code": ("delivery_location_code", "delivery_location"),
+    "pickup_text": ("pickup_text", "pickup", "diem_lay", "noi_lay"),
+    "delivery_text": ("delivery_text", "delivery", "diem_giao", "noi_giao"),
+    "empty_return_note": ("empty_return_note", "empty_return", "tra_rong", "ha_rong"),
+    "seal_no": ("seal_no", "seal", "so_seal"),
+    "delivery_order_no": ("delivery_order_no", "do", "do_no", "so_do"),
+    "weight_kg": ("weight_kg", "weight", "trong_luong", "khoi_luong"),
+    "distance_km": ("distance_km", "distance", "km", "so_km"),
+    "freight_charge": ("freight_charge", "freight", "cuoc", "cuoc_van_chuyen"),
+}
+
+ORDER_STATUSES = {
+    OrderStatus.NEW, OrderStatus.REJECTED, OrderStatus.ACCEPTED, OrderStatus.ASSIGNED,
+    OrderStatus.IN_TRANSIT, OrderStatus.DELIVERED, OrderStatus.EMPTY_RETURN,
+    OrderStatus.COMPLETED, OrderStatus.CANCELLED,
+}
+
+CONTAINER_CODE_RE = re.compile(r"^[A-Z]{4}\d{7}$")
+
+# Column order of the COPY into order_import_staging
+STAGING_COLUMNS = (
+    "job_id", "row_no", "id", "log_id", "order_code", "customer_id", "status",
+    "order_date", "customer_requested_date", "pickup_text", "delivery_text",
+    "pickup_site_id", "delivery_site_id", "port_site_id",
+    "pickup_location_id", "delivery_location_id", "equipment", "qty",
+    "container_code", "cargo_note", "empty_return_note", "seal_no",
+    "delivery_order_no", "weight_kg", "distance_km", "freight_charge",
+)
+# Staging columns copied as-is into orders
+_ORDER_COLUMNS = tuple(c for c in STAGING_COLUMNS if c not in ("job_id", "row_no", "log_id"))
+
+# Parameters are cast: psycopg 3 sends them untyped and Postgres cannot deduce
+# one type for a parameter used both as a SELECT value and in a comparison
+_MERGE = text(f"""
+    WITH inserted AS (
+        INSERT INTO orders (tenant_id, created_by_user_id, priority, created_at, updated_at, {", ".join(_ORDER_COLUMNS)})
+        SELECT CAST(:tenant_id AS varchar), CAST(:user_id AS varchar), 'NORMAL',
+               CAST(:now AS timestamp), CAST(:now AS timestamp), {", ".join("s." + c for c in _ORDER_COLUMNS)}
+        FROM order_import_staging s
+        WHERE s.job_id = :job_id
+          AND (s.container_code IS NULL OR NOT EXISTS (
+              SELECT 1 FROM orders o
+              WHERE o.tenant_id = CAST(:tenant_id AS varchar) AND o.container_code = s.container_code
+          ))
+        ON CONFLICT (tenant_id, order_code) DO NOTHING
+        RETURNING id
+    ), logs AS (
+        INSERT INTO order_status_logs (id, tenant_id, order_id, from_status, to_status, changed_at, changed_by_user_id, note)
+        SELECT s.log_id, CAST(:tenant_id AS varchar), s.id, NULL, s.status, s.order_date,
+               CAST(:user_id AS varchar), 'Imported'
+        FROM order_import_staging s
+        JOIN inserted i ON i.id = s.id
+        WHERE s.job_id = :job_id
+    )
+    SELECT id FROM inserted
+""")
+
+_CLEAR_STAGING = text("DELETE FROM order_import_staging WHERE job_id = :job_id")
+
+
+# =====================
+# Files
+# =====================
+
+def _import_dir(tenant_id: str) -> Path:
+    return Path(settings.STORAGE_DIR) / "imports" / str(tenant_id)
+
+
+def error_report_path(tenant_id: str, job_id: str) -> Path:
+    return _import_dir(tenant_id) / f"{job_id}_errors.csv"
+
+
+def detect_format(filename: str) -> str:
+    suffix = Path(filename or "").suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix == ".xlsx":
+        return "xlsx"
+    if suffix == ".txt":
+        return "text"
+    raise ValueError("File must be .csv, .xlsx or .txt")
+
+
+def save_source(tenant_id: str, fmt: str, fileobj: Optional[BinaryIO] = None, content: Optional[str] = None) -> Path:
+    """Store the uploaded file (or pasted text) until the job has read it"""
+    directory = _import_dir(tenant_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{uuid.uuid4()}.{'txt' if fmt == 'text' else fmt}"
+    if fileobj is not None:
+        with open(path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, 1024 * 1024)
+    else:
+        path.write_text(content or "", encoding="utf-8")
+    return path
+
+
+# =====================
+# Readers: yield (row number in the source, {field: value})
+# =====================
+
+def _normalize_header(value: Any) -> str:
+    """'Số Cont' -> 'so_cont'"""
+    s = unicodedata.normalize("NFKD", str(value or "").replace("đ", "d").replace("Đ", "D"))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", "_", s.lower()).strip("_")
+
+
+_ALIAS_INDEX = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+
+
+def _map_header(header: Tuple[Any, ...]) -> List[Optional[str]]:
+    fields = [_ALIAS_INDEX.get(_normalize_header(h)) for h in header]
+    if not any(fields):
+        raise JobFailed(
+            "No known columns in the header row",
+            {"columns": [str(h) for h in header if h is not None], "expected": sorted(COLUMN_ALIASES)},
+        )
+    return fields
+
+
+def _row_values(fields: List[Optional[str]], values: Tuple[Any, ...]) -> Dict[str, Any]:
+    row = {}
+    for field, value in zip(fields, values):
+        if field is None or value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        row[field] = value
+    return row
+
+
+def _iter_csv(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        fields = _map_header(tuple(header))
+        for row_no, values in enumerate(reader, start=2):
+            row = _row_values(fields, tuple(values))
+            if row:
+                yield row_no, row
+
+
+def _iter_xlsx(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        fields = _map_header(header)
+        for row_no, values in enumerate(rows, start=2):
+            row = _row_values(fields, values)
+            if row:
+                yield row_no, row
+    finally:
+        workbook.close()
+
+
+def _iter_text(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Pasted order lines, same format as POST /orders/batch"""
+    with open(path, encoding="utf-8-sig") as f:
+        for line_no, line in enumerate(f, start=1):
+            for order in parse_order_text(line):
+                yield line_no, {k: v for k, v in order.items() if v is not None}
+
+
+_READERS = {"csv": _iter_csv, "xlsx": _iter_xlsx, "text": _iter_text}
+
+
+def _estimate_rows(path: Path, fmt: str) -> int:
+    """Row count for progress (lines for CSV/text, sheet dimension for XLSX)"""
+    if fmt == "xlsx":
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    with open(path, "rb") as f:
+        lines = sum(1 for _ in f)
+    return max(lines - 1, 0) if fmt == "csv" else lines
+
+
+# =====================
+# Values
+# =====================
+
+_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S",
+                 "%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d-%m-%Y")
+
+
+def _parse_date(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value), fmt)
+        except ValueError:
+            continue
+    raise ValueError("expected YYYY-MM-DD or DD/MM/YYYY")
+
+
+def _parse_number(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(" ", "").replace(",", ""))
+    except ValueError:
+        raise ValueError("expected a number")
+
+
+def _parse_int(value: Any) -> int:
+    number = _parse_number(value)
+    if number != int(number):
+        raise ValueError("expected a whole number")
+    return int(number)
+
+
+def _code(value: Any) -> str:
+    return str(value).strip().upper()
+
+
+class _Lookups:
+    """Code -> id caches for the whole import; each chunk only queries codes not seen yet"""
+
+    def __init__(self, session: Session, tenant_id: str):
+        self.session = session
+        self.tenant_id = tenant_id
+        self.customers: Dict[str, Optional[Tuple[str, str]]] = {}  # CODE -> (id, code)
+        self.sites: Dict[str, Optional[str]] = {}  # CODE -> id
+        self.locations: Dict[str, Optional[Tuple[str, str]]] = {}  # CODE -> (id, "code - name")
+
+    def load(self, rows: List[Tuple[int, Dict[str, Any]]]) -> None:
+        customer_codes, site_codes, location_codes = set(), set(), set()
+        for _, row in rows:
+            if "customer_code" in row:
+                customer_codes.add(_code(row["customer_code"]))
+            for field in ("pickup_site_code", "delivery_site_code", "port_site_code"):
+                if field in row:
+                    site_codes.add(_code(row[field]))
+            for field in ("pickup_location_code", "delivery_location_code"):
+                if field in row:
+                    location_codes.add(_code(row[field]))
+
+        missing = customer_codes - self.customers.keys()
+        if missing:
+            self.customers.update(dict.fromkeys(missing))
+            for id_, code in self.session.exec(
+                select(Customer.id, Customer.code).where(
+                    Customer.tenant_id == self.tenant_id, func.upper(Customer.code).in_(missing)
+                )
+            ).all():
+                self.customers[code.upper()] = (id_, code)
+
+        missing = site_codes - self.sites.keys()
+        if missing:
+            self.sites.update(dict.fromkeys(missing))
+            for id_, code in self.session.exec(
+                select(Site.id, Site.code).where(Site.tenant_id == self.tenant_id, func.upper(Site.code).in_(missing))
+            ).all():
+                # Site codes are not unique: the first match wins
+                self.sites[code.upper()] = self.sites[code.upper()] or id_
+
+        missing = location_codes - self.locations.keys()
+        if missing:
+            self.locations.update(dict.fromkeys(missing))
+            for id_, code, name in self.session.exec(
+                select(Location.id, Location.code, Location.name).where(
+                    Location.tenant_id == self.tenant_id, func.upper(Location.code).in_(missing)
+                )
+            ).all():
+                self.locations[code.upper()] = (id_, f"{code} - {name}")
+
+
+# =====================
+# Pipeline
+# =====================
+
+class _ErrorReport:
+    """Rejected rows, streamed to CSV; the first RESULT_ERROR_LIMIT are also kept for the job result"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.count = 0
+        self.rows: set = set()
+        self.first: List[Dict[str, Any]] = []
+        self._file = None
+        self._writer = None
+
+    def add(self, row_no: int, field: Optional[str], message: str, value: Any = None) -> None:
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._file.write("\ufeff")  # Excel opens UTF-8 correctly
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["row", "field", "value", "message"])
+        self._writer.writerow([row_no, field or "", "" if value is None else value, message])
+        self.count += 1
+        self.rows.add(row_no)
+        if len(self.first) < RESULT_ERROR_LIMIT:
+            self.first.append({"row": row_no, "field": field, "value": value, "message": message})
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def _validate(
+    row_no: int, row: Dict[str, Any], lookups: _Lookups, default_customer: Optional[Tuple[str, str]],
+    errors: _ErrorReport,
+) -> Optional[Dict[str, Any]]:
+    """Row -> order values (ids resolved, types converted), or None after reporting its errors"""
+    failed = False
+
+    def fail(field: str, message: str) -> None:
+        nonlocal failed
+        failed = True
+        errors.add(row_no, field, message, row.get(field))
+
+    order: Dict[str, Any] = {}
+    if "customer_code" in row:
+        customer = lookups.customers.get(_code(row["customer_code"]))
+        if customer is None:
+            fail("customer_code", "Unknown customer")
+    else:
+        customer = default_customer
+        if customer is None:
+            fail("customer_code", "Customer is required")
+    if customer is not None:
+        order["customer_id"], order["customer_code"] = customer
+
+    for field, target in (("pickup_site_code", "pickup_site_id"), ("delivery_site_code", "delivery_site_id"),
+                          ("port_site_code", "port_site_id")):
+        if field in row:
+            order[target] = lookups.sites.get(_code(row[field]))
+            if order[target] is None:
+                fail(field, "Unknown site")
+
+    for field, target, text_field in (("pickup_location_code", "pickup_location_id", "pickup_text"),
+                                      ("delivery_location_code", "delivery_location_id", "delivery_text")):
+        if field in row:
+            location = lookups.locations.get(_code(row[field]))
+            if location is None:
+                fail(field, "Unknown location")
+            else:
+                order[target], order[text_field] = location
+
+    for field in ("pickup_text", "delivery_text", "equipment", "cargo_note", "empty_return_note",
+                  "seal_no", "delivery_order_no", "order_code"):
+        if field in row and field not in order:
+            order[field] = str(row[field]).strip()
+
+    status = _code(row.get("status", OrderStatus.NEW))
+    if status not in ORDER_STATUSES:
+        fail("status", "Unknown status")
+    order["status"] = status
+
+    if "container_code" in row:
+        container = re.sub(r"\s+", "", _code(row["container_code"]))
+        if not CONTAINER_CODE_RE.match(container):
+            fail("container_code", "Container number must be 4 letters + 7 digits")
+        order["container_code"] = container
+
+    for field, parse in (("order_date", _parse_date), ("customer_requested_date", _parse_date),
+                         ("qty", _parse_int), ("distance_km", _parse_int), ("freight_charge", _parse_int),
+                         ("weight_kg", _parse_number)):
+        if field in row:
+            try:
+                order[field] = parse(row[field])
+            except ValueError as e:
+                fail(field, f"Invalid value: {e}")
+    if order.get("qty", 1) < 1:
+        fail("qty", "Quantity must be at least 1")
+
+    return None if failed else order
+
+
+def _copy_to_staging(session: Session, rows: List[tuple]) -> None:
+    """COPY rows into order_import_staging inside the session's transaction"""
+    sql = f"COPY order_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN"
+    dbapi = session.connection().connection.dbapi_connection
+    cursor = dbapi.cursor()
+    try:
+        if hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:  # psycopg2
+            buf = io.StringIO()
+            for row in rows:
+                buf.write("\t".join(_copy_value(v) for v in row))
+                buf.write("\n")
+            buf.seek(0)
+            cursor.copy_expert(sql, buf)
+    finally:
+        cursor.close()
+
+
+def _copy_value(value: Any) -> str:
+    """COPY text format: \\N for NULL, backslash escapes for separators"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class _Importer:
+    def __init__(self, ctx: JobContext, customer_id: Optional[str], dry_run: bool):
+        self.ctx = ctx
+        self.session = ctx.session
+        self.tenant_id = ctx.tenant_id
+        self.dry_run = dry_run
+        self.lookups = _Lookups(self.session, self.tenant_id)
+        self.errors = _ErrorReport(error_report_path(self.tenant_id, ctx.job_id))
+        self.seen_containers: set = set()
+        self.seen_order_codes: set = set()
+        self.read = 0
+        self.created = 0
+        self.valid = 0
+        self.duplicates = 0
+
+        self.default_customer = None
+        if customer_id:
+            customer = self.session.get(Customer, customer_id)
+            if not customer or str(customer.tenant_id) != self.tenant_id:
+                raise JobFailed("Customer not found")
+            self.default_customer = (customer.id, customer.code)
+
+    def run(self, rows: Iterator[Tuple[int, Dict[str, Any]]], total: int) -> None:
+        chunk: List[Tuple[int, Dict[str, Any]]] = []
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= settings.ORDER_IMPORT_BATCH_SIZE:
+                self._chunk(chunk)
+                chunk = []
+                self.ctx.progress(self.read, max(total, self.read))
+        if chunk:
+            self._chunk(chunk)
+        self.ctx.progress(self.read, self.read)
+
+    def _chunk(self, chunk: List[Tuple[int, Dict[str, Any]]]) -> None:
+        self.read += len(chunk)
+        self.lookups.load(chunk)
+
+        orders: List[Tuple[int, Dict[str, Any]]] = []
+        for row_no, row in chunk:
+            order = _validate(row_no, row, self.lookups, self.default_customer, self.errors)
+            if order is not None:
+                orders.append((row_no, order))
+        orders = self._dedupe(orders)
+        self.valid += len(orders)
+        if not orders or self.dry_run:
+            return
+
+        self._assign_order_codes(orders)
+        now = datetime.utcnow()
+        staged = {}
+        rows = []
+        for row_no, order in orders:
+            order_id = str(uuid.uuid4())
+            staged[order_id] = (row_no, order)
+            order.setdefault("order_date", now)
+            order.setdefault("qty", 1)
+            values = {"job_id": self.ctx.job_id, "row_no": row_no, "id": order_id, "log_id": str(uuid.uuid4()), **order}
+            rows.append(tuple(values.get(c) for c in STAGING_COLUMNS))
+
+        _copy_to_staging(self.session, rows)
+        inserted = set(self.session.execute(_MERGE, {
+            "job_id": self.ctx.job_id, "tenant_id": self.tenant_id, "user_id": self.ctx.user_id, "now": now,
+        }).scalars().all())
+        self.session.execute(_CLEAR_STAGING, {"job_id": self.ctx.job_id})
+        sync_milestones(self.session, inserted)
+        refresh_documents(self.session, order_ids=inserted)
+        self.session.commit()
+        if inserted:
+            invalidate_tables(self.tenant_id, "orders")
+
+        self.created += len(inserted)
+        for order_id, (row_no, order) in staged.items():
+            if order_id not in inserted:
+                self.duplicates += 1
+                self.errors.add(row_no, "order_code", "Order code or container already exists", order["order_code"])
+
+    def _dedupe(self, orders: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+        """Drop container numbers / order codes repeated in the file or already in the database"""
+        containers = {o["container_code"] for _, o in orders if o.get("container_code")} - self.seen_containers
+        codes = {o["order_code"] for _, o in orders if o.get("order_code")} - self.seen_order_codes
+        existing_containers = set()
+        if containers:
+            existing_containers = set(self.session.exec(
+                select(Order.container_code).where(Order.tenant_id == self.tenant_id, Order.container_code.in_(containers))
+            ).all())
+        existing_codes = set()
+        if codes:
+            existing_codes = set(self.session.exec(
+                select(Order.order_code).where(Order.tenant_id == self.tenant_id, Order.order_code.in_(codes))
+            ).all())
+
+        kept = []
+        for row_no, order in orders:
+            container = order.get("container_code")
+            code = order.get("order_code")
+            if container and (container in self.seen_containers or container in existing_containers):
+                message = "Container already imported" if container in existing_containers else "Container repeated in file"
+                self.duplicates += 1
+                self.errors.add(row_no, "container_code", message, container)
+                continue
+            if code and (code in self.seen_order_codes or code in existing_codes):
+                message = "Order code already exists" if code in existing_codes else "Order code repeated in file"
+                self.duplicates += 1
+                self.errors.add(row_no, "order_code", message, code)
+                continue
+            if container:
+                self.seen_containers.add(container)
+            if code:
+                self.seen_order_codes.add(code)
+            kept.append((row_no, order))
+        return kept
+
+    def _assign_order_codes(self, orders: List[Tuple[int, Dict[str, Any]]]) -> None:
+        """Manual codes move their customer's sequence first; the rest get one allocation per customer"""
+        manual: Dict[str, List[str]] = defaultdict(list)
+        pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for _, order in orders:
+            customer_code = order.pop("customer_code")
+            if order.get("order_code"):
+                manual[customer_code].append(order["order_code"])
+            else:
+                pending[customer_code].append(order)
+
+        for customer_code, codes in manual.items():
+            numbered = [
+                c for c in codes if re.fullmatch(rf"{re.escape(customer_code)}-\d{{1,{sequences.MAX_DIGITS}}}", c)
+            ]
+            if numbered:
+                highest = max(numbered, key=lambda c: int(c.rsplit("-", 1)[1]))
+                note_manual_order_code(self.session, self.tenant_id, customer_code, highest)
+        for customer_code, group in pending.items():
+            for order, code in zip(group, next_order_codes(self.session, self.tenant_id, customer_code, len(group))):
+                order["order_code"] = code
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "ok": True,
+            "dry_run": self.dry_run,
+            "rows": self.read,
+            "valid": self.valid,
+            "created": self.created,
+            "failed": len(self.errors.rows),
+            "duplicates": self.duplicates,
+            "errors": self.errors.first,
+            "error_report_url": f"/api/v1/orders/import/{self.ctx.job_id}/errors" if self.errors.count else None,
+        }
+
+
+def run_order_import(
+    ctx: JobContext,
+    source_path: str,
+    fmt: str,
+    customer_id: Optional[str] = None,
+    dry_run: bool = False,
+) -> dict:
+    """Job handler for orders.import"""
+    path = Path(source_path)
+    if fmt not in _READERS:
+        raise JobFailed(f"Unsupported format: {fmt}")
+    if not path.exists():
+        raise JobFailed("Import file is no longer available, upload it again")
+
+    importer = _Importer(ctx, customer_id, dry_run)
+    try:
+        importer.run(_READERS[fmt](path), _estimate_rows(path, fmt))
+    finally:
+        importer.errors.close()
+        path.unlink(missing_ok=True)
+    return importer.result()
@@ -0,0 +1,216 @@
+"""
+Order search
+
+One row per order in order_search_documents holds what dispatchers search by:
+order code, container number, customer code/name, pickup/delivery text and
+site names, seal and DO numbers. The row is indexed three ways:
+
+- (tenant_id, container_code) and (tenant_id, order_code) with
+  text_pattern_ops: exact and prefix matches ("TCNU12" -> TCNU1234567)
+- tsv (generated tsvector, 'simple' config) with GIN: word prefixes
+  ("cat la" -> "... cat lai ..."; accents are kept, so "cát lái" and
+  "cat lai" are different words)
+- document with a pg_trgm GIN index: substrings of 3+ characters
+
+so a search reads a few index entries instead of scanning the tenant's orders
+with ILIKE '%q%'. Results are ranked exact code > code prefix > text match.
+
+Documents are rebuilt in the same transaction as the write: after each flush
+for new or changed orders, and for every order of a customer or site whose
+name/code changed. Writes that bypass the ORM (raw SQL) call
+refresh_documents() themselves; ``python -m app.services.order_search``
+rebuilds everything.
+"""
+import re
+from typing import Iterable, List, Optional
+
+from sqlalchemy import bindparam, column, event, inspect, text
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from app.models import Customer, Order, Site
+
+# Shortest query matched as a substring (pg_trgm needs 3 characters to use the index)
+MIN_SUBSTRING_LENGTH = 3
+
+_UPSERT = """
+    INSERT INTO order_search_documents (order_id, tenant_id, order_code, container_code, status, order_date, document, updated_at)
+    SELECT o.id, o.tenant_id, upper(o.order_code), upper(replace(o.container_code, ' ', '')), o.status, o.order_date,
+           lower(concat_ws(' ', o.order_code, o.container_code, c.code, c.name, c.short_name,
+                           o.pickup_text, o.delivery_text, ps.code, ps.company_name, ds.code, ds.company_name,
+                           o.seal_no, o.delivery_order_no, o.cargo_note, o.equipment)),
+           now()
+    FROM orders o
+    LEFT JOIN customers c ON c.id = o.customer_id
+    LEFT JOIN sites ps ON ps.id = o.pickup_site_id
+    LEFT JOIN sites ds ON ds.id = o.delivery_site_id
+    WHERE {where}
+    ON CONFLICT (order_id) DO UPDATE SET
+        tenant_id = EXCLUDED.tenant_id, order_code = EXCLUDED.order_code,
+        container_code = EXCLUDED.container_code, status = EXCLUDED.status,
+        order_date = EXCLUDED.order_date, document = EXCLUDED.document,
+        updated_at = EXCLUDED.updated_at
+"""
+_REFRESH = {
+    "orders": text(_UPSERT.format(where="o.id IN :ids")).bindparams(bindparam("ids", expanding=True)),
+    "customers": text(_UPSERT.format(where="o.customer_id IN :ids")).bindparams(bindparam("ids", expanding=True)),
+    "sites": text(_UPSERT.format(where="o.pickup_site_id IN :ids OR o.delivery_site_id IN :ids")).bindparams(
+        bindparam("ids", expanding=True)
+    ),
+}
+REBUILD_SQL = _UPSERT.format(where="TRUE")
+
+_MATCH = """
+    SELECT d.order_id,
+           CASE WHEN d.container_code = :code OR d.order_code = :code THEN 3
+                WHEN d.container_code LIKE :code_prefix OR d.order_code LIKE :code_prefix THEN 2
+                ELSE 0 END
+           + ts_rank_cd(d.tsv, to_tsquery('simple', :tsquery))
+           + {similarity} AS score
+    FROM order_search_documents d
+    {join}
+    WHERE d.tenant_id = :tenant_id
+      AND (d.container_code LIKE :code_prefix
+           OR d.order_code LIKE :code_prefix
+           OR d.tsv @@ to_tsquery('simple', :tsquery)
+           {substring})
+      {filters}
+"""
+
+_SEARCHED_COLUMNS = {
+    Customer: ("name", "code", "short_name"),
+    Site: ("company_name", "code"),
+}
+
+
+def refresh_documents(bind, order_ids: Iterable[str] = (), customer_ids: Iterable[str] = (),
+                      site_ids: Iterable[str] = ()) -> None:
+    """Rebuild the documents of the given orders / of all orders of the given customers or sites"""
+    for kind, ids in (("orders", order_ids), ("customers", customer_ids), ("sites", site_ids)):
+        ids = [str(i) for i in ids if i]
+        if ids:
+            bind.execute(_REFRESH[kind], {"ids": ids})
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _tsquery(q: str) -> Optional[str]:
+    """'tan cang cat' -> 'tan:* & cang:* & cat:*' (word characters only, so always valid syntax)"""
+    words = re.findall(r"\w+", q.lower())
+    return " & ".join(f"{w}:*" for w in words) if words else None
+
+
+def search_orders(
+    session: Session,
+    tenant_id: str,
+    q: str,
+    limit: int = 20,
+    status: Optional[List[str]] = None,
+    customer_user_id: Optional[str] = None,
+    driver_id: Optional[str] = None,
+) -> List[Order]:
+    """
+    Orders matching ``q`` best first (newest first among equal scores).
+
+    customer_user_id / driver_id restrict to what a CUSTOMER / DRIVER may see,
+    as in GET /orders.
+    """
+    q = (q or "").strip()
+    tsquery = _tsquery(q)
+    if not tsquery:
+        return []
+
+    code = re.sub(r"\s+", "", q).upper()
+    params = {
+        "tenant_id": str(tenant_id),
+        "code": code,
+        "code_prefix": _escape_like(code) + "%",
+        "tsquery": tsquery,
+        "limit": limit,
+    }
+    similarity, substring = "0", ""
+    if len(q) >= MIN_SUBSTRING_LENGTH:
+        params["q"] = q.lower()
+        params["contains"] = "%" + _escape_like(q.lower()) + "%"
+        similarity = "similarity(d.document, :q)"
+        substring = "OR d.document LIKE :contains"
+
+    join, filters = "", []
+    if status:
+        filters.append("AND d.status IN :statuses")
+        params["statuses"] = list(status)
+    # None = no restriction; any other value (even "") filters
+    if customer_user_id is not None or driver_id is not None:
+        join = "JOIN orders o ON o.id = d.order_id"
+        if customer_user_id is not None:
+            filters.append("AND (o.created_by_user_id = :user_id OR o.customer_id = :user_id)")
+            params["user_id"] = str(customer_user_id)
+        if driver_id is not None:
+            filters.append("AND o.driver_id = :driver_id")
+            params["driver_id"] = str(driver_id)
+
+    query = text(
+        _MATCH.format(similarity=similarity, join=join, substring=substring, filters="\n      ".join(filters))
+        + "    ORDER BY score DESC, d.order_date DESC\n    LIMIT :limit"
+    )
+    if status:
+        query = query.bindparams(bindparam("statuses", expanding=True))
+
+    ranked = [row.order_id for row in session.execute(query, params)]
+    if not ranked:
+        return []
+    orders = {o.id: o for o in session.exec(select(Order).where(Order.id.in_(ranked))).all()}
+    return [orders[i] for i in ranked if i in orders]
+
+
+def matching_order_ids(tenant_id: str, q: str):
+    """
+    SELECT of the order ids matching ``q`` (unranked), for endpoints that keep
+    their own filters/pagination: ``query.where(Order.id.in_(matching_order_ids(...)))``
+    """
+    q = (q or "").strip()
+    code = re.sub(r"\s+", "", q).upper()
+    params = {"tenant_id": str(tenant_id), "code_prefix": _escape_like(code) + "%"}
+    tsquery, substring = "", ""
+    if _tsquery(q):
+        params["tsquery"] = _tsquery(q)
+        tsquery = "OR d.tsv @@ to_tsquery('simple', :tsquery)"
+    if len(q) >= MIN_SUBSTRING_LENGTH:
+        params["contains"] = "%" + _escape_like(q.lower()) + "%"
+        substring = "OR d.document LIKE :contains"
+    matches = text(f"""
+        SELECT d.order_id FROM order_search_documents d
+        WHERE d.tenant_id = :tenant_id
+          AND (d.container_code LIKE :code_prefix OR d.order_code LIKE :code_prefix {tsquery} {substring})
+    """).bindparams(**params).columns(column("order_id")).subquery()
+    return select(matches.c.order_id)
+
+
+# ============ Keep documents in step with ORM writes ============
+
+def _changed(obj, names) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in names if name in state.attrs)
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    order_ids, customer_ids, site_ids = set(), set(), set()
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Order):
+            order_ids.add(obj.id)
+        elif type(obj) in _SEARCHED_COLUMNS and obj not in session.new and _changed(obj, _SEARCHED_COLUMNS[type(obj)]):
+            (customer_ids if isinstance(obj, Customer) else site_ids).add(obj.id)
+    if order_ids or customer_ids or site_ids:
+        refresh_documents(session.connection(), order_ids, customer_ids, site_ids)
+
+
+if __name__ == "__main__":
+    # Rebuild every document (after raw SQL writes to orders or a restore)
+    from app.db.session import background_engine
+
+    with background_engine.begin() as conn:
+        count = conn.execute(text(REBUILD_SQL)).rowcount
+    print(f"Rebuilt {count} order search documents")
@@ -1,15 +1,57 @@
 """
 Order Status Logger Service
 Automatically log status changes to order_status_logs table
+
+Each log also keeps the order's milestone columns (accepted_at, picked_up_at,
+delivered_at, completed_at) in step: the first time an order reaches one of
+those statuses. Salary and revenue queries filter on those indexed columns
+(a range scan) instead of looking up status logs per order.
 """
 
 from sqlmodel import Session
-from app.models import OrderStatusLog
+from sqlalchemy import bindparam, text
+from app.models import Order, OrderStatusLog
+from app.models.order import OrderStatus
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 import uuid
 
 
+# Status -> Order column holding when the order first reached it
+MILESTONES = {
+    OrderStatus.ACCEPTED: "accepted_at",
+    OrderStatus.ASSIGNED: "accepted_at",  # Accepting with a driver goes straight to ASSIGNED
+    OrderStatus.IN_TRANSIT: "picked_up_at",
+    OrderStatus.DELIVERED: "delivered_at",
+    OrderStatus.COMPLETED: "completed_at",
+}
+
+_SYNC_MILESTONES = """
+    UPDATE orders o SET
+        accepted_at = m.accepted_at,
+        picked_up_at = m.picked_up_at,
+        delivered_at = m.delivered_at,
+        completed_at = m.completed_at
+    FROM (
+        SELECT order_id,
+               MIN(changed_at) FILTER (WHERE to_status IN ('ACCEPTED', 'ASSIGNED')) AS accepted_at,
+               MIN(changed_at) FILTER (WHERE to_status = 'IN_TRANSIT') AS picked_up_at,
+               MIN(changed_at) FILTER (WHERE to_status = 'DELIVERED') AS delivered_at,
+               MIN(changed_at) FILTER (WHERE to_status = 'COMPLETED') AS completed_at
+        FROM order_status_logs
+        WHERE {where}
+        GROUP BY order_id
+    ) m
+    WHERE o.id = m.order_id
+      AND (o.accepted_at IS DISTINCT FROM m.accepted_at
+           OR o.picked_up_at IS DISTINCT FROM m.picked_up_at
+           OR o.delivered_at IS DISTINCT FROM m.delivered_at
+           OR o.completed_at IS DISTINCT FROM m.completed_at)
+"""
+_SYNC_ORDERS = text(_SYNC_MILESTONES.format(where="order_id IN :ids")).bindparams(bindparam("ids", expanding=True))
+_SYNC_TENANT = text(_SYNC_MILESTONES.format(where="tenant_id = :tenant_id"))
+
+
 def log_status_change(
     session: Session,
     tenant_id: str,
@@ -46,11 +88,43 @@ def log_status_change(
     )
 
     session.add(log)
+
+    # First time at a milestone status: stamp the order (callers have it loaded)
+    column = MILESTONES.get(to_status)
+    if column:
+        order = session.get(Order, order_id)
+        if order is not None and getattr(order, column) is None:
+            setattr(order, column, log.changed_at)
+            session.add(order)
+
     # Don't commit here - let the caller handle transaction
 
     return log
 
 
+def sync_milestones(session: Session, order_ids: Iterable[str]) -> None:
+    """
+    Recompute milestone columns from the status logs, for writes that bypass
+    log_status_change (edited changed_at, bulk imports)
+    """
+    ids = [str(i) for i in order_ids if i]
+    if ids:
+        session.flush()
+        session.execute(_SYNC_ORDERS, {"ids": ids})
+
+
+def backfill_milestones(session: Session, tenant_id: str) -> int:
+    """Recompute milestone columns for every order of a tenant; returns orders changed"""
+    return session.execute(_SYNC_TENANT, {"tenant_id": str(tenant_id)}).rowcount
+
+
+def month_range(year: int, month: int) -> Tuple[datetime, datetime]:
+    """[start, end) of a calendar month, for range filters on milestone columns"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
 def get_delivered_date(session: Session, order_id: str) -> Optional[datetime]:
     """
     Get the datetime when order was marked as DELIVERED
@@ -58,16 +132,6 @@ def get_delivered_date(session: Session, order_id: str) -> Optional[datetime]:
     Returns:
         Datetime when status changed to DELIVERED, or None if not delivered yet
     """
-    from sqlmodel import select
-    from app.models.order import OrderStatus
-
-    log = session.exec(
-        select(OrderStatusLog)
-        .where(
-            OrderStatusLog.order_id == order_id,
-            OrderStatusLog.to_status == OrderStatus.DELIVERED
-        )
-        .order_by(OrderStatusLog.changed_at.asc())  # Get first DELIVERED log
-    ).first()
-
-    return log.changed_at if log else None
+    # Order.delivered_at mirrors the first DELIVERED log; loaded orders cost no query
+    order = session.get(Order, order_id)
+    return order.delivered_at if order else None
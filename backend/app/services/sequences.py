@@ -0,0 +1,146 @@
+"""
+Document number sequences (order codes, invoice numbers, MES/OMS numbers)
+
+One row per (tenant, key) in document_sequences holds the last number handed
+out. allocate() reserves a block of N numbers with a single upsert:
+
+    INSERT ... ON CONFLICT (tenant_id, key)
+    DO UPDATE SET last_value = last_value + N RETURNING last_value
+
+so concurrent callers never get the same number and a batch of 500 orders costs
+one round trip instead of 500 scan + lock + commit cycles.
+
+- The scan of existing documents (``max_suffix``) only runs when a key is used
+  for the first time, to seed it above numbers created before the sequence
+  existed. Concurrent first callers wait on the new row's lock, then continue
+  from the seeded value.
+- Numbers are taken in their own short transaction, like Postgres sequences:
+  the row lock is never held for the caller's whole request, and a caller that
+  rolls back leaves a gap. That transaction runs on the small sequence pool
+  (sequence_engine) rather than on a second connection from the caller's
+  pool, so requests that already hold a connection never queue for another.
+- Manually entered numbers (e.g. an order code typed by the user) must be
+  reported with bump() so the sequence never hands them out again.
+"""
+import asyncio
+import re
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+# Tenant id for platform-wide sequences (billing invoices)
+GLOBAL_TENANT = "*"
+
+# Longest numeric suffix that is a sequence number: last_value is an INTEGER,
+# so longer suffixes (e.g. a pasted container or phone number) are ignored
+MAX_DIGITS = 9
+
+# seed(conn) -> highest number already used for the key
+Seed = Callable[[Connection], int]
+
+_UPSERT = """
+    INSERT INTO document_sequences (id, tenant_id, key, last_value, created_at, updated_at)
+    VALUES (:id, :tenant_id, :key, :value, :now, :now)
+    ON CONFLICT (tenant_id, key) DO UPDATE
+    SET last_value = {new_value}, updated_at = EXCLUDED.updated_at
+    RETURNING last_value, (xmax = 0) AS created
+"""
+_ALLOCATE = text(_UPSERT.format(new_value="document_sequences.last_value + EXCLUDED.last_value"))
+_BUMP = text(_UPSERT.format(new_value="GREATEST(document_sequences.last_value, EXCLUDED.last_value)"))
+
+_SEED_ADD = text("""
+    UPDATE document_sequences SET last_value = last_value + :base
+    WHERE tenant_id = :tenant_id AND key = :key
+    RETURNING last_value
+""")
+_SEED_MAX = text("""
+    UPDATE document_sequences SET last_value = GREATEST(last_value, :base)
+    WHERE tenant_id = :tenant_id AND key = :key
+    RETURNING last_value
+""")
+
+
+def _params(tenant_id: str, key: str, value: int) -> dict:
+    return {"id": str(uuid.uuid4()), "tenant_id": str(tenant_id), "key": key,
+            "value": value, "now": datetime.utcnow()}
+
+
+def _allocate(conn: Connection, tenant_id: str, key: str, count: int, seed: Optional[Seed]) -> range:
+    last, created = conn.execute(_ALLOCATE, _params(tenant_id, key, count)).one()
+    if created and seed is not None:
+        base = seed(conn) or 0
+        if base > 0:
+            last = conn.execute(_SEED_ADD, {"base": base, "tenant_id": str(tenant_id), "key": key}).scalar_one()
+    return range(last - count + 1, last + 1)
+
+
+def _bump(conn: Connection, tenant_id: str, key: str, value: int, seed: Optional[Seed]) -> None:
+    _, created = conn.execute(_BUMP, _params(tenant_id, key, value)).one()
+    if created and seed is not None:
+        base = seed(conn) or 0
+        if base > value:
+            conn.execute(_SEED_MAX, {"base": base, "tenant_id": str(tenant_id), "key": key})
+
+
+def _engine(bind: Any):
+    """An Engine is used as given; for a Session (sync or async) numbers come from sequence_engine"""
+    if isinstance(bind, Engine):
+        return bind
+    from app.db.session import sequence_engine
+
+    return sequence_engine
+
+
+def allocate(bind: Any, tenant_id: str, key: str, count: int = 1, seed: Optional[Seed] = None) -> range:
+    """Reserve ``count`` consecutive numbers for (tenant, key)"""
+    if count < 1:
+        raise ValueError("count must be >= 1")
+    with _engine(bind).begin() as conn:
+        return _allocate(conn, tenant_id, key, count, seed)
+
+
+async def allocate_async(session: Any, tenant_id: str, key: str, count: int = 1, seed: Optional[Seed] = None) -> range:
+    """allocate() for AsyncSession callers, in a worker thread; ``seed`` receives a sync Connection"""
+    return await asyncio.to_thread(allocate, session, tenant_id, key, count, seed)
+
+
+def bump(bind: Any, tenant_id: str, key: str, value: int, seed: Optional[Seed] = None) -> None:
+    """Make sure the sequence is at least ``value`` (a number was used outside allocate)"""
+    with _engine(bind).begin() as conn:
+        _bump(conn, tenant_id, key, value, seed)
+
+
+def peek(bind: Any, tenant_id: str, key: str) -> Optional[int]:
+    """Last number handed out, or None if the key was never used (no lock, no increment)"""
+    query = text("SELECT last_value FROM document_sequences WHERE tenant_id = :tenant_id AND key = :key")
+    params = {"tenant_id": str(tenant_id), "key": key}
+    if hasattr(bind, "get_bind"):  # A plain read: the caller's session is fine
+        return bind.execute(query, params).scalar()
+    with bind.connect() as conn:
+        return conn.execute(query, params).scalar()
+
+
+def max_suffix(table: str, column: str, prefix: str, tenant_id: Optional[str] = None) -> Seed:
+    """
+    Seed from existing documents: highest N among ``column`` values of the form
+    ``<prefix><digits>`` (e.g. ADG-225 but not ADG-2.01), up to MAX_DIGITS
+    digits. ``table``/``column`` are code constants, never user input.
+    """
+    like = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    tenant_filter = "tenant_id = :tenant_id AND " if tenant_id is not None else ""
+    query = text(f"""
+        SELECT MAX(CAST(SUBSTRING({column} FROM :start) AS INTEGER))
+        FROM {table}
+        WHERE {tenant_filter}{column} LIKE :like AND {column} ~ :regex
+    """)
+    params = {"start": len(prefix) + 1, "like": like, "regex": f"^{re.escape(prefix)}[0-9]{{1,{MAX_DIGITS}}}$"}
+    if tenant_id is not None:
+        params["tenant_id"] = str(tenant_id)
+
+    def seed(conn: Connection) -> int:
+        return conn.execute(query, params).scalar() or 0
+
+    return seed
@@ -0,0 +1,65 @@
+"""
+Order import job against the benchmark database.
+
+Runs the real COPY + merge path of app/services/order_import.py (psycopg 3 has
+to be able to type every merge parameter) and times one import of
+IMPORT_ROWS rows. The imported orders are deleted again so the other
+benchmarks see the same seeded data.
+"""
+import csv
+import uuid
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.jobs import JobContext
+from app.services.order_import import run_order_import
+
+IMPORT_ROWS = 500
+CONTAINER_PREFIX = "IMPU"
+
+
+def _write_csv(path, customer_code: str, start: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Mã KH", "Số Cont", "Loại Cont", "Ngày đặt", "Điểm lấy", "Điểm giao"])
+        for i in range(IMPORT_ROWS):
+            writer.writerow([customer_code, f"{CONTAINER_PREFIX}{start + i:07d}", "40HC", "15/01/2026", "Cat Lai", "Binh Duong"])
+        # Container of a seeded order: rejected as a duplicate
+        writer.writerow([customer_code, "MSCU1000000", "20DC", "15/01/2026", "Cat Lai", "Binh Duong"])
+
+
+def _delete_imported(session, tenant_id: str) -> None:
+    params = {"tenant_id": tenant_id, "prefix": f"{CONTAINER_PREFIX}%"}
+    imported = "SELECT id FROM orders WHERE tenant_id = :tenant_id AND container_code LIKE :prefix"
+    session.execute(text(f"DELETE FROM order_status_logs WHERE order_id IN ({imported})"), params)
+    session.execute(text(f"DELETE FROM orders WHERE id IN ({imported})"), params)
+    session.commit()
+
+
+def bench_order_import_csv(benchmark, session, bench_data, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_DIR", str(tmp_path))  # error reports
+    runs = []
+
+    def setup():
+        path = tmp_path / f"orders_{len(runs)}.csv"
+        _write_csv(path, bench_data.customer_code, len(runs) * IMPORT_ROWS)
+        ctx = JobContext(job_id=str(uuid.uuid4()), tenant_id=bench_data.tenant_id, user_id=None, attempt=1,
+                         session=session)
+        runs.append(ctx.job_id)
+        return (ctx, str(path), "csv"), {}
+
+    try:
+        result = benchmark.pedantic(run_order_import, setup=setup, rounds=10, iterations=1)
+        assert result["created"] == IMPORT_ROWS
+        assert result["duplicates"] == 1
+
+        created = session.execute(text("""
+            SELECT count(*) FROM orders o
+            JOIN order_status_logs l ON l.order_id = o.id AND l.note = 'Imported'
+            JOIN order_search_documents d ON d.order_id = o.id
+            WHERE o.tenant_id = :tenant_id AND o.container_code LIKE :prefix
+        """), {"tenant_id": bench_data.tenant_id, "prefix": f"{CONTAINER_PREFIX}%"}).scalar()
+        assert created == IMPORT_ROWS * len(runs)
+    finally:
+        _delete_imported(session, bench_data.tenant_id)
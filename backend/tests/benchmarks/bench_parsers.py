@@ -0,0 +1,50 @@
+"""
+Benchmarks for pure-CPU parsing/search paths (no database rows involved).
+"""
+from pathlib import Path
+
+from app.ai.knowledge import KnowledgeBase
+from app.services.document_parser import DocumentParser
+
+KNOWLEDGE_DIR = Path(__file__).resolve().parents[2] / "app" / "ai" / "knowledge"
+
+
+def _invoice_text(lines: int) -> str:
+    header = (
+        "COMMERCIAL INVOICE\n"
+        "Invoice No.: INV-2026-000123\n"
+        "Invoice Date: 15/01/2026\n"
+        "Seller: SHENZHEN PRECISION COMPONENTS CO., LTD\n"
+        "Buyer: CONG TY TNHH DIEN TU SAIGON\n"
+        "Port of Loading: SHEKOU, CHINA\n"
+        "Port of Discharge: HO CHI MINH, VIETNAM\n"
+        "Vessel: WAN HAI 305 Voyage: N123\n"
+        "B/L No.: WHLC0123456789\n"
+        "Container: WHLU1234567 / 40HC\n"
+        "Incoterms: CIF HOCHIMINH\n"
+        "Currency: USD\n"
+        "DESCRIPTION OF GOODS / PART NUMBER\n"
+    )
+    items = "".join(
+        f"{i + 1} PN-{100000 + i} Connector assembly type {i % 7} HS Code: 8536{i % 90:02d}90 "
+        f"{(i % 50) + 1} PCS {1.25 + i % 10:.2f} {((i % 50) + 1) * (1.25 + i % 10):.2f}\n"
+        for i in range(lines)
+    )
+    footer = (
+        "Gross Weight: 1,250.50 KGS\n"
+        "Net Weight: 1,100.00 KGS\n"
+        "Packages: 45 CTN\n"
+        "Total Amount: USD 25,678.90\n"
+    )
+    return header + items + footer
+
+
+def bench_parse_pdf_text_invoice(measure):
+    parser = DocumentParser()
+    text = _invoice_text(200)
+    measure(parser.parse_pdf_text, text)
+
+
+def bench_knowledge_base_search(measure):
+    kb = KnowledgeBase(knowledge_dir=str(KNOWLEDGE_DIR))
+    measure(kb.search, "làm sao tạo đơn hàng container và điều xe", 3)
@@ -0,0 +1,65 @@
+"""
+Benchmarks for service functions that read from the database.
+
+Each call runs against the deterministic data in seed.py; query counts per call
+are reported next to wall time and checked against query_baseline.json.
+"""
+from datetime import date, datetime
+
+from app.api.v1.routes.driver_salary_management import build_trip_snapshot
+from app.models import Order
+from app.models.driver_salary_setting import DriverSalarySetting
+from app.models.fms.customs_partners import CustomsExporter, normalize_partner_name
+from app.services.driver_scorer import DriverScorer
+from app.services.freight_calculator import get_freight_from_rates
+from app.services.order_code import next_order_code, next_order_codes
+from app.services.partner_matching_service import PartnerMatchingService
+
+from seed import SNAPSHOT_MONTH, SNAPSHOT_YEAR
+
+
+def bench_driver_scorer_find_best_driver(measure, session, bench_data):
+    scorer = DriverScorer()
+    order = session.get(Order, bench_data.order_id)
+    measure(scorer.find_best_driver, order, session, 5)
+
+
+def bench_get_freight_from_rates(measure, session, bench_data):
+    measure(
+        get_freight_from_rates,
+        session,
+        pickup_location_id=None,
+        delivery_location_id=None,
+        pickup_site_id=bench_data.pickup_site_id,
+        delivery_site_id=bench_data.delivery_site_id,
+        tenant_id=bench_data.tenant_id,
+        equipment="40",
+        order_date=date(2026, 1, 15),
+    )
+
+
+def bench_next_order_code(measure, session, bench_data):
+    measure(next_order_code, session, bench_data.tenant_id, bench_data.customer_code, datetime(2026, 1, 15))
+
+
+def bench_next_order_codes_batch(measure, session, bench_data):
+    measure(next_order_codes, session, bench_data.tenant_id, bench_data.customer_code, 100)
+
+
+def bench_partner_fuzzy_match(measure, session, bench_data):
+    service = PartnerMatchingService(session)
+    normalized = normalize_partner_name(bench_data.exporter_query)
+    measure(service._fuzzy_match, CustomsExporter, normalized, bench_data.tenant_id)
+
+
+def bench_build_trip_snapshot(measure, session, bench_data):
+    settings = session.get(DriverSalarySetting, bench_data.salary_setting_id)
+    measure(
+        build_trip_snapshot,
+        session,
+        bench_data.tenant_id,
+        bench_data.driver_id,
+        SNAPSHOT_YEAR,
+        SNAPSHOT_MONTH,
+        settings,
+    )
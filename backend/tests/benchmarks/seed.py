@@ -0,0 +1,185 @@
+"""
+Deterministic seed data for the micro-benchmarks.
+
+Every id is a uuid5 of a fixed name and every random choice comes from a
+seeded Random, so two runs (and two machines) benchmark the same rows and
+issue the same number of queries.
+"""
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlmodel import Session
+
+from app.models import Customer, Driver, Location, Order, Rate, Site, Tenant, Vehicle, VehicleGPS
+from app.models.driver_salary_setting import DriverSalarySetting
+from app.models.fms.customs_partners import CustomsExporter
+from app.models.order_status_log import OrderStatusLog
+
+SEED = 20260105
+NAMESPACE = uuid.UUID("6f1b2f0e-6a5c-4b8e-9a57-0c6d1c2b9e41")
+
+NUM_LOCATIONS = 30
+NUM_CUSTOMERS = 20
+NUM_DRIVERS = 60
+NUM_ORDERS = 3000
+NUM_EXPORTERS = 2000
+
+# Fixed "now" so date filters (last 30 days, this month) hit the same rows;
+# conftest.py freezes datetime.utcnow()/now() of the benchmarked modules at it
+NOW = datetime(2026, 1, 15, 12, 0, 0)
+SNAPSHOT_YEAR, SNAPSHOT_MONTH = 2026, 1
+
+EQUIPMENT = ["20DC", "40DC", "40HC", "45HC"]
+EXPORTER_WORDS = [
+    "GLOBAL", "PACIFIC", "ELECTRONICS", "TRADING", "SUPPLY", "INDUSTRIAL", "ASIA",
+    "TECHNOLOGY", "MANUFACTURING", "LOGISTICS", "PRECISION", "COMPONENTS", "HOLDINGS",
+    "INTERNATIONAL", "SHENZHEN", "DONGGUAN", "SUZHOU", "SAIGON", "HANOI", "DELTA",
+]
+
+
+def _id(kind: str, n: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"{kind}-{n}"))
+
+
+@dataclass
+class BenchData:
+    """Handles to seeded rows the benchmarks operate on"""
+    tenant_id: str
+    customer_code: str
+    driver_id: str
+    order_id: str
+    pickup_site_id: str
+    delivery_site_id: str
+    salary_setting_id: str
+    exporter_query: str
+    site_ids: List[str] = field(default_factory=list)
+
+
+def seed(session: Session) -> BenchData:
+    rng = random.Random(SEED)
+    tenant_id = _id("tenant", 0)
+
+    session.add(Tenant(id=tenant_id, code="BENCH", name="Benchmark Logistics", is_active=True))
+
+    # Locations + sites around HCMC (lat/lng so distance scoring does real work)
+    locations, sites = [], []
+    for i in range(NUM_LOCATIONS):
+        lat = 10.70 + rng.random() * 0.4
+        lng = 106.55 + rng.random() * 0.4
+        loc = Location(
+            id=_id("location", i), tenant_id=tenant_id, code=f"LOC{i:03d}",
+            name=f"Location {i}", type=rng.choice(["PORT", "ICD", "WAREHOUSE"]),
+            latitude=lat, longitude=lng, is_active=True,
+        )
+        site = Site(
+            id=_id("site", i), tenant_id=tenant_id, location_id=loc.id, code=f"SITE{i:03d}",
+            company_name=f"Site {i}", detailed_address=f"{i} Nguyen Van Linh",
+            site_type=loc.type, latitude=lat, longitude=lng, status="ACTIVE",
+        )
+        locations.append(loc)
+        sites.append(site)
+    session.add_all(locations)
+    session.flush()
+    session.add_all(sites)
+
+    # One rate per ordered location pair that orders use
+    for i in range(NUM_LOCATIONS - 1):
+        session.add(Rate(
+            id=_id("rate", i), tenant_id=tenant_id,
+            pickup_location_id=locations[i].id, delivery_location_id=locations[i + 1].id,
+            distance_km=10 + i, price_cont_20=1_500_000 + i * 10_000, price_cont_40=2_000_000 + i * 10_000,
+            effective_date=date(2025, 1, 1), status="ACTIVE",
+        ))
+
+    customers = [
+        Customer(id=_id("customer", i), tenant_id=tenant_id, code=f"KH{i:02d}", name=f"Customer {i}", is_active=True)
+        for i in range(NUM_CUSTOMERS)
+    ]
+    session.add_all(customers)
+
+    # Drivers, each with a tractor and a GPS fix. No relationships are declared
+    # between these models, so flush each level before the rows referencing it.
+    tractors = [
+        Vehicle(
+            id=_id("vehicle", i), tenant_id=tenant_id, code=f"XE{i:03d}",
+            plate_no=f"51C-{10000 + i}", type="TRACTOR", status="ACTIVE",
+        )
+        for i in range(NUM_DRIVERS)
+    ]
+    session.add_all(tractors)
+    session.flush()
+    drivers = [
+        Driver(
+            id=_id("driver", i), tenant_id=tenant_id, name=f"Driver {i}",
+            phone=f"09{10000000 + i}", status="ACTIVE", tractor_id=tractor.id,
+        )
+        for i, tractor in enumerate(tractors)
+    ]
+    session.add_all(drivers)
+    session.flush()
+    for i, (tractor, driver) in enumerate(zip(tractors, drivers)):
+        session.add(VehicleGPS(
+            id=_id("gps", i), tenant_id=tenant_id, vehicle_id=tractor.id, driver_id=driver.id,
+            latitude=10.70 + rng.random() * 0.4, longitude=106.55 + rng.random() * 0.4,
+            work_status=rng.choice(["available", "on_trip", "loading"]),
+            gps_timestamp=NOW - timedelta(minutes=rng.randint(0, 60)),
+        ))
+    session.flush()
+
+    # Orders: a mix of statuses over the last 60 days, most delivered
+    status_logs = []
+    for i in range(NUM_ORDERS):
+        created = NOW - timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 1440))
+        pickup = rng.randrange(NUM_LOCATIONS - 1)
+        status = rng.choices(["NEW", "ASSIGNED", "DELIVERED", "COMPLETED"], weights=[1, 2, 4, 3])[0]
+        customer = customers[i % NUM_CUSTOMERS]
+        driver = drivers[i % NUM_DRIVERS] if status != "NEW" else None
+        order = Order(
+            id=_id("order", i), tenant_id=tenant_id, order_code=f"{customer.code}-{i + 1}",
+            order_date=created, customer_id=customer.id, status=status,
+            driver_id=driver.id if driver else None,
+            pickup_site_id=sites[pickup].id, delivery_site_id=sites[pickup + 1].id,
+            equipment=rng.choice(EQUIPMENT), container_code=f"MSCU{1000000 + i}", qty=1,
+            created_at=created, updated_at=created + timedelta(hours=6),
+        )
+        session.add(order)
+        if status in ("DELIVERED", "COMPLETED"):
+            status_logs.append(OrderStatusLog(
+                id=_id("status-log", i), tenant_id=tenant_id, order_id=order.id,
+                from_status="IN_TRANSIT", to_status="DELIVERED",
+                changed_at=created + timedelta(hours=5),
+            ))
+        if i % 500 == 499:
+            session.flush()
+    session.flush()
+    session.add_all(status_logs)
+
+    setting = DriverSalarySetting(id=_id("salary-setting", 0), tenant_id=tenant_id)
+    session.add(setting)
+
+    # Exporters for fuzzy partner matching
+    for i in range(NUM_EXPORTERS):
+        words = rng.sample(EXPORTER_WORDS, rng.randint(2, 4))
+        exporter = CustomsExporter(
+            id=_id("exporter", i), tenant_id=tenant_id,
+            name=f"{' '.join(words)} CO., LTD", is_active=True,
+        )
+        exporter.update_matching_fields()
+        session.add(exporter)
+
+    session.commit()
+
+    return BenchData(
+        tenant_id=tenant_id,
+        customer_code=customers[0].code,
+        driver_id=drivers[0].id,
+        order_id=_id("order", 0),
+        pickup_site_id=sites[0].id,
+        delivery_site_id=sites[1].id,
+        salary_setting_id=setting.id,
+        exporter_query="GLOBAL PACIFIC ELECTRONICS",
+        site_ids=[s.id for s in sites],
+    )
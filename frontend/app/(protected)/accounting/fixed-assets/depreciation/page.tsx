@@ -14,7 +14,8 @@ import {
   Package,
   AlertCircle,
 } from "lucide-react";
-import { apiFetch } from "@/lib/api";
+import { apiFetch, API_BASE } from "@/lib/api";
+import { waitForJob } from "@/lib/jobs";
 
 interface AssetSummary {
   total_assets: number;
@@ -64,13 +65,23 @@ export default function DepreciationPage() {
     setRunningDepreciation(true);
     setMessage(null);
     try {
-      const res = await apiFetch<{ message: string; assets_processed: number; total_depreciation: number }>(
-        "/accounting/run-bulk-depreciation",
-        { method: "POST" }
-      );
+      // Local date (toISOString would be the previous day before 7:00 in Vietnam)
+      const now = new Date();
+      const today = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, "0")}-${String(now.getDate()).padStart(2, "0")}`;
+      const res = await fetch(`${API_BASE}/api/v1/accounting/run-bulk-depreciation?depreciation_date=${today}`, {
+        method: "POST",
+        headers: { Authorization: `Bearer ${localStorage.getItem("access_token")}` },
+        credentials: "include",
+      });
+      if (!res.ok) {
+        const text = await res.text();
+        throw new Error(text || `HTTP ${res.status}`);
+      }
+      // Runs as a background job; poll until it finishes
+      const result = await waitForJob<{ processed: number; skipped: number; total_depreciation: number }>(res);
       setMessage({
         type: "success",
-        text: `Đã chạy khấu hao thành công cho ${res.assets_processed} tài sản`
+        text: `Đã chạy khấu hao thành công cho ${result.processed} tài sản`
       });
       fetchData();
     } catch (error: any) {
@@ -28,6 +28,7 @@ import { PartnerSuggestionField } from '@/components/fms/PartnerSuggestionField'
 import { CorrectionIndicator } from '@/components/fms/CorrectionIndicator';
 import { AuditTrailPanel } from '@/components/fms/AuditTrailPanel';
 import { History, Edit2 } from 'lucide-react';
+import { waitForJob } from '@/lib/jobs';
 
 // ============================================================
 // INTERFACES
@@ -636,7 +637,8 @@ export default function CustomsImportPage() {
         throw new Error(`Failed to parse documents: ${errorMsg}`);
       }
 
-      const result: AIParseResult = await response.json();
+      // Parsing runs as a background job; poll until it finishes
+      const result = await waitForJob<AIParseResult>(response);
 
       if (!result.success) {
         throw new Error(result.error || 'AI parsing failed');
@@ -3,6 +3,7 @@
 import { useState, useEffect, useMemo, useRef, useCallback } from "react";
 import { useTranslations } from "next-intl";
 import { getDriverColor } from "@/lib/utils";
+import { waitForJob, JobError } from "@/lib/jobs";
 import { History } from "lucide-react";
 import StatusLogModal from "@/components/tms/StatusLogModal";
 
@@ -450,10 +451,16 @@ export default function DriverSalaryManagementPage() {
         throw new Error(typeof error.detail === 'string' ? error.detail : JSON.stringify(error.detail) || "Failed to generate payrolls");
       }
 
-      const result = await res.json();
+      const result = await waitForJob(res);
       alert(result.message);
       fetchPayrolls();
     } catch (err: any) {
+      // Missing km is reported by the background job
+      if (err instanceof JobError && err.detail?.code === 'MISSING_KM') {
+        setMissingKmData(err.detail);
+        setShowMissingKmModal(true);
+        return;
+      }
       alert("Error: " + err.message);
     } finally {
       setGeneratingPayrolls(false);
@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react";
 import { useTranslations } from "next-intl";
+import { waitForJob } from "@/lib/jobs";
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || "http://localhost:8000/api/v1";
 
@@ -365,7 +366,7 @@ export default function TripRevenuePage() {
       if (!res.ok) {
         throw new Error(t("errors.recalculateFailed"));
       }
-      const result = await res.json();
+      const result = await waitForJob(res);
       setSuccessMsg(t("messages.recalculateComplete", { updated: result.updated, skipped: result.skipped }));
       setTimeout(() => setSuccessMsg(null), 5000);
       fetchOrders();
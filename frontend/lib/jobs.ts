@@ -0,0 +1,66 @@
+/**
+ * Background jobs (backend: /api/v1/jobs)
+ *
+ * Long-running endpoints answer 202 with { job_id, status_url }. waitForJob polls
+ * the status URL until the job finishes and returns its result, so callers can
+ * keep treating the call as request/response.
+ */
+
+export interface JobStatus<T = any> {
+  job_id: string;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed" | "cancelled";
+  progress: number;
+  progress_message?: string | null;
+  result?: T | null;
+  error?: string | null;
+  status_url: string;
+}
+
+export class JobError extends Error {
+  detail: any;
+
+  constructor(message: string, detail?: any) {
+    super(message);
+    this.name = "JobError";
+    this.detail = detail;
+  }
+}
+
+/**
+ * Resolve a fetch() Response into the job result.
+ * Non-202 responses are returned as-is (parsed JSON), for endpoints that
+ * still answer synchronously.
+ */
+export async function waitForJob<T = any>(
+  res: Response,
+  options: { intervalMs?: number; onProgress?: (job: JobStatus<T>) => void } = {}
+): Promise<T> {
+  const body = await res.json();
+  if (res.status !== 202 || !body?.status_url) {
+    return body as T;
+  }
+
+  const token = typeof window !== "undefined" ? localStorage.getItem("access_token") : null;
+  const url = new URL(body.status_url, res.url || window.location.href).toString();
+  const intervalMs = options.intervalMs ?? 1500;
+
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    const statusRes = await fetch(url, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+      credentials: "include",
+    });
+    if (!statusRes.ok) {
+      throw new JobError(`Job status HTTP ${statusRes.status}`);
+    }
+    const job: JobStatus<T> = await statusRes.json();
+    options.onProgress?.(job);
+    if (job.status === "succeeded") {
+      return job.result as T;
+    }
+    if (job.status === "failed" || job.status === "cancelled") {
+      throw new JobError(job.error || `Job ${job.status}`, job.result);
+    }
+  }
+}